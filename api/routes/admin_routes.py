@@ -16,7 +16,9 @@ from fastapi.responses import FileResponse
 from pydantic import BaseModel
 
 # Database and config
+from config import AppConfig
 from database.simple_connection import db as simple_db_instance
+from api.services.ghl_metadata_cache import ghl_metadata_cache, build_field_reference
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1/admin", tags=["Admin Dashboard"])
@@ -43,7 +45,7 @@ class GHLConnectionTest(BaseModel):
 def test_ghl_connection(private_token: str, location_id: str) -> Dict:
     """Test GHL API connection"""
     try:
-        url = f"https://services.leadconnectorhq.com/locations/{location_id}/customFields"
+        url = f"{AppConfig.GHL_API_BASE_URL}/locations/{location_id}/customFields"
         headers = {
             "Authorization": f"Bearer {private_token}",
             "Content-Type": "application/json",
@@ -75,27 +77,6 @@ def test_ghl_connection(private_token: str, location_id: str) -> Dict:
             "error": str(e)
         }
 
-def get_ghl_custom_fields(private_token: str, location_id: str) -> Dict:
-    """Get all custom fields from GHL"""
-    try:
-        url = f"https://services.leadconnectorhq.com/locations/{location_id}/customFields"
-        headers = {
-            "Authorization": f"Bearer {private_token}",
-            "Content-Type": "application/json",
-            "Version": "2021-07-28"
-        }
-        
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code == 200:
-            data = response.json()
-            return {"success": True, "fields": data.get('customFields', [])}
-        else:
-            return {"success": False, "error": f"API returned {response.status_code}"}
-            
-    except Exception as e:
-        return {"success": False, "error": str(e)}
-
 # Test GHL API Connection
 @router.post("/test-ghl-connection")
 async def test_ghl_connection_endpoint(config: GHLConnectionTest):
@@ -116,48 +97,18 @@ async def test_ghl_connection_endpoint(config: GHLConnectionTest):
 async def generate_field_reference():
     """Generate field_reference.json from current GHL custom fields"""
     try:
-        # Get all custom fields
-        fields_result = get_ghl_custom_fields(DSP_LOCATION_PIT, DSP_GHL_LOCATION_ID)
+        # Explicit admin action - revalidate the metadata cache before generating
+        if not ghl_metadata_cache.refresh("custom_fields") and ghl_metadata_cache.get_version("custom_fields") is None:
+            error = ghl_metadata_cache.peek("custom_fields") or {}
+            raise HTTPException(status_code=500, detail=f"Failed to retrieve custom fields: {error.get('last_error', 'GHL unavailable')}")
         
-        if not fields_result["success"]:
-            raise HTTPException(status_code=500, detail=f"Failed to retrieve custom fields: {fields_result['error']}")
-        
-        custom_fields = fields_result["fields"]
+        custom_fields = ghl_metadata_cache.get("custom_fields", allow_fetch=False)
         
         # Process fields into reference format
-        all_ghl_fields = {}
-        client_fields = {}
-        vendor_fields = {}
-        
-        for field in custom_fields:
-            if field.get('documentType') == 'field':
-                field_name = field.get('name')
-                field_key = field.get('fieldKey')
-                field_id = field.get('id')
-                
-                if field_name and field_key and field_id:
-                    field_data = {
-                        "fieldKey": field_key,
-                        "id": field_id,
-                        "dataType": field.get('dataType', 'TEXT'),
-                        "model": field.get('model', 'contact')
-                    }
-                    
-                    all_ghl_fields[field_name] = field_data
-                    
-                    # Categorize as client or vendor field
-                    if any(keyword in field_name.lower() for keyword in ['vendor', 'company', 'business', 'service']):
-                        vendor_fields[field_name] = field_data
-                    else:
-                        client_fields[field_name] = field_data
-        
-        # Create field reference structure
-        field_reference = {
-            "client_fields": client_fields,
-            "vendor_fields": vendor_fields,
-            "all_ghl_fields": all_ghl_fields,
-            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+        field_reference = build_field_reference(custom_fields)
+        all_ghl_fields = field_reference["all_ghl_fields"]
+        client_fields = field_reference["client_fields"]
+        vendor_fields = field_reference["vendor_fields"]
         
         # Save to file
         with open("field_reference.json", "w") as f:
@@ -214,14 +165,13 @@ async def create_fields_from_csv(csvFile: UploadFile = File(...)):
         # Parse CSV
         csv_reader = csv.DictReader(io.StringIO(csv_text))
         
-        # Get existing fields to avoid duplicates
-        fields_result = get_ghl_custom_fields(DSP_LOCATION_PIT, DSP_GHL_LOCATION_ID)
+        # Get existing fields to avoid duplicates (revalidated since we are about to write)
+        ghl_metadata_cache.refresh("custom_fields")
         
         existing_field_names = set()
-        if fields_result["success"]:
-            for field in fields_result["fields"]:
-                if field.get('documentType') == 'field':
-                    existing_field_names.add(field.get('name'))
+        for field in ghl_metadata_cache.get("custom_fields"):
+            if field.get('documentType') == 'field':
+                existing_field_names.add(field.get('name'))
         
         # Process CSV rows
         created_count = 0
@@ -278,7 +228,7 @@ async def create_fields_from_csv(csvFile: UploadFile = File(...)):
             
             # Create the field
             try:
-                url = f"https://services.leadconnectorhq.com/locations/{DSP_GHL_LOCATION_ID}/customFields"
+                url = f"{AppConfig.GHL_API_BASE_URL}/locations/{DSP_GHL_LOCATION_ID}/customFields"
                 response = requests.post(url, headers=headers, json=field_payload)
                 
                 if response.status_code == 201:
@@ -296,6 +246,10 @@ async def create_fields_from_csv(csvFile: UploadFile = File(...)):
                 error_count += 1
                 results.append(f"Error creating {field_name}: {str(e)}")
         
+        # Pick up the newly created fields (subscribers rebuild their indexes on change)
+        if created_count:
+            ghl_metadata_cache.refresh("custom_fields")
+        
         # Log to database
         simple_db_instance.log_activity(
             event_type="bulk_field_creation",
@@ -360,16 +314,18 @@ async def admin_health_check():
         # Test database connection
         stats = simple_db_instance.get_stats()
         
-        # Test GHL API connection
-        ghl_test = test_ghl_connection(DSP_LOCATION_PIT, DSP_GHL_LOCATION_ID)
+        # GHL status comes from the metadata cache - health probes never call GHL
+        custom_fields_entry = ghl_metadata_cache.peek("custom_fields")
+        custom_fields = ghl_metadata_cache.get("custom_fields", allow_fetch=False)
         
         return {
             "status": "healthy",
             "admin_api": "operational",
             "database_connected": True,
-            "ghl_api_connected": ghl_test.get("success", False),
+            "ghl_api_connected": bool(custom_fields_entry) and not custom_fields_entry.get("last_error"),
             "database_stats": stats,
-            "ghl_field_count": ghl_test.get("fieldCount", 0),
+            "ghl_field_count": len([f for f in custom_fields if f.get('documentType') == 'field']),
+            "ghl_metadata": custom_fields_entry,
             "timestamp": datetime.now().isoformat()
         }
         
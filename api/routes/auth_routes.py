@@ -87,31 +87,14 @@ async def get_current_user(
 ) -> User:
     """Get current authenticated user"""
     try:
-        token = credentials.credentials
-        payload = auth_service.verify_token(token)
-        
-        if not payload:
+        # Cached per token; only hits the database on a miss
+        user = auth_service.resolve_principal(credentials.credentials, db)
+        if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid or expired token"
             )
             
-        user_id = payload.get("sub")
-        tenant_id = payload.get("tenant_id")
-        
-        if not user_id or not tenant_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token payload"
-            )
-            
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user or not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found or inactive"
-            )
-            
         return user
         
     except Exception as e:
@@ -163,7 +146,7 @@ async def login_step1(
             )
         
         # Authenticate user
-        user, auth_message = auth_service.authenticate_user(
+        user, auth_message = await auth_service.authenticate_user_async(
             login_data.email, 
             login_data.password, 
             str(tenant.id), 
@@ -412,7 +395,8 @@ async def register(
                 tenant_id=str(tenant.id),
                 first_name=register_data.first_name,
                 last_name=register_data.last_name,
-                db=db
+                db=db,
+                password_hash=await auth_service.hash_password_async(register_data.password)
             )
         except ValueError as e:
             raise HTTPException(
@@ -524,7 +508,8 @@ async def refresh_token(
     try:
         # Verify refresh token
         payload = auth_service.verify_token(refresh_data.refresh_token)
-        if not payload or payload.get("type") != "refresh":
+        if (not payload or payload.get("type") != "refresh"
+                or auth_service.is_token_revoked(refresh_data.refresh_token, db)):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid refresh token"
@@ -574,6 +559,8 @@ async def logout(
 ):
     """Logout user and revoke tokens"""
     try:
+        revoked = auth_service.revoke_user_tokens(str(current_user.id), db)
+        
         # Log logout event
         auth_service.log_security_event(
             tenant_id=str(current_user.tenant_id),
@@ -581,7 +568,7 @@ async def logout(
             action="logout",
             ip_address=get_client_ip(request),
             user_agent=request.headers.get("user-agent", ""),
-            details={"email": current_user.email},
+            details={"email": current_user.email, "tokens_revoked": revoked},
             db=db
         )
         
@@ -680,7 +667,7 @@ async def reset_password(
             )
         
         # Update password
-        user.password_hash = auth_service.hash_password(reset_data.new_password)
+        user.password_hash = await auth_service.hash_password_async(reset_data.new_password)
         user.login_attempts = 0  # Reset login attempts
         user.locked_until = None  # Unlock account
         db.commit()
@@ -4,13 +4,17 @@ import logging
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 import uuid
+import json
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from database.simple_connection import db as simple_db_instance
 from api.services.lead_routing_service import lead_routing_service
 from api.services.ghl_api import GoHighLevelAPI
+from api.services.bulk_reassignment_engine import bulk_reassignment_engine
+from api.services.vendor_scoring import vendor_scoring
 from config import AppConfig
 
 logger = logging.getLogger(__name__)
@@ -196,6 +200,7 @@ async def reassign_lead(request: LeadReassignmentRequest):
                 'timestamp': datetime.utcnow().isoformat()
             }
             simple_db_instance.create_lead_event(event_data)
+            vendor_scoring.handle_lead_event(event_data)
             
             logger.info(f"✅ Successfully reassigned lead {lead['id']} from vendor {previous_vendor_id} to {new_vendor_id}")
             
@@ -276,34 +281,119 @@ async def get_reassignment_history(contact_id: str):
             detail=f"Failed to get reassignment history: {str(e)}"
         )
 
+def _wants_stream(request: Request, data: Dict[str, Any]) -> Optional[str]:
+    """Streaming format requested via body ("stream": "ndjson"/"sse") or Accept header"""
+    stream = data.get('stream')
+    if stream in ("ndjson", "sse"):
+        return stream
+    accept = request.headers.get('accept', '')
+    if 'text/event-stream' in accept:
+        return "sse"
+    if 'application/x-ndjson' in accept:
+        return "ndjson"
+    return None
+
+def _stream_job_events(queue, stream_format: str) -> StreamingResponse:
+    """Stream bulk job events as NDJSON lines or Server-Sent Events"""
+    async def event_stream():
+        async for event in bulk_reassignment_engine.iter_events(queue):
+            if stream_format == "sse":
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+            else:
+                yield json.dumps(event) + "\n"
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(event_stream(), media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def _collect_job_results(queue) -> Dict[str, Any]:
+    """Wait for a bulk job and return the classic (non-streaming) response shape"""
+    results = []
+    summary = {}
+    async for event in bulk_reassignment_engine.iter_events(queue):
+        if event['event'] == 'result':
+            results.append({k: v for k, v in event.items() if k != 'event'})
+        elif event['event'] in ('completed', 'failed'):
+            summary = event
+
+    return {
+        "success": summary.get('event') == 'completed',
+        "job_id": summary.get('job_id'),
+        "status": summary.get('event'),
+        "total": summary.get('total', len(results)),
+        "successful": summary.get('successful', sum(1 for r in results if r.get('success'))),
+        "failed": summary.get('failed', sum(1 for r in results if not r.get('success'))),
+        "error": summary.get('error'),
+        "results": results
+    }
+
 @router.post("/bulk")
 async def bulk_reassign_leads(request: Request):
-    """Bulk reassign multiple leads"""
+    """
+    Bulk reassign multiple leads.
+
+    Runs as a checkpointed job: leads are resolved in batch, vendor pools are computed
+    once per (service, county) and GHL updates run concurrently under the shared rate
+    limiter. Pass "stream": "ndjson" or "sse" (or the matching Accept header) to receive
+    per-lead results as they complete; an interrupted job can be resumed by job_id.
+    """
     data = await request.json()
     contact_ids = data.get('contact_ids', [])
     reason = data.get('reason', 'bulk_reassignment')
-    
-    results = []
-    for contact_id in contact_ids:
-        try:
-            result = await reassign_lead(
-                LeadReassignmentRequest(
-                    contact_id=contact_id,
-                    reason=reason
-                )
-            )
-            results.append(result.dict())
-        except Exception as e:
-            results.append({
-                "success": False,
-                "contact_id": contact_id,
-                "message": str(e)
-            })
-    
+    exclude_previous = data.get('exclude_previous', True)
+
+    if not contact_ids:
+        raise HTTPException(status_code=400, detail="contact_ids is required")
+
+    job = bulk_reassignment_engine.create_job(contact_ids, reason=reason, exclude_previous=exclude_previous)
+    queue = bulk_reassignment_engine.start_job(job['job_id'])
+
+    stream_format = _wants_stream(request, data)
+    if stream_format:
+        return _stream_job_events(queue, stream_format)
+    return await _collect_job_results(queue)
+
+@router.get("/bulk/jobs")
+async def list_bulk_reassignment_jobs(include_completed: bool = False):
+    """List bulk reassignment jobs (by default only unfinished/resumable ones)"""
     return {
         "success": True,
-        "total": len(contact_ids),
-        "successful": sum(1 for r in results if r.get('success')),
-        "failed": sum(1 for r in results if not r.get('success')),
-        "results": results
-    }
\ No newline at end of file
+        "jobs": bulk_reassignment_engine.list_jobs(include_completed=include_completed)
+    }
+
+@router.get("/bulk/{job_id}")
+async def get_bulk_reassignment_job(job_id: str):
+    """Get progress and per-lead results of a bulk reassignment job"""
+    job = bulk_reassignment_engine.load_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Bulk reassignment job {job_id} not found")
+
+    return {
+        "success": True,
+        **bulk_reassignment_engine.summarize_job(job),
+        "results": list(job.get('results', {}).values())
+    }
+
+@router.post("/bulk/{job_id}/resume")
+async def resume_bulk_reassignment_job(job_id: str, request: Request):
+    """Resume an interrupted bulk reassignment job from its checkpoint"""
+    job = bulk_reassignment_engine.load_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Bulk reassignment job {job_id} not found")
+    if job.get('status') == 'completed':
+        return {"success": True, "message": "Job already completed",
+                **bulk_reassignment_engine.summarize_job(job)}
+
+    queue = bulk_reassignment_engine.start_job(job_id)
+    if queue is None:
+        raise HTTPException(status_code=409, detail=f"Bulk reassignment job {job_id} is already running")
+
+    try:
+        data = await request.json()
+    except Exception:
+        data = {}
+
+    stream_format = _wants_stream(request, data)
+    if stream_format:
+        return _stream_job_events(queue, stream_format)
+    return await _collect_job_results(queue)
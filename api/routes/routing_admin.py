@@ -1,16 +1,23 @@
 # api/routes/routing_admin.py
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi.security import HTTPAuthorizationCredentials
 from pydantic import BaseModel
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Optional
+import asyncio
+import hmac
 import logging
 import requests
 import json
 import uuid
 from database.simple_connection import db
 from api.services.lead_routing_service import lead_routing_service
-from api.services.ghl_api import GoHighLevelAPI
-from api.routes.webhook_routes import create_lead_from_ghl_contact
+from api.services.vendor_scoring import vendor_scoring
+from api.services.vendor_capacity import vendor_capacity
+from api.services.unassigned_lead_router import unassigned_lead_router
+from api.services.tracing import tracer
+from utils.structured_logging import payload_capture
+from api.security.auth_middleware import auth_middleware
 from config import AppConfig
 
 logger = logging.getLogger(__name__)
@@ -20,6 +27,12 @@ router = APIRouter(prefix="/api/v1/routing", tags=["Lead Routing Administration"
 class RoutingConfigRequest(BaseModel):
     performance_percentage: int
 
+class VendorCapacityRequest(BaseModel):
+    # None = use the configured default, 0 = unlimited
+    max_open_leads: Optional[int] = None
+    max_leads_per_day: Optional[int] = None
+    max_leads_per_hour: Optional[int] = None
+
 class VendorMatchingRequest(BaseModel):
     zip_code: str
     service_category: str
@@ -116,8 +129,14 @@ async def get_routing_vendors():
         vendors = db.get_vendors(account_id)
         
         # Add routing-specific information
+        scores = vendor_scoring.get_scores(vendors)
+        capacity = vendor_capacity.get_status(vendors)
         for vendor in vendors:
             vendor['coverage_summary'] = _get_coverage_summary(vendor)
+            vendor['capacity'] = capacity.get(vendor.get('id'))
+            if vendor.get('id') in scores:
+                vendor['performance_score'] = round(scores[vendor['id']]['score'] / 100.0, 4)
+                vendor['performance_windows'] = scores[vendor['id']]['windows']
             vendor['routing_eligible'] = (
                 vendor.get('status') == 'active' and 
                 vendor.get('taking_new_work', False)
@@ -133,14 +152,112 @@ async def get_routing_vendors():
         logger.error(f"Error getting routing vendors: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve vendors")
 
+@router.get("/performance-scores")
+async def get_vendor_performance_scores():
+    """Current close-rate scores used by performance-based routing, best first"""
+    try:
+        account = db.get_account_by_ghl_location_id(AppConfig.GHL_LOCATION_ID)
+        vendors = db.get_vendors(account["id"]) if account else []
+        scores = vendor_scoring.get_scores(vendors)
+        data = sorted(
+            [{
+                "vendor_id": vendor["id"],
+                "name": vendor.get("name"),
+                "synced_close_percentage": vendor.get("lead_close_percentage") or 0,
+                "score": round(scores[vendor["id"]]["score"], 2),
+                "windows": scores[vendor["id"]]["windows"]
+            } for vendor in vendors if vendor.get("id") in scores],
+            key=lambda row: -row["score"]
+        )
+        return {
+            "status": "success",
+            "data": data,
+            "count": len(data),
+            "windows_days": vendor_scoring.windows,
+            "stats": vendor_scoring.get_stats()
+        }
+    except Exception as e:
+        logger.error(f"Error getting vendor performance scores: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve vendor performance scores")
+
+@router.post("/performance-scores/rebuild")
+async def rebuild_vendor_performance_scores():
+    """Recompute performance counters from lead history (initial backfill; normally incremental)"""
+    try:
+        result = await asyncio.to_thread(vendor_scoring.rebuild)
+        return {"status": "success", "data": result, "message": "Vendor performance scores rebuilt"}
+    except Exception as e:
+        logger.error(f"Error rebuilding vendor performance scores: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to rebuild vendor performance scores")
+
+@router.post("/vendors/{vendor_id}/capacity")
+async def update_vendor_capacity(vendor_id: str, request: VendorCapacityRequest):
+    """Set a vendor's lead quotas (max open leads, leads/day, leads/hour)"""
+    limits = [request.max_open_leads, request.max_leads_per_day, request.max_leads_per_hour]
+    if any(limit is not None and limit < 0 for limit in limits):
+        raise HTTPException(status_code=400, detail="Capacity limits must be 0 (unlimited) or positive")
+    try:
+        conn = db._get_conn()
+        try:
+            cursor = conn.execute("""
+                UPDATE vendors
+                SET max_open_leads = ?, max_leads_per_day = ?, max_leads_per_hour = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (*limits, vendor_id))
+            if cursor.rowcount == 0:
+                raise HTTPException(status_code=404, detail="Vendor not found")
+            conn.commit()
+        finally:
+            conn.close()
+        vendor_capacity.reset(vendor_id)
+
+        return {
+            "status": "success",
+            "data": vendor_capacity.get_status([{"id": vendor_id}]).get(vendor_id),
+            "message": "Vendor capacity updated"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error updating vendor capacity: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to update vendor capacity")
+
+@router.get("/capacity")
+async def get_vendor_capacity():
+    """Lead quotas and remaining capacity for every vendor"""
+    try:
+        account = db.get_account_by_ghl_location_id(AppConfig.GHL_LOCATION_ID)
+        vendors = db.get_vendors(account["id"]) if account else []
+        capacity = vendor_capacity.get_status(vendors)
+        return {
+            "status": "success",
+            "data": [{"vendor_id": vendor["id"], "name": vendor.get("name"), **capacity[vendor["id"]]}
+                     for vendor in vendors if vendor.get("id") in capacity],
+            "stats": vendor_capacity.get_stats()
+        }
+    except Exception as e:
+        logger.error(f"Error getting vendor capacity: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve vendor capacity")
+
 @router.post("/vendors/{vendor_id}/coverage")
 async def update_vendor_coverage(vendor_id: str, coverage_data: Dict[str, Any]):
     """Update vendor coverage configuration"""
     try:
         # Validate coverage data
-        coverage_type = coverage_data.get('service_coverage_type', 'zip')
-        if coverage_type not in ['global', 'national', 'state', 'county', 'zip']:
+        coverage_type = coverage_data.get('coverage_type') or coverage_data.get('service_coverage_type', 'zip')
+        if coverage_type not in ['global', 'national', 'state', 'county', 'zip', 'radius']:
             raise HTTPException(status_code=400, detail="Invalid coverage type")
+
+        home_zip_code = coverage_data.get('home_zip_code')
+        service_radius_miles = coverage_data.get('service_radius_miles')
+        if coverage_type == 'radius':
+            try:
+                service_radius_miles = float(service_radius_miles)
+            except (TypeError, ValueError):
+                service_radius_miles = 0
+            if not home_zip_code or service_radius_miles <= 0:
+                raise HTTPException(status_code=400, detail="Radius coverage requires home_zip_code and a positive service_radius_miles")
         
         # Update vendor in database
         conn = db._get_conn()
@@ -148,17 +265,19 @@ async def update_vendor_coverage(vendor_id: str, coverage_data: Dict[str, Any]):
         
         cursor.execute("""
             UPDATE vendors 
-            SET service_coverage_type = ?, 
-                service_states = ?, 
-                service_counties = ?, 
-                service_areas = ?,
+            SET coverage_type = ?, 
+                coverage_states = ?, 
+                coverage_counties = ?, 
+                home_zip_code = ?,
+                service_radius_miles = ?,
                 updated_at = CURRENT_TIMESTAMP 
             WHERE id = ?
         """, (
             coverage_type,
-            str(coverage_data.get('service_states', [])),
-            str(coverage_data.get('service_counties', [])),
-            str(coverage_data.get('service_areas', [])),
+            json.dumps(coverage_data.get('coverage_states', coverage_data.get('service_states', []))),
+            json.dumps(coverage_data.get('coverage_counties', coverage_data.get('service_counties', []))),
+            home_zip_code,
+            service_radius_miles,
             vendor_id
         ))
         
@@ -230,11 +349,11 @@ async def test_vendor_matching(request: VendorMatchingRequest):
             specific_service=specific_service  # NEW: Pass specific service for exact matching
         )
         
-        # Select vendor using routing logic
+        # Preview the vendor routing would pick - a test must not assign, score or use quota
         selected_vendor = None
         if matching_vendors:
-            selected_vendor = lead_routing_service.select_vendor_from_pool(
-                matching_vendors, account_id
+            selected_vendor = await asyncio.to_thread(
+                lead_routing_service.preview_vendor_from_pool, matching_vendors, account_id
             )
         
         # Enhanced response with routing details
@@ -260,468 +379,100 @@ async def test_vendor_matching(request: VendorMatchingRequest):
         raise HTTPException(status_code=500, detail="Failed to test vendor matching")
 
 @router.post("/process-unassigned-leads")
-async def process_unassigned_leads():
+async def process_unassigned_leads(include_ghl: bool = True):
     """
-    Enhanced feature: Pull unassigned leads from GoHighLevel and attempt to assign them to vendors
-    This replaces the simple test matching with a more useful bulk assignment feature
+    Pull all unassigned leads (local DB + GoHighLevel) and assign them to vendors in one batch.
+    Leads are grouped by (service, county) so each vendor pool is looked up once; the same
+    sweep can also run on a schedule (UNASSIGNED_LEAD_SWEEP_INTERVAL_MINUTES).
     """
     try:
-        # Get the default account for this GHL location
-        account = db.get_account_by_ghl_location_id(AppConfig.GHL_LOCATION_ID)
-        if not account:
-            return {
-                "status": "error",
-                "message": "No account found - cannot process leads"
-            }
-        
-        account_id = account["id"]
-        
-        # Step 1: Get unassigned leads from GoHighLevel
-        unassigned_ghl_leads = await _get_unassigned_leads_from_ghl()
-        
-        if not unassigned_ghl_leads:
-            return {
-                "status": "success",
-                "data": {
-                    "processed_leads": 0,
-                    "successful_assignments": 0,
-                    "failed_assignments": 0,
-                    "leads": []
-                },
-                "message": "No unassigned leads found in GoHighLevel"
-            }
-        
-        # Step 2: Process each unassigned lead
-        processed_leads = []
-        successful_assignments = 0
-        failed_assignments = 0
-        
-        for ghl_lead in unassigned_ghl_leads:
-            lead_result = await _process_single_unassigned_lead(ghl_lead, account_id)
-            processed_leads.append(lead_result)
-            
-            if lead_result["assignment_successful"]:
-                successful_assignments += 1
-            else:
-                failed_assignments += 1
+        result = await unassigned_lead_router.run(include_ghl=include_ghl, trigger="dashboard")
+        if result["status"] == "success" and not result["data"]["processed_leads"]:
+            result["message"] = "No unassigned leads found"
+        return result
         
+    except ValueError as e:
         return {
-            "status": "success",
-            "data": {
-                "processed_leads": len(processed_leads),
-                "successful_assignments": successful_assignments,
-                "failed_assignments": failed_assignments,
-                "leads": processed_leads
-            },
-            "message": f"Processed {len(processed_leads)} unassigned leads: {successful_assignments} assigned, {failed_assignments} failed"
+            "status": "error",
+            "message": str(e)
         }
-        
     except Exception as e:
         logger.error(f"Error processing unassigned leads: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to process unassigned leads")
 
-async def _get_unassigned_leads_from_ghl() -> List[Dict[str, Any]]:
-    """
-    Fetch unassigned leads from GoHighLevel API
-    Returns leads that don't have a vendor assigned in the assignedTo field
-    """
-    try:
-        # Initialize GHL API client
-        ghl_api = GoHighLevelAPI(
-            location_api_key=AppConfig.GHL_LOCATION_API,
-            private_token=AppConfig.GHL_PRIVATE_TOKEN,
-            location_id=AppConfig.GHL_LOCATION_ID,
-            agency_api_key=AppConfig.GHL_AGENCY_API_KEY,
-            company_id=AppConfig.GHL_COMPANY_ID
-        )
-        
-        # Get contacts from GHL that are leads but don't have assigned vendors
-        contacts = ghl_api.search_contacts(query="lead", limit=100)
-        
-        # Filter for unassigned leads (no assignedTo or assignedTo is empty)
-        unassigned_leads = []
-        for contact in contacts:
-            # Check if this contact is a lead and doesn't have an assigned vendor
-            assigned_to = contact.get('assignedTo')
-            tags = contact.get('tags', [])
-            
-            # Consider it a lead if it has lead-related tags or is in a lead pipeline
-            is_lead = any(tag.lower() in ['lead', 'new lead', 'unassigned'] for tag in tags)
-            
-            if is_lead and not assigned_to:
-                # Extract relevant information for processing
-                lead_info = {
-                    'ghl_contact_id': contact.get('id'),
-                    'name': f"{contact.get('firstName', '')} {contact.get('lastName', '')}".strip(),
-                    'email': contact.get('email'),
-                    'phone': contact.get('phone'),
-                    'address': contact.get('address1'),
-                    'city': contact.get('city'),
-                    'state': contact.get('state'),
-                    'postal_code': contact.get('postalCode'),
-                    'tags': tags,
-                    'custom_fields': contact.get('customFields', {}),
-                    'source': contact.get('source', 'GoHighLevel'),
-                    'created_at': contact.get('dateAdded')
-                }
-                unassigned_leads.append(lead_info)
-        
-        logger.info(f"Found {len(unassigned_leads)} unassigned leads in GoHighLevel")
-        return unassigned_leads
-        
-    except Exception as e:
-        logger.error(f"Error fetching unassigned leads from GHL: {e}")
-        return []
+@router.get("/process-unassigned-leads/status")
+async def get_unassigned_leads_processing_status():
+    """Whether a sweep is running and the summary of the last completed one"""
+    return {
+        "status": "success",
+        "data": {
+            "running": unassigned_lead_router.is_running,
+            "last_run": unassigned_lead_router.last_run
+        }
+    }
 
+@router.get("/latency")
+async def get_lead_latency_breakdown():
+    """p50/p95/p99 per lifecycle stage (webhook -> routing -> assignment), overall and per form"""
+    return {
+        "status": "success",
+        "data": tracer.get_stage_stats()
+    }
 
-def find_category_from_specific_service(specific_service: str) -> str:
-    """
-    Smart category lookup: derive primary category from specific service
-    Uses DockSide Pros service dictionary to avoid defaulting to "Boater Resources"
-    
-    Example: "Outboard Engine Repair" → "Engines and Generators"
-    """
-    import logging
-    logger = logging.getLogger(__name__)
-    
-    if not specific_service:
-        return "Boater Resources"
-    
-    # DockSide Pros Service Dictionary
-    SERVICE_CATEGORY_MAPPINGS = {
-        "Engines and Generators": [
-            "Engines and Generators Sales/Service", "Generator Sales or Service",
-            "Engine Service or Sales", "Outboard Engine Service", "Inboard Engine Service", 
-            "Outboard Engine Repair", "Inboard Engine Repair", "Generator Repair",
-            "Motor Repair", "Engine Installation", "Generator Installation",
-            "Diesel Engine Service", "Gas Engine Service", "Marine Engine Repair",
-            "Outboard Engine Service", "Inboard Engine Service"
-        ],
-        
-        "Boat Maintenance": [
-            "Ceramic Coating", "Boat Detailing", "Bottom Cleaning",
-            "Boat and Yacht Maintenance", "Boat Oil Change", "Bilge Cleaning",
-            "Jet Ski Maintenance", "Barnacle Cleaning", "Yacht Fire Detection Systems",
-            "Boat Wrapping and Marine Protection Film", "Boat Cleaning", "Boat Washing"
-        ],
-        
-        "Marine Systems": [
-            "Marine Systems Install and Sales", "Yacht Stabilizers and Seakeepers",
-            "Instrument Panel and Dashboard", "Yacht AC Sales", "Yacht AC Service",
-            "Boat Electrical Service", "Boat Sound Systems", "Yacht Plumbing",
-            "Boat Lighting", "Yacht Refrigeration and Watermakers", "Marine Electronics"
-        ],
-        
-        "Boat and Yacht Repair": [
-            "Boat and Yacht Repair", "Fiberglass Repair", "Welding & Metal Fabrication",
-            "Carpentry & Woodwork", "Riggers & Masts", "Jet Ski Repair",
-            "Boat Canvas and Upholstery", "Boat Decking and Yacht Flooring"
-        ]
+@router.get("/traces")
+async def get_recent_lead_traces(limit: int = 20, form_identifier: Optional[str] = None,
+                                 min_duration_ms: float = 0):
+    """Most recent lead traces from the in-memory ring buffer, newest first"""
+    return {
+        "status": "success",
+        "data": tracer.get_recent_traces(min(limit, 200), form_identifier, min_duration_ms)
     }
-    
-    # Keyword mappings for partial matches
-    KEYWORD_MAPPINGS = {
-        "engine": "Engines and Generators",
-        "motor": "Engines and Generators", 
-        "generator": "Engines and Generators",
-        "outboard": "Engines and Generators",
-        "inboard": "Engines and Generators",
-        "diesel": "Engines and Generators",
-        "detailing": "Boat Maintenance",
-        "cleaning": "Boat Maintenance",
-        "maintenance": "Boat Maintenance",
-        "ceramic": "Boat Maintenance",
-        "repair": "Boat and Yacht Repair",
-        "fiberglass": "Boat and Yacht Repair",
-        "electrical": "Marine Systems",
-        "plumbing": "Marine Systems",
-        "ac service": "Marine Systems"
+
+@router.get("/traces/{trace_id}")
+async def get_lead_trace(trace_id: str):
+    """All spans of one buffered trace"""
+    trace = tracer.get_trace(trace_id)
+    if not trace:
+        raise HTTPException(status_code=404, detail="Trace not found (it may have left the buffer)")
+    return {
+        "status": "success",
+        "data": trace
     }
-    
-    specific_lower = specific_service.lower().strip()
-    
-    # Method 1: Exact match
-    for category, services in SERVICE_CATEGORY_MAPPINGS.items():
-        for service in services:
-            if specific_lower == service.lower():
-                logger.info(f"🎯 Exact service match: '{specific_service}' → {category}")
-                return category
-    
-    # Method 2: Partial match
-    for category, services in SERVICE_CATEGORY_MAPPINGS.items():
-        for service in services:
-            if specific_lower in service.lower() or service.lower() in specific_lower:
-                logger.info(f"🎯 Partial service match: '{specific_service}' → {category} (matched: {service})")
-                return category
-    
-    # Method 3: Keyword match
-    for keyword, category in KEYWORD_MAPPINGS.items():
-        if keyword in specific_lower:
-            logger.info(f"🎯 Keyword match: '{specific_service}' → {category} (keyword: {keyword})")
-            return category
-    
-    # Default fallback
-    logger.warning(f"⚠️ No category match found for '{specific_service}' - defaulting to Boater Resources")
-    return "Boater Resources"
 
+async def require_debug_access(request: Request) -> bool:
+    """Captured payloads hold customer PII: require the /metrics bearer token or an admin user's token"""
+    authorization = request.headers.get("authorization") or ""
+    if not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Authentication required", headers={"WWW-Authenticate": "Bearer"})
+    token = authorization[len("Bearer "):]
+    if AppConfig.METRICS_AUTH_TOKEN and hmac.compare_digest(token, AppConfig.METRICS_AUTH_TOKEN):
+        return True
+    user = await auth_middleware.get_current_user(
+        request, HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    )
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return True
 
-async def _process_single_unassigned_lead(ghl_lead: Dict[str, Any], account_id: str) -> Dict[str, Any]:
-    """
-    Process a single unassigned lead: CREATE IN DATABASE FIRST, then route
-    FIXED: Now creates leads in local database before attempting routing
-    """
-    lead_result = {
-        "ghl_contact_id": ghl_lead.get('ghl_contact_id'),
-        "customer_name": ghl_lead.get('name'),
-        "assignment_successful": False,
-        "assigned_vendor": None,
-        "matching_vendors_count": 0,
-        "error_message": None,
-        "service_category": None,
-        "zip_code": None,
-        "database_lead_created": False,
-        "opportunity_created": False,
-        "processing_method": "bulk_assignment_pipeline"
+@router.get("/debug/payloads")
+async def get_captured_payloads(limit: int = 20, kind: Optional[str] = None,
+                                _: bool = Depends(require_debug_access)):
+    """Raw payloads kept in the debug ring buffer (enable with LOG_CAPTURE_PAYLOADS=true)"""
+    return {
+        "status": "success",
+        "data": {
+            "capture": payload_capture.get_stats(),
+            "payloads": payload_capture.recent(min(limit, 200), kind)
+        }
     }
-    
-    try:
-        contact_id = ghl_lead.get('ghl_contact_id')
-        if not contact_id:
-            lead_result["error_message"] = "No GHL contact ID provided"
-            return lead_result
-        
-        logger.info(f"🔄 Processing bulk lead: {contact_id} - {ghl_lead.get('name')}")
-        
-        # Step 1: Check if database lead already exists (avoid duplicates)
-        existing_lead = db.get_lead_by_ghl_contact_id(contact_id)
-        
-        lead_id = None
-        opportunity_id = None
-        
-        if existing_lead:
-            logger.info(f"📋 Database lead already exists: {existing_lead['id']}")
-            lead_id = existing_lead['id']
-            opportunity_id = existing_lead.get('ghl_opportunity_id')
-            lead_result["database_lead_created"] = False  # Already existed
-            
-            # Extract existing lead data for routing (don't overwrite)
-            service_category = existing_lead.get('primary_service_category') or existing_lead.get('service_category', '')
-            zip_code = existing_lead.get('service_zip_code') or existing_lead.get('customer_zip_code', '')
-            
-            # If existing lead has incomplete data, try to update from GHL
-            if not service_category or service_category == 'Boater Resources' or not zip_code:
-                logger.info(f"🔄 Existing lead has incomplete data, checking GHL for updates...")
-                
-                # Get full contact data from GHL
-                from api.services.ghl_api import GoHighLevelAPI
-                from config import AppConfig
-                
-                ghl_api = GoHighLevelAPI(
-                    location_id=AppConfig.GHL_LOCATION_ID,
-                    private_token=AppConfig.GHL_PRIVATE_TOKEN
-                )
-                
-                contact_response = ghl_api.get_contact(contact_id)
-                if contact_response.get('success'):
-                    full_contact = contact_response.get('contact', {})
-                    custom_fields = full_contact.get('customFields', {})
-                    
-                    # Extract specific service from custom fields
-                    specific_service = ""
-                    if isinstance(custom_fields, dict):
-                        specific_service = custom_fields.get('FT85QGi0tBq1AfVGNJ9v', '')
-                    elif isinstance(custom_fields, list):
-                        for field in custom_fields:
-                            if isinstance(field, dict) and field.get('id') == 'FT85QGi0tBq1AfVGNJ9v':
-                                specific_service = field.get('value', '')
-                                break
-                    
-                    # Update service category if we found specific service
-                    if specific_service and (not service_category or service_category == 'Boater Resources'):
-                        service_category = find_category_from_specific_service(specific_service)
-                        logger.info(f"🎯 Updated service category from GHL: {service_category}")
-                        
-                        # Update database with new category (but preserve source and created_at)
-                        try:
-                            db.update_lead_field(lead_id, 'primary_service_category', service_category)
-                            db.update_lead_field(lead_id, 'specific_service_requested', specific_service)
-                        except:
-                            pass
-                    
-                    # Update ZIP if missing
-                    if not zip_code:
-                        zip_code = full_contact.get('postalCode', '')
-                        if zip_code:
-                            try:
-                                db.update_lead_field(lead_id, 'customer_zip_code', zip_code)
-                            except:
-                                pass
-            
-        else:
-            # Step 2: CREATE LEAD IN DATABASE (same pipeline as webhooks)
-            logger.info(f"➕ Creating new database lead for contact {contact_id}")
-            
-            try:
-                # Use the shared pipeline to create lead + opportunity
-                from api.routes.webhook_routes import create_lead_from_ghl_contact
-                
-                # Convert GHL lead data to the format expected by create_lead_from_ghl_contact
-                ghl_contact_data = {
-                    'id': contact_id,
-                    'firstName': ghl_lead.get('name', '').split(' ')[0] if ghl_lead.get('name') else '',
-                    'lastName': ' '.join(ghl_lead.get('name', '').split(' ')[1:]) if ghl_lead.get('name') and len(ghl_lead.get('name', '').split(' ')) > 1 else '',
-                    'email': ghl_lead.get('email', ''),
-                    'phone': ghl_lead.get('phone', ''),
-                    'address1': ghl_lead.get('address', ''),
-                    'city': ghl_lead.get('city', ''),
-                    'state': ghl_lead.get('state', ''),
-                    'postalCode': ghl_lead.get('postal_code', ''),
-                    'customFields': ghl_lead.get('custom_fields', {})
-                }
-                
-                # Create lead using shared pipeline (same as webhooks)
-                lead_id, opportunity_id = await create_lead_from_ghl_contact(
-                    ghl_contact_data=ghl_contact_data,
-                    account_id=account_id,
-                    form_identifier="bulk_assignment"
-                )
-                
-                logger.info(f"✅ Created database lead: {lead_id}")
-                if opportunity_id:
-                    logger.info(f"✅ Created opportunity: {opportunity_id}")
-                
-                lead_result["database_lead_created"] = True
-                lead_result["opportunity_created"] = bool(opportunity_id)
-                
-                # Extract service category and ZIP for routing
-                # Try to get specific service from custom fields
-                custom_fields = ghl_contact_data.get('customFields', {})
-                specific_service = ""
-                
-                # Handle custom fields as either dict or list
-                if isinstance(custom_fields, dict):
-                    # Look for specific service in custom fields (GHL field ID for specific_service_requested)
-                    for field_id, field_value in custom_fields.items():
-                        if field_id == 'FT85QGi0tBq1AfVGNJ9v':  # specific_service_requested field ID
-                            specific_service = field_value
-                            break
-                elif isinstance(custom_fields, list):
-                    # Handle list format (GHL sometimes returns as list of {id, value} objects)
-                    for field in custom_fields:
-                        if isinstance(field, dict) and field.get('id') == 'FT85QGi0tBq1AfVGNJ9v':
-                            specific_service = field.get('value', '')
-                            break
-                
-                # Smart category lookup from specific service
-                if specific_service:
-                    service_category = find_category_from_specific_service(specific_service)
-                    logger.info(f"🧠 Smart lookup: '{specific_service}' → {service_category}")
-                else:
-                    # Try to extract from lead data before defaulting
-                    service_category = ghl_lead.get('service_category', '')
-                    if not service_category:
-                        service_category = "Boater Resources"  # Final fallback
-                        logger.warning(f"⚠️ No service category found for {contact_id}, using default")
-                
-                zip_code = ghl_lead.get('postal_code', '')
-                
-            except Exception as create_error:
-                logger.error(f"❌ Failed to create database lead: {create_error}")
-                lead_result["error_message"] = f"Lead creation failed: {create_error}"
-                return lead_result
-        
-        # Step 3: Apply routing algorithm (same as webhooks)
-        if lead_id and service_category:
-            logger.info(f"🎯 Applying routing algorithm to lead {lead_id}")
-            
-            lead_result["service_category"] = service_category
-            lead_result["zip_code"] = zip_code
-            
-            # Apply routing algorithm (same as webhook leads)
-            if service_category and zip_code:
-                logger.info(f"🔍 Finding vendors for {service_category} in {zip_code}")
-                
-                # Use the same routing service as webhooks
-                from api.services.lead_routing_service import lead_routing_service
-                
-                matching_vendors = lead_routing_service.find_matching_vendors(
-                    account_id=account_id,
-                    service_category=service_category,
-                    zip_code=zip_code,
-                    priority="normal"
-                )
-                
-                lead_result["matching_vendors_count"] = len(matching_vendors)
-                
-                if matching_vendors:
-                    # Select vendor using same algorithm as webhooks (respects 70/30 setting)
-                    selected_vendor = lead_routing_service.select_vendor_from_pool(
-                        matching_vendors, account_id
-                    )
-                    
-                    if selected_vendor:
-                        # Assign to database (same as webhooks)
-                        assignment_success = db.assign_lead_to_vendor(lead_id, selected_vendor['id'])
-                        
-                        if assignment_success:
-                            logger.info(f"✅ Assigned lead {lead_id} to vendor {selected_vendor['name']}")
-                            
-                            # Update GHL opportunity (same as webhooks)
-                            vendor_ghl_user_id = selected_vendor.get("ghl_user_id")
-                            if vendor_ghl_user_id and opportunity_id:
-                                logger.info(f"📋 Assigning opportunity {opportunity_id} to vendor {vendor_ghl_user_id}")
-                                
-                                try:
-                                    from api.services.ghl_api import GoHighLevelAPI
-                                    from config import AppConfig
-                                    
-                                    ghl_api_client = GoHighLevelAPI(
-                                        private_token=AppConfig.GHL_PRIVATE_TOKEN,
-                                        location_id=AppConfig.GHL_LOCATION_ID
-                                    )
-                                    
-                                    assignment_result = ghl_api_client.update_opportunity(opportunity_id, {
-                                        'assignedTo': vendor_ghl_user_id,
-                                        'pipelineId': AppConfig.PIPELINE_ID,
-                                        'pipelineStageId': AppConfig.NEW_LEAD_STAGE_ID
-                                    })
-                                    
-                                    if assignment_result:
-                                        logger.info(f"✅ Successfully assigned opportunity to {selected_vendor['name']}")
-                                        lead_result["assignment_successful"] = True
-                                        lead_result["assigned_vendor"] = selected_vendor
-                                    else:
-                                        logger.error(f"❌ Failed to update opportunity assignment")
-                                        lead_result["error_message"] = "Failed to update GHL opportunity"
-                                        
-                                except Exception as opp_error:
-                                    logger.error(f"❌ Error updating opportunity: {opp_error}")
-                                    lead_result["error_message"] = f"Opportunity update error: {opp_error}"
-                            else:
-                                logger.warning(f"⚠️ Vendor {selected_vendor['name']} missing GHL user ID or no opportunity")
-                                lead_result["assignment_successful"] = True  # Database assignment worked
-                                lead_result["assigned_vendor"] = selected_vendor
-                                lead_result["error_message"] = "Assigned but vendor missing GHL user ID"
-                        else:
-                            logger.error(f"❌ Failed to assign lead to vendor in database")
-                            lead_result["error_message"] = "Database assignment failed"
-                    else:
-                        logger.warning(f"⚠️ No vendor selected from {len(matching_vendors)} matching vendors")
-                        lead_result["error_message"] = "No vendor selected from pool"
-                else:
-                    logger.warning(f"⚠️ No matching vendors found for {service_category} in {zip_code}")
-                    lead_result["error_message"] = "No matching vendors found"
-            else:
-                logger.warning(f"⚠️ Missing service category or ZIP code for routing")
-                lead_result["error_message"] = f"Missing routing data: category={service_category}, zip={zip_code}"
-        else:
-            logger.error(f"❌ Missing lead_id or service_category for routing")
-            lead_result["error_message"] = f"Missing lead_id ({lead_id}) or service_category ({service_category})"
-        
-        return lead_result
-        
-    except Exception as e:
-        logger.error(f"❌ Error processing lead {contact_id}: {e}")
-        lead_result["error_message"] = f"Processing error: {e}"
-        return lead_result
 
+@router.delete("/debug/payloads")
+async def clear_captured_payloads(_: bool = Depends(require_debug_access)):
+    """Empty the debug payload ring buffer"""
+    payload_capture.clear()
+    return {
+        "status": "success",
+        "message": "Captured payloads cleared"
+    }
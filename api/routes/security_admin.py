@@ -194,31 +194,31 @@ async def update_security_config(
         if config.max_requests_per_window is not None:
             if config.max_requests_per_window < 1 or config.max_requests_per_window > 1000:
                 raise HTTPException(status_code=400, detail="max_requests_per_window must be between 1 and 1000")
-            security_manager.max_requests_per_window = config.max_requests_per_window
+            security_manager.update_limits(max_requests_per_window=config.max_requests_per_window)
             updated_fields.append(f"max_requests_per_window: {config.max_requests_per_window}")
         
         if config.rate_limit_window is not None:
             if config.rate_limit_window < 10 or config.rate_limit_window > 3600:
                 raise HTTPException(status_code=400, detail="rate_limit_window must be between 10 and 3600 seconds")
-            security_manager.rate_limit_window = config.rate_limit_window
+            security_manager.update_limits(rate_limit_window=config.rate_limit_window)
             updated_fields.append(f"rate_limit_window: {config.rate_limit_window}")
         
         if config.max_404_errors is not None:
             if config.max_404_errors < 1 or config.max_404_errors > 50:
                 raise HTTPException(status_code=400, detail="max_404_errors must be between 1 and 50")
-            security_manager.max_404_errors = config.max_404_errors
+            security_manager.update_limits(max_404_errors=config.max_404_errors)
             updated_fields.append(f"max_404_errors: {config.max_404_errors}")
         
         if config.block_duration is not None:
             if config.block_duration < 60 or config.block_duration > 86400:
                 raise HTTPException(status_code=400, detail="block_duration must be between 60 and 86400 seconds")
-            security_manager.block_duration = config.block_duration
+            security_manager.update_limits(block_duration=config.block_duration)
             updated_fields.append(f"block_duration: {config.block_duration}")
         
         if config.max_errors_per_window is not None:
             if config.max_errors_per_window < 1 or config.max_errors_per_window > 100:
                 raise HTTPException(status_code=400, detail="max_errors_per_window must be between 1 and 100")
-            security_manager.max_errors_per_window = config.max_errors_per_window
+            security_manager.update_limits(max_errors_per_window=config.max_errors_per_window)
             updated_fields.append(f"max_errors_per_window: {config.max_errors_per_window}")
         
         if not updated_fields:
@@ -2,9 +2,11 @@
 API routes for serving the unified DockSide Pros service dictionary
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
 from typing import Dict, List, Optional
 import logging
+from config import AppConfig
 from api.services.dockside_pros_service_dictionary import (
     DOCKSIDE_PROS_SERVICES,
     get_all_categories,
@@ -12,41 +14,81 @@ from api.services.dockside_pros_service_dictionary import (
     get_specific_services,
     validate_service_hierarchy
 )
+from api.services.response_cache import json_response_cache, serve_payload
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1/services", tags=["Service Dictionary"])
 
+SERVICE_DICTIONARY_CACHE_CONTROL = f"public, max-age={AppConfig.SERVICE_DICTIONARY_CACHE_MAX_AGE}"
+
+def _build_service_dictionary() -> Dict:
+    """Transform the dictionary to a more frontend-friendly format"""
+    transformed_dict = {}
+    
+    for cat_id, cat_data in DOCKSIDE_PROS_SERVICES.items():
+        category_name = cat_data["name"]
+        transformed_dict[category_name] = {
+            "id": cat_id,
+            "name": category_name,
+            "subcategories": {}
+        }
+        
+        for subcat_name, subcat_data in cat_data["subcategories"].items():
+            transformed_dict[category_name]["subcategories"][subcat_name] = {
+                "name": subcat_name,
+                "request_a_pro": subcat_data.get("request_a_pro", True),
+                "specific_services": subcat_data.get("specific_services", []),
+                "hardcoded_vendor": subcat_data.get("hardcoded_vendor", None)
+            }
+    
+    return {
+        "success": True,
+        "data": transformed_dict,
+        "total_categories": len(transformed_dict)
+    }
+
+def _build_formatted_dictionary() -> Dict:
+    """Format the dictionary for the vendor application form (with Level 3 services)"""
+    formatted = {}
+    
+    for cat_data in DOCKSIDE_PROS_SERVICES.values():
+        category_name = cat_data["name"]
+        
+        # Build subcategories list
+        subcategories = []
+        level3_services = {}
+        
+        for subcat_name, subcat_data in cat_data["subcategories"].items():
+            subcategories.append(subcat_name)
+            
+            # Add Level 3 services if they exist
+            specific_services = subcat_data.get("specific_services", [])
+            if specific_services:
+                level3_services[subcat_name] = specific_services
+        
+        formatted[category_name] = {
+            "subcategories": subcategories,
+            "level3Services": level3_services
+        }
+    
+    return {
+        "success": True,
+        "data": formatted
+    }
+
+json_response_cache.register("service_dictionary", _build_service_dictionary)
+json_response_cache.register("service_dictionary_formatted", _build_formatted_dictionary)
+
 @router.get("/dictionary")
-async def get_service_dictionary() -> Dict:
+async def get_service_dictionary(request: Request) -> Response:
     """
     Get the complete DockSide Pros service dictionary.
     Returns the full hierarchy with categories, subcategories, and specific services.
+    Served pre-serialized with ETag / gzip / brotli support.
     """
     try:
-        # Transform the dictionary to a more frontend-friendly format
-        transformed_dict = {}
-        
-        for cat_id, cat_data in DOCKSIDE_PROS_SERVICES.items():
-            category_name = cat_data["name"]
-            transformed_dict[category_name] = {
-                "id": cat_id,
-                "name": category_name,
-                "subcategories": {}
-            }
-            
-            for subcat_name, subcat_data in cat_data["subcategories"].items():
-                transformed_dict[category_name]["subcategories"][subcat_name] = {
-                    "name": subcat_name,
-                    "request_a_pro": subcat_data.get("request_a_pro", True),
-                    "specific_services": subcat_data.get("specific_services", []),
-                    "hardcoded_vendor": subcat_data.get("hardcoded_vendor", None)
-                }
-        
-        return {
-            "success": True,
-            "data": transformed_dict,
-            "total_categories": len(transformed_dict)
-        }
+        payload = json_response_cache.get("service_dictionary")
+        return serve_payload(request, payload, SERVICE_DICTIONARY_CACHE_CONTROL)
     except Exception as e:
         logger.error(f"Error getting service dictionary: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -140,38 +182,14 @@ async def validate_service(data: Dict) -> Dict:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/dictionary/formatted")
-async def get_formatted_dictionary() -> Dict:
+async def get_formatted_dictionary(request: Request) -> Response:
     """
     Get the service dictionary formatted specifically for the vendor application form.
     Includes proper structure for Level 3 services.
     """
     try:
-        formatted = {}
-        
-        for cat_data in DOCKSIDE_PROS_SERVICES.values():
-            category_name = cat_data["name"]
-            
-            # Build subcategories list
-            subcategories = []
-            level3_services = {}
-            
-            for subcat_name, subcat_data in cat_data["subcategories"].items():
-                subcategories.append(subcat_name)
-                
-                # Add Level 3 services if they exist
-                specific_services = subcat_data.get("specific_services", [])
-                if specific_services:
-                    level3_services[subcat_name] = specific_services
-            
-            formatted[category_name] = {
-                "subcategories": subcategories,
-                "level3Services": level3_services
-            }
-        
-        return {
-            "success": True,
-            "data": formatted
-        }
+        payload = json_response_cache.get("service_dictionary_formatted")
+        return serve_payload(request, payload, SERVICE_DICTIONARY_CACHE_CONTROL)
     except Exception as e:
         logger.error(f"Error getting formatted dictionary: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -3,46 +3,61 @@ Service Hierarchy API Routes
 Provides endpoints to serve the complete service hierarchy to frontend applications
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
 from typing import Dict, List, Any
 import logging
 
+from config import AppConfig
+
 from api.services.service_categories import (
     SERVICE_CATEGORIES,
     LEVEL_3_SERVICES,
     service_manager
 )
+from api.services.response_cache import json_response_cache, serve_payload
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1/services", tags=["Services"])
 
+SERVICE_DICTIONARY_CACHE_CONTROL = f"public, max-age={AppConfig.SERVICE_DICTIONARY_CACHE_MAX_AGE}"
+
+
+def _build_service_hierarchy() -> Dict[str, Any]:
+    """Build the complete hierarchy response (matches vendor_application_final.html format)"""
+    hierarchy = {}
+    
+    for category in SERVICE_CATEGORIES.keys():
+        hierarchy[category] = {
+            "subcategories": SERVICE_CATEGORIES.get(category, []),
+            "level3Services": LEVEL_3_SERVICES.get(category, {})
+        }
+    
+    return {
+        "success": True,
+        "data": hierarchy,
+        "stats": {
+            "total_categories": len(SERVICE_CATEGORIES),
+            "categories_with_level3": len(LEVEL_3_SERVICES)
+        }
+    }
+
+
+json_response_cache.register("services_hierarchy", _build_service_hierarchy)
+
 
 @router.get("/hierarchy")
-async def get_service_hierarchy() -> Dict[str, Any]:
+async def get_service_hierarchy(request: Request) -> Response:
     """
     Get the complete service hierarchy including Level 1, 2, and 3 services.
+    Served from a pre-serialized, precompressed cache with ETag revalidation.
     
     Returns:
         Dict containing the complete service hierarchy structure
     """
     try:
-        # Build the response structure matching vendor_application_final.html format
-        hierarchy = {}
-        
-        for category in SERVICE_CATEGORIES.keys():
-            hierarchy[category] = {
-                "subcategories": SERVICE_CATEGORIES.get(category, []),
-                "level3Services": LEVEL_3_SERVICES.get(category, {})
-            }
-        
-        return {
-            "success": True,
-            "data": hierarchy,
-            "stats": {
-                "total_categories": len(SERVICE_CATEGORIES),
-                "categories_with_level3": len(LEVEL_3_SERVICES)
-            }
-        }
+        payload = json_response_cache.get("services_hierarchy")
+        return serve_payload(request, payload, SERVICE_DICTIONARY_CACHE_CONTROL)
     except Exception as e:
         logger.error(f"Error fetching service hierarchy: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException # type: ignore
 from typing import List, Dict, Any, Optional
 import logging
 from database.simple_connection import db
+from api.services.vendor_scoring import vendor_scoring
 
 logger = logging.getLogger(__name__)
 
@@ -61,6 +62,11 @@ async def get_vendors(account_id: Optional[str] = None):
     """Get vendors, optionally filtered by account"""
     try:
         vendors = db.get_vendors(account_id)
+        scores = vendor_scoring.get_scores(vendors)
+        for vendor in vendors:
+            if vendor.get('id') in scores:
+                vendor['performance_score'] = round(scores[vendor['id']]['score'] / 100.0, 4)
+                vendor['performance_windows'] = scores[vendor['id']]['windows']
         return {
             "status": "success",
             "data": vendors,
@@ -1,13 +1,15 @@
 # api/routes/webhook_routes.py
 
+import os
 import logging
 import json
+import socket
+import hashlib
 from typing import Dict, List, Any, Optional
 import time
 import uuid
 import re
 import asyncio
-import threading
 from urllib.parse import parse_qs
 
 from fastapi import APIRouter, Request, HTTPException, BackgroundTasks
@@ -17,10 +19,17 @@ from fastapi.responses import JSONResponse
 from config import AppConfig
 from database.simple_connection import db as simple_db_instance
 from api.services.ghl_api import GoHighLevelAPI
-from api.services.ghl_api_v2_optimized import OptimizedGoHighLevelAPI
+from api.services.ghl_api_v2_optimized import OptimizedGoHighLevelAPI, get_shared_ghl_client
+from api.services.ghl_rate_limiter import ghl_rate_limiter
+from api.services.stage_pipeline import StagePipeline, PipelineStage
+from api.services.priority_scheduler import priority_scheduler, lane_for_form_config
+from api.services.tracing import tracer
+from utils.structured_logging import log_event, payload_capture
 from api.services.field_mapper import field_mapper
 from api.services.lead_routing_service import lead_routing_service
+from api.services.vendor_scoring import vendor_scoring
 from api.services.location_service import location_service
+from api.services.contact_identity_index import contact_identity_index, normalize_phone
 from api.services.service_mapper import (
     get_service_category as get_direct_service_category,
     get_specific_service as get_specific_service_from_form,
@@ -60,195 +69,6 @@ async def get_counties_by_state(state_code: str):
             "counties": []
         }
 
-async def create_lead_from_ghl_contact(
-    ghl_contact_data: Dict[str, Any],
-    account_id: str,
-    form_identifier: str = "bulk_assignment"
-) -> tuple[str, Optional[str]]:
-    """
-    SHARED PIPELINE: Convert GHL contact to database lead + opportunity
-    Used by both webhook and bulk assignment workflows for consistency
-    
-    Returns: (lead_id, opportunity_id)
-    """
-    try:
-        # Step 1: Extract customer data (reuse webhook logic)
-        customer_data = {
-            "name": f"{ghl_contact_data.get('firstName', '')} {ghl_contact_data.get('lastName', '')}".strip(),
-            "email": ghl_contact_data.get("email", ""),
-            "phone": ghl_contact_data.get("phone", "")
-        }
-        
-        # Step 2: Apply field mapping (same as webhook system)
-        mapped_payload = field_mapper.map_payload(ghl_contact_data, industry="marine")
-        logger.info(f"🔄 Shared pipeline field mapping. Original keys: {list(ghl_contact_data.keys())}, Mapped keys: {list(mapped_payload.keys())}")
-        
-        # Step 3: Service classification (reuse webhook logic)
-        service_category = get_direct_service_category(form_identifier)
-        
-        # Step 4: ZIP → County conversion (critical for routing)
-        zip_code = mapped_payload.get("zip_code_of_service", "")
-        service_county = ""
-        service_state = ""
-        
-        if zip_code and len(zip_code) == 5 and zip_code.isdigit():
-            logger.info(f"🗺️ Converting ZIP {zip_code} to county using shared pipeline")
-            location_data = location_service.zip_to_location(zip_code)
-            
-            if not location_data.get('error'):
-                county = location_data.get('county', '')
-                state = location_data.get('state', '')
-                if county and state:
-                    service_county = f"{county}, {state}"
-                    service_state = state
-                    logger.info(f"✅ Shared pipeline ZIP {zip_code} → {service_county}")
-                else:
-                    logger.warning(f"⚠️ Shared pipeline ZIP {zip_code} conversion incomplete: county={county}, state={state}")
-            else:
-                logger.warning(f"⚠️ Shared pipeline could not convert ZIP {zip_code}: {location_data['error']}")
-        else:
-            logger.warning(f"⚠️ Shared pipeline invalid ZIP code format: '{zip_code}'")
-
-        # Step 5: Create database lead using correct schema
-        lead_id_str = str(uuid.uuid4())
-        
-        # Build service_details from all mapped fields
-        service_details = {}
-        standard_lead_fields = {
-            "firstName", "lastName", "email", "phone", "primary_service_category",
-            "customer_zip_code", "specific_service_requested"
-        }
-        
-        for field_key, field_value in mapped_payload.items():
-            if field_value and field_value != "" and field_key not in standard_lead_fields:
-                service_details[field_key] = field_value
-                
-        service_details.update({
-            "form_source": form_identifier,
-            "processing_method": "shared_pipeline",
-            "created_via": "create_lead_from_ghl_contact"
-        })
-        
-        # Database INSERT using correct schema
-        conn = None
-        try:
-            conn = simple_db_instance._get_conn()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO leads (
-                    id, account_id, ghl_contact_id, ghl_opportunity_id, customer_name,
-                    customer_email, customer_phone, primary_service_category, specific_service_requested,
-                    service_zip_code, service_county, service_state, vendor_id, 
-                    status, priority, source, service_details, 
-                    created_at, updated_at, service_city, 
-                    service_complexity, estimated_duration, requires_emergency_response, 
-                    classification_confidence, classification_reasoning
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, ?, ?, ?, ?, ?, ?)
-            ''', (
-                lead_id_str,                                                # id
-                account_id,                                                 # account_id
-                ghl_contact_data.get('id'),                                 # ghl_contact_id
-                None,                                                       # ghl_opportunity_id (will be updated)
-                customer_data.get("name", ""),                              # customer_name
-                customer_data.get("email", "").lower().strip() if customer_data.get("email") else None,  # customer_email
-                customer_data.get("phone", ""),                             # customer_phone
-                service_category,                                           # primary_service_category (FIXED)
-                mapped_payload.get("specific_service_requested", ""),                # specific_service_requested (FIXED)
-                zip_code,                                                   # service_zip_code (FIXED)
-                service_county,                                             # service_county
-                service_state,                                              # service_state
-                None,                                                       # vendor_id (unassigned)
-                "unassigned",                                               # status
-                "normal",                                                   # priority
-                form_identifier,                                            # source
-                json.dumps(service_details),                                # service_details
-                "",                                                         # service_city
-                "simple",                                                   # service_complexity
-                "medium",                                                   # estimated_duration
-                False,                                                      # requires_emergency_response
-                1.0,                                                        # classification_confidence
-                f"Created via shared pipeline from {form_identifier}"       # classification_reasoning
-            ))
-            
-            conn.commit()
-            logger.info(f"✅ Shared pipeline created lead: {lead_id_str}")
-            
-        except Exception as e:
-            logger.error(f"❌ Shared pipeline lead creation error: {e}")
-            raise
-        finally:
-            if conn:
-                conn.close()
-        
-        # Step 6: Create opportunity if needed (check for existing first)
-        opportunity_id = None
-        if AppConfig.PIPELINE_ID and AppConfig.NEW_LEAD_STAGE_ID:
-            # Use optimized v2 API for better performance
-            ghl_api_client = OptimizedGoHighLevelAPI(
-                private_token=AppConfig.GHL_PRIVATE_TOKEN,
-                location_id=AppConfig.GHL_LOCATION_ID,
-                agency_api_key=AppConfig.GHL_AGENCY_API_KEY
-            )
-            
-            # First check if an opportunity already exists for this contact
-            existing_opportunities = ghl_api_client.get_opportunities_by_contact(ghl_contact_data.get('id'))
-            
-            if existing_opportunities and len(existing_opportunities) > 0:
-                # Use existing opportunity
-                opportunity_id = existing_opportunities[0].get('id')
-                logger.info(f"📋 Shared pipeline using existing opportunity: {opportunity_id}")
-            else:
-                # Create new opportunity
-                logger.info(f"📈 Shared pipeline creating opportunity for {service_category} lead")
-                
-                customer_name = customer_data["name"]
-                
-                opportunity_data = {
-                    'contactId': ghl_contact_data.get('id'),
-                    'pipelineId': AppConfig.PIPELINE_ID,
-                    'pipelineStageId': AppConfig.NEW_LEAD_STAGE_ID,
-                    'name': f"{customer_name} - {service_category}",
-                    'monetaryValue': 0,
-                    'status': 'open',
-                    'source': f"{form_identifier} (DSP Shared Pipeline)",
-                    'locationId': AppConfig.GHL_LOCATION_ID,
-                }
-                
-                opportunity_response = ghl_api_client.create_opportunity(opportunity_data)
-                
-                # Handle both v1 and v2 API response formats
-                if opportunity_response:
-                    if opportunity_response.get('opportunity', {}).get('id'):
-                        # v2 API format - opportunity is nested
-                        opportunity_id = opportunity_response['opportunity']['id']
-                        logger.info(f"✅ Shared pipeline created opportunity (v2 format): {opportunity_id}")
-                    elif opportunity_response.get('id'):
-                        # v1 API format - id at root level
-                        opportunity_id = opportunity_response['id']
-                        logger.info(f"✅ Shared pipeline created opportunity (v1 format): {opportunity_id}")
-                    else:
-                        logger.error(f"❌ Shared pipeline unexpected opportunity response format: {opportunity_response}")
-                else:
-                    logger.error(f"❌ Shared pipeline failed to create opportunity: No response received")
-            
-            # Update lead with opportunity ID if we have one
-            if opportunity_id:
-                try:
-                    simple_db_instance.update_lead_opportunity_id(lead_id_str, opportunity_id)
-                    logger.info(f"✅ Shared pipeline linked opportunity {opportunity_id} to lead {lead_id_str}")
-                except Exception as e:
-                    logger.warning(f"⚠️ Shared pipeline could not link opportunity ID: {e}")
-        else:
-            logger.warning("⚠️ Shared pipeline: Pipeline not configured - skipping opportunity creation")
-        
-        return lead_id_str, opportunity_id
-        
-    except Exception as e:
-        logger.error(f"❌ Shared pipeline error for contact {ghl_contact_data.get('id', 'unknown')}: {e}")
-        raise
-
-
 # Service mappings have been moved to api.services.service_mapper
 # Duplicate definitions removed for better modularity
 
@@ -1196,7 +1016,7 @@ def convert_service_areas_to_counties(zip_codes_input) -> Dict[str, Any]:
     """
     Convert ZIP codes to counties for vendor applications
     Direct location service conversion - NO AI processing
-    Handles both string and list input formats
+    Handles both string and list input formats; all ZIPs are resolved in one batch lookup
     """
     if not zip_codes_input:
         return {"counties": [], "zip_codes": [], "conversion_success": False}
@@ -1204,7 +1024,7 @@ def convert_service_areas_to_counties(zip_codes_input) -> Dict[str, Any]:
     # Handle both list and string input
     if isinstance(zip_codes_input, list):
         # If it's already a list, use it directly but clean up each entry
-        zip_codes = [zip_code.strip() for zip_code in zip_codes_input if zip_code and zip_code.strip()]
+        zip_codes = [str(zip_code).strip() for zip_code in zip_codes_input if zip_code and str(zip_code).strip()]
     elif isinstance(zip_codes_input, str):
         # If it's a string, split by comma
         zip_codes = [zip_code.strip() for zip_code in zip_codes_input.split(',') if zip_code.strip()]
@@ -1215,67 +1035,24 @@ def convert_service_areas_to_counties(zip_codes_input) -> Dict[str, Any]:
     if not zip_codes:
         return {"counties": [], "zip_codes": [], "conversion_success": False}
     
-    # Convert ZIP codes to counties using location service
-    counties = []
-    successful_conversions = 0
-    conversion_details = []
+    batch = location_service.zips_to_locations(zip_codes)
+    successful_conversions = batch["successful_conversions"]
+    failed = [d for d in batch["details"] if not d["success"]]
     
-    for zip_code in zip_codes:
-        zip_str = zip_code.strip()
-        
-        # Validate ZIP code format
-        if len(zip_str) == 5 and zip_str.isdigit():
-            location_data = location_service.zip_to_location(zip_str)
-            
-            if not location_data.get('error'):
-                county = location_data.get('county')
-                state = location_data.get('state')
-                city = location_data.get('city')
-                
-                if county and state:
-                    county_entry = f"{county}, {state}"
-                    if county_entry not in counties:
-                        counties.append(county_entry)
-                    
-                    conversion_details.append({
-                        "zip_code": zip_str,
-                        "county": county,
-                        "state": state,
-                        "city": city,
-                        "success": True
-                    })
-                    successful_conversions += 1
-                    logger.info(f"🗺️ Vendor Application: ZIP {zip_str} → {county_entry}")
-                else:
-                    conversion_details.append({
-                        "zip_code": zip_str,
-                        "error": "No county/state data",
-                        "success": False
-                    })
-                    logger.warning(f"⚠️ Vendor Application: ZIP {zip_str} resolved but missing county/state")
-            else:
-                conversion_details.append({
-                    "zip_code": zip_str,
-                    "error": location_data['error'],
-                    "success": False
-                })
-                logger.warning(f"⚠️ Vendor Application: Could not convert ZIP {zip_str}: {location_data['error']}")
-        else:
-            conversion_details.append({
-                "zip_code": zip_str,
-                "error": "Invalid ZIP code format",
-                "success": False
-            })
-            logger.warning(f"⚠️ Vendor Application: Invalid ZIP code format: '{zip_str}'")
+    logger.info("🗺️ Vendor Application: %d/%d ZIP codes → %d counties",
+                successful_conversions, len(zip_codes), len(batch["counties"]))
+    if failed:
+        logger.warning("⚠️ Vendor Application: could not convert %d ZIP codes: %s",
+                       len(failed), ", ".join(f"{d['zip_code']} ({d['error']})" for d in failed[:10]))
     
     conversion_rate = (successful_conversions / len(zip_codes)) * 100 if zip_codes else 0
     
     return {
-        "counties": counties,
+        "counties": batch["counties"],
         "zip_codes": zip_codes,
         "conversion_success": successful_conversions > 0,
         "conversion_rate": conversion_rate,
-        "conversion_details": conversion_details,
+        "conversion_details": batch["details"],
         "successful_conversions": successful_conversions,
         "total_zip_codes": len(zip_codes)
     }
@@ -1312,47 +1089,28 @@ async def handle_clean_elementor_webhook(
     Direct processing only - NO AI interference.
     Preserves ALL form data exactly as received from WordPress.
     """
+    received_ns = time.time_ns()
+    
     # Get the raw body - this is async but fast
     body = await request.body()
     content_type = request.headers.get("content-type", "")
     
-    # Start a completely independent thread for processing
-    # This ensures the response is returned immediately
-    def run_async_task():
-        """Run the async task in a new event loop in a separate thread"""
-        try:
-            # Set up logging for this thread
-            logger.info(f"🚀 Starting background thread for webhook: {form_identifier}")
-            
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(
-                    process_elementor_webhook_with_body(
-                        form_identifier,
-                        body,
-                        content_type
-                    )
-                )
-                logger.info(f"✅ Background thread completed for webhook: {form_identifier}")
-            except Exception as e:
-                logger.error(f"❌ Background thread error for {form_identifier}: {e}", exc_info=True)
-            finally:
-                loop.close()
-        except Exception as e:
-            logger.error(f"💥 Critical thread error for {form_identifier}: {e}", exc_info=True)
-    
-    # Start the thread - this returns immediately
-    thread = threading.Thread(target=run_async_task, daemon=True, name=f"webhook-{form_identifier}")
-    thread.start()
-    logger.info(f"📤 Returning immediate 200 OK for {form_identifier}, processing in thread: {thread.name}")
+    # Queue in the form's priority lane - emergency forms jump ahead of lead/vendor backlogs
+    lane = lane_for_form_config(get_form_configuration(form_identifier))
+    priority_scheduler.submit(
+        lane,
+        lambda: process_elementor_webhook_with_body(form_identifier, body, content_type, received_ns, lane),
+        name=f"webhook-{form_identifier}"
+    )
+    logger.info(f"📤 Returning immediate 200 OK for {form_identifier}, queued in '{lane}' lane")
     
     # Return 200 OK immediately using JSONResponse for fastest response
     return JSONResponse(
         content={
             "status": "accepted",
             "message": "Webhook received and queued for processing",
-            "form_identifier": form_identifier
+            "form_identifier": form_identifier,
+            "lane": lane
         },
         status_code=200
     )
@@ -1361,51 +1119,67 @@ async def handle_clean_elementor_webhook(
 async def process_elementor_webhook_with_body(
     form_identifier: str,
     body: bytes,
-    content_type: str
+    content_type: str,
+    received_ns: Optional[int] = None,
+    lane: Optional[str] = None
 ):
     """
     Background task to process Elementor webhook from raw body.
     This runs after returning 200 OK to WordPress.
+    The whole run is one trace, starting when the request was received (received_ns).
     """
+    with tracer.trace("webhook", start_ns=received_ns, form_identifier=form_identifier, lane=lane or ""):
+        if received_ns:
+            tracer.record("queue_wait", received_ns, time.time_ns())
+        await _process_elementor_webhook_body(form_identifier, body, content_type)
+
+
+async def _process_elementor_webhook_body(form_identifier: str, body: bytes, content_type: str):
+    """Parse and service-map the raw body, then hand off to process_elementor_webhook_async"""
     start_time = time.time()
     
     try:
         logger.info(f"🔄 Background processing started for '{form_identifier}' - Content-Type: {content_type}")
         
         # Now parse the body in the background
-        if "application/json" in content_type:
-            elementor_payload = json.loads(body.decode('utf-8'))
-            logger.info(f"✅ Parsed JSON payload with {len(elementor_payload)} fields")
-        elif "application/x-www-form-urlencoded" in content_type or "multipart/form-data" in content_type:
-            from urllib.parse import parse_qs
-            body_str = body.decode('utf-8')
-            elementor_payload = {k: v[0] if len(v) == 1 else v for k, v in parse_qs(body_str).items()}
-            logger.info(f"✅ Parsed form-encoded payload with {len(elementor_payload)} fields")
-        else:
-            # Try JSON by default
-            elementor_payload = json.loads(body.decode('utf-8'))
-            logger.info(f"✅ Parsed payload as JSON (default) with {len(elementor_payload)} fields")
+        with tracer.span("parse", bytes=len(body)):
+            if "application/json" in content_type:
+                elementor_payload = json.loads(body.decode('utf-8'))
+                logger.info(f"✅ Parsed JSON payload with {len(elementor_payload)} fields")
+            elif "application/x-www-form-urlencoded" in content_type or "multipart/form-data" in content_type:
+                from urllib.parse import parse_qs
+                body_str = body.decode('utf-8')
+                elementor_payload = {k: v[0] if len(v) == 1 else v for k, v in parse_qs(body_str).items()}
+                logger.info(f"✅ Parsed form-encoded payload with {len(elementor_payload)} fields")
+            else:
+                # Try JSON by default
+                elementor_payload = json.loads(body.decode('utf-8'))
+                logger.info(f"✅ Parsed payload as JSON (default) with {len(elementor_payload)} fields")
         
         # Use enhanced service mapping instead of just normalization
         # This consolidates redundant fields and adds intelligent service classification
         try:
             logger.info(f"🔧 Applying intelligent service mapping for form '{form_identifier}'")
-            processed_payload, service_metadata = process_webhook_with_service_mapping(elementor_payload)
+            with tracer.span("service_mapping"):
+                processed_payload, service_metadata = process_webhook_with_service_mapping(elementor_payload)
             elementor_payload = processed_payload
             
             # Log the service classification results
-            logger.info(f"📊 Service Classification Results:")
-            logger.info(f"   - Level 1 Category: {service_metadata.get('primary_category', 'Not identified')}")
-            logger.info(f"   - Level 2 Service: {service_metadata.get('service_type', 'Not identified')}")
-            logger.info(f"   - Level 3 Specific: {service_metadata.get('specific_service', 'Not identified')}")
-            logger.info(f"   - Routing Priority: {service_metadata.get('routing_priority', 'normal')}")
+            log_event(logger, logging.INFO, "📊 Service classification",
+                      form=form_identifier,
+                      category=service_metadata.get('primary_category'),
+                      service=service_metadata.get('service_type'),
+                      specific=service_metadata.get('specific_service'),
+                      priority=service_metadata.get('routing_priority', 'normal'))
             
         except Exception as e:
             logger.warning(f"⚠️ Service mapping failed, falling back to basic normalization: {e}")
             # Fallback to basic normalization if service mapping fails
             elementor_payload = normalize_field_names(elementor_payload)
         
-        logger.info(f"📥 Processing webhook in background for form '{form_identifier}': {json.dumps(elementor_payload, indent=2)}")
+        # Full payloads go to the debug ring buffer (LOG_CAPTURE_PAYLOADS), not the main log
+        payload_capture.capture("elementor_normalized", elementor_payload, form=form_identifier)
+        logger.info("📥 Processing webhook in background for form '%s' (%d fields)", form_identifier, len(elementor_payload))
         
         # Now continue with the original processing
         await process_elementor_webhook_async(form_identifier, elementor_payload)
@@ -1415,6 +1189,8 @@ async def process_elementor_webhook_with_body(
         
     except Exception as e:
         processing_time = time.time() - start_time
+        if tracer.current_span():
+            tracer.current_span().set_error(str(e))
         logger.error(f"❌ Failed to process webhook body for form '{form_identifier}' after {processing_time:.2f}s: {e}", exc_info=True)
         simple_db_instance.log_activity(
             event_type="webhook_processing_error",
@@ -1428,6 +1204,48 @@ async def process_elementor_webhook_with_body(
         )
 
 
+async def find_existing_ghl_contact(ghl_api_client, search_email: str, search_phone: str = "") -> Optional[Dict[str, Any]]:
+    """
+    Search GHL for a contact with this email or phone (used when the local identity
+    index misses). Email and phone searches run concurrently; an email match wins.
+    """
+    searches = [asyncio.to_thread(ghl_api_client.search_contacts, query=search_email, limit=10)]
+    if search_phone:
+        searches.append(asyncio.to_thread(ghl_api_client.search_contacts, query=search_phone, limit=10))
+    results = await asyncio.gather(*searches)
+    email_search_results = results[0] or []
+    phone_search_results = results[1] if len(results) > 1 else []
+
+    # Combine and deduplicate results
+    all_search_results = list(email_search_results)
+    if phone_search_results:
+        existing_ids = {contact.get('id') for contact in all_search_results}
+        for phone_contact in phone_search_results:
+            if phone_contact.get('id') not in existing_ids:
+                all_search_results.append(phone_contact)
+
+    if not all_search_results:
+        logger.info("📋 No search results returned for email or phone - contact appears to be new")
+        return None
+
+    logger.info("📋 Search returned %d potential matches", len(all_search_results))
+    search_phone_normalized = normalize_phone(search_phone)
+    phone_match = None
+    for contact_result in all_search_results:
+        # Check for exact email match
+        if (contact_result.get('email') or '').lower() == search_email:
+            logger.info("✅ Found exact EMAIL match: %s", contact_result.get('id'))
+            return contact_result
+        # Check for phone match with normalization
+        if (phone_match is None and search_phone_normalized
+                and normalize_phone(contact_result.get('phone')) == search_phone_normalized):
+            phone_match = contact_result
+
+    if phone_match:
+        logger.info("✅ Found PHONE match: %s", phone_match.get('id'))
+    return phone_match
+
+
 async def process_elementor_webhook_async(
     form_identifier: str,
     elementor_payload: Dict[str, Any]
@@ -1442,28 +1260,22 @@ async def process_elementor_webhook_async(
         logger.info(f"🔄 Starting background processing for form '{form_identifier}'")
         
         # Debug logging for key vendor fields
-        logger.info(f"📋 Key vendor fields in normalized payload:")
-        logger.info(f"   - vendor_company_name: '{elementor_payload.get('vendor_company_name')}'")
-        logger.info(f"   - service_categories_selected: '{elementor_payload.get('service_categories_selected')}'")
-        logger.info(f"   - services_provided: '{elementor_payload.get('services_provided')}'")
-        logger.info(f"   - service_zip_codes: '{elementor_payload.get('service_zip_codes')}'")
+        log_event(logger, logging.DEBUG, "📋 Key vendor fields in normalized payload",
+                  vendor_company_name=elementor_payload.get('vendor_company_name'),
+                  service_categories_selected=elementor_payload.get('service_categories_selected'),
+                  services_provided=elementor_payload.get('services_provided'),
+                  service_zip_codes=elementor_payload.get('service_zip_codes'))
         
         # SPECIAL DEBUG for Level 3 services investigation
         if "vendor" in form_identifier.lower():
-            logger.info(f"🔍 VENDOR APPLICATION - Level 3 Services Debug:")
-            logger.info(f"   - primary_level3_services present: {'primary_level3_services' in elementor_payload}")
-            logger.info(f"   - additional_level3_services present: {'additional_level3_services' in elementor_payload}")
-            logger.info(f"   - all_level3_services present: {'all_level3_services' in elementor_payload}")
-            if 'primary_level3_services' in elementor_payload:
-                logger.info(f"   - primary_level3_services type: {type(elementor_payload.get('primary_level3_services'))}")
-                logger.info(f"   - primary_level3_services content: {elementor_payload.get('primary_level3_services')}")
-            if 'additional_level3_services' in elementor_payload:
-                logger.info(f"   - additional_level3_services type: {type(elementor_payload.get('additional_level3_services'))}")
-                logger.info(f"   - additional_level3_services content: {elementor_payload.get('additional_level3_services')}")
+            log_event(logger, logging.DEBUG, "🔍 VENDOR APPLICATION - Level 3 services",
+                      primary=elementor_payload.get('primary_level3_services'),
+                      additional=elementor_payload.get('additional_level3_services'),
+                      all_present='all_level3_services' in elementor_payload)
 
         # Get direct form configuration - NO AI
         form_config = get_form_configuration(form_identifier)
-        logger.info(f"📋 Direct form config for '{form_identifier}': {form_config}")
+        logger.debug("📋 Direct form config for '%s': %s", form_identifier, form_config)
 
         # Validate form submission - Direct validation only
         validation_result = validate_form_submission(form_identifier, elementor_payload, form_config)
@@ -1496,7 +1308,8 @@ async def process_elementor_webhook_async(
         logger.info(f"🔑 GHL API client initialized")
 
         # Process payload into GHL format - PRESERVE ALL FIELDS
-        final_ghl_payload = process_payload_to_ghl_format(elementor_payload, form_config)
+        with tracer.span("field_mapping"):
+            final_ghl_payload = process_payload_to_ghl_format(elementor_payload, form_config)
         
         # Handle vendor application specific coverage data processing
         if form_config.get("form_type") == "vendor_application":
@@ -1553,7 +1366,9 @@ async def process_elementor_webhook_async(
 
         final_ghl_payload["email"] = final_ghl_payload["email"].lower().strip()
 
-        logger.info(f"🎯 Prepared Final GHL Payload for '{form_identifier}': {json.dumps(final_ghl_payload, indent=2)}")
+        payload_capture.capture("ghl_contact_payload", final_ghl_payload, form=form_identifier)
+        logger.info("🎯 Prepared final GHL payload for '%s' (%d fields, %d custom)",
+                    form_identifier, len(final_ghl_payload), len(final_ghl_payload.get("customFields", [])))
 
         # --- GHL API OPERATIONS: Create or Update Contact ---
         existing_ghl_contact = None
@@ -1562,103 +1377,80 @@ async def process_elementor_webhook_async(
         action_taken = ""
         api_response_details = None
 
-        # Search for existing contact by email AND phone
+        # Look for an existing contact by email AND phone - local identity index first, GHL search on a miss
         search_email = final_ghl_payload["email"]
         search_phone = final_ghl_payload.get("phone", "")
         
-        logger.info(f"🔍 Searching for existing contact with email: {search_email}")
-        if search_phone:
-            logger.info(f"🔍 Also checking for phone duplicates: {search_phone}")
-        
-        # Search by email first
-        email_search_results = ghl_api_client.search_contacts(query=search_email, limit=10)
-        phone_search_results = []
-        
-        # Search by phone if provided
-        if search_phone:
-            phone_search_results = ghl_api_client.search_contacts(query=search_phone, limit=10)
-        
-        # Combine and deduplicate results
-        all_search_results = email_search_results or []
-        if phone_search_results:
-            existing_ids = {contact.get('id') for contact in all_search_results}
-            for phone_contact in phone_search_results:
-                if phone_contact.get('id') not in existing_ids:
-                    all_search_results.append(phone_contact)
-        
-        if all_search_results:
-            logger.info(f"📋 Search returned {len(all_search_results)} potential matches")
-            
-            for i, contact_result in enumerate(all_search_results):
-                contact_id = contact_result.get('id')
-                contact_email = contact_result.get('email', '').lower()
-                contact_phone = contact_result.get('phone', '')
-                
-                logger.info(f"  [{i}] Contact: {contact_id} - Email: {contact_email}, Phone: {contact_phone}")
-                
-                # Check for exact email match
-                if contact_email == search_email:
-                    existing_ghl_contact = contact_result
-                    logger.info(f"✅ Found exact EMAIL match: {existing_ghl_contact.get('id')}")
-                    break
-                    
-                # Check for phone match with normalization
-                elif search_phone and contact_phone:
-                    # Normalize phone numbers for comparison (remove non-digits)
-                    search_phone_normalized = ''.join(filter(str.isdigit, search_phone))
-                    contact_phone_normalized = ''.join(filter(str.isdigit, contact_phone))
-                    
-                    if search_phone_normalized == contact_phone_normalized:
-                        existing_ghl_contact = contact_result
-                        logger.info(f"✅ Found PHONE match: {existing_ghl_contact.get('id')}")
-                        break
-        else:
-            logger.info("📋 No search results returned for email or phone - contact appears to be new")
-
-        # Create or update contact
-        if existing_ghl_contact:
-            # UPDATE EXISTING CONTACT
-            final_ghl_contact_id = existing_ghl_contact["id"]
-            action_taken = "updated"
-            logger.info(f"🔄 Updating existing GHL contact {final_ghl_contact_id}")
-            
-            update_payload = final_ghl_payload.copy()
-            update_payload.pop("locationId", None) 
-            update_payload.pop("id", None)
-
-            operation_successful = ghl_api_client.update_contact(final_ghl_contact_id, update_payload)
-            if not operation_successful:
-                api_response_details = "Update call returned false - check GHL API logs"
-                logger.error(f"❌ Failed to update GHL contact {final_ghl_contact_id}")
-        else:
-            # CREATE NEW CONTACT
-            action_taken = "created"
-            logger.info(f"➕ Creating new GHL contact for email {final_ghl_payload.get('email')}")
-            
-            created_contact_response = ghl_api_client.create_contact(final_ghl_payload)
-            
-            if created_contact_response and isinstance(created_contact_response, dict):
-                # Handle both v1 and v2 API response formats
-                # v2 API returns {'contact': {'id': '...'}} while v1 returns {'id': '...'}
-                contact_data = created_contact_response.get("contact", created_contact_response)
-                contact_id = contact_data.get("id")
+        with tracer.span("ghl.contact_search") as search_span:
+            indexed_contact_id = contact_identity_index.lookup(search_email, search_phone)
+            if indexed_contact_id:
+                existing_ghl_contact = {"id": indexed_contact_id}
+                logger.info("📇 Matched existing contact %s from local identity index", indexed_contact_id)
+            else:
+                existing_ghl_contact = await find_existing_ghl_contact(ghl_api_client, search_email, search_phone)
+            if search_span:
+                search_span.set_attribute("source", "index" if indexed_contact_id else "ghl_search")
+
+        update_payload = final_ghl_payload.copy()
+        update_payload.pop("locationId", None) 
+        update_payload.pop("id", None)
+
+        with tracer.span("ghl.contact_upsert", action="update" if existing_ghl_contact else "create"):
+            # Create or update contact
+            if existing_ghl_contact:
+                # UPDATE EXISTING CONTACT
+                final_ghl_contact_id = existing_ghl_contact["id"]
+                action_taken = "updated"
+                logger.info(f"🔄 Updating existing GHL contact {final_ghl_contact_id}")
+
+                operation_successful = ghl_api_client.update_contact(final_ghl_contact_id, update_payload)
+
+                if not operation_successful and indexed_contact_id:
+                    # The indexed contact may have been deleted or merged in GHL - re-resolve once via search
+                    logger.warning(f"⚠️ Indexed contact {final_ghl_contact_id} could not be updated - re-checking GHL")
+                    contact_identity_index.forget(final_ghl_contact_id)
+                    existing_ghl_contact = await find_existing_ghl_contact(ghl_api_client, search_email, search_phone)
+                    if existing_ghl_contact and existing_ghl_contact["id"] != final_ghl_contact_id:
+                        final_ghl_contact_id = existing_ghl_contact["id"]
+                        operation_successful = ghl_api_client.update_contact(final_ghl_contact_id, update_payload)
+                    elif not existing_ghl_contact:
+                        final_ghl_contact_id = None
+
+                if existing_ghl_contact and not operation_successful:
+                    api_response_details = "Update call returned false - check GHL API logs"
+                    logger.error(f"❌ Failed to update GHL contact {final_ghl_contact_id}")
+
+            if not existing_ghl_contact:
+                # CREATE NEW CONTACT
+                action_taken = "created"
+                logger.info(f"➕ Creating new GHL contact for email {final_ghl_payload.get('email')}")
+            
+                created_contact_response = ghl_api_client.create_contact(final_ghl_payload)
+            
+                if created_contact_response and isinstance(created_contact_response, dict):
+                    # Handle both v1 and v2 API response formats
+                    # v2 API returns {'contact': {'id': '...'}} while v1 returns {'id': '...'}
+                    contact_data = created_contact_response.get("contact", created_contact_response)
+                    contact_id = contact_data.get("id")
                 
-                if not created_contact_response.get("error") and contact_id:
-                    final_ghl_contact_id = contact_id
-                    operation_successful = True
-                    logger.info(f"✅ Successfully created new GHL contact {final_ghl_contact_id}")
+                    if not created_contact_response.get("error") and contact_id:
+                        final_ghl_contact_id = contact_id
+                        operation_successful = True
+                        logger.info(f"✅ Successfully created new GHL contact {final_ghl_contact_id}")
+                    else:
+                        logger.error(f"❌ GHL contact creation failed: {created_contact_response}")
+                        api_response_details = created_contact_response
                 else:
-                    logger.error(f"❌ GHL contact creation failed: {created_contact_response}")
-                    api_response_details = created_contact_response
-            else:
-                logger.error(f"❌ Unexpected response from GHL API: {created_contact_response}")
-                api_response_details = {"error": True, "unexpected_response": created_contact_response}
+                    logger.error(f"❌ Unexpected response from GHL API: {created_contact_response}")
+                    api_response_details = {"error": True, "unexpected_response": created_contact_response}
 
         # Handle success/failure and log results
         processing_time = round(time.time() - start_time, 3)
         
         if operation_successful and final_ghl_contact_id:
             logger.info(f"✅ Successfully {action_taken} GHL contact {final_ghl_contact_id} for form '{form_identifier}' in {processing_time}s")
+            tracer.annotate(ghl_contact_id=final_ghl_contact_id, contact_action=action_taken)
+            contact_identity_index.record(final_ghl_contact_id, search_email, search_phone, source=f"webhook_{action_taken}")
             
             # Log successful activity to database
             simple_db_instance.log_activity(
@@ -1974,6 +1766,8 @@ async def process_elementor_webhook_async(
         else:
             # Operation failed
             error_message = f"Failed to {action_taken} GHL contact for form '{form_identifier}'"
+            if tracer.current_span():
+                tracer.current_span().set_error(error_message)
             logger.error(f"❌ {error_message}. API Response: {api_response_details}")
             
             simple_db_instance.log_activity(
@@ -1994,6 +1788,8 @@ async def process_elementor_webhook_async(
 
     except Exception as e:
         processing_time = round(time.time() - start_time, 3)
+        if tracer.current_span():
+            tracer.current_span().set_error(str(e))
         logger.exception(f"💥 Critical error in background processing for form '{form_identifier}' after {processing_time}s: {e}")
         simple_db_instance.log_activity(
             event_type="clean_webhook_exception",
@@ -2015,10 +1811,14 @@ async def assign_vendor_to_lead(
     service_county: str,
     service_state: str,
     service_zip: str,
-    priority: str = "normal"
+    priority: str = "normal",
+    matching_vendors: Optional[List[Dict[str, Any]]] = None,
+    ghl_api: Optional[OptimizedGoHighLevelAPI] = None
 ) -> Dict[str, Any]:
     """
     Assign vendor to lead AFTER lead creation with opportunity_id.
+    Pass matching_vendors when the pool was already computed (lead pipeline) and ghl_api
+    to reuse a client; blocking DB/GHL calls run in worker threads.
     Returns assignment result dictionary.
     """
     try:
@@ -2026,14 +1826,17 @@ async def assign_vendor_to_lead(
         logger.info(f"   Service: {specific_service}")
         logger.info(f"   Location: {service_county}, {service_state} {service_zip}")
         
-        # Find matching vendors
-        matching_vendors = lead_routing_service.find_matching_vendors(
-            account_id=account_id,
-            service_category=specific_service.split(" - ")[0] if " - " in specific_service else specific_service,
-            zip_code=service_zip,
-            priority=priority,
-            specific_service=specific_service
-        )
+        # Find matching vendors (unless the pipeline already did it concurrently)
+        if matching_vendors is None:
+            with tracer.span("vendor_match"):
+                matching_vendors = await asyncio.to_thread(
+                    lead_routing_service.find_matching_vendors,
+                    account_id=account_id,
+                    service_category=specific_service.split(" - ")[0] if " - " in specific_service else specific_service,
+                    zip_code=service_zip,
+                    priority=priority,
+                    specific_service=specific_service
+                )
         
         if not matching_vendors:
             logger.warning(f"⚠️ No vendors found for {specific_service} in {service_county}, {service_state}")
@@ -2041,10 +1844,11 @@ async def assign_vendor_to_lead(
         
         logger.info(f"✅ Found {len(matching_vendors)} matching vendors")
         
-        # Select vendor using configured algorithm
-        selected_vendor = lead_routing_service.select_vendor_from_pool(
-            matching_vendors, account_id
-        )
+        # Select vendor using configured algorithm (assigns the lead under the routing lock)
+        with tracer.span("vendor_selection", pool_size=len(matching_vendors)):
+            selected_vendor = await asyncio.to_thread(
+                lead_routing_service.select_vendor_from_pool, matching_vendors, account_id, lead_id
+            )
         
         if not selected_vendor:
             logger.error(f"❌ Vendor selection failed")
@@ -2055,19 +1859,12 @@ async def assign_vendor_to_lead(
         vendor_name = selected_vendor.get('company_name', selected_vendor.get('name', 'Unknown'))
         
         logger.info(f"🎯 Selected vendor: {vendor_name} (ID: {vendor_id}, GHL User: {vendor_ghl_user_id})")
-        
-        # Update lead with vendor assignment
-        if not simple_db_instance.assign_lead_to_vendor(lead_id, vendor_id):
-            return {"success": False, "reason": "database_update_failed"}
+        tracer.annotate(vendor_id=vendor_id)
         
         # Update GHL opportunity
         if vendor_ghl_user_id and opportunity_id:
             try:
-                ghl_api = OptimizedGoHighLevelAPI(
-                    private_token=AppConfig.GHL_PRIVATE_TOKEN,
-                    location_id=AppConfig.GHL_LOCATION_ID,
-                    agency_api_key=AppConfig.GHL_AGENCY_API_KEY
-                )
+                ghl_api = ghl_api or get_shared_ghl_client()
                 
                 update_data = {
                     'assignedTo': vendor_ghl_user_id,
@@ -2075,7 +1872,10 @@ async def assign_vendor_to_lead(
                     'pipelineStageId': AppConfig.NEW_LEAD_STAGE_ID
                 }
                 
-                if ghl_api.update_opportunity(opportunity_id, update_data):
+                with tracer.span("ghl.assign_opportunity"):
+                    await ghl_rate_limiter.acquire_async()
+                    updated = await asyncio.to_thread(ghl_api.update_opportunity, opportunity_id, update_data)
+                if updated:
                     logger.info(f"✅ Assigned GHL opportunity {opportunity_id} to {vendor_name}")
                     return {"success": True, "vendor_id": vendor_id, "vendor_name": vendor_name}
                 else:
@@ -2092,172 +1892,183 @@ async def assign_vendor_to_lead(
         logger.error(f"❌ Error in vendor assignment: {e}")
         return {"success": False, "reason": "process_error", "error": str(e)}
 
-async def trigger_clean_lead_routing_workflow(
-    ghl_contact_id: str, 
-    form_identifier: str, 
-    form_config: Dict[str, Any],
-    form_data: Dict[str, Any],
-    selected_vendor_id: Optional[str] = None,      # Pre-selected vendor ID (deprecated)
-    selected_vendor_ghl_user: Optional[str] = None  # Pre-selected vendor GHL user ID (deprecated)
-):
-    """
-    FIXED: Clean background task for lead routing with correct order of operations
-    1. Create opportunity FIRST
-    2. Create lead WITH opportunity_id
-    3. Trigger vendor assignment
-    """
-    logger.info(f"🚀 CLEAN BACKGROUND TASK: Processing lead for contact {ghl_contact_id} from form '{form_identifier}'")
+# ============================================
+# LEAD ROUTING PIPELINE STAGES
+# Each stage reads its inputs from the shared context and returns its output, which the
+# pipeline stores under the stage name. Dependencies (see LEAD_ROUTING_PIPELINE):
+#   account, mapping, opportunity  -> start immediately
+#   location, vendor_candidates    -> overlap the GHL opportunity call
+#   lead_record                    -> needs the opportunity ID and location
+#   vendor_assignment              -> needs the lead record and vendor pool
+# ============================================
+
+def _resolve_routing_account_id() -> str:
+    account = simple_db_instance.get_account_by_ghl_location_id(AppConfig.GHL_LOCATION_ID)
+    if account:
+        return account["id"]
+    logger.warning(f"⚠️ No account found for GHL Location ID: {AppConfig.GHL_LOCATION_ID}")
+    return simple_db_instance.create_account(
+        company_name="Digital Marine LLC",
+        industry="marine",
+        ghl_location_id=AppConfig.GHL_LOCATION_ID,
+        ghl_private_token=AppConfig.GHL_PRIVATE_TOKEN
+    )
+
+async def _stage_account(ctx: Dict[str, Any]) -> str:
+    return await asyncio.to_thread(_resolve_routing_account_id)
+
+async def _stage_mapping(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """Field mapping, service_details and service resolution (CPU only)"""
+    form_data = ctx["form_data"]
+    form_identifier = ctx["form_identifier"]
     
-    try:
-        # Get account information
-        account = simple_db_instance.get_account_by_ghl_location_id(AppConfig.GHL_LOCATION_ID)
-        if not account:
-            logger.warning(f"⚠️ No account found for GHL Location ID: {AppConfig.GHL_LOCATION_ID}")
-            account_id = simple_db_instance.create_account(
-                company_name="Digital Marine LLC",
-                industry="marine",
-                ghl_location_id=AppConfig.GHL_LOCATION_ID,
-                ghl_private_token=AppConfig.GHL_PRIVATE_TOKEN
-            )
-        else:
-            account_id = account["id"]
- 
-        # Direct service classification (NO AI)
-        service_category = form_config.get("service_category", "No Category")
-        
-        # Extract customer data directly from form (NO PHONE)
-        customer_data = {
-            "name": f"{form_data.get('firstName', '')} {form_data.get('lastName', '')}".strip(),
-            "email": form_data.get("email", ""),
-            "phone": form_data.get("phone", "")
-        }
-        
-        # FIXED CODE - Use field mapping system like contact creation (works for all 16 form types)
-        mapped_payload = field_mapper.map_payload(form_data, industry="marine")
-        logger.info(f"🔄 Lead creation using field mapping. Original keys: {list(form_data.keys())}, Mapped keys: {list(mapped_payload.keys())}")
-        
-        # Create service_details from ALL mapped fields (preserves all form data)
-        service_details = {}
-        
-        # Standard fields that have dedicated database columns (don't duplicate in service_details)
-        standard_lead_fields = {
-            "firstName", "lastName", "email", "phone", "primary_service_category",
-            "customer_zip_code", "specific_service_requested"
-        }
-        
-        # Store ALL other fields in service_details (preserves all 16 form types)
-        for field_key, field_value in mapped_payload.items():
-            # Skip empty values and standard fields (those go in dedicated columns)
-            if field_value == "" or field_value is None or field_key in standard_lead_fields:
-                continue
-                
-            service_details[field_key] = field_value
-            
-        # Add form metadata (NO PHONE)
-        service_details.update({
-            "form_source": form_identifier,
-            "submission_time": form_data.get("Time", ""),
-            "submission_date": form_data.get("Date", ""),
-            "processing_method": "direct_mapping"
-        })
-        
-        logger.info(f"📦 Created service_details with {len(service_details)} fields from mapped payload")
-
-        # FIXED: Convert ZIP to county for lead routing (CRITICAL FIX FOR VENDOR MATCHING)
-        zip_code = mapped_payload.get("zip_code_of_service", "")
-        service_county = ""
-        service_state = ""
-        
-        if zip_code and len(zip_code) == 5 and zip_code.isdigit():
-            logger.info(f"🗺️ Converting ZIP {zip_code} to county for lead routing")
-            location_data = location_service.zip_to_location(zip_code)
-            
-            if not location_data.get('error'):
-                county = location_data.get('county', '')
-                state = location_data.get('state', '')
-                if county and state:
-                    service_county = f"{county}, {state}"  # Format: "Miami-Dade, FL"
-                    service_state = state
-                    logger.info(f"✅ ZIP {zip_code} → {service_county}")
-                else:
-                    logger.warning(f"⚠️ ZIP {zip_code} conversion incomplete: county={county}, state={state}")
-            else:
-                logger.warning(f"⚠️ Could not convert ZIP {zip_code}: {location_data['error']}")
+    # FIXED CODE - Use field mapping system like contact creation (works for all 16 form types)
+    mapped_payload = field_mapper.map_payload(form_data, industry="marine")
+    logger.info(f"🔄 Lead creation using field mapping. Original keys: {list(form_data.keys())}, Mapped keys: {list(mapped_payload.keys())}")
+    
+    # Standard fields that have dedicated database columns (don't duplicate in service_details)
+    standard_lead_fields = {
+        "firstName", "lastName", "email", "phone", "primary_service_category",
+        "customer_zip_code", "specific_service_requested"
+    }
+    
+    # Store ALL other fields in service_details (preserves all 16 form types)
+    service_details = {
+        field_key: field_value for field_key, field_value in mapped_payload.items()
+        if field_value != "" and field_value is not None and field_key not in standard_lead_fields
+    }
+    
+    # Add form metadata (NO PHONE)
+    service_details.update({
+        "form_source": form_identifier,
+        "submission_time": form_data.get("Time", ""),
+        "submission_date": form_data.get("Date", ""),
+        "processing_method": "direct_mapping"
+    })
+    
+    logger.info(f"📦 Created service_details with {len(service_details)} fields from mapped payload")
+    
+    # Get service values from mapped payload (mapped from GHL custom fields)
+    specific_service_requested = mapped_payload.get("specific_service_needed", "")  # From GHL field FT85QGi0tBq1AfVGNJ9v
+    
+    # If no Level 3 specific service, extract Level 2 from form identifier
+    if not specific_service_requested:
+        level2_service = get_specific_service_from_form(form_identifier)
+        if level2_service:
+            specific_service_requested = level2_service
+            logger.info(f"📝 Using Level 2 subcategory from form identifier: {specific_service_requested}")
         else:
-            logger.warning(f"⚠️ Invalid ZIP code format: '{zip_code}' - service_county will remain NULL")
-
-        # Get service values from mapped payload (mapped from GHL custom fields)
-        specific_service_requested = mapped_payload.get("specific_service_needed", "")  # From GHL field FT85QGi0tBq1AfVGNJ9v
-        
-        # If no Level 3 specific service, extract Level 2 from form identifier
-        if not specific_service_requested:
-            # Try to get the Level 2 subcategory from form identifier
-            level2_service = get_specific_service_from_form(form_identifier)
-            if level2_service:
-                specific_service_requested = level2_service
-                logger.info(f"📝 Using Level 2 subcategory from form identifier: {specific_service_requested}")
-            else:
-                # Last resort: use the form identifier itself as a readable service name
-                specific_service_requested = form_identifier.replace("_", " ").title()
-                logger.info(f"📝 Using form identifier as Level 2: {specific_service_requested}")
-        
-        # STEP 1: Create opportunity FIRST (before lead creation)
-        opportunity_id = None
-        form_type = form_config.get("form_type", "unknown")
-        if form_type == "client_lead" or form_type == "emergency_service":
-            if AppConfig.PIPELINE_ID and AppConfig.NEW_LEAD_STAGE_ID:
-                logger.info(f"📈 Creating opportunity FIRST for {service_category} lead")
-                
-                ghl_api_client = OptimizedGoHighLevelAPI(
-                    private_token=AppConfig.GHL_PRIVATE_TOKEN,
-                    location_id=AppConfig.GHL_LOCATION_ID,
-                    agency_api_key=AppConfig.GHL_AGENCY_API_KEY
-                )
-                
-                customer_name = customer_data["name"]
-                location_info = mapped_payload.get("zip_code_of_service", "Unknown Location")
-                
-                opportunity_data = {
-                    'contactId': ghl_contact_id,
-                    'pipelineId': AppConfig.PIPELINE_ID,
-                    'pipelineStageId': AppConfig.NEW_LEAD_STAGE_ID,
-                    'name': f"{customer_name} - {service_category}",
-                    'monetaryValue': 0,
-                    'status': 'open',
-                    'source': f"{form_identifier} (DSP)",
-                    'locationId': AppConfig.GHL_LOCATION_ID,
-                    # NOTE: assignedTo will be set AFTER vendor selection
-                }
-                
-                opportunity_response = ghl_api_client.create_opportunity(opportunity_data)
-                
-                # Handle both v1 and v2 API response formats
-                if opportunity_response:
-                    if opportunity_response.get('opportunity', {}).get('id'):
-                        # v2 API format - opportunity is nested
-                        opportunity_id = opportunity_response['opportunity']['id']
-                        logger.info(f"✅ Created opportunity FIRST (v2 format): {opportunity_id}")
-                    elif opportunity_response.get('id'):
-                        # v1 API format - id at root level
-                        opportunity_id = opportunity_response['id']
-                        logger.info(f"✅ Created opportunity FIRST (v1 format): {opportunity_id}")
-                    else:
-                        logger.error(f"❌ Unexpected opportunity response format: {opportunity_response}")
-                else:
-                    logger.error(f"❌ Failed to create opportunity: No response received")
-            else:
-                logger.warning("⚠️ Pipeline not configured - skipping opportunity creation")
+            # Last resort: use the form identifier itself as a readable service name
+            specific_service_requested = form_identifier.replace("_", " ").title()
+            logger.info(f"📝 Using form identifier as Level 2: {specific_service_requested}")
+    
+    return {
+        "mapped_payload": mapped_payload,
+        "service_details": service_details,
+        "zip_code": mapped_payload.get("zip_code_of_service", ""),
+        "specific_service_requested": specific_service_requested
+    }
+
+async def _stage_location(ctx: Dict[str, Any]) -> Dict[str, str]:
+    """FIXED: Convert ZIP to county for lead routing (CRITICAL FIX FOR VENDOR MATCHING)"""
+    zip_code = ctx["mapping"]["zip_code"]
+    location = {"service_county": "", "service_state": ""}
+    
+    if not (zip_code and len(zip_code) == 5 and zip_code.isdigit()):
+        logger.warning(f"⚠️ Invalid ZIP code format: '{zip_code}' - service_county will remain NULL")
+        return location
+    
+    location_data = await asyncio.to_thread(location_service.zip_to_location, zip_code)
+    if location_data.get('error'):
+        logger.warning(f"⚠️ Could not convert ZIP {zip_code}: {location_data['error']}")
+        return location
+    
+    county = location_data.get('county', '')
+    state = location_data.get('state', '')
+    if county and state:
+        location["service_county"] = f"{county}, {state}"  # Format: "Miami-Dade, FL"
+        location["service_state"] = state
+        logger.info(f"✅ ZIP {zip_code} → {location['service_county']}")
+    else:
+        logger.warning(f"⚠️ ZIP {zip_code} conversion incomplete: county={county}, state={state}")
+    return location
+
+async def _stage_opportunity(ctx: Dict[str, Any]) -> Optional[str]:
+    """STEP 1: Create opportunity FIRST (before lead creation). Returns opportunity ID or None."""
+    form_config = ctx["form_config"]
+    form_type = form_config.get("form_type", "unknown")
+    if form_type not in ("client_lead", "emergency_service"):
+        return None
+    if not (AppConfig.PIPELINE_ID and AppConfig.NEW_LEAD_STAGE_ID):
+        logger.warning("⚠️ Pipeline not configured - skipping opportunity creation")
+        return None
+    
+    service_category = ctx["service_category"]
+    logger.info(f"📈 Creating opportunity FIRST for {service_category} lead")
+    
+    opportunity_data = {
+        'contactId': ctx["ghl_contact_id"],
+        'pipelineId': AppConfig.PIPELINE_ID,
+        'pipelineStageId': AppConfig.NEW_LEAD_STAGE_ID,
+        'name': f"{ctx['customer_data']['name']} - {service_category}",
+        'monetaryValue': 0,
+        'status': 'open',
+        'source': f"{ctx['form_identifier']} (DSP)",
+        'locationId': AppConfig.GHL_LOCATION_ID,
+        # NOTE: assignedTo will be set AFTER vendor selection
+    }
+    
+    await ghl_rate_limiter.acquire_async()
+    opportunity_response = await asyncio.to_thread(ctx["ghl_api"].create_opportunity, opportunity_data)
+    
+    # Handle both v1 and v2 API response formats
+    if not opportunity_response:
+        logger.error(f"❌ Failed to create opportunity: No response received")
+        return None
+    if opportunity_response.get('opportunity', {}).get('id'):
+        # v2 API format - opportunity is nested
+        opportunity_id = opportunity_response['opportunity']['id']
+    elif opportunity_response.get('id'):
+        # v1 API format - id at root level
+        opportunity_id = opportunity_response['id']
+    else:
+        logger.error(f"❌ Unexpected opportunity response format: {opportunity_response}")
+        return None
+    
+    logger.info(f"✅ Created opportunity FIRST: {opportunity_id}")
+    return opportunity_id
+
+async def _stage_vendor_candidates(ctx: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Local vendor matching - read only, so it overlaps the GHL opportunity call"""
+    specific_service = ctx["mapping"]["specific_service_requested"]
+    zip_code = ctx["mapping"]["zip_code"]
+    if not specific_service or not zip_code:
+        return []
+    
+    return await asyncio.to_thread(
+        lead_routing_service.find_matching_vendors,
+        account_id=ctx["account"],
+        service_category=specific_service.split(" - ")[0] if " - " in specific_service else specific_service,
+        zip_code=zip_code,
+        priority=ctx["priority"],
+        specific_service=specific_service
+    )
+
+def _insert_routing_lead(ctx: Dict[str, Any]) -> str:
+    customer_data = ctx["customer_data"]
+    mapping = ctx["mapping"]
+    location = ctx["location"]
+    opportunity_id = ctx["opportunity"]
+    zip_code = mapping["zip_code"]
+    
+    conn = None
+    try:
+        lead_id = str(uuid.uuid4())
+        conn = simple_db_instance._get_conn()
+        cursor = conn.cursor()
         
-        # STEP 2: Create lead WITH opportunity_id
-        conn = None
-        lead_id = None
-        try:
-            lead_id = str(uuid.uuid4())
-            conn = simple_db_instance._get_conn()
-            cursor = conn.cursor()
-            
-            # FIXED: INSERT using actual database schema field names (26 fields)
-            cursor.execute('''
+        # FIXED: INSERT using actual database schema field names (26 fields)
+        cursor.execute('''
             INSERT INTO leads (
                 id, account_id, ghl_contact_id, ghl_opportunity_id, customer_name,
                 customer_email, customer_phone, primary_service_category, specific_service_requested,
@@ -2269,23 +2080,23 @@ async def trigger_clean_lead_routing_workflow(
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             lead_id,                                                      # id
-            account_id,                                                   # account_id  
-            ghl_contact_id,                                               # ghl_contact_id
+            ctx["account"],                                               # account_id  
+            ctx["ghl_contact_id"],                                        # ghl_contact_id
             opportunity_id,                                               # ghl_opportunity_id (NOW WE HAVE IT!)
             customer_data.get("name", ""),                                # customer_name
             customer_data.get("email", "").lower().strip() if customer_data.get("email") else None,  # customer_email
             customer_data.get("phone", ""),                               # customer_phone
-            service_category,                                             # primary_service_category (from form_config)
-            specific_service_requested,                                   # specific_service_requested (from GHL field)
+            ctx["service_category"],                                      # primary_service_category (from form_config)
+            mapping["specific_service_requested"],                        # specific_service_requested (from GHL field)
             zip_code,                                                     # customer_zip_code
-            service_county,                                               # service_county
-            service_state,                                                # service_state
+            location["service_county"],                                   # service_county
+            location["service_state"],                                    # service_state
             None,                                                         # vendor_id (NULL initially)
             None,                                                         # assigned_at (NULL initially)
             "pending_assignment" if opportunity_id else "unassigned",    # status
             "normal",                                                     # priority  
-            f"{form_identifier} (DSP)",                                   # source
-            json.dumps(service_details),                                  # service_details
+            f"{ctx['form_identifier']} (DSP)",                            # source
+            json.dumps(mapping["service_details"]),                       # service_details
             zip_code,                                                     # service_zip_code 
             "",                                                           # service_city
             "[]",                                                         # specific_services (JSON array)
@@ -2295,36 +2106,117 @@ async def trigger_clean_lead_routing_workflow(
             1.0,                                                          # classification_confidence
             "Direct form mapping"                                         # classification_reasoning
         ))
-            
-            conn.commit()
-            logger.info(f"✅ Lead created with ID: {lead_id}")
-            
-        except Exception as e:
-            logger.error(f"❌ Lead creation error: {e}")
-            raise
-        finally:
-            if conn:
-                conn.close()
         
-        # STEP 3: Trigger vendor assignment (if we have opportunity and required data)
-        if opportunity_id and specific_service_requested and (service_county or zip_code):
-            logger.info(f"🎯 Triggering vendor assignment for lead {lead_id}")
-            logger.info(f"   Opportunity: {opportunity_id}")
-            logger.info(f"   Service: {specific_service_requested}")
-            logger.info(f"   Location: {service_county or zip_code}")
-            
-            # Call the vendor assignment function
-            assignment_result = await assign_vendor_to_lead(
-                lead_id=lead_id,
-                account_id=account_id,
-                opportunity_id=opportunity_id,
-                specific_service=specific_service_requested,
-                service_county=service_county,
-                service_state=service_state,
-                service_zip=zip_code,
-                priority=form_config.get("priority", "normal")
-            )
-            
+        conn.commit()
+        logger.info(f"✅ Lead created with ID: {lead_id}")
+        return lead_id
+        
+    except Exception as e:
+        logger.error(f"❌ Lead creation error: {e}")
+        raise
+    finally:
+        if conn:
+            conn.close()
+
+async def _stage_lead_record(ctx: Dict[str, Any]) -> str:
+    """STEP 2: Create lead WITH opportunity_id"""
+    return await asyncio.to_thread(_insert_routing_lead, ctx)
+
+async def _stage_vendor_assignment(ctx: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """STEP 3: Select vendor from the precomputed pool, assign in DB, update the GHL opportunity"""
+    opportunity_id = ctx["opportunity"]
+    specific_service = ctx["mapping"]["specific_service_requested"]
+    zip_code = ctx["mapping"]["zip_code"]
+    location = ctx["location"]
+    
+    if not (opportunity_id and specific_service and (location["service_county"] or zip_code)):
+        return None  # Prerequisites not met - reported by the workflow
+    
+    logger.info(f"🎯 Triggering vendor assignment for lead {ctx['lead_record']}")
+    return await assign_vendor_to_lead(
+        lead_id=ctx["lead_record"],
+        account_id=ctx["account"],
+        opportunity_id=opportunity_id,
+        specific_service=specific_service,
+        service_county=location["service_county"],
+        service_state=location["service_state"],
+        service_zip=zip_code,
+        priority=ctx["priority"],
+        matching_vendors=ctx["vendor_candidates"],
+        ghl_api=ctx["ghl_api"]
+    )
+
+LEAD_ROUTING_PIPELINE = StagePipeline("lead_routing", [
+    PipelineStage("account", _stage_account),
+    PipelineStage("mapping", _stage_mapping),
+    PipelineStage("location", _stage_location, depends_on=["mapping"]),
+    PipelineStage("opportunity", _stage_opportunity),
+    PipelineStage("vendor_candidates", _stage_vendor_candidates, depends_on=["account", "mapping"]),
+    PipelineStage("lead_record", _stage_lead_record, depends_on=["account", "mapping", "location", "opportunity"]),
+    PipelineStage("vendor_assignment", _stage_vendor_assignment, depends_on=["lead_record", "vendor_candidates"]),
+])
+
+async def trigger_clean_lead_routing_workflow(
+    ghl_contact_id: str, 
+    form_identifier: str, 
+    form_config: Dict[str, Any],
+    form_data: Dict[str, Any],
+    selected_vendor_id: Optional[str] = None,      # Pre-selected vendor ID (deprecated)
+    selected_vendor_ghl_user: Optional[str] = None  # Pre-selected vendor GHL user ID (deprecated)
+):
+    """
+    Clean background task for lead routing, run as a stage pipeline (LEAD_ROUTING_PIPELINE).
+    Order guarantees are kept - opportunity before lead, lead before vendor assignment -
+    while independent work overlaps: vendor matching and ZIP resolution run during the
+    GHL opportunity call.
+    """
+    logger.info(f"🚀 CLEAN BACKGROUND TASK: Processing lead for contact {ghl_contact_id} from form '{form_identifier}'")
+    
+    form_type = form_config.get("form_type", "unknown")
+    priority = form_config.get("priority", "normal")
+    
+    try:
+        context = {
+            "ghl_contact_id": ghl_contact_id,
+            "form_identifier": form_identifier,
+            "form_config": form_config,
+            "form_data": form_data,
+            "priority": priority,
+            # Direct service classification (NO AI)
+            "service_category": form_config.get("service_category", "No Category"),
+            # Extract customer data directly from form
+            "customer_data": {
+                "name": f"{form_data.get('firstName', '')} {form_data.get('lastName', '')}".strip(),
+                "email": form_data.get("email", ""),
+                "phone": form_data.get("phone", "")
+            },
+            "ghl_api": get_shared_ghl_client(),
+        }
+        
+        with tracer.span("lead_routing", form_type=form_type, priority=priority):
+            stage_results = await LEAD_ROUTING_PIPELINE.run(context)
+        stage_timings = StagePipeline.timings_ms(stage_results)
+        
+        lead_result = stage_results["lead_record"]
+        if lead_result.status != "success":
+            raise Exception(f"Lead creation failed: {lead_result.error}")
+        
+        lead_id = context["lead_record"]
+        opportunity_id = context.get("opportunity")
+        tracer.annotate(lead_id=lead_id, opportunity_id=opportunity_id or "")
+        mapping = context["mapping"]
+        location = context["location"]
+        specific_service_requested = mapping["specific_service_requested"]
+        zip_code = mapping["zip_code"]
+        service_county = location["service_county"]
+        service_state = location["service_state"]
+        assignment_result = context.get("vendor_assignment")
+        
+        if stage_results["vendor_assignment"].status != "success":
+            assignment_result = {"success": False, "reason": "pipeline_stage_failed",
+                                 "error": stage_results["vendor_assignment"].error}
+        
+        if assignment_result is not None:
             if assignment_result['success']:
                 logger.info(f"✅ Vendor assignment successful: {assignment_result.get('vendor_name')}")
                 
@@ -2392,9 +2284,6 @@ async def trigger_clean_lead_routing_workflow(
             # TODO: Send notification to GHL admin user
             # This would typically be done via GHL task/note creation or email
         
-        # Note: Vendor assignment now happens in assign_vendor_to_lead function above
-        # This ensures proper order: opportunity -> lead -> vendor assignment
-        
         # Log successful routing
         simple_db_instance.log_activity(
             event_type="clean_lead_routing_completed",
@@ -2405,8 +2294,9 @@ async def trigger_clean_lead_routing_workflow(
                 "form_identifier": form_identifier,
                 "form_type": form_type,
                 "priority": priority,
-                "service_category": service_category,
+                "service_category": context["service_category"],
                 "processing_method": "direct_only_no_ai",
+                "stage_timings_ms": stage_timings,
                 "timestamp": time.time()
             },
             lead_id=ghl_contact_id,
@@ -2521,7 +2411,8 @@ async def handle_vendor_user_creation_webhook(request: Request):
         
         # Parse incoming GHL workflow webhook payload
         ghl_payload = await request.json()
-        logger.info(f"📥 GHL Vendor User Creation Webhook received: {json.dumps(ghl_payload, indent=2)}")
+        payload_capture.capture("ghl_vendor_user_webhook", ghl_payload)
+        logger.info("📥 GHL Vendor User Creation Webhook received (contact %s)", ghl_payload.get("contact_id") or ghl_payload.get("contactId"))
         
         # Extract vendor information directly from webhook payload
         contact_id = ghl_payload.get("contact_id") or ghl_payload.get("contactId")
@@ -2537,6 +2428,7 @@ async def handle_vendor_user_creation_webhook(request: Request):
         logger.info(f"   👨 Name: {vendor_first_name} {vendor_last_name}")
         logger.info(f"   📱 Phone: {vendor_phone}")
         logger.info(f"   🏢 Company: {vendor_company_name}")
+        contact_identity_index.record(contact_id, vendor_email, vendor_phone, source="ghl_webhook")
         
         # Use v1 API for vendor user creation (required for GHL user management)
         # This is the ONLY place where v1 API is still required
@@ -2818,9 +2710,15 @@ async def clean_webhook_health_check():
         "routing_method": "direct_vendor_matching_no_ai",
         "ai_processing": "completely_disabled",
         "opportunity_creation": "enabled" if AppConfig.PIPELINE_ID else "disabled",
+        "processing_lanes": priority_scheduler.get_lane_stats()["lanes"],
         "message": "Clean webhook system ready for direct processing - NO AI interference"
     }
 
+@router.get("/scheduler/lanes")
+async def get_scheduler_lane_stats():
+    """Per-lane queue depth and latency SLO metrics for webhook processing"""
+    return {"status": "success", **priority_scheduler.get_lane_stats()}
+
 # Get service categories endpoint
 @router.get("/service-categories")
 async def get_clean_service_categories():
@@ -2907,64 +2805,282 @@ async def handle_lead_reassignment_webhook(request: Request):
     from api.routes.webhook_reassignment_fixed import handle_lead_reassignment_webhook_fixed
     return await handle_lead_reassignment_webhook_fixed(request)
 
+@router.post("/ghl/opportunity-status")
+async def handle_opportunity_status_webhook(request: Request):
+    """
+    GHL workflow webhook for "Opportunity Status Changed" / "Pipeline Stage Changed".
+    Records the change as a lead event and feeds won/lost outcomes to vendor performance
+    scoring (api/services/vendor_scoring.py), which performance-based routing ranks by.
+    Authenticated with the X-Webhook-API-Key header like the other GHL workflow webhooks.
+    """
+    api_key = request.headers.get("X-Webhook-API-Key")
+    if not api_key or api_key != AppConfig.GHL_WEBHOOK_API_KEY:
+        logger.error(f"❌ GHL opportunity webhook with missing/invalid API key from IP: {request.client.host}")
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Webhook-API-Key header")
+
+    try:
+        ghl_payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    payload_capture.capture("ghl_opportunity_status_webhook", ghl_payload)
+
+    custom_data = ghl_payload.get("customData") or {}
+    opportunity = ghl_payload.get("opportunity") or {}
+    opportunity_id = (
+        ghl_payload.get("opportunity_id") or ghl_payload.get("opportunityId") or
+        opportunity.get("id") or custom_data.get("opportunity_id") or ghl_payload.get("id")
+    )
+    contact_id = (
+        ghl_payload.get("contact_id") or ghl_payload.get("contactId") or
+        opportunity.get("contactId") or custom_data.get("contact_id")
+    )
+    status = (
+        ghl_payload.get("status") or ghl_payload.get("opportunity_status") or
+        opportunity.get("status") or custom_data.get("status")
+    )
+    # GHL's workflow payload spells it "pipleline_stage"
+    stage = (
+        ghl_payload.get("pipeline_stage") or ghl_payload.get("pipleline_stage") or
+        ghl_payload.get("stage_name") or opportunity.get("pipelineStageName") or custom_data.get("stage")
+    )
+
+    lead = None
+    if opportunity_id:
+        lead = await asyncio.to_thread(simple_db_instance.get_lead_by_ghl_opportunity_id, opportunity_id)
+    if not lead and contact_id:
+        lead = await asyncio.to_thread(simple_db_instance.get_lead_by_ghl_contact_id, contact_id)
+    if not lead:
+        logger.warning(f"⚠️ Opportunity status webhook for unknown lead (opportunity {opportunity_id}, contact {contact_id})")
+        return {"status": "ignored", "message": "No matching lead", "opportunity_id": opportunity_id}
+
+    event_data = {
+        "lead_id": lead["id"],
+        "contact_id": lead.get("ghl_contact_id") or contact_id,
+        "event_type": "opportunity_status_changed",
+        "opportunity_id": opportunity_id or lead.get("ghl_opportunity_id"),
+        "vendor_id": lead.get("vendor_id"),
+        "status": status,
+        "stage": stage
+    }
+    await asyncio.to_thread(simple_db_instance.create_lead_event, event_data)
+    outcome = await asyncio.to_thread(vendor_scoring.handle_lead_event, event_data)
+
+    if outcome in ("won", "lost"):
+        await asyncio.to_thread(simple_db_instance.update_lead, lead["id"], {"status": outcome})
+    elif outcome == "open" and lead.get("status") in ("won", "lost"):
+        await asyncio.to_thread(simple_db_instance.update_lead, lead["id"], {"status": "assigned"})
+
+    logger.info(f"📥 Opportunity status for lead {lead['id']}: status={status}, stage={stage}, outcome={outcome}")
+    return {
+        "status": "success",
+        "lead_id": lead["id"],
+        "vendor_id": lead.get("vendor_id"),
+        "outcome": outcome
+    }
+
+def _ghl_webhook_delivery_id(request: Request, ghl_payload: Dict[str, Any], body: bytes) -> str:
+    """
+    Identify one webhook delivery so GHL retries can be recognised. GHL workflow webhooks
+    carry no delivery id of their own, so unless one is supplied the raw body hash is used
+    (a retry resends the identical body).
+    """
+    custom_data = ghl_payload.get("customData") or {}
+    explicit = (request.headers.get("x-webhook-id") or ghl_payload.get("webhookId")
+                or ghl_payload.get("webhook_id") or custom_data.get("webhook_id"))
+    if explicit:
+        return str(explicit)
+    return "body-" + hashlib.sha256(body).hexdigest()[:32]
+
+
+async def _run_ghl_contact_job(job_id: str, contact_id: str, ghl_payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Process one recorded new-contact job and store its outcome"""
+    simple_db_instance.update_ghl_contact_job(job_id, "processing")
+    try:
+        result = await process_ghl_new_contact(contact_id, ghl_payload)
+    except HTTPException as e:
+        simple_db_instance.update_ghl_contact_job(job_id, "failed", error=str(e.detail))
+        raise
+    except Exception as e:
+        simple_db_instance.update_ghl_contact_job(job_id, "failed", error=str(e))
+        raise
+    simple_db_instance.update_ghl_contact_job(job_id, "completed", result=result)
+    return result
+
+
+def _submit_ghl_contact_job(job_id: str, contact_id: str, ghl_payload: Dict[str, Any]) -> None:
+    priority_scheduler.submit("lead", lambda: _run_ghl_contact_job(job_id, contact_id, ghl_payload),
+                              name=f"ghl-new-contact:{contact_id}")
+
+
+# Lease holder id on the GHL contact jobs this worker process runs
+GHL_CONTACT_JOB_WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+_ghl_contact_job_lease_task: Optional[asyncio.Task] = None
+
+
+def resume_ghl_contact_jobs() -> int:
+    """Take over queued/processing jobs whose lease expired (their worker stopped or crashed)"""
+    jobs = simple_db_instance.claim_expired_ghl_contact_jobs(
+        GHL_CONTACT_JOB_WORKER_ID, AppConfig.GHL_CONTACT_JOB_LEASE_SECONDS
+    )
+    for job in jobs:
+        _submit_ghl_contact_job(job["id"], job["ghl_contact_id"], job["payload"])
+    if jobs:
+        logger.info(f"🔁 Resumed {len(jobs)} GHL new-contact jobs abandoned by another worker")
+    return len(jobs)
+
+
+async def _ghl_contact_job_lease_loop() -> None:
+    """Renew this worker's job leases and resume expired ones, three times per lease period"""
+    lease_seconds = AppConfig.GHL_CONTACT_JOB_LEASE_SECONDS
+    while True:
+        await asyncio.sleep(lease_seconds / 3)
+        try:
+            await asyncio.to_thread(simple_db_instance.renew_ghl_contact_job_leases,
+                                    GHL_CONTACT_JOB_WORKER_ID, lease_seconds)
+            await asyncio.to_thread(resume_ghl_contact_jobs)
+        except Exception as e:
+            logger.error(f"❌ GHL contact job lease heartbeat failed: {e}")
+
+
+def start_ghl_contact_job_leases() -> None:
+    """Resume expired jobs and keep this worker's leases alive (called from the app lifespan)"""
+    global _ghl_contact_job_lease_task
+    resume_ghl_contact_jobs()
+    if _ghl_contact_job_lease_task is None or _ghl_contact_job_lease_task.done():
+        _ghl_contact_job_lease_task = asyncio.get_running_loop().create_task(_ghl_contact_job_lease_loop())
+
+
+def stop_ghl_contact_job_leases() -> None:
+    global _ghl_contact_job_lease_task
+    if _ghl_contact_job_lease_task is not None:
+        _ghl_contact_job_lease_task.cancel()
+        _ghl_contact_job_lease_task = None
+
+
 @router.post("/ghl/process-new-contact")
-async def handle_ghl_new_contact_trigger(request: Request):
+async def handle_ghl_new_contact_trigger(request: Request, wait: bool = False):
     """
     GHL webhook endpoint triggered when a contact is created with "New Lead" tag.
     Bypasses WordPress form handling and picks up lead processing at the point where
     a lead needs to be created in the Lead Router database, followed by opportunity
     creation and vendor assignment.
     
+    The delivery is recorded under contact ID + webhook ID and acknowledged right away;
+    processing runs on the shared worker pool (lead lane). GHL retries of a delivery that
+    is queued, running or done coalesce into the same job. Progress is available from
+    GET /ghl/process-new-contact/{contact_id}. Pass ?wait=true (or set
+    GHL_CONTACT_TRIGGER_ASYNC=false) to process inline and get the full result.
+    """
+    body = await request.body()
+    try:
+        ghl_payload = json.loads(body) if body else {}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    payload_capture.capture("ghl_new_contact_webhook", ghl_payload)
+    logger.info("📥 GHL New Contact Webhook received (%d fields)", len(ghl_payload))
+    
+    # Check if this is a custom workflow webhook with customData
+    custom_data = ghl_payload.get("customData", {})
+    
+    # Extract contact ID from webhook - check multiple possible locations including customData
+    contact_id = (
+        ghl_payload.get("contactId") or 
+        ghl_payload.get("contact_id") or 
+        ghl_payload.get("id") or 
+        ghl_payload.get("contact", {}).get("id") or
+        ghl_payload.get("Contact ID") or
+        ghl_payload.get("contact", {}).get("Contact ID") or
+        custom_data.get("contact_id")
+    )
+    
+    if not contact_id:
+        logger.error(f"❌ No contact ID found in webhook payload. Keys received: {list(ghl_payload.keys())}, customData keys: {list(custom_data.keys())}")
+        raise HTTPException(status_code=400, detail="Contact ID is required")
+    
+    webhook_id = _ghl_webhook_delivery_id(request, ghl_payload, body)
+    job, is_new = await asyncio.to_thread(
+        simple_db_instance.claim_ghl_contact_job, contact_id, webhook_id, ghl_payload,
+        AppConfig.GHL_CONTACT_TRIGGER_DEDUP_HOURS * 3600,
+        GHL_CONTACT_JOB_WORKER_ID, AppConfig.GHL_CONTACT_JOB_LEASE_SECONDS
+    )
+    
+    if not is_new:
+        logger.info(f"🔁 Duplicate delivery for contact {contact_id} coalesced into job {job['id']} ({job['status']})")
+        return {
+            "status": "success",
+            "message": "Delivery already received",
+            "duplicate": True,
+            "job_id": job["id"],
+            "job_status": job["status"],
+            "ghl_contact_id": contact_id
+        }
+    
+    # Log webhook for debugging
+    simple_db_instance.log_activity(
+        event_type="ghl_new_contact_webhook",
+        event_data={
+            "contact_id": contact_id,
+            "webhook_id": webhook_id,
+            "job_id": job["id"],
+            "webhook_type": ghl_payload.get("type", "unknown"),
+            "payload_keys": list(ghl_payload.keys())
+        },
+        lead_id=contact_id,
+        success=True
+    )
+    
+    if wait or not AppConfig.GHL_CONTACT_TRIGGER_ASYNC:
+        return await _run_ghl_contact_job(job["id"], contact_id, ghl_payload)
+    
+    _submit_ghl_contact_job(job["id"], contact_id, ghl_payload)
+    logger.info(f"🎯 Queued new contact {contact_id} as job {job['id']}")
+    return {
+        "status": "success",
+        "message": "Contact queued for processing",
+        "queued": True,
+        "job_id": job["id"],
+        "ghl_contact_id": contact_id
+    }
+
+
+@router.get("/ghl/process-new-contact/{contact_id}")
+async def get_ghl_new_contact_status(contact_id: str):
+    """Processing jobs for a contact, newest first, with their result or error"""
+    jobs = await asyncio.to_thread(simple_db_instance.get_ghl_contact_jobs, contact_id)
+    if not jobs:
+        raise HTTPException(status_code=404, detail="No processing jobs for this contact")
+    for job in jobs:
+        job.pop("payload", None)
+    return {
+        "status": "success",
+        "data": {
+            "ghl_contact_id": contact_id,
+            "latest_status": jobs[0]["status"],
+            "jobs": jobs
+        }
+    }
+
+
+async def process_ghl_new_contact(contact_id: str, ghl_payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Create the lead for a GHL contact, then its opportunity and vendor assignment.
+    
     Flow:
-    1. Parse GHL webhook payload and extract contact ID
-    2. Fetch complete contact details from GHL
-    3. Extract required fields from contact data
-    4. Check for duplicate leads (idempotent)
-    5. Create lead record in database
-    6. Create opportunity in GHL
-    7. Perform vendor matching and assignment
-    8. Return success response
+    1. Fetch complete contact details from GHL
+    2. Extract required fields from contact data
+    3. Check for duplicate leads (idempotent)
+    4. Create lead record in database
+    5. Create opportunity in GHL
+    6. Perform vendor matching and assignment
+    7. Return the processing result
     """
     start_time = time.time()
+    custom_data = ghl_payload.get("customData", {})
     
     try:
-        # Step 1: Parse incoming webhook payload
-        ghl_payload = await request.json()
-        logger.info(f"📥 GHL New Contact Webhook received: {json.dumps(ghl_payload, indent=2)}")
-        
-        # Check if this is a custom workflow webhook with customData
-        custom_data = ghl_payload.get("customData", {})
-        
-        # Extract contact ID from webhook - check multiple possible locations including customData
-        contact_id = (
-            ghl_payload.get("contactId") or 
-            ghl_payload.get("contact_id") or 
-            ghl_payload.get("id") or 
-            ghl_payload.get("contact", {}).get("id") or
-            ghl_payload.get("Contact ID") or
-            ghl_payload.get("contact", {}).get("Contact ID") or
-            custom_data.get("contact_id")
-        )
-        
-        if not contact_id:
-            logger.error(f"❌ No contact ID found in webhook payload. Keys received: {list(ghl_payload.keys())}, customData keys: {list(custom_data.keys())}")
-            raise HTTPException(status_code=400, detail="Contact ID is required")
-        
         logger.info(f"🎯 Processing new contact: {contact_id}")
         
-        # Log webhook for debugging
-        simple_db_instance.log_activity(
-            event_type="ghl_new_contact_webhook",
-            event_data={
-                "contact_id": contact_id,
-                "webhook_type": ghl_payload.get("type", "unknown"),
-                "payload_keys": list(ghl_payload.keys())
-            },
-            lead_id=contact_id,
-            success=True
-        )
-        
-        # Step 2: Initialize GHL API and fetch complete contact details
+        # Step 1: Initialize GHL API and fetch complete contact details
         ghl_api = OptimizedGoHighLevelAPI(
             private_token=AppConfig.GHL_PRIVATE_TOKEN,
             location_id=AppConfig.GHL_LOCATION_ID,
@@ -2980,10 +3096,11 @@ async def handle_ghl_new_contact_trigger(request: Request):
         
         logger.info(f"✅ Retrieved contact: {contact_details.get('firstName')} {contact_details.get('lastName')}")
         
-        # Step 3: Extract required fields from contact data
+        # Step 2: Extract required fields from contact data
         customer_name = f"{contact_details.get('firstName', '')} {contact_details.get('lastName', '')}".strip()
         customer_email = contact_details.get('email', '')
         customer_phone = contact_details.get('phone', '')
+        contact_identity_index.record(contact_id, customer_email, customer_phone, source="ghl_webhook")
         
         # Apply field mapping to extract service information
         mapped_payload = field_mapper.map_payload(contact_details, industry="marine")
@@ -3056,7 +3173,7 @@ async def handle_ghl_new_contact_trigger(request: Request):
             if not service_category:
                 # No fallback - this is a data quality issue that needs attention
                 service_category = "Uncategorized"
-                logger.error(f"❌ No service category found for contact {contact.get('id')} - marking as Uncategorized")
+                logger.error(f"❌ No service category found for contact {contact_id} - marking as Uncategorized")
                 # TODO: Trigger admin notification here
             
             logger.info(f"📌 Using service category from mapping: {service_category}")
@@ -3095,7 +3212,7 @@ async def handle_ghl_new_contact_trigger(request: Request):
         
         account_id = account_record['id']
         
-        # Step 4: Check for duplicate leads (idempotent behavior)
+        # Step 3: Check for duplicate leads (idempotent behavior)
         existing_lead = simple_db_instance.get_lead_by_ghl_contact_id(contact_id)
         
         if existing_lead:
@@ -3109,7 +3226,7 @@ async def handle_ghl_new_contact_trigger(request: Request):
                 "processing_time": round(time.time() - start_time, 3)
             }
         
-        # Step 5: Create lead record in database
+        # Step 4: Create lead record in database
         lead_id = str(uuid.uuid4())
         
         # Build service details from all mapped fields
@@ -3181,7 +3298,7 @@ async def handle_ghl_new_contact_trigger(request: Request):
             if conn:
                 conn.close()
         
-        # Step 6: Create opportunity in GHL
+        # Step 5: Create opportunity in GHL
         opportunity_id = None
         
         if AppConfig.PIPELINE_ID and AppConfig.NEW_LEAD_STAGE_ID:
@@ -3229,7 +3346,7 @@ async def handle_ghl_new_contact_trigger(request: Request):
         else:
             logger.warning("⚠️ Pipeline not configured - skipping opportunity creation")
         
-        # Step 7: Perform vendor matching and assignment
+        # Step 6: Perform vendor matching and assignment
         vendor_assigned = False
         selected_vendor = None
         
@@ -3250,19 +3367,18 @@ async def handle_ghl_new_contact_trigger(request: Request):
         if available_vendors:
             logger.info(f"✅ Found {len(available_vendors)} matching vendors")
             
-            # Select vendor from pool
-            selected_vendor = lead_routing_service.select_vendor_from_pool(available_vendors, account_id)
+            # Select vendor from pool and assign the lead under the routing lock
+            # (the lock may wait - keep it off the event loop)
+            selected_vendor = await asyncio.to_thread(
+                lead_routing_service.select_vendor_from_pool, available_vendors, account_id, lead_id
+            )
             
-            if selected_vendor and selected_vendor.get('ghl_user_id'):
+            if selected_vendor:
                 logger.info(f"🎯 Selected vendor: {selected_vendor['name']}")
+                logger.info(f"✅ Assigned lead to vendor in database")
+                vendor_assigned = True
                 
-                # Assign lead to vendor in database
-                assignment_success = simple_db_instance.assign_lead_to_vendor(lead_id, selected_vendor['id'])
-                
-                if assignment_success:
-                    logger.info(f"✅ Assigned lead to vendor in database")
-                    vendor_assigned = True
-                    
+                if selected_vendor.get('ghl_user_id'):
                     # Update opportunity with vendor assignment
                     if opportunity_id:
                         try:
@@ -3281,9 +3397,9 @@ async def handle_ghl_new_contact_trigger(request: Request):
                         except Exception as e:
                             logger.error(f"❌ Error assigning opportunity: {e}")
                 else:
-                    logger.error(f"❌ Failed to assign lead to vendor in database")
+                    logger.warning(f"⚠️ Selected vendor has no GHL User ID")
             else:
-                logger.warning(f"⚠️ Selected vendor has no GHL User ID")
+                logger.error(f"❌ No vendor selected or failed to assign lead to vendor in database")
         else:
             logger.warning(f"⚠️ No matching vendors found for {service_category} in {zip_code}")
         
@@ -3305,7 +3421,7 @@ async def handle_ghl_new_contact_trigger(request: Request):
             success=True
         )
         
-        # Step 8: Return success response
+        # Step 7: Return success response
         response_data = {
             "status": "success",
             "message": "Contact processed successfully",
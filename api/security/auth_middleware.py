@@ -9,8 +9,8 @@ from typing import Optional
 import logging
 from sqlalchemy.orm import Session
 
-from database.simple_connection import get_db
-from database.models import User, Tenant
+from database.simple_connection import get_db_session
+from database.models import User
 from api.services.auth_service import auth_service
 
 logger = logging.getLogger(__name__)
@@ -26,40 +26,22 @@ class AuthMiddleware:
         db: Session = None
     ) -> Optional[User]:
         """Get current authenticated user from token"""
-        if not db:
-            db = next(get_db())
-            
         if not credentials:
             return None
             
-        try:
-            token = credentials.credentials
-            payload = auth_service.verify_token(token)
-            
-            if not payload:
-                return None
-                
-            user_id = payload.get("sub")
-            tenant_id = payload.get("tenant_id")
+        owns_session = db is None
+        if owns_session:
+            db = get_db_session()
             
-            if not user_id or not tenant_id:
-                return None
-                
-            # Get user
-            user = db.query(User).filter(User.id == user_id).first()
-            if not user or not user.is_active:
-                return None
-                
-            # Verify tenant is active
-            tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
-            if not tenant or not tenant.is_active:
-                return None
-                
-            return user
+        try:
+            return auth_service.resolve_principal(credentials.credentials, db)
             
         except Exception as e:
             logger.error(f"Authentication middleware error: {str(e)}")
             return None
+        finally:
+            if owns_session:
+                db.close()
 
     def require_auth(self, require_verified: bool = True, allowed_roles: list = None):
         """Decorator to require authentication"""
@@ -94,36 +76,39 @@ class AuthMiddleware:
                     credentials=token
                 )
                 
-                # Get current user
-                db = next(get_db())
-                user = await self.get_current_user(request, credentials, db)
-                
-                if not user:
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Invalid or expired token",
-                        headers={"WWW-Authenticate": "Bearer"}
-                    )
-                
-                # Check if email verification is required
-                if require_verified and not user.is_verified:
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="Email verification required"
-                    )
-                
-                # Check role permissions
-                if allowed_roles and user.role not in allowed_roles:
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="Insufficient permissions"
-                    )
-                
-                # Add user to kwargs
-                kwargs['current_user'] = user
-                kwargs['db'] = db
-                
-                return await func(*args, **kwargs)
+                # Get current user (session is scoped to this request)
+                db = get_db_session()
+                try:
+                    user = await self.get_current_user(request, credentials, db)
+                    
+                    if not user:
+                        raise HTTPException(
+                            status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Invalid or expired token",
+                            headers={"WWW-Authenticate": "Bearer"}
+                        )
+                    
+                    # Check if email verification is required
+                    if require_verified and not user.is_verified:
+                        raise HTTPException(
+                            status_code=status.HTTP_403_FORBIDDEN,
+                            detail="Email verification required"
+                        )
+                    
+                    # Check role permissions
+                    if allowed_roles and user.role not in allowed_roles:
+                        raise HTTPException(
+                            status_code=status.HTTP_403_FORBIDDEN,
+                            detail="Insufficient permissions"
+                        )
+                    
+                    # Add user to kwargs
+                    kwargs['current_user'] = user
+                    kwargs['db'] = db
+                    
+                    return await func(*args, **kwargs)
+                finally:
+                    db.close()
             
             return wrapper
         return decorator
@@ -140,24 +125,26 @@ class AuthMiddleware:
                         break
                 
                 user = None
-                db = next(get_db())
-                
-                if request:
-                    # Try to get authorization header
-                    authorization = request.headers.get("authorization")
-                    if authorization and authorization.startswith("Bearer "):
-                        token = authorization.replace("Bearer ", "")
-                        credentials = HTTPAuthorizationCredentials(
-                            scheme="Bearer",
-                            credentials=token
-                        )
-                        user = await self.get_current_user(request, credentials, db)
-                
-                # Add user to kwargs (can be None)
-                kwargs['current_user'] = user
-                kwargs['db'] = db
-                
-                return await func(*args, **kwargs)
+                db = get_db_session()
+                try:
+                    if request:
+                        # Try to get authorization header
+                        authorization = request.headers.get("authorization")
+                        if authorization and authorization.startswith("Bearer "):
+                            token = authorization.replace("Bearer ", "")
+                            credentials = HTTPAuthorizationCredentials(
+                                scheme="Bearer",
+                                credentials=token
+                            )
+                            user = await self.get_current_user(request, credentials, db)
+                    
+                    # Add user to kwargs (can be None)
+                    kwargs['current_user'] = user
+                    kwargs['db'] = db
+                    
+                    return await func(*args, **kwargs)
+                finally:
+                    db.close()
             
             return wrapper
         return decorator
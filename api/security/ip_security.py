@@ -3,16 +3,31 @@
 import time
 import logging
 from typing import Dict, List, Optional, Set
-from collections import defaultdict, deque
+from collections import Counter
 from datetime import datetime, timedelta
 import json
 import os
 from threading import Lock
 from fastapi import Request, HTTPException
 from fastapi.responses import Response
+from api.services.shared_state import shared_state
 
 logger = logging.getLogger(__name__)
 
+# Shared state keys - every worker sees the same windows, blocks, lists and limits
+BLOCKED_KEY = "security:blocked_ips"
+WHITELIST_KEY = "security:whitelist"
+TRUSTED_NETWORKS_KEY = "security:trusted_networks"
+LIMITS_KEY = "security:limits"
+STATS_KEY = "security:stats"
+STAT_NAMES = ("total_requests", "blocked_requests", "ips_blocked", "attacks_prevented")
+LIMIT_FIELDS = ("rate_limit_window", "max_requests_per_window", "max_404_errors", "block_duration",
+                "max_errors_per_window", "suspicious_block_duration")
+
+# Whitelist/limits are re-read this often; per-request counters are flushed this often
+LISTS_REFRESH_SECONDS = 5
+STATS_FLUSH_SECONDS = 5
+
 class IPSecurityManager:
     """
     Advanced IP-based security manager with rate limiting and automatic blocking
@@ -31,13 +46,17 @@ class IPSecurityManager:
         self.max_errors_per_window = 10  # any errors per minute
         self.suspicious_block_duration = 300  # 5 minutes for suspicious activity
         
-        # Data structures with thread safety
+        # Request/error windows and blocked IPs live in shared state; these are local
+        # read-through copies of the lists consulted on every request
         self._lock = Lock()
-        self._request_counts = defaultdict(deque)  # IP -> deque of timestamps
-        self._error_counts = defaultdict(lambda: {"404": deque(), "errors": deque()})
-        self._blocked_ips = {}  # IP -> {"reason": str, "blocked_until": timestamp, "blocked_at": timestamp}
         self._whitelist = set()  # IPs that should never be blocked
         self._trusted_networks = set()  # CIDR ranges for trusted networks
+        self._lists_loaded_at = 0.0
+        self._seen_ips: Dict[str, float] = {}  # IP -> last request (this worker)
+        
+        # Per-request counters are batched locally and added to the shared totals
+        self._pending_stats = Counter()
+        self._stats_flushed_at = time.monotonic()
         
         # Load persistent data
         self._load_persistent_data()
@@ -47,14 +66,64 @@ class IPSecurityManager:
         
         # Add requested IP to whitelist
         self.add_to_whitelist("34.174.132.172")
-        
-        # Statistics
-        self.stats = {
-            "total_requests": 0,
-            "blocked_requests": 0,
-            "ips_blocked": 0,
-            "attacks_prevented": 0
-        }
+    
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Totals across all workers (this worker's unflushed counts included)"""
+        with self._lock:
+            pending = dict(self._pending_stats)
+        try:
+            return {name: shared_state.get(f"{STATS_KEY}:{name}", 0) + pending.get(name, 0) for name in STAT_NAMES}
+        except Exception as e:
+            logger.warning(f"⚠️ Shared security stats unavailable: {e}")
+            return {name: pending.get(name, 0) for name in STAT_NAMES}
+    
+    def count(self, stat: str, amount: int = 1):
+        """Bump a security counter (flushed to shared state every few seconds)"""
+        with self._lock:
+            self._pending_stats[stat] += amount
+            due = time.monotonic() - self._stats_flushed_at >= STATS_FLUSH_SECONDS
+        if due:
+            self._flush_stats()
+    
+    def _flush_stats(self):
+        with self._lock:
+            pending, self._pending_stats = self._pending_stats, Counter()
+            self._stats_flushed_at = time.monotonic()
+        try:
+            for stat, amount in pending.items():
+                if amount:
+                    shared_state.incr(f"{STATS_KEY}:{stat}", amount)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not flush security stats: {e}")
+            with self._lock:
+                self._pending_stats.update(pending)
+    
+    def _refresh_lists(self, force: bool = False):
+        """Pick up whitelist, trusted network and limit changes made by any worker"""
+        if not force and time.monotonic() - self._lists_loaded_at < LISTS_REFRESH_SECONDS:
+            return
+        try:
+            whitelist = set(shared_state.hgetall(WHITELIST_KEY))
+            trusted_networks = set(shared_state.hgetall(TRUSTED_NETWORKS_KEY))
+            limits = shared_state.hgetall(LIMITS_KEY)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not refresh shared security lists: {e}")
+            self._lists_loaded_at = time.monotonic()  # Keep the last known lists, retry later
+            return
+        self._whitelist, self._trusted_networks = whitelist, trusted_networks
+        for field, value in limits.items():
+            if field in LIMIT_FIELDS:
+                setattr(self, field, value)
+        self._lists_loaded_at = time.monotonic()
+    
+    def update_limits(self, **limits):
+        """Change rate-limit/blocking thresholds for every worker"""
+        for field, value in limits.items():
+            if field not in LIMIT_FIELDS:
+                raise ValueError(f"Unknown security limit: {field}")
+            setattr(self, field, value)
+            shared_state.hset(LIMITS_KEY, field, value)
     
     def _load_persistent_data(self):
         """Load blocked IPs and whitelist from persistent storage"""
@@ -64,32 +133,41 @@ class IPSecurityManager:
                 with open("security_data.json", "r") as f:
                     data = json.load(f)
                     
-                # Load blocked IPs (only those still valid)
+                # Seed shared state with blocks still valid (another worker may already have)
                 current_time = time.time()
-                for ip, block_info in data.get("blocked_ips", {}).items():
-                    if block_info.get("blocked_until", 0) > current_time:
-                        self._blocked_ips[ip] = block_info
+                blocked = {ip: block_info for ip, block_info in data.get("blocked_ips", {}).items()
+                           if block_info.get("blocked_until", 0) > current_time}
+                known_blocks = shared_state.hgetall(BLOCKED_KEY)
+                for ip, block_info in blocked.items():
+                    if ip not in known_blocks:
+                        shared_state.hset(BLOCKED_KEY, ip, block_info)
                 
                 # Load whitelist
-                self._whitelist = set(data.get("whitelist", []))
-                self._trusted_networks = set(data.get("trusted_networks", []))
+                for ip in data.get("whitelist", []):
+                    shared_state.hset(WHITELIST_KEY, ip, current_time)
+                for network in data.get("trusted_networks", []):
+                    shared_state.hset(TRUSTED_NETWORKS_KEY, network, current_time)
                 
-                logger.info(f"🔒 Loaded {len(self._blocked_ips)} blocked IPs, {len(self._whitelist)} whitelisted IPs")
+                logger.info(f"🔒 Loaded {len(blocked)} blocked IPs, {len(data.get('whitelist', []))} whitelisted IPs")
         except Exception as e:
             logger.warning(f"⚠️ Could not load security data: {e}")
+        self._refresh_lists(force=True)
     
     def _save_persistent_data(self):
         """Save blocked IPs and whitelist to persistent storage"""
         try:
             data = {
-                "blocked_ips": self._blocked_ips,
-                "whitelist": list(self._whitelist),
-                "trusted_networks": list(self._trusted_networks),
+                "blocked_ips": shared_state.hgetall(BLOCKED_KEY),
+                "whitelist": list(shared_state.hgetall(WHITELIST_KEY)),
+                "trusted_networks": list(shared_state.hgetall(TRUSTED_NETWORKS_KEY)),
                 "saved_at": time.time()
             }
             
-            with open("security_data.json", "w") as f:
+            # Several workers may save at once - replace the file atomically
+            temp_path = f"security_data.json.{os.getpid()}.tmp"
+            with open(temp_path, "w") as f:
                 json.dump(data, f, indent=2)
+            os.replace(temp_path, "security_data.json")
                 
         except Exception as e:
             logger.error(f"❌ Could not save security data: {e}")
@@ -118,6 +196,7 @@ class IPSecurityManager:
     
     def is_whitelisted(self, ip: str) -> bool:
         """Check if IP is whitelisted"""
+        self._refresh_lists()
         if ip in self._whitelist:
             return True
         
@@ -136,14 +215,18 @@ class IPSecurityManager:
         """Check if IP is currently blocked"""
         current_time = time.time()
         
-        if ip in self._blocked_ips:
-            block_info = self._blocked_ips[ip]
-            
+        try:
+            block_info = shared_state.hget(BLOCKED_KEY, ip)
+        except Exception as e:
+            logger.error(f"❌ Block check unavailable for {ip}, allowing: {e}")
+            return {"blocked": False}
+        
+        if block_info:
             # Check if block has expired
             if current_time > block_info.get("blocked_until", 0):
                 # Block expired, remove it
-                del self._blocked_ips[ip]
-                self._save_persistent_data()
+                if shared_state.hdel(BLOCKED_KEY, ip):
+                    self._save_persistent_data()
                 return {"blocked": False}
             
             # Still blocked
@@ -159,56 +242,57 @@ class IPSecurityManager:
     def check_rate_limit(self, ip: str) -> Dict[str, any]:
         """Check if IP is within rate limits"""
         current_time = time.time()
-        window_start = current_time - self.rate_limit_window
+        self._seen_ips[ip] = current_time
         
-        with self._lock:
-            # Clean old entries
-            while self._request_counts[ip] and self._request_counts[ip][0] < window_start:
-                self._request_counts[ip].popleft()
-            
-            # Check current count
-            current_count = len(self._request_counts[ip])
-            
-            if current_count >= self.max_requests_per_window:
-                return {
-                    "allowed": False,
-                    "reason": "Rate limit exceeded",
-                    "current_count": current_count,
-                    "limit": self.max_requests_per_window,
-                    "window_seconds": self.rate_limit_window,
-                    "retry_after": int(self.rate_limit_window - (current_time - self._request_counts[ip][0]))
-                }
-            
-            # Add current request
-            self._request_counts[ip].append(current_time)
-            
+        try:
+            # Check and record in one atomic step, so workers can't overshoot together
+            allowed, current_count, oldest = shared_state.hit_window(
+                f"security:requests:{ip}", self.rate_limit_window, self.max_requests_per_window
+            )
+        except Exception as e:
+            logger.error(f"❌ Rate limit check unavailable for {ip}, allowing: {e}")
+            return {"allowed": True, "current_count": 0, "limit": self.max_requests_per_window,
+                    "remaining": self.max_requests_per_window}
+        
+        if not allowed:
             return {
-                "allowed": True,
-                "current_count": current_count + 1,
+                "allowed": False,
+                "reason": "Rate limit exceeded",
+                "current_count": current_count,
                 "limit": self.max_requests_per_window,
-                "remaining": self.max_requests_per_window - current_count - 1
+                "window_seconds": self.rate_limit_window,
+                "retry_after": int(self.rate_limit_window - (current_time - oldest))
             }
+        
+        return {
+            "allowed": True,
+            "current_count": current_count,
+            "limit": self.max_requests_per_window,
+            "remaining": self.max_requests_per_window - current_count
+        }
+    
+    def screen_request(self, ip: str) -> Dict[str, any]:
+        """
+        Block check and rate-limit hit for one request in a single call (blocking shared-state
+        I/O - the middleware runs it in a worker thread). rate_limit is None for whitelisted
+        or blocked IPs, which don't count against the window.
+        """
+        block_status = self.is_blocked(ip)
+        if block_status["blocked"] or self.is_whitelisted(ip):
+            return {"block_status": block_status, "rate_limit": None}
+        return {"block_status": block_status, "rate_limit": self.check_rate_limit(ip)}
     
     def record_error(self, ip: str, status_code: int):
         """Record an error for IP and check for blocking conditions"""
         if self.is_whitelisted(ip):
             return
         
-        current_time = time.time()
-        window_start = current_time - self.rate_limit_window
-        
-        with self._lock:
+        try:
             # Record 404 errors separately
             if status_code == 404:
-                self._error_counts[ip]["404"].append(current_time)
-                
-                # Clean old 404 entries
-                while (self._error_counts[ip]["404"] and 
-                       self._error_counts[ip]["404"][0] < window_start):
-                    self._error_counts[ip]["404"].popleft()
+                _, recent_404s, _ = shared_state.hit_window(f"security:404s:{ip}", self.rate_limit_window)
                 
                 # Check for consecutive 404s (within a reasonable time window)
-                recent_404s = len(self._error_counts[ip]["404"])
                 if recent_404s >= self.max_404_errors:
                     self._block_ip(ip, f"Consecutive 404 errors ({recent_404s})", self.block_duration)
                     logger.warning(f"🚫 Blocked IP {ip} for {recent_404s} consecutive 404 errors")
@@ -216,20 +300,16 @@ class IPSecurityManager:
             
             # Record all errors
             if status_code >= 400:
-                self._error_counts[ip]["errors"].append(current_time)
-                
-                # Clean old error entries
-                while (self._error_counts[ip]["errors"] and 
-                       self._error_counts[ip]["errors"][0] < window_start):
-                    self._error_counts[ip]["errors"].popleft()
+                _, total_errors, _ = shared_state.hit_window(f"security:errors:{ip}", self.rate_limit_window)
                 
                 # Check for excessive errors
-                total_errors = len(self._error_counts[ip]["errors"])
                 if total_errors >= self.max_errors_per_window:
                     self._block_ip(ip, f"Excessive errors ({total_errors} in {self.rate_limit_window}s)", 
                                  self.suspicious_block_duration)
                     logger.warning(f"🚫 Blocked IP {ip} for excessive errors ({total_errors})")
                     return
+        except Exception as e:
+            logger.error(f"❌ Could not record error for {ip}: {e}")
     
     def _block_ip(self, ip: str, reason: str, duration: int):
         """Block an IP address"""
@@ -240,15 +320,15 @@ class IPSecurityManager:
         current_time = time.time()
         block_until = current_time + duration
         
-        self._blocked_ips[ip] = {
+        shared_state.hset(BLOCKED_KEY, ip, {
             "reason": reason,
             "blocked_at": current_time,
             "blocked_until": block_until,
             "duration": duration
-        }
+        })
         
-        self.stats["ips_blocked"] += 1
-        self.stats["attacks_prevented"] += 1
+        self.count("ips_blocked")
+        self.count("attacks_prevented")
         
         # Save to persistent storage
         self._save_persistent_data()
@@ -257,20 +337,21 @@ class IPSecurityManager:
     
     def add_to_whitelist(self, ip: str):
         """Add IP to whitelist"""
+        shared_state.hset(WHITELIST_KEY, ip, time.time())
         self._whitelist.add(ip)
         self._save_persistent_data()
         logger.info(f"⚪ Added IP to whitelist: {ip}")
     
     def remove_from_whitelist(self, ip: str):
         """Remove IP from whitelist"""
+        shared_state.hdel(WHITELIST_KEY, ip)
         self._whitelist.discard(ip)
         self._save_persistent_data()
         logger.info(f"🔴 Removed IP from whitelist: {ip}")
     
     def unblock_ip(self, ip: str):
         """Manually unblock an IP"""
-        if ip in self._blocked_ips:
-            del self._blocked_ips[ip]
+        if shared_state.hdel(BLOCKED_KEY, ip):
             self._save_persistent_data()
             logger.info(f"✅ Manually unblocked IP: {ip}")
             return True
@@ -281,13 +362,14 @@ class IPSecurityManager:
         current_time = time.time()
         
         # Count currently blocked IPs
-        active_blocks = sum(1 for block_info in self._blocked_ips.values() 
+        active_blocks = sum(1 for block_info in shared_state.hgetall(BLOCKED_KEY).values() 
                           if block_info.get("blocked_until", 0) > current_time)
         
         return {
             **self.stats,
+            "shared_state_backend": shared_state.name,
             "currently_blocked_ips": active_blocks,
-            "total_known_ips": len(self._request_counts),
+            "total_known_ips": len(self._seen_ips),
             "whitelist_size": len(self._whitelist),
             "trusted_networks": len(self._trusted_networks),
             "rate_limit_window": self.rate_limit_window,
@@ -301,7 +383,7 @@ class IPSecurityManager:
         current_time = time.time()
         active_blocks = {}
         
-        for ip, block_info in self._blocked_ips.items():
+        for ip, block_info in shared_state.hgetall(BLOCKED_KEY).items():
             if block_info.get("blocked_until", 0) > current_time:
                 active_blocks[ip] = {
                     **block_info,
@@ -317,35 +399,18 @@ class IPSecurityManager:
         current_time = time.time()
         cleanup_threshold = current_time - (self.rate_limit_window * 10)  # Keep 10 windows of data
         
+        # Remove expired blocks
+        expired_ips = [ip for ip, block_info in shared_state.hgetall(BLOCKED_KEY).items()
+                      if block_info.get("blocked_until", 0) <= current_time]
+        expired_ips = [ip for ip in expired_ips if shared_state.hdel(BLOCKED_KEY, ip)]
+        
+        # Request/error windows trim themselves; drop expired backend entries and idle IPs
+        shared_state.cleanup()
         with self._lock:
-            # Remove expired blocks
-            expired_ips = [ip for ip, block_info in self._blocked_ips.items() 
-                          if block_info.get("blocked_until", 0) <= current_time]
-            
-            for ip in expired_ips:
-                del self._blocked_ips[ip]
-            
-            # Clean old request tracking data
-            for ip in list(self._request_counts.keys()):
-                while (self._request_counts[ip] and 
-                       self._request_counts[ip][0] < cleanup_threshold):
-                    self._request_counts[ip].popleft()
-                
-                # Remove empty entries
-                if not self._request_counts[ip]:
-                    del self._request_counts[ip]
-            
-            # Clean old error tracking data
-            for ip in list(self._error_counts.keys()):
-                for error_type in ["404", "errors"]:
-                    while (self._error_counts[ip][error_type] and 
-                           self._error_counts[ip][error_type][0] < cleanup_threshold):
-                        self._error_counts[ip][error_type].popleft()
-                
-                # Remove empty entries
-                if (not self._error_counts[ip]["404"] and 
-                    not self._error_counts[ip]["errors"]):
-                    del self._error_counts[ip]
+            for ip, last_seen in list(self._seen_ips.items()):
+                if last_seen < cleanup_threshold:
+                    del self._seen_ips[ip]
+        self._flush_stats()
         
         if expired_ips:
             self._save_persistent_data()
@@ -1,12 +1,17 @@
 # api/security/middleware.py
 
 import time
+import asyncio
 import logging
+from typing import Optional
 from fastapi import Request, Response, HTTPException
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response as StarletteResponse
 from api.security.ip_security import security_manager
+from utils.metrics import metrics, rate_limit_rejections
+
+metrics.register_stats("ip_security", lambda: security_manager.stats)
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +32,7 @@ class IPSecurityMiddleware(BaseHTTPMiddleware):
         client_ip = security_manager.get_client_ip(request)
         
         # Update request stats
-        security_manager.stats["total_requests"] += 1
+        security_manager.count("total_requests")
         
         # Skip security for health checks and admin endpoints from localhost
         if self._should_skip_security(request, client_ip):
@@ -36,7 +41,8 @@ class IPSecurityMiddleware(BaseHTTPMiddleware):
         
         # Check Elementor endpoint whitelist
         if not self._check_elementor_whitelist(request, client_ip):
-            security_manager.stats["blocked_requests"] += 1
+            security_manager.count("blocked_requests")
+            rate_limit_rejections.inc("elementor_whitelist")
             return JSONResponse(
                 status_code=403,
                 content={
@@ -45,10 +51,14 @@ class IPSecurityMiddleware(BaseHTTPMiddleware):
                 }
             )
         
-        # Check if IP is blocked
-        block_status = security_manager.is_blocked(client_ip)
+        # Check if IP is blocked and record the request in its rate-limit window - one
+        # shared-state round trip, off the event loop (the SQLite backend may wait on a write lock)
+        screen = await asyncio.to_thread(security_manager.screen_request, client_ip)
+        block_status = screen["block_status"]
+        rate_limit_result = screen["rate_limit"]
         if block_status["blocked"]:
-            security_manager.stats["blocked_requests"] += 1
+            security_manager.count("blocked_requests")
+            rate_limit_rejections.inc("ip_blocked")
             
             # Log the blocked attempt
             logger.warning(f"🚫 Blocked request from {client_ip} to {request.url.path} - {block_status['reason']}")
@@ -68,31 +78,29 @@ class IPSecurityMiddleware(BaseHTTPMiddleware):
                     headers={"Retry-After": str(block_status["remaining_seconds"])}
                 )
         
-        # Check rate limiting (only for non-whitelisted IPs)
-        if not security_manager.is_whitelisted(client_ip):
-            rate_limit_result = security_manager.check_rate_limit(client_ip)
+        # Rate limiting (only for non-whitelisted IPs)
+        if rate_limit_result and not rate_limit_result["allowed"]:
+            rate_limit_rejections.inc("ip_rate_limit")
+            # Log rate limit violation
+            logger.warning(f"⚡ Rate limit exceeded for {client_ip}: {rate_limit_result['current_count']}/{rate_limit_result['limit']}")
             
-            if not rate_limit_result["allowed"]:
-                # Log rate limit violation
-                logger.warning(f"⚡ Rate limit exceeded for {client_ip}: {rate_limit_result['current_count']}/{rate_limit_result['limit']}")
-                
-                # Record as suspicious activity but don't block immediately for rate limiting
-                security_manager.record_error(client_ip, 429)
-                
-                return JSONResponse(
-                    status_code=429,
-                    content={
-                        "error": "Rate limit exceeded",
-                        "limit": rate_limit_result["limit"],
-                        "window_seconds": rate_limit_result["window_seconds"],
-                        "retry_after": rate_limit_result["retry_after"]
-                    },
-                    headers={
-                        "X-RateLimit-Limit": str(rate_limit_result["limit"]),
-                        "X-RateLimit-Window": str(rate_limit_result["window_seconds"]),
-                        "Retry-After": str(rate_limit_result["retry_after"])
-                    }
-                )
+            # Record as suspicious activity but don't block immediately for rate limiting
+            await asyncio.to_thread(security_manager.record_error, client_ip, 429)
+            
+            return JSONResponse(
+                status_code=429,
+                content={
+                    "error": "Rate limit exceeded",
+                    "limit": rate_limit_result["limit"],
+                    "window_seconds": rate_limit_result["window_seconds"],
+                    "retry_after": rate_limit_result["retry_after"]
+                },
+                headers={
+                    "X-RateLimit-Limit": str(rate_limit_result["limit"]),
+                    "X-RateLimit-Window": str(rate_limit_result["window_seconds"]),
+                    "Retry-After": str(rate_limit_result["retry_after"])
+                }
+            )
         
         # Process the request
         try:
@@ -100,14 +108,14 @@ class IPSecurityMiddleware(BaseHTTPMiddleware):
             
             # Record error if status code indicates an error
             if response.status_code >= 400:
-                security_manager.record_error(client_ip, response.status_code)
+                await asyncio.to_thread(security_manager.record_error, client_ip, response.status_code)
                 
                 # Special logging for 404s
                 if response.status_code == 404:
                     logger.info(f"📄 404 from {client_ip} for {request.url.path}")
             
             # Add security headers
-            self._add_security_headers(response, client_ip)
+            self._add_security_headers(response, client_ip, rate_limit_result)
             
             # Log processing time for monitoring
             processing_time = time.time() - start_time
@@ -119,7 +127,7 @@ class IPSecurityMiddleware(BaseHTTPMiddleware):
         except Exception as e:
             # Log exceptions and record as server errors
             logger.error(f"💥 Exception processing request from {client_ip}: {e}")
-            security_manager.record_error(client_ip, 500)
+            await asyncio.to_thread(security_manager.record_error, client_ip, 500)
             
             # Re-raise the exception to be handled by FastAPI
             raise
@@ -139,7 +147,8 @@ class IPSecurityMiddleware(BaseHTTPMiddleware):
         
         # Skip IP security for GHL webhook endpoints - relies on X-Webhook-API-Key header validation instead
         # This allows GoHighLevel webhooks from any AWS IP to reach the endpoint's own authorization validation
-        if path in ["/api/v1/webhooks/ghl/vendor-user-creation", "/api/v1/webhooks/ghl/process-new-contact"]:
+        if path in ["/api/v1/webhooks/ghl/vendor-user-creation", "/api/v1/webhooks/ghl/process-new-contact",
+                    "/api/v1/webhooks/ghl/opportunity-status"]:
             return True
         
         return False
@@ -170,12 +179,11 @@ class IPSecurityMiddleware(BaseHTTPMiddleware):
         
         return True
     
-    def _add_security_headers(self, response: Response, client_ip: str):
-        """Add security-related headers to response"""
+    def _add_security_headers(self, response: Response, client_ip: str, rate_limit_result: Optional[dict] = None):
+        """Add security-related headers to response (rate limit headers from the request's own check)"""
         
         # Add rate limit headers for tracking
-        rate_limit_result = security_manager.check_rate_limit(client_ip)
-        if "remaining" in rate_limit_result:
+        if rate_limit_result and "remaining" in rate_limit_result:
             response.headers["X-RateLimit-Remaining"] = str(rate_limit_result["remaining"])
             response.headers["X-RateLimit-Limit"] = str(rate_limit_result["limit"])
         
@@ -0,0 +1,168 @@
+# api/security/principal_cache.py
+"""
+Principal Cache
+Resolved users for authenticated requests, keyed by token fingerprint. An entry lives
+for at most PRINCIPAL_CACHE_TTL_SECONDS and never past the token's own expiry, and is
+dropped on logout/revocation or when the user's active flag, role or tenant changes.
+
+Every worker keeps its own cache, so invalidations are also published as generation
+counters in shared state (one per user, one for everyone). An entry remembers the
+generations it was resolved under and is a miss once either has moved on.
+"""
+
+import time
+import logging
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Any, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect
+
+from config import AppConfig
+from utils.metrics import metrics
+from database.models import User, Tenant
+from api.services.shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+# Changes to any of these must take effect on the user's next request
+PRINCIPAL_FIELDS = ("is_active", "role", "is_verified", "tenant_id")
+
+GENERATION_ALL_KEY = "principal:generation:all"
+GENERATION_USER_KEY = "principal:generation:user:{}"
+
+
+class PrincipalCache:
+    """LRU of fingerprint -> detached User, indexed by user id for invalidation"""
+
+    def __init__(self, ttl_seconds: int = None, max_entries: int = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else AppConfig.PRINCIPAL_CACHE_TTL_SECONDS
+        self.max_entries = max_entries or AppConfig.PRINCIPAL_CACHE_MAX_ENTRIES
+        self._lock = Lock()
+        # fp -> (expires_at, user_id, user, generation)
+        self._entries: "OrderedDict[str, Tuple[float, str, User, Tuple[int, int]]]" = OrderedDict()
+        self._by_user: Dict[str, Set[str]] = {}
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "stale": 0, "generation_errors": 0}
+
+    def generation(self, user_id: str) -> Optional[Tuple[int, int]]:
+        """
+        (everyone, user) invalidation generations from shared state. Read before resolving
+        a user from the database; None if shared state is unavailable (nothing is cached then).
+        """
+        try:
+            return (shared_state.get(GENERATION_ALL_KEY, 0),
+                    shared_state.get(GENERATION_USER_KEY.format(user_id), 0))
+        except Exception as e:
+            self.stats["generation_errors"] += 1
+            logger.warning(f"⚠️ Principal cache generations unavailable - bypassing cache: {e}")
+            return None
+
+    def get(self, fingerprint: str) -> Optional[User]:
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None and entry[0] <= time.time():
+                self._drop(fingerprint)
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+        # Another worker may have invalidated this user since the entry was cached
+        if self.generation(entry[1]) != entry[3]:
+            with self._lock:
+                if self._entries.get(fingerprint) is entry:
+                    self._drop(fingerprint)
+                self.stats["stale"] += 1
+                self.stats["misses"] += 1
+            return None
+
+        with self._lock:
+            if fingerprint in self._entries:
+                self._entries.move_to_end(fingerprint)
+            self.stats["hits"] += 1
+        return entry[2]
+
+    def put(self, fingerprint: str, user: User, token_expires_at: float = None,
+            generation: Optional[Tuple[int, int]] = None) -> None:
+        """Cache a resolved user under the generation read before it was resolved"""
+        if self.ttl_seconds <= 0 or generation is None:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if token_expires_at:
+            expires_at = min(expires_at, token_expires_at)
+        user_id = str(user.id)
+        with self._lock:
+            self._drop(fingerprint)
+            self._entries[fingerprint] = (expires_at, user_id, user, generation)
+            self._by_user.setdefault(user_id, set()).add(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, fingerprint: str) -> None:
+        """Remove one entry. Caller must hold self._lock."""
+        entry = self._entries.pop(fingerprint, None)
+        if entry is None:
+            return
+        fingerprints = self._by_user.get(entry[1])
+        if fingerprints is not None:
+            fingerprints.discard(fingerprint)
+            if not fingerprints:
+                del self._by_user[entry[1]]
+
+    def invalidate_token(self, fingerprint: str, user_id: Optional[str] = None) -> None:
+        """Drop one token; with user_id, other workers drop the user's cached tokens too"""
+        with self._lock:
+            self._drop(fingerprint)
+            self.stats["invalidations"] += 1
+        if user_id is not None:
+            self._publish(GENERATION_USER_KEY.format(user_id))
+
+    def invalidate_user(self, user_id: str) -> None:
+        with self._lock:
+            for fingerprint in list(self._by_user.get(str(user_id), ())):
+                self._drop(fingerprint)
+            self.stats["invalidations"] += 1
+        self._publish(GENERATION_USER_KEY.format(user_id))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+            self.stats["invalidations"] += 1
+        self._publish(GENERATION_ALL_KEY)
+
+    def _publish(self, key: str) -> None:
+        """Bump a generation so every worker's entries from before it become misses"""
+        try:
+            shared_state.incr(key)
+        except Exception as e:
+            self.stats["generation_errors"] += 1
+            logger.error(f"❌ Could not publish principal cache invalidation ({key}): {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "users": len(self._by_user),
+            "ttl_seconds": self.ttl_seconds,
+            "hit_rate_pct": round(self.stats["hits"] / total * 100, 1) if total else 0.0,
+        }
+
+
+# Global instance
+principal_cache = PrincipalCache()
+metrics.register_cache("principal", lambda: (principal_cache.stats["hits"], principal_cache.stats["misses"]))
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_changed_user(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in PRINCIPAL_FIELDS):
+        principal_cache.invalidate_user(str(target.id))
+
+
+@event.listens_for(Tenant, "after_update")
+def _invalidate_changed_tenant(mapper, connection, target):
+    if inspect(target).attrs.is_active.history.has_changes():
+        principal_cache.clear()
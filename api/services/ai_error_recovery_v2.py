@@ -2,11 +2,15 @@
 # Production-ready AI Error Recovery with all improvements from code review
 
 import os
+import re
 import json
+import asyncio
 import hashlib
 import logging
+import threading
+import weakref
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict, replace
 from typing import Dict, Any, Optional, List, Tuple, Set
 from datetime import datetime
 from pathlib import Path
@@ -16,6 +20,8 @@ from cachetools import TTLCache
 import time
 
 from config import AppConfig
+from api.services.shared_state import shared_state
+from utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +48,8 @@ class AnalysisResult:
     retry_recommended: bool
     additional_checks: List[str]
     ai_powered: bool = True
+    replaces_payload: bool = False  # corrected_payload is the complete payload (rule rewrites)
+    operations: Optional[List[Dict[str, Any]]] = None  # structural rewrites (cached analyses reuse only these)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -54,7 +62,8 @@ class AnalysisResult:
             "reasoning": self.reasoning,
             "retry_recommended": self.retry_recommended,
             "additional_checks": self.additional_checks,
-            "ai_powered": self.ai_powered
+            "ai_powered": self.ai_powered,
+            "operations": self.operations
         }
 
 class FieldReferenceService:
@@ -143,44 +152,88 @@ class FieldReferenceService:
         
         return sorted(matches, key=lambda x: x[2], reverse=True)[:max_results]
 
+def mask_values(text: str, payload: Optional[Dict[str, Any]] = None) -> str:
+    """Mask emails, quoted values and numbers (lead data) in free text, plus any of payload's string values"""
+    text = text or ""
+    if isinstance(payload, dict):
+        for value in sorted((v.strip() for v in payload.values() if isinstance(v, str)), key=len, reverse=True):
+            if len(value) > 1:
+                text = re.sub(re.escape(value), "<value>", text, flags=re.IGNORECASE)
+    text = re.sub(r"[\w.+-]+@[\w-]+(\.[\w-]+)*", "<email>", text)
+    text = re.sub(r"\"[^\"]*\"|'[^']*'", "<value>", text)
+    return re.sub(r"\d+", "<n>", text)
+
+def create_error_signature(error_response: Dict[str, Any], payload_keys: List[str]) -> str:
+    """
+    Signature for an error+payload shape. Emails, quoted values and numbers are masked
+    so the same validation error on different leads maps to the same signature.
+    """
+    error_text = mask_values(error_response.get("response_text", "")[:200].lower())
+    status_code = error_response.get("status_code", 0)
+    sorted_keys = sorted(payload_keys)
+    
+    signature_data = f"{status_code}:{error_text}:{','.join(sorted_keys)}"
+    return hashlib.md5(signature_data.encode()).hexdigest()
+
 class ErrorSignatureCache:
-    """LRU cache for repeated error patterns"""
+    """
+    Cache for repeated error patterns. Analyses are shared with every worker through
+    shared_state; the local TTLCache sits in front so repeats in one worker stay free.
+    A signature matches many leads, so only the structural part of an analysis is cached
+    (see structural_analysis) - never another lead's payload values.
+    """
     
     def __init__(self, max_size: int = 100, ttl: int = 3600):  # 1 hour TTL
         self.cache = TTLCache(maxsize=max_size, ttl=ttl)
+        self.ttl = ttl
         self.hit_count = 0
         self.miss_count = 0
     
     def _create_signature(self, error_response: Dict[str, Any], payload_keys: List[str]) -> str:
         """Create a signature for error+payload combination"""
-        error_text = error_response.get("response_text", "")
-        status_code = error_response.get("status_code", 0)
-        sorted_keys = sorted(payload_keys)
-        
-        signature_data = f"{status_code}:{error_text[:200]}:{','.join(sorted_keys)}"
-        return hashlib.md5(signature_data.encode()).hexdigest()
+        return create_error_signature(error_response, payload_keys)
     
     def get(self, error_response: Dict[str, Any], payload_keys: List[str]) -> Optional[AnalysisResult]:
         """Get cached analysis if available"""
         signature = self._create_signature(error_response, payload_keys)
         
+        if signature not in self.cache:
+            self._load_shared(signature)
+        
         if signature in self.cache:
             self.hit_count += 1
             cached_result = self.cache[signature]
-            # Reduce confidence for cached results
-            cached_result.confidence = "medium" if cached_result.confidence == "high" else "low"
             logger.info(f"🎯 Cache hit for error signature: {signature[:8]}")
-            return cached_result
+            # Reduce confidence for cached results
+            return replace(cached_result,
+                           confidence="medium" if cached_result.confidence == "high" else "low")
         
         self.miss_count += 1
         return None
     
-    def put(self, error_response: Dict[str, Any], payload_keys: List[str], analysis: AnalysisResult):
-        """Cache analysis result"""
+    def put(self, error_response: Dict[str, Any], payload_keys: List[str], analysis: AnalysisResult,
+            original_payload: Dict[str, Any]):
+        """Cache the structural part of an analysis of original_payload"""
         signature = self._create_signature(error_response, payload_keys)
+        analysis = structural_analysis(analysis, original_payload)
         self.cache[signature] = analysis
+        try:
+            shared_state.set(f"ai_error_cache:{signature}", asdict(analysis), ttl=self.ttl)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not share cached analysis: {e}")
         logger.debug(f"💾 Cached analysis for signature: {signature[:8]}")
     
+    def _load_shared(self, signature: str) -> None:
+        """Copy an analysis another worker cached into the local cache"""
+        try:
+            data = shared_state.get(f"ai_error_cache:{signature}")
+        except Exception as e:
+            logger.warning(f"⚠️ Shared analysis cache unavailable: {e}")
+            return
+        if data:
+            # Entries written before analyses were reduced to their structure may carry values
+            self.cache[signature] = structural_analysis(AnalysisResult(**data))
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
         total_requests = self.hit_count + self.miss_count
@@ -194,23 +247,331 @@ class ErrorSignatureCache:
             "max_size": self.cache.maxsize
         }
 
+# Deterministic value rewrites a learned rule may apply (name -> function)
+def _normalize_email(value: Any) -> Any:
+    return value.strip().lower() if isinstance(value, str) else value
+
+def _e164_phone(value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    digits = ''.join(filter(str.isdigit, value))
+    if len(digits) == 10:
+        return f"+1{digits}"
+    if len(digits) == 11 and digits.startswith("1"):
+        return f"+{digits}"
+    return value
+
+VALUE_TRANSFORMS = {
+    "strip": lambda v: v.strip() if isinstance(v, str) else v,
+    "lower": lambda v: v.lower() if isinstance(v, str) else v,
+    "upper": lambda v: v.upper() if isinstance(v, str) else v,
+    "email": _normalize_email,
+    "e164_phone": _e164_phone,
+    "digits_only": lambda v: ''.join(filter(str.isdigit, v)) if isinstance(v, str) else v,
+    "to_string": lambda v: v if isinstance(v, str) else json.dumps(v) if isinstance(v, (dict, list)) else str(v),
+    "to_list": lambda v: v if isinstance(v, list) else [v],
+}
+
+class CorrectionRuleStore:
+    """
+    Learned corrections persisted as deterministic rewrite rules keyed by error signature.
+    A rule is a list of structural operations (rename / drop / transform) derived from a
+    payload correction that made a retry succeed, so the same error is fixed without a model
+    call. Rules never carry payload values - a signature matches many different leads.
+    """
+    
+    def __init__(self, rules_file: str = None):
+        if rules_file is None:
+            project_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            rules_file = os.path.join(project_dir, "ai_correction_rules.json")
+        self.rules_file = rules_file
+        self.rules: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._load()
+    
+    def _load(self):
+        try:
+            if os.path.exists(self.rules_file):
+                with open(self.rules_file, 'r') as f:
+                    rules = json.load(f)
+                # Older rule files may hold literal "set" operations (another lead's values)
+                for signature, rule in rules.items():
+                    rule["operations"] = [op for op in rule.get("operations", []) if op.get("op") in STRUCTURAL_OPS]
+                    if rule["operations"]:
+                        self.rules[signature] = rule
+                logger.info(f"✅ Loaded {len(self.rules)} learned correction rules")
+        except Exception as e:
+            logger.error(f"❌ Error loading correction rules: {e}")
+            self.rules = {}
+    
+    def _save(self):
+        tmp_file = f"{self.rules_file}.tmp"
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump(self.rules, f, indent=2)
+            os.replace(tmp_file, self.rules_file)
+        except Exception as e:
+            logger.error(f"❌ Error saving correction rules: {e}")
+    
+    def get(self, signature: str) -> Optional[Dict[str, Any]]:
+        return self.rules.get(signature)
+    
+    @staticmethod
+    def derive_operations(original: Dict[str, Any], corrected: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Diff two payloads into structural operations. Fields with no deterministic rewrite,
+        including keys added with new values, are skipped.
+        """
+        operations = []
+        removed = [key for key in original if key not in corrected]
+        added = [key for key in corrected if key not in original]
+        
+        for old_key in list(removed):
+            for new_key in list(added):
+                if corrected[new_key] == original[old_key]:
+                    operations.append({"op": "rename", "field": old_key, "to": new_key})
+                    removed.remove(old_key)
+                    added.remove(new_key)
+                    break
+        
+        operations.extend({"op": "drop", "field": key} for key in removed)
+        
+        for key in original:
+            if key in corrected and corrected[key] != original[key]:
+                transform = next((name for name, fn in VALUE_TRANSFORMS.items()
+                                  if fn(original[key]) == corrected[key]), None)
+                if transform:
+                    operations.append({"op": "transform", "field": key, "transform": transform})
+        
+        return operations
+    
+    @staticmethod
+    def apply(rule: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
+        rewritten = dict(payload)
+        for operation in rule.get("operations", []):
+            field = operation["field"]
+            if operation["op"] == "rename" and field in rewritten:
+                rewritten[operation["to"]] = rewritten.pop(field)
+            elif operation["op"] == "drop":
+                rewritten.pop(field, None)
+            elif operation["op"] == "transform" and field in rewritten:
+                rewritten[field] = VALUE_TRANSFORMS[operation["transform"]](rewritten[field])
+        return rewritten
+    
+    def learn(self, signature: str, analysis: "AnalysisResult",
+              original: Dict[str, Any], corrected: Dict[str, Any]) -> bool:
+        """Persist a rule for a correction that made the retry succeed"""
+        operations = self.derive_operations(original, corrected)
+        if not operations:
+            return False
+        
+        with self._lock:
+            existing = self.rules.get(signature, {})
+            self.rules[signature] = {
+                "error_type": analysis.error_type,
+                "root_cause": mask_values(analysis.root_cause, original),
+                "operations": operations,
+                "learned_at": existing.get("learned_at", datetime.now().isoformat()),
+                "hits": existing.get("hits", 0)
+            }
+            self._save()
+        logger.info(f"📚 Learned correction rule {signature[:8]}: {[op['op'] + ':' + op['field'] for op in operations]}")
+        return True
+    
+    def record_hit(self, signature: str):
+        with self._lock:
+            if signature in self.rules:
+                self.rules[signature]["hits"] = self.rules[signature].get("hits", 0) + 1
+                self.rules[signature]["last_used"] = datetime.now().isoformat()
+                self._save()
+    
+    def forget(self, signature: str):
+        """Drop a rule that no longer fixes its error"""
+        with self._lock:
+            if self.rules.pop(signature, None) is not None:
+                self._save()
+                logger.warning(f"🗑️ Dropped correction rule {signature[:8]} - retry still failed")
+
+STRUCTURAL_OPS = {"rename", "drop", "transform"}
+
+def structural_analysis(analysis: AnalysisResult, original_payload: Optional[Dict[str, Any]] = None) -> AnalysisResult:
+    """
+    The part of an analysis that is safe to reuse for other leads: the corrected payload is
+    reduced to structural operations against the payload it was made for, and free text is masked.
+    """
+    operations = [op for op in (analysis.operations or []) if op.get("op") in STRUCTURAL_OPS]
+    if analysis.corrected_payload and isinstance(original_payload, dict):
+        corrected = analysis.corrected_payload
+        if not analysis.replaces_payload:
+            corrected = {**original_payload, **corrected}
+        operations = CorrectionRuleStore.derive_operations(original_payload, corrected)
+    return replace(
+        analysis,
+        root_cause=mask_values(analysis.root_cause, original_payload),
+        reasoning=mask_values(analysis.reasoning, original_payload),
+        suggested_corrections={},
+        corrected_payload=None,
+        replaces_payload=False,
+        operations=operations
+    )
+
+class CircuitBreaker:
+    """Stops model calls after repeated failures; lets one trial call through after the cooldown"""
+    
+    def __init__(self, failure_threshold: int, cooldown_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            return "half_open"
+        return "open"
+    
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open":
+                return False
+            if self.state == "half_open":
+                # One trial call per cooldown window
+                self.opened_at = time.monotonic()
+            return True
+    
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+    
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f"⚡ AI error analysis circuit opened after {self.consecutive_failures} failures")
+                self.opened_at = time.monotonic()
+
+class AnthropicAnalysisModel:
+    """
+    Async Anthropic client wrapper. analyze(prompt) returns (tool_input, usage).
+    Any object with the same coroutine can be passed to AIErrorRecoveryServiceV2 as a stub.
+    """
+    
+    def __init__(self, api_key: str, model: str = "claude-3-5-sonnet-20241022"):
+        self.api_key = api_key
+        self.model = model
+        # httpx async clients are bound to the loop that created them (webhook workers run their own)
+        self._clients = weakref.WeakKeyDictionary()
+    
+    def _client(self) -> "anthropic.AsyncAnthropic":
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = anthropic.AsyncAnthropic(api_key=self.api_key, max_retries=0)
+            self._clients[loop] = client
+        return client
+    
+    async def analyze(self, prompt: str) -> Tuple[Optional[Dict[str, Any]], Dict[str, int]]:
+        response = await self._client().messages.create(
+            model=self.model,
+            max_tokens=1000,  # Reduced tokens
+            temperature=0.1,
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            tools=[ERROR_ANALYSIS_TOOL],
+            tool_choice={"type": "tool", "name": "error_analysis"}
+        )
+        
+        usage = {}
+        if hasattr(response, 'usage'):
+            usage = {"input": response.usage.input_tokens, "output": response.usage.output_tokens}
+        
+        if response.content and response.content[0].type == "tool_use":
+            return response.content[0].input, usage
+        return None, usage
+
+ERROR_ANALYSIS_TOOL = {
+    "name": "error_analysis",
+    "description": "Analyze API error and suggest corrections",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "error_type": {
+                "type": "string",
+                "enum": ["validation_error", "format_error", "missing_field", "duplicate", "auth_error", "unknown"]
+            },
+            "root_cause": {"type": "string"},
+            "problematic_fields": {
+                "type": "array",
+                "items": {"type": "string"}
+            },
+            "suggested_corrections": {
+                "type": "object",
+                "additionalProperties": {"type": "string"}
+            },
+            "corrected_payload": {"type": "object"},
+            "confidence": {
+                "type": "string",
+                "enum": ["high", "medium", "low"]
+            },
+            "reasoning": {"type": "string"},
+            "retry_recommended": {"type": "boolean"},
+            "additional_checks": {
+                "type": "array",
+                "items": {"type": "string"}
+            }
+        },
+        "required": ["error_type", "root_cause", "confidence", "retry_recommended"]
+    }
+}
+
 class AIErrorRecoveryServiceV2:
     """Production-ready AI Error Recovery Service with all improvements"""
     
-    def __init__(self):
+    def __init__(self, model=None, rule_store: CorrectionRuleStore = None):
+        """
+        model: object with `async analyze(prompt) -> (tool_input, usage)`; defaults to the
+        async Anthropic client when ANTHROPIC_API_KEY is set (pass a stub for local testing).
+        """
         self.anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
         self.client = None
-        self.enabled = bool(self.anthropic_api_key and self.anthropic_api_key != "your_anthropic_api_key")
+        self.model = model
+        self.enabled = model is not None or bool(
+            self.anthropic_api_key and self.anthropic_api_key != "your_anthropic_api_key"
+        )
         
         # Initialize services
         self.field_service = FieldReferenceService()
         self.error_cache = ErrorSignatureCache()
+        self.rule_store = rule_store or CorrectionRuleStore()
+        self.circuit_breaker = CircuitBreaker(
+            AppConfig.AI_RECOVERY_BREAKER_THRESHOLD,
+            AppConfig.AI_RECOVERY_BREAKER_COOLDOWN_SECONDS
+        )
+        self.max_concurrency = AppConfig.AI_RECOVERY_MAX_CONCURRENCY
+        self.timeout_seconds = AppConfig.AI_RECOVERY_TIMEOUT_SECONDS
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
         
         # Metrics
         self.metrics = {
             "total_analyses": 0,
             "cache_hits": 0,
+            "rule_hits": 0,
+            "rules_learned": 0,
             "ai_calls": 0,
+            "ai_timeouts": 0,
+            "ai_failures": 0,
+            "ai_skipped_circuit_open": 0,
+            "ai_skipped_concurrency": 0,
             "token_usage": {"input": 0, "output": 0},
             "retry_attempts": 0,
             "successful_recoveries": 0
@@ -219,9 +580,13 @@ class AIErrorRecoveryServiceV2:
         # Load prompt template
         self.prompt_template = self._load_prompt_template()
         
-        if self.enabled:
+        if self.model is not None:
+            logger.info("✅ AI Error Recovery V2 initialized with injected analysis model")
+        elif self.enabled:
             try:
+                # Sync client kept for callers that share it (ai_enhanced_field_mapper_v2)
                 self.client = anthropic.Anthropic(api_key=self.anthropic_api_key)
+                self.model = AnthropicAnalysisModel(self.anthropic_api_key)
                 logger.info("✅ AI Error Recovery V2 initialized with Anthropic")
             except Exception as e:
                 logger.error(f"❌ Failed to initialize Anthropic client: {e}")
@@ -270,6 +635,27 @@ Analyze and respond with the specified JSON structure for error correction."""
         
         payload_keys = list(original_payload.keys()) if isinstance(original_payload, dict) else []
         
+        # Learned deterministic rules fix repeat errors without a model call
+        signature = create_error_signature(error_response, payload_keys)
+        rule = self.rule_store.get(signature)
+        if rule and isinstance(original_payload, dict):
+            self.metrics["rule_hits"] += 1
+            self.rule_store.record_hit(signature)
+            logger.info(f"📚 Applying learned correction rule {signature[:8]}")
+            return AnalysisResult(
+                error_type=rule.get("error_type", "unknown"),
+                root_cause=rule.get("root_cause", ""),
+                problematic_fields=[op["field"] for op in rule["operations"]],
+                suggested_corrections={},
+                corrected_payload=self.rule_store.apply(rule, original_payload),
+                confidence="high",
+                reasoning=f"Learned correction rule {signature[:8]}",
+                retry_recommended=True,
+                additional_checks=[],
+                ai_powered=False,
+                replaces_payload=True
+            )
+        
         # Check cache first
         cached_result = self.error_cache.get(error_response, payload_keys)
         if cached_result:
@@ -292,8 +678,9 @@ Analyze and respond with the specified JSON structure for error correction."""
             # Use structured function calling
             analysis = await self._query_claude_structured(context)
             
-            # Cache the result
-            self.error_cache.put(error_response, payload_keys, analysis)
+            # Cache the result (not timeouts / circuit-open placeholders)
+            if analysis.ai_powered:
+                self.error_cache.put(error_response, payload_keys, analysis, original_payload)
             
             return analysis
             
@@ -355,7 +742,21 @@ Analyze and respond with the specified JSON structure for error correction."""
         return sanitized
     
     async def _query_claude_structured(self, context: Dict[str, str]) -> AnalysisResult:
-        """Use structured function calling for reliable parsing"""
+        """Structured (tool-use) analysis on the async client, with timeout, concurrency cap and circuit breaker"""
+        
+        if not self.circuit_breaker.allow():
+            self.metrics["ai_skipped_circuit_open"] += 1
+            return self._unavailable_analysis("AI analysis circuit open")
+        
+        with self._in_flight_lock:
+            if self._in_flight >= self.max_concurrency:
+                self.metrics["ai_skipped_concurrency"] += 1
+                at_capacity = True
+            else:
+                self._in_flight += 1
+                at_capacity = False
+        if at_capacity:
+            return self._unavailable_analysis("AI analysis at concurrency limit")
         
         self.metrics["ai_calls"] += 1
         
@@ -363,96 +764,58 @@ Analyze and respond with the specified JSON structure for error correction."""
         prompt = self.prompt_template.format(**context)
         
         try:
-            # Use Anthropic's tools/function calling for structured output
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1000,  # Reduced tokens
-                temperature=0.1,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                tools=[
-                    {
-                        "name": "error_analysis",
-                        "description": "Analyze API error and suggest corrections",
-                        "input_schema": {
-                            "type": "object",
-                            "properties": {
-                                "error_type": {
-                                    "type": "string",
-                                    "enum": ["validation_error", "format_error", "missing_field", "duplicate", "auth_error", "unknown"]
-                                },
-                                "root_cause": {"type": "string"},
-                                "problematic_fields": {
-                                    "type": "array",
-                                    "items": {"type": "string"}
-                                },
-                                "suggested_corrections": {
-                                    "type": "object",
-                                    "additionalProperties": {"type": "string"}
-                                },
-                                "corrected_payload": {"type": "object"},
-                                "confidence": {
-                                    "type": "string",
-                                    "enum": ["high", "medium", "low"]
-                                },
-                                "reasoning": {"type": "string"},
-                                "retry_recommended": {"type": "boolean"},
-                                "additional_checks": {
-                                    "type": "array",
-                                    "items": {"type": "string"}
-                                }
-                            },
-                            "required": ["error_type", "root_cause", "confidence", "retry_recommended"]
-                        }
-                    }
-                ],
-                tool_choice={"type": "tool", "name": "error_analysis"}
-            )
+            tool_input, usage = await asyncio.wait_for(self.model.analyze(prompt), self.timeout_seconds)
             
             # Track token usage
-            if hasattr(response, 'usage'):
-                self.metrics["token_usage"]["input"] += response.usage.input_tokens
-                self.metrics["token_usage"]["output"] += response.usage.output_tokens
-            
-            # Extract structured result
-            if response.content and response.content[0].type == "tool_use":
-                tool_input = response.content[0].input
-                
-                return AnalysisResult(
-                    error_type=tool_input.get("error_type", "unknown"),
-                    root_cause=tool_input.get("root_cause", ""),
-                    problematic_fields=tool_input.get("problematic_fields", []),
-                    suggested_corrections=tool_input.get("suggested_corrections", {}),
-                    corrected_payload=tool_input.get("corrected_payload"),
-                    confidence=tool_input.get("confidence", "low"),
-                    reasoning=tool_input.get("reasoning", ""),
-                    retry_recommended=tool_input.get("retry_recommended", False),
-                    additional_checks=tool_input.get("additional_checks", []),
-                    ai_powered=True
-                )
+            self.metrics["token_usage"]["input"] += usage.get("input", 0)
+            self.metrics["token_usage"]["output"] += usage.get("output", 0)
             
             # Fallback if structured output fails
-            raise Exception("No structured output received")
+            if not tool_input:
+                raise Exception("No structured output received")
             
-        except Exception as e:
-            logger.error(f"❌ Claude structured query error: {e}")
-            # Return minimal fallback analysis
+            self.circuit_breaker.record_success()
             return AnalysisResult(
-                error_type="unknown",
-                root_cause=f"AI analysis failed: {e}",
-                problematic_fields=[],
-                suggested_corrections={},
-                corrected_payload=None,
-                confidence="low",
-                reasoning="AI analysis unavailable",
-                retry_recommended=False,
-                additional_checks=[],
-                ai_powered=False
+                error_type=tool_input.get("error_type", "unknown"),
+                root_cause=tool_input.get("root_cause", ""),
+                problematic_fields=tool_input.get("problematic_fields", []),
+                suggested_corrections=tool_input.get("suggested_corrections", {}),
+                corrected_payload=tool_input.get("corrected_payload"),
+                confidence=tool_input.get("confidence", "low"),
+                reasoning=tool_input.get("reasoning", ""),
+                retry_recommended=tool_input.get("retry_recommended", False),
+                additional_checks=tool_input.get("additional_checks", []),
+                ai_powered=True
             )
+            
+        except asyncio.TimeoutError:
+            self.metrics["ai_timeouts"] += 1
+            self.circuit_breaker.record_failure()
+            logger.error(f"❌ Claude structured query timed out after {self.timeout_seconds}s")
+            return self._unavailable_analysis(f"AI analysis timed out after {self.timeout_seconds}s")
+        except Exception as e:
+            self.metrics["ai_failures"] += 1
+            self.circuit_breaker.record_failure()
+            logger.error(f"❌ Claude structured query error: {e}")
+            return self._unavailable_analysis(f"AI analysis failed: {e}")
+        finally:
+            with self._in_flight_lock:
+                self._in_flight -= 1
+    
+    def _unavailable_analysis(self, root_cause: str) -> AnalysisResult:
+        """Minimal analysis when the model could not be consulted"""
+        return AnalysisResult(
+            error_type="unknown",
+            root_cause=root_cause,
+            problematic_fields=[],
+            suggested_corrections={},
+            corrected_payload=None,
+            confidence="low",
+            reasoning="AI analysis unavailable",
+            retry_recommended=False,
+            additional_checks=[],
+            ai_powered=False
+        )
     
     def _fallback_error_analysis(self, 
                                 error_response: Dict[str, Any], 
@@ -506,6 +869,7 @@ Analyze and respond with the specified JSON structure for error correction."""
         retry_attempt = 0
         current_payload = original_payload.copy()
         analysis_history = []
+        initial_signature = create_error_signature(error_response, list(original_payload.keys()))
         
         start_time = time.time()
         
@@ -551,6 +915,9 @@ Analyze and respond with the specified JSON structure for error correction."""
                     if result and not isinstance(result, dict) or not result.get("error"):
                         state = RetryState.SUCCESS
                         self.metrics["successful_recoveries"] += 1
+                        if self.rule_store.learn(initial_signature, analysis_history[0],
+                                                 original_payload, current_payload):
+                            self.metrics["rules_learned"] += 1
                         break
                     
                     # Still failing - analyze new error
@@ -564,6 +931,10 @@ Analyze and respond with the specified JSON structure for error correction."""
                     logger.error(f"❌ Exception during retry {retry_attempt}: {e}")
                     state = RetryState.FAILED
         
+        # A learned rule that did not fix its error is stale
+        if state != RetryState.SUCCESS and analysis_history and analysis_history[0].replaces_payload:
+            self.rule_store.forget(initial_signature)
+        
         # Compile final result
         elapsed_time = time.time() - start_time
         
@@ -585,7 +956,15 @@ Analyze and respond with the specified JSON structure for error correction."""
         
         corrected = payload.copy()
         
-        # Apply AI-suggested corrected payload if available
+        # Rule rewrites are complete payloads (they may rename or drop keys)
+        if analysis.replaces_payload and analysis.corrected_payload is not None:
+            return dict(analysis.corrected_payload)
+        
+        # Cached analyses carry only structural operations, applied to this lead's own values
+        if analysis.operations:
+            corrected = CorrectionRuleStore.apply({"operations": analysis.operations}, corrected)
+        
+        # Apply AI-suggested corrected payload if available (only ever for the lead it was made for)
         if analysis.corrected_payload:
             corrected.update(analysis.corrected_payload)
         
@@ -650,6 +1029,8 @@ Analyze and respond with the specified JSON structure for error correction."""
             "field_reference_loaded": len(self.field_service.field_reference),
             "metrics": self.metrics,
             "cache_stats": cache_stats,
+            "correction_rules": len(self.rule_store.rules),
+            "circuit_breaker": self.circuit_breaker.state,
             "efficiency": {
                 "cache_hit_rate": cache_stats["hit_rate_percent"],
                 "avg_tokens_per_call": (
@@ -664,4 +1045,7 @@ Analyze and respond with the specified JSON structure for error correction."""
 
 
 # Global enhanced instance
-ai_error_recovery_v2 = AIErrorRecoveryServiceV2()
\ No newline at end of file
+ai_error_recovery_v2 = AIErrorRecoveryServiceV2()
+metrics.register_stats("ai_error_recovery", lambda: ai_error_recovery_v2.metrics)
+metrics.register_cache("ai_error_analysis", lambda: (
+    ai_error_recovery_v2.error_cache.hit_count, ai_error_recovery_v2.error_cache.miss_count))
\ No newline at end of file
@@ -4,8 +4,12 @@ Handles user authentication, JWT tokens, password hashing, and 2FA
 """
 
 import os
+import hmac
+import asyncio
+import hashlib
 import secrets
 import string
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, Tuple
 from passlib.context import CryptContext
@@ -13,8 +17,10 @@ from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 
+from config import AppConfig
 from database.models import User, AuthToken, TwoFactorCode, Tenant, AuditLog
 from database.simple_connection import get_db_session
+from api.security.principal_cache import principal_cache
 
 
 class AuthService:
@@ -28,6 +34,11 @@ class AuthService:
         self.two_factor_expire_minutes = int(os.getenv("TWO_FACTOR_CODE_EXPIRE_MINUTES", "10"))
         self.max_login_attempts = int(os.getenv("ACCOUNT_LOCKOUT_THRESHOLD", "5"))
         self.lockout_duration_minutes = int(os.getenv("ACCOUNT_LOCKOUT_DURATION_MINUTES", "30"))
+        # Tokens are stored as keyed HMAC fingerprints so they can be looked up by equality
+        self.token_fingerprint_key = (AppConfig.TOKEN_FINGERPRINT_KEY or self.jwt_secret).encode("utf-8")
+        # bcrypt is deliberately slow - keep it off the event loop, on a fixed number of threads
+        self._hash_executor = ThreadPoolExecutor(max_workers=AppConfig.AUTH_HASH_WORKERS,
+                                                 thread_name_prefix="auth-hash")
 
     def hash_password(self, password: str) -> str:
         """Hash a password"""
@@ -37,6 +48,21 @@ class AuthService:
         """Verify a password against its hash"""
         return self.pwd_context.verify(plain_password, hashed_password)
 
+    async def hash_password_async(self, password: str) -> str:
+        """Hash a password on the bcrypt thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._hash_executor, self.hash_password, password)
+
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password on the bcrypt thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._hash_executor, self.verify_password,
+                                          plain_password, hashed_password)
+
+    def fingerprint_token(self, token: str) -> str:
+        """Deterministic HMAC-SHA256 fingerprint of a token (what auth_tokens.token_hash stores)"""
+        return hmac.new(self.token_fingerprint_key, token.encode("utf-8"), hashlib.sha256).hexdigest()
+
     def generate_2fa_code(self) -> str:
         """Generate a random 2FA code"""
         return ''.join(secrets.choice(string.digits) for _ in range(self.two_factor_code_length))
@@ -80,6 +106,37 @@ class AuthService:
         except JWTError:
             return None
 
+    def resolve_principal(self, token: str, db: Session) -> Optional[User]:
+        """
+        Active user for a bearer token (None if invalid, revoked, or user/tenant inactive).
+        Served from the principal cache when possible; the returned User is detached.
+        """
+        payload = self.verify_token(token)
+        if not payload or not payload.get("sub") or not payload.get("tenant_id"):
+            return None
+
+        fingerprint = self.fingerprint_token(token)
+        user = principal_cache.get(fingerprint)
+        if user is not None:
+            return user
+
+        # Read before the lookup, so an invalidation racing it leaves the entry stale
+        generation = principal_cache.generation(payload["sub"])
+        if self.is_token_revoked(token, db):
+            return None
+
+        user = db.query(User).filter(User.id == payload["sub"]).first()
+        if not user or not user.is_active:
+            return None
+
+        tenant = db.query(Tenant.is_active).filter(Tenant.id == payload["tenant_id"]).first()
+        if not tenant or not tenant.is_active:
+            return None
+
+        db.expunge(user)
+        principal_cache.put(fingerprint, user, payload.get("exp"), generation)
+        return user
+
     def get_tenant_by_domain(self, domain: str, db: Session) -> Optional[Tenant]:
         """Get tenant by domain"""
         return db.query(Tenant).filter(
@@ -179,8 +236,9 @@ class AuthService:
         return True
 
     def create_user(self, email: str, password: str, tenant_id: str, first_name: str = None, 
-                   last_name: str = None, role: str = "user", db: Session = None) -> User:
-        """Create a new user"""
+                   last_name: str = None, role: str = "user", db: Session = None,
+                   password_hash: str = None) -> User:
+        """Create a new user (pass password_hash if it was already hashed off the event loop)"""
         if not db:
             db = get_db_session()
             should_close = True
@@ -194,7 +252,8 @@ class AuthService:
                 raise ValueError("User with this email already exists")
                 
             # Hash password
-            password_hash = self.hash_password(password)
+            if not password_hash:
+                password_hash = self.hash_password(password)
             
             # Create user
             user = User(
@@ -233,10 +292,27 @@ class AuthService:
             
         return user, "success"
 
+    async def authenticate_user_async(self, email: str, password: str, tenant_id: str,
+                                      db: Session) -> Tuple[Optional[User], str]:
+        """authenticate_user() with the bcrypt check run on the thread pool"""
+        user = self.get_user_by_email(email, tenant_id, db)
+        
+        if not user:
+            return None, "Invalid email or password"
+            
+        if self.is_user_locked(user):
+            return None, f"Account is locked. Try again after {user.locked_until.strftime('%Y-%m-%d %H:%M:%S')} UTC"
+            
+        if not await self.verify_password_async(password, user.password_hash):
+            self.increment_login_attempts(user, db)
+            return None, "Invalid email or password"
+            
+        return user, "success"
+
     def store_auth_token(self, user_id: str, token: str, token_type: str, db: Session) -> None:
         """Store authentication token in database"""
-        # Hash the token for security
-        token_hash = self.pwd_context.hash(token)
+        # Store a fingerprint, never the token itself
+        token_hash = self.fingerprint_token(token)
         
         # Calculate expiration
         if token_type == "access":
@@ -256,19 +332,39 @@ class AuthService:
         db.add(auth_token)
         db.commit()
 
-    def revoke_token(self, token_hash: str, db: Session) -> bool:
+    def revoke_token(self, token: str, db: Session) -> bool:
         """Revoke a token"""
         auth_token = db.query(AuthToken).filter(
-            AuthToken.token_hash == token_hash
+            AuthToken.token_hash == self.fingerprint_token(token)
         ).first()
         
         if auth_token:
             auth_token.is_revoked = True
             db.commit()
+            principal_cache.invalidate_token(auth_token.token_hash, auth_token.user_id)
             return True
             
         return False
 
+    def revoke_user_tokens(self, user_id: str, db: Session) -> int:
+        """Revoke every outstanding token for a user"""
+        revoked = db.query(AuthToken).filter(
+            and_(
+                AuthToken.user_id == user_id,
+                AuthToken.is_revoked == False
+            )
+        ).update({"is_revoked": True})
+        db.commit()
+        principal_cache.invalidate_user(user_id)
+        return revoked
+
+    def is_token_revoked(self, token: str, db: Session) -> bool:
+        """Check whether a stored token has been revoked (unknown tokens are not revoked)"""
+        auth_token = db.query(AuthToken.is_revoked).filter(
+            AuthToken.token_hash == self.fingerprint_token(token)
+        ).first()
+        return bool(auth_token and auth_token.is_revoked)
+
     def log_security_event(self, tenant_id: str, user_id: str, action: str, 
                           ip_address: str, user_agent: str, details: Dict[str, Any], 
                           db: Session) -> None:
@@ -0,0 +1,496 @@
+# api/services/bulk_reassignment_engine.py
+"""
+Bulk Lead Reassignment Engine
+Reassigns many leads in one job instead of awaiting the single-lead flow per contact:
+- Leads for all contacts are loaded in one batched query
+- Eligible vendor pools are computed once per (service, county) group
+- Vendor selection happens locally, DB assignments are committed in one transaction
+- GHL opportunity updates run with bounded concurrency under the shared rate limiter
+- Each reassignment gets the same bookkeeping as the single-lead flow (reassignment count,
+  GHL contact fields/tags, lead_reassigned event and vendor scoring)
+- Progress is checkpointed to disk so an interrupted job can be resumed
+"""
+
+import os
+import json
+import uuid
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional, AsyncIterator, Tuple
+
+from config import AppConfig
+from database.simple_connection import db as simple_db_instance
+from api.services.lead_routing_service import lead_routing_service
+from api.services.lead_reassignment_core import lead_reassignment_core
+from api.services.vendor_scoring import vendor_scoring
+from api.services.ghl_rate_limiter import ghl_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Approximate GHL calls made by the single-lead flow (contact, opportunities, create, update)
+FALLBACK_GHL_CALL_COST = 4
+
+# GHL calls for the contact update of a batched item (read tags, write fields/tags)
+CONTACT_UPDATE_GHL_CALL_COST = 2
+
+TERMINAL_EVENTS = ("completed", "failed")
+
+
+class BulkReassignmentEngine:
+    """
+    Runs bulk reassignment jobs. Each job is persisted as a JSON checkpoint containing
+    the contact list, the vendor selected for each contact (written before the DB commit)
+    and the final result per contact, so a resumed job never re-selects a vendor.
+    """
+
+    def __init__(self, checkpoint_dir: str = None, max_concurrency: int = None):
+        if checkpoint_dir is None:
+            project_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            checkpoint_dir = os.path.join(project_dir, "bulk_reassignment_jobs")
+        self.checkpoint_dir = checkpoint_dir
+        self.max_concurrency = max_concurrency or AppConfig.BULK_REASSIGNMENT_CONCURRENCY
+        self.rate_limiter = ghl_rate_limiter
+        # Reuse one GHL client (and its connection settings) for every update in every job
+        self.ghl_api = lead_reassignment_core.ghl_api
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    # ============================================
+    # CHECKPOINTS
+    # ============================================
+
+    def _checkpoint_path(self, job_id: str) -> str:
+        return os.path.join(self.checkpoint_dir, f"{job_id}.json")
+
+    def _save_checkpoint(self, job: Dict[str, Any]) -> None:
+        """Atomically persist the job checkpoint"""
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        job["updated_at"] = datetime.utcnow().isoformat()
+        path = self._checkpoint_path(job["job_id"])
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(job, f)
+        os.replace(tmp_path, path)
+
+    def load_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Load a job checkpoint from disk"""
+        try:
+            with open(self._checkpoint_path(job_id), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"❌ Could not read bulk reassignment checkpoint {job_id}: {e}")
+            return None
+
+    def create_job(self, contact_ids: List[str], reason: str = "bulk_reassignment",
+                   exclude_previous: bool = True) -> Dict[str, Any]:
+        """Create and persist a new job (duplicates in contact_ids are dropped)"""
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "status": "pending",
+            "reason": reason,
+            "exclude_previous": exclude_previous,
+            "contact_ids": list(dict.fromkeys(contact_ids)),
+            "assignments": {},
+            "results": {},
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        self._save_checkpoint(job)
+        logger.info(f"📦 Created bulk reassignment job {job['job_id']} for {len(job['contact_ids'])} contacts")
+        return job
+
+    def summarize_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        results = job.get("results", {})
+        status = job.get("status")
+        if self.is_running(job["job_id"]):
+            status = "running"
+        elif status == "running":
+            # Checkpoint says running but no task owns it - the process died mid-job
+            status = "interrupted"
+        return {
+            "job_id": job["job_id"],
+            "status": status,
+            "reason": job.get("reason"),
+            "total": len(job.get("contact_ids", [])),
+            "processed": len(results),
+            "successful": sum(1 for r in results.values() if r.get("success")),
+            "failed": sum(1 for r in results.values() if not r.get("success")),
+            "created_at": job.get("created_at"),
+            "updated_at": job.get("updated_at"),
+        }
+
+    def list_jobs(self, include_completed: bool = False) -> List[Dict[str, Any]]:
+        """List job summaries (by default only jobs that can still be resumed)"""
+        jobs = []
+        if not os.path.isdir(self.checkpoint_dir):
+            return jobs
+        for filename in sorted(os.listdir(self.checkpoint_dir)):
+            if not filename.endswith(".json"):
+                continue
+            job = self.load_job(filename[:-5])
+            if not job:
+                continue
+            if include_completed or job.get("status") != "completed":
+                jobs.append(self.summarize_job(job))
+        return jobs
+
+    def is_running(self, job_id: str) -> bool:
+        task = self._tasks.get(job_id)
+        return task is not None and not task.done()
+
+    # ============================================
+    # JOB EXECUTION
+    # ============================================
+
+    def start_job(self, job_id: str) -> Optional[asyncio.Queue]:
+        """
+        Start (or resume) a job in the background and return its event queue.
+        The job keeps running if the client consuming the stream disconnects.
+        Returns None if the job does not exist or is already running.
+        """
+        if self.is_running(job_id) or not os.path.exists(self._checkpoint_path(job_id)):
+            return None
+
+        queue: asyncio.Queue = asyncio.Queue()
+        self._tasks[job_id] = asyncio.create_task(self._run_job(job_id, queue))
+        return queue
+
+    async def iter_events(self, queue: asyncio.Queue) -> AsyncIterator[Dict[str, Any]]:
+        """Yield job events until the job completes or fails"""
+        while True:
+            event = await queue.get()
+            yield event
+            if event.get("event") in TERMINAL_EVENTS:
+                break
+
+    async def _run_job(self, job_id: str, queue: asyncio.Queue) -> None:
+        job = self.load_job(job_id)
+        resumed = job.get("status") != "pending"
+        job["status"] = "running"
+        pending = [cid for cid in job["contact_ids"] if cid not in job["results"]]
+
+        await queue.put({
+            "event": "started",
+            "job_id": job_id,
+            "resumed": resumed,
+            "total": len(job["contact_ids"]),
+            "already_processed": len(job["contact_ids"]) - len(pending),
+            "pending": len(pending),
+        })
+
+        try:
+            work_items, failures = await asyncio.to_thread(self._plan_assignments, job, pending)
+
+            for result in failures:
+                self._record_result(job, result)
+                await queue.put({"event": "result", **result})
+
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            tasks = [asyncio.create_task(self._apply_work_item(job, item, semaphore)) for item in work_items]
+
+            for finished in asyncio.as_completed(tasks):
+                result = await finished
+                self._record_result(job, result)
+                await queue.put({"event": "result", **result})
+
+            job["status"] = "completed"
+            self._save_checkpoint(job)
+
+            summary = {**self.summarize_job(job), "status": "completed"}
+            simple_db_instance.log_activity(
+                event_type="bulk_reassignment_completed",
+                event_data={**summary, "reason": job.get("reason")},
+                lead_id="bulk_operation",
+                success=summary["successful"] > 0
+            )
+            logger.info(f"✅ Bulk reassignment job {job_id} completed: "
+                        f"{summary['successful']} successful, {summary['failed']} failed")
+            await queue.put({"event": "completed", **summary})
+
+        except Exception as e:
+            logger.error(f"❌ Bulk reassignment job {job_id} failed: {e}", exc_info=True)
+            job["status"] = "interrupted"
+            job["last_error"] = str(e)
+            self._save_checkpoint(job)
+            await queue.put({"event": "failed", "job_id": job_id, "error": str(e),
+                             **{k: v for k, v in self.summarize_job(job).items() if k != "status"}})
+
+    def _record_result(self, job: Dict[str, Any], result: Dict[str, Any]) -> None:
+        job["results"][result["contact_id"]] = result
+        self._save_checkpoint(job)
+
+    # ============================================
+    # PLANNING (batched DB reads, pools per group, local selection)
+    # ============================================
+
+    def _resolve_account_id(self) -> str:
+        account = simple_db_instance.get_account_by_ghl_location_id(AppConfig.GHL_LOCATION_ID)
+        if account:
+            return account["id"]
+        return simple_db_instance.create_account(
+            company_name="Default Account",
+            industry="marine",
+            ghl_location_id=AppConfig.GHL_LOCATION_ID,
+            ghl_private_token=AppConfig.GHL_PRIVATE_TOKEN
+        )
+
+    def _build_routing_context(self, lead: Dict[str, Any], zip_locations: Dict[str, Dict]) -> Optional[Dict[str, Any]]:
+        """
+        Extract what the fast path needs from a lead record. Returns None when the lead
+        lacks service, location or opportunity data - those contacts go through the
+        single-lead flow which can recover them from GHL.
+        """
+        service_category = lead.get("primary_service_category") or ""
+        specific_service = lead.get("specific_service_requested") or ""
+        zip_code = lead.get("service_zip_code") or lead.get("customer_zip_code") or ""
+        service_to_match = specific_service or service_category
+
+        if not service_to_match or len(zip_code) != 5 or not lead.get("ghl_opportunity_id"):
+            return None
+
+        group_key = (service_to_match, lead_routing_service.resolve_location_key(zip_code, zip_locations))
+
+        return {
+            "lead": lead,
+            "zip_code": zip_code,
+            "service_to_match": service_to_match,
+            "group_key": group_key,
+        }
+
+    def _plan_assignments(self, job: Dict[str, Any], pending: List[str]) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Select a vendor for every pending contact and commit the DB assignments.
+        Runs in a worker thread (all DB and geo lookups are blocking).
+        """
+        account_id = self._resolve_account_id()
+        exclude_previous = job.get("exclude_previous", True)
+        leads = simple_db_instance.get_leads_by_ghl_contact_ids(
+            [cid for cid in pending if cid not in job["assignments"]]
+        )
+
+        work_items: List[Dict] = []
+        failures: List[Dict] = []
+        groups: Dict[tuple, List[Dict]] = {}
+        zip_locations: Dict[str, Dict] = {}
+
+        for contact_id in pending:
+            if contact_id in job["assignments"]:
+                # Resumed job - the vendor was already chosen before the interruption
+                work_items.append(job["assignments"][contact_id])
+                continue
+
+            lead = leads.get(contact_id)
+            context = self._build_routing_context(lead, zip_locations) if lead else None
+            if context is None:
+                work_items.append({"contact_id": contact_id, "mode": "fallback"})
+                continue
+            groups.setdefault(context["group_key"], []).append(context)
+
+        reassignment_counts = simple_db_instance.get_lead_reassignment_counts(
+            [context["lead"]["id"] for members in groups.values() for context in members]
+        )
+        performance_percentage = lead_routing_service.get_performance_percentage(account_id)
+        batch_last_assigned: Dict[str, str] = {}
+        batch_reserved: Dict[str, int] = {}
+        new_assignments: List[Dict] = []
+
+        for group_key, members in groups.items():
+            service_to_match = group_key[0]
+            pool = lead_routing_service.find_matching_vendors(
+                account_id=account_id,
+                service_category=service_to_match.split(" - ")[0] if " - " in service_to_match else service_to_match,
+                zip_code=members[0]["zip_code"],
+                priority="high",
+                specific_service=service_to_match
+            )
+            logger.info(f"🎯 Pool for {service_to_match} in {group_key[1]}: {len(pool)} vendors, {len(members)} leads")
+
+            for context in members:
+                lead = context["lead"]
+                contact_id = lead["ghl_contact_id"]
+                previous_vendor_id = lead.get("vendor_id")
+
+                candidates = pool
+                if exclude_previous and previous_vendor_id:
+                    candidates = [v for v in pool if v["id"] != previous_vendor_id]
+
+                if not candidates:
+                    failures.append({
+                        "contact_id": contact_id,
+                        "success": False,
+                        "lead_id": lead["id"],
+                        "previous_vendor_id": previous_vendor_id,
+                        "error": "No alternative vendors available" if pool else "No matching vendors found",
+                    })
+                    continue
+
+                selected = lead_routing_service.select_vendor_for_batch(candidates, performance_percentage,
+                                                                        batch_last_assigned, batch_reserved)
+                if not selected:
+                    failures.append({
+                        "contact_id": contact_id,
+                        "success": False,
+                        "lead_id": lead["id"],
+                        "previous_vendor_id": previous_vendor_id,
+                        "error": "All matching vendors are at capacity",
+                    })
+                    continue
+                assignment = {
+                    "contact_id": contact_id,
+                    "mode": "fast",
+                    "lead_id": lead["id"],
+                    "opportunity_id": lead.get("ghl_opportunity_id"),
+                    "previous_vendor_id": previous_vendor_id,
+                    "new_vendor_id": selected["id"],
+                    "vendor_name": selected.get("company_name") or selected.get("name") or "Unknown",
+                    "vendor_ghl_user": selected.get("ghl_user_id"),
+                    "vendor_email": selected.get("email"),
+                    "assigned_at": batch_last_assigned[selected["id"]],
+                    # Absolute value decided at planning time, so re-applying a resumed item never double counts
+                    "reassignment_count": reassignment_counts.get(lead["id"], 0) + 1,
+                    "service": service_to_match,
+                    "location": group_key[1],
+                }
+                job["assignments"][contact_id] = assignment
+                new_assignments.append(assignment)
+                work_items.append(assignment)
+
+        # Persist selections before committing so a crash between the two never re-selects
+        self._save_checkpoint(job)
+
+        fast_items = [item for item in work_items if item.get("mode") == "fast"]
+        simple_db_instance.bulk_assign_leads_to_vendors(
+            [(item["lead_id"], item["new_vendor_id"]) for item in fast_items]
+        )
+        lead_routing_service.update_vendors_last_assigned(
+            account_id,
+            [item["new_vendor_id"] for item in new_assignments],
+            batch_last_assigned
+        )
+
+        logger.info(f"📋 Planned bulk job {job['job_id']}: {len(fast_items)} batched, "
+                    f"{len(work_items) - len(fast_items)} via single-lead flow, {len(failures)} unroutable")
+        return work_items, failures
+
+    # ============================================
+    # GHL UPDATES (bounded concurrency + shared rate limiter)
+    # ============================================
+
+    async def _apply_work_item(self, job: Dict[str, Any], item: Dict[str, Any],
+                               semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        contact_id = item["contact_id"]
+        async with semaphore:
+            try:
+                if item.get("mode") == "fallback":
+                    await self.rate_limiter.acquire_async(FALLBACK_GHL_CALL_COST, priority="bulk")
+                    result = await asyncio.to_thread(self._run_single_lead_flow, job, contact_id)
+                    result.setdefault("contact_id", contact_id)
+                    return result
+
+                ghl_updated = False
+                if item.get("vendor_ghl_user") and item.get("opportunity_id"):
+                    await self.rate_limiter.acquire_async(priority="bulk")
+                    ghl_updated = await asyncio.to_thread(
+                        self.ghl_api.update_opportunity,
+                        item["opportunity_id"],
+                        {
+                            "assignedTo": item["vendor_ghl_user"],
+                            "pipelineId": AppConfig.PIPELINE_ID,
+                            "pipelineStageId": AppConfig.NEW_LEAD_STAGE_ID
+                        }
+                    )
+
+                reassignment_count = item.get("reassignment_count", 1)
+                await asyncio.to_thread(simple_db_instance.update_lead, item["lead_id"], {
+                    "vendor_assigned_at": datetime.utcnow().isoformat(),
+                    "reassignment_count": reassignment_count,
+                    "reassignment_reason": job.get("reason"),
+                    "previous_vendor_id": item["previous_vendor_id"]
+                })
+
+                await self.rate_limiter.acquire_async(CONTACT_UPDATE_GHL_CALL_COST, priority="bulk")
+                ghl_contact_updated = await asyncio.to_thread(self._update_ghl_contact, item, reassignment_count)
+
+                event_data = {
+                    "lead_id": item["lead_id"],
+                    "contact_id": contact_id,
+                    "event_type": "lead_reassigned",
+                    "previous_vendor_id": item["previous_vendor_id"],
+                    "new_vendor_id": item["new_vendor_id"],
+                    "reason": job.get("reason"),
+                    "reassignment_count": reassignment_count,
+                    "bulk_job_id": job["job_id"],
+                    "timestamp": datetime.utcnow().isoformat()
+                }
+                await asyncio.to_thread(simple_db_instance.create_lead_event, event_data)
+                await asyncio.to_thread(vendor_scoring.handle_lead_event, event_data)
+
+                await asyncio.to_thread(
+                    simple_db_instance.log_activity,
+                    event_type="lead_reassigned_success",
+                    event_data={
+                        "lead_id": item["lead_id"],
+                        "contact_id": contact_id,
+                        "opportunity_id": item["opportunity_id"],
+                        "previous_vendor_id": item["previous_vendor_id"],
+                        "new_vendor_id": item["new_vendor_id"],
+                        "vendor_name": item["vendor_name"],
+                        "reason": job.get("reason"),
+                        "service": item.get("service"),
+                        "location": item.get("location"),
+                        "bulk_job_id": job["job_id"]
+                    },
+                    lead_id=item["lead_id"],
+                    success=True
+                )
+
+                return {
+                    "contact_id": contact_id,
+                    "success": True,
+                    "lead_id": item["lead_id"],
+                    "opportunity_id": item["opportunity_id"],
+                    "previous_vendor_id": item["previous_vendor_id"],
+                    "new_vendor_id": item["new_vendor_id"],
+                    "vendor_name": item["vendor_name"],
+                    "ghl_updated": ghl_updated,
+                    "ghl_contact_updated": ghl_contact_updated,
+                    "reassignment_count": reassignment_count,
+                    "message": f"Successfully reassigned to {item['vendor_name']}"
+                }
+
+            except Exception as e:
+                logger.error(f"❌ Bulk reassignment failed for contact {contact_id}: {e}")
+                return {"contact_id": contact_id, "success": False, "error": str(e)}
+
+    def _update_ghl_contact(self, item: Dict[str, Any], reassignment_count: int) -> bool:
+        """Write the new vendor and reassignment tracking fields/tag to the GHL contact"""
+        contact_id = item["contact_id"]
+        try:
+            contact = self.ghl_api.get_contact_by_id(contact_id) or {}
+            update_data = {
+                "customFields": [
+                    {"key": "assigned_vendor", "field_value": item["vendor_name"]},
+                    {"key": "vendor_email", "field_value": item.get("vendor_email")},
+                    {"key": "reassignment_count", "field_value": str(reassignment_count)},
+                    {"key": "last_reassignment", "field_value": datetime.utcnow().isoformat()}
+                ],
+                "tags": (contact.get("tags") or []) + [f"reassigned_{reassignment_count}"]
+            }
+            return bool(self.ghl_api.update_contact(contact_id, update_data))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not update GHL contact {contact_id} after bulk reassignment: {e}")
+            return False
+
+    def _run_single_lead_flow(self, job: Dict[str, Any], contact_id: str) -> Dict[str, Any]:
+        """Run the (blocking) single-lead flow in a worker thread with its own event loop"""
+        return asyncio.run(lead_reassignment_core.reassign_lead(
+            contact_id=contact_id,
+            exclude_previous=job.get("exclude_previous", True),
+            reason=job.get("reason", "bulk_reassignment"),
+            preserve_source=True
+        ))
+
+
+# Global instance
+bulk_reassignment_engine = BulkReassignmentEngine()
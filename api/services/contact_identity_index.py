@@ -0,0 +1,111 @@
+# api/services/contact_identity_index.py
+"""
+Contact Identity Index
+Local map of normalized email and E.164 phone to GHL contact id, so repeat submitters
+are matched without searching GHL. Fed by our own contact creates/updates, the GHL sync
+jobs and inbound GHL contact webhooks; a miss falls back to GHL search.
+"""
+
+import logging
+from typing import Dict, Any, List, Optional, Iterable
+
+from database.simple_connection import db as simple_db_instance
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    if not email or not isinstance(email, str):
+        return None
+    email = email.strip().lower()
+    return email if "@" in email else None
+
+
+def normalize_phone(phone: Optional[str], default_country_code: str = "1") -> Optional[str]:
+    """E.164 form of a phone number; bare 10-digit numbers are taken as US/Canada"""
+    if not phone or not isinstance(phone, str):
+        return None
+    digits = "".join(ch for ch in phone if ch.isdigit())
+    if phone.strip().startswith("+"):
+        return f"+{digits}" if 8 <= len(digits) <= 15 else None
+    if len(digits) == 10:
+        return f"+{default_country_code}{digits}"
+    if len(digits) == 11 and digits.startswith(default_country_code):
+        return f"+{digits}"
+    return None
+
+
+def identity_keys(email: Optional[str] = None, phone: Optional[str] = None) -> List[str]:
+    """Index keys for a contact, email first (an email match wins over a phone match)"""
+    keys = []
+    normalized_email = normalize_email(email)
+    if normalized_email:
+        keys.append(f"email:{normalized_email}")
+    normalized_phone = normalize_phone(phone)
+    if normalized_phone:
+        keys.append(f"phone:{normalized_phone}")
+    return keys
+
+
+class ContactIdentityIndex:
+    """SQLite-backed email/phone -> GHL contact id lookups"""
+
+    def __init__(self, database=None):
+        self.db = database or simple_db_instance
+        self.stats = {"hits": 0, "misses": 0, "recorded": 0, "forgotten": 0}
+
+    def lookup(self, email: Optional[str] = None, phone: Optional[str] = None) -> Optional[str]:
+        """GHL contact id for this email/phone, or None if the index has never seen them"""
+        keys = identity_keys(email, phone)
+        found = self.db.lookup_contact_identities(keys)
+        for key in keys:
+            if key in found:
+                self.stats["hits"] += 1
+                logger.debug("📇 Contact identity hit: %s -> %s", key, found[key])
+                return found[key]
+        self.stats["misses"] += 1
+        return None
+
+    def record(self, ghl_contact_id: str, email: Optional[str] = None, phone: Optional[str] = None,
+               source: str = "webhook") -> int:
+        if not ghl_contact_id:
+            return 0
+        stored = self.db.upsert_contact_identities(
+            [(key, ghl_contact_id, source) for key in identity_keys(email, phone)]
+        )
+        self.stats["recorded"] += stored
+        return stored
+
+    def record_contacts(self, contacts: Iterable[Dict[str, Any]], source: str = "sync") -> int:
+        """Bulk-record GHL contact objects (id/email/phone), e.g. a page from the sync job"""
+        rows = []
+        for contact in contacts:
+            contact_id = contact.get("id")
+            if contact_id:
+                rows.extend((key, contact_id, source)
+                            for key in identity_keys(contact.get("email"), contact.get("phone")))
+        stored = self.db.upsert_contact_identities(rows)
+        self.stats["recorded"] += stored
+        return stored
+
+    def forget(self, ghl_contact_id: str) -> int:
+        """Drop identities of a contact that was deleted or merged away in GHL"""
+        if not ghl_contact_id:
+            return 0
+        removed = self.db.delete_contact_identities(ghl_contact_id)
+        self.stats["forgotten"] += removed
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate_pct": round(self.stats["hits"] / total * 100, 1) if total else 0.0,
+        }
+
+
+# Global instance
+contact_identity_index = ContactIdentityIndex()
+metrics.register_cache("contact_identity", lambda: (contact_identity_index.stats["hits"],
+                                                    contact_identity_index.stats["misses"]))
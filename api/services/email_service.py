@@ -5,13 +5,16 @@ Handles sending emails for 2FA codes, password resets, and notifications
 
 import os
 import asyncio
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Optional, List
 from jinja2 import Environment, FileSystemLoader
 import logging
 
+from api.services.mail_outbox import (
+    mail_outbox, PRIORITY_SECURITY, PRIORITY_ACCOUNT, PRIORITY_NOTIFICATION
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -28,10 +31,16 @@ class EmailService:
         self.template_env = Environment(
             loader=FileSystemLoader('templates/email')
         )
+        
+        # Delivery goes through the outbox's pooled connection for this account
+        mail_outbox.register_sender("default", self.smtp_host, self.smtp_port,
+                                    self.smtp_username, self.smtp_password)
 
     async def send_email(self, to_email: str, subject: str, html_body: str, 
-                        text_body: Optional[str] = None) -> bool:
-        """Send an email"""
+                        text_body: Optional[str] = None,
+                        priority: int = PRIORITY_NOTIFICATION,
+                        expires_in_seconds: Optional[int] = None) -> bool:
+        """Queue an email for delivery (returns once it is persisted to the outbox)"""
         try:
             if not self.smtp_username or not self.smtp_password:
                 logger.warning("SMTP credentials not configured - email not sent")
@@ -52,17 +61,11 @@ class EmailService:
             html_part = MIMEText(html_body, 'html')
             msg.attach(html_part)
 
-            # Send email
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
-
-            logger.info(f"Email sent successfully to {to_email}")
-            return True
+            # Queue for the outbox worker - no SMTP round trips on the request path
+            return mail_outbox.enqueue("default", msg, priority, expires_in_seconds)
 
         except Exception as e:
-            logger.error(f"Failed to send email to {to_email}: {str(e)}")
+            logger.error(f"Failed to queue email to {to_email}: {str(e)}")
             return False
 
     async def send_2fa_code(self, to_email: str, code: str, user_name: str = None) -> bool:
@@ -135,7 +138,9 @@ class EmailService:
         © 2025 Dockside Pro. All rights reserved.
         """
         
-        return await self.send_email(to_email, subject, html_body, text_body)
+        # Codes expire after 10 minutes, so an undelivered email is useless after that
+        return await self.send_email(to_email, subject, html_body, text_body,
+                                     priority=PRIORITY_SECURITY, expires_in_seconds=600)
 
     async def send_password_reset(self, to_email: str, reset_code: str, user_name: str = None) -> bool:
         """Send password reset email"""
@@ -205,7 +210,8 @@ class EmailService:
         © 2025 Dockside Pro. All rights reserved.
         """
         
-        return await self.send_email(to_email, subject, html_body, text_body)
+        return await self.send_email(to_email, subject, html_body, text_body,
+                                     priority=PRIORITY_SECURITY, expires_in_seconds=3600)
 
     async def send_account_locked_notification(self, to_email: str, user_name: str = None, 
                                              unlock_time: str = None) -> bool:
@@ -262,7 +268,7 @@ class EmailService:
         </html>
         """
         
-        return await self.send_email(to_email, subject, html_body)
+        return await self.send_email(to_email, subject, html_body, priority=PRIORITY_ACCOUNT)
 
     async def send_welcome_email(self, to_email: str, user_name: str, verification_code: str) -> bool:
         """Send welcome email with verification code"""
@@ -321,7 +327,7 @@ class EmailService:
         </html>
         """
         
-        return await self.send_email(to_email, subject, html_body)
+        return await self.send_email(to_email, subject, html_body, priority=PRIORITY_ACCOUNT)
 
 
 # Global instance
@@ -24,6 +24,11 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspa
 from config import AppConfig
 from api.services.ghl_api_v2_optimized import OptimizedGoHighLevelAPI
 from database.simple_connection import db as simple_db_instance
+from api.services.contact_identity_index import contact_identity_index
+from utils.metrics import metrics
+
+db_sync_records = metrics.counter("db_sync_records_total", "Records touched by GHL <-> DB syncs", ("stat",))
+db_sync_runs = metrics.counter("db_sync_runs_total", "Completed GHL <-> DB sync runs", ("result",))
 
 logger = logging.getLogger(__name__)
 
@@ -156,6 +161,7 @@ class EnhancedDatabaseSync:
                       f"{self.stats['leads_created']} created, "
                       f"{self.stats['leads_deleted']} deleted.")
             
+            self._record_metrics("success")
             return {
                 'success': True,
                 'message': message,
@@ -165,6 +171,7 @@ class EnhancedDatabaseSync:
             
         except Exception as e:
             logger.error(f"❌ Sync failed: {e}")
+            self._record_metrics("failed")
             return {
                 'success': False,
                 'message': f"Sync failed: {str(e)}",
@@ -172,6 +179,15 @@ class EnhancedDatabaseSync:
                 'error': str(e)
             }
     
+    def _record_metrics(self, result: str) -> None:
+        """Add this run's counts to the process-wide sync counters"""
+        db_sync_runs.inc(result)
+        for stat, value in self.stats.items():
+            if isinstance(value, int) and value:
+                db_sync_records.inc(stat, amount=value)
+        if self.stats['errors']:
+            db_sync_records.inc('errors', amount=len(self.stats['errors']))
+    
     def _fetch_all_ghl_vendors(self) -> Dict[str, Dict]:
         """
         Fetch ALL vendor contacts from GHL
@@ -221,6 +237,9 @@ class EnhancedDatabaseSync:
                     logger.info(f"   No more contacts to fetch")
                     break
                 
+                # Every fetched page also refreshes the local email/phone -> contact id index
+                contact_identity_index.record_contacts(contacts, source="sync")
+                
                 # Process each contact
                 for contact in contacts:
                     contact_id = contact.get('id')
@@ -407,25 +426,12 @@ class EnhancedDatabaseSync:
         return updates
     
     def _parse_coverage_from_zip_codes(self, service_zip_codes_value: str) -> Dict:
-        """Parse service_zip_codes field to determine coverage type"""
-        normalized_value = service_zip_codes_value.upper().strip()
-        
-        if 'GLOBAL' in normalized_value:
-            return {'type': 'global', 'states': [], 'counties': []}
-        elif 'NATIONAL' in normalized_value or normalized_value in ['USA', 'UNITED STATES']:
-            return {'type': 'national', 'states': [], 'counties': []}
-        elif ';' in service_zip_codes_value:
-            items = [s.strip() for s in service_zip_codes_value.split(';') if s.strip()]
-            if items and ', ' in items[0]:
-                counties = items
-                states = list({county.split(', ')[-1].strip() for county in counties if ', ' in county})
-                return {'type': 'county', 'states': states, 'counties': counties}
-        elif ',' in service_zip_codes_value:
-            items = [s.strip() for s in service_zip_codes_value.split(',') if s.strip()]
-            if all(len(item) == 2 and item.isupper() for item in items):
-                return {'type': 'state', 'states': items, 'counties': []}
-        
-        return {'type': None, 'states': None, 'counties': None}
+        """Parse service_zip_codes field (ZIPs, counties, states or GLOBAL/NATIONAL) to determine coverage type"""
+        from api.services.location_service import location_service
+        coverage = location_service.resolve_coverage(service_zip_codes_value)
+        if not coverage['type']:
+            return {'type': None, 'states': None, 'counties': None}
+        return {'type': coverage['type'], 'states': coverage['states'], 'counties': coverage['counties']}
     
     def _values_differ(self, current: Any, new: Any, field_name: str) -> bool:
         """Check if two values are different"""
@@ -500,6 +506,7 @@ class EnhancedDatabaseSync:
             
             if success:
                 self.stats['vendors_deactivated'] += 1
+                contact_identity_index.forget(local_vendor.get('ghl_contact_id'))
                 logger.info(f"🔴 Deactivated vendor (deleted from GHL): {vendor_name}")
             
             # Option 2: Actually delete (more aggressive)
@@ -581,6 +588,8 @@ class EnhancedDatabaseSync:
                 if not contacts:
                     break
                 
+                contact_identity_index.record_contacts(contacts, source="sync")
+                
                 for contact in contacts:
                     contact_id = contact.get('id')
                     custom_fields = {cf['id']: cf.get('value', '') 
@@ -687,6 +696,7 @@ class EnhancedDatabaseSync:
             
             if success:
                 self.stats['leads_deleted'] += 1
+                contact_identity_index.forget(local_lead.get('ghl_contact_id'))
                 logger.info(f"🔴 Deactivated lead (deleted from GHL): {lead_name}")
             
             # Option 2: Actually delete (more aggressive)
@@ -26,6 +26,7 @@ class FieldMapper:
         self._field_reference = {}
         self._ghl_field_mapping = {}  # Maps GHL field keys to their details (ID, name, etc.)
         self._reverse_mappings = {}  # Maps GHL field keys back to form field names
+        self._field_reference_version = None  # Content hash of the GHL metadata the index was built from
         
         # Load all data
         self.load_mappings()
@@ -190,6 +191,19 @@ class FieldMapper:
         
         logger.info(f"🔗 Built GHL field mapping: {processed_count} custom fields processed from {len(all_ghl_fields)} total fields")
     
+    def reload_field_reference(self, field_reference: Dict[str, Any], version: Optional[str] = None):
+        """
+        Replace the in-memory field reference and rebuild the GHL field index.
+        Called by the GHL metadata cache when custom fields change; a matching version is a no-op.
+        """
+        if version and version == self._field_reference_version:
+            return
+        
+        self._field_reference = field_reference
+        self._build_ghl_field_mapping()
+        self._field_reference_version = version
+        logger.info(f"🔄 FieldMapper reloaded field reference (version {(version or 'unknown')[:12]})")
+    
     def _generate_reverse_mappings(self):
         """Generate reverse mappings (GHL field -> form field) for all industries"""
         self._reverse_mappings = {}
@@ -415,6 +429,7 @@ class FieldMapper:
             "total_ghl_fields": total_ghl_fields,
             "field_reference_loaded": total_ghl_fields > 0,
             "reverse_mappings": len(self._reverse_mappings),
+            "field_reference_version": self._field_reference_version,
             "last_updated": self._mappings.get("metadata", {}).get("last_updated", "unknown")
         }
     
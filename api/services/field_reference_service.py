@@ -19,6 +19,7 @@ class FieldReferenceService:
         self.reference_file = Path(reference_file)
         self.field_reference = {}
         self._field_name_index = {}
+        self._version = None
         self._load_field_reference()
         self._build_indices()
     
@@ -83,6 +84,17 @@ class FieldReferenceService:
                 if short_key not in self._field_name_index:
                     self._field_name_index[short_key] = field_key
     
+    def reload_field_reference(self, field_reference: Dict[str, Any], version: Optional[str] = None):
+        """Swap in new field definitions and rebuild indices (skipped when the version is unchanged)"""
+        if version and version == self._version:
+            return
+        
+        self.field_reference = field_reference.get('all_ghl_fields', {})
+        self._build_indices()
+        self.get_field_definition.cache_clear()
+        self._version = version
+        logger.info(f"🔄 Field reference reloaded: {len(self.field_reference)} fields (version {(version or 'unknown')[:12]})")
+    
     @lru_cache(maxsize=256)
     def get_field_definition(self, field_key: str) -> Optional[Dict[str, Any]]:
         """Get field definition by key (cached)"""
@@ -350,6 +362,7 @@ class FieldReferenceService:
             "categories": categories,
             "index_size": len(self._field_name_index),
             "reference_file": str(self.reference_file),
+            "version": self._version,
             "file_exists": self.reference_file.exists()
         }
     
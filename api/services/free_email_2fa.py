@@ -13,6 +13,8 @@ from typing import Optional
 import logging
 from datetime import datetime
 
+from api.services.mail_outbox import mail_outbox, PRIORITY_SECURITY
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,11 +36,18 @@ class FreeEmail2FAService:
         
         # Test mode flag
         self.test_mode = os.getenv("EMAIL_TEST_MODE", "true").lower() == "true"
+        self._register_sender()
+        
+    def _register_sender(self):
+        """(Re)register this account with the mail outbox's connection pool"""
+        mail_outbox.register_sender("free_2fa", self.smtp_host, self.smtp_port,
+                                    self.email_address, self.email_password)
         
     def configure_email(self, email: str, password: str):
         """Configure email credentials programmatically"""
         self.email_address = email
         self.email_password = password
+        self._register_sender()
         logger.info(f"Email configured for: {email}")
     
     async def send_2fa_code(self, to_email: str, code: str, user_name: str = None) -> bool:
@@ -62,9 +71,9 @@ class FreeEmail2FAService:
             success = await self._send_email(to_email, subject, html_body, text_body)
             
             if success:
-                logger.info(f"2FA code sent successfully to {to_email}")
+                logger.info(f"2FA code queued for {to_email}")
             else:
-                logger.error(f"Failed to send 2FA code to {to_email}")
+                logger.error(f"Failed to queue 2FA code for {to_email}")
                 
             return success
             
@@ -73,7 +82,7 @@ class FreeEmail2FAService:
             return False
     
     async def _send_email(self, to_email: str, subject: str, html_body: str, text_body: str) -> bool:
-        """Internal method to send email via SMTP"""
+        """Internal method to queue a 2FA email (delivered over a pooled SMTP connection)"""
         try:
             if not self.email_address or not self.email_password:
                 logger.error("Email credentials not configured")
@@ -93,20 +102,9 @@ class FreeEmail2FAService:
             msg.attach(text_part)
             msg.attach(html_part)
             
-            # Send via Gmail SMTP
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.email_address, self.email_password)
-                server.send_message(msg)
+            # Codes sent ahead of notifications and dropped if not delivered within their 10 minutes
+            return mail_outbox.enqueue("free_2fa", msg, PRIORITY_SECURITY, expires_in_seconds=600)
             
-            return True
-            
-        except smtplib.SMTPAuthenticationError:
-            logger.error("SMTP Authentication failed - check email credentials")
-            return False
-        except smtplib.SMTPException as e:
-            logger.error(f"SMTP error: {str(e)}")
-            return False
         except Exception as e:
             logger.error(f"Unexpected error sending email: {str(e)}")
             return False
@@ -5,6 +5,10 @@ import logging
 from typing import Dict, List, Optional
 from datetime import datetime
 
+from config import AppConfig
+from api.services.ghl_metadata_cache import ghl_metadata_cache
+from api.services.ghl_http import create_ghl_session
+
 logger = logging.getLogger(__name__)
 
 class GoHighLevelAPI:
@@ -17,7 +21,7 @@ class GoHighLevelAPI:
         self.agency_api_key = agency_api_key
         self.location_id = location_id
         self.company_id = company_id  # For V2 user creation API
-        self.base_url = "https://services.leadconnectorhq.com"
+        self.base_url = AppConfig.GHL_API_BASE_URL
         
         # Determine which API version to try first
         if self.location_api_key:
@@ -76,6 +80,13 @@ class GoHighLevelAPI:
             }
         else:
             self.agency_headers = None
+        
+        # Keep-alive session with GHL call metrics (latency/status by endpoint and auth type)
+        self.session = create_ghl_session({
+            "location": self.location_api_key,
+            "pit": self.private_token,
+            "agency": agency_api_key,
+        })
     
     def _make_request_with_fallback(self, method: str, url: str, **kwargs) -> requests.Response:
         """Make request with automatic fallback between API key types"""
@@ -84,7 +95,7 @@ class GoHighLevelAPI:
         try:
             logger.debug(f"🔑 Trying {self.primary_auth_type} for {method} {url}")
             kwargs['headers'] = self.primary_headers
-            response = requests.request(method, url, **kwargs)
+            response = self.session.request(method, url, **kwargs)
             
             # If successful (2xx status), return immediately
             if 200 <= response.status_code < 300:
@@ -96,7 +107,7 @@ class GoHighLevelAPI:
                 logger.warning(f"🔄 {self.primary_auth_type} failed ({response.status_code}), trying {self.fallback_auth_type}")
                 
                 kwargs['headers'] = self.fallback_headers
-                fallback_response = requests.request(method, url, **kwargs)
+                fallback_response = self.session.request(method, url, **kwargs)
                 
                 if 200 <= fallback_response.status_code < 300:
                     logger.info(f"✅ {self.fallback_auth_type} succeeded: {fallback_response.status_code}")
@@ -117,7 +128,7 @@ class GoHighLevelAPI:
                 try:
                     logger.warning(f"🔄 Trying {self.fallback_auth_type} after exception")
                     kwargs['headers'] = self.fallback_headers
-                    return requests.request(method, url, **kwargs)
+                    return self.session.request(method, url, **kwargs)
                 except Exception as fallback_e:
                     logger.error(f"❌ Fallback also failed: {fallback_e}")
                     raise fallback_e
@@ -152,6 +163,50 @@ class GoHighLevelAPI:
             logger.error(f"Error searching contacts: {str(e)}")
             return []
     
+    def search_contacts_paged(self, query: str = "", page_size: int = 100, max_pages: int = 50,
+                              priority: str = "normal") -> List[Dict]:
+        """
+        Search contacts across all pages (search_contacts only returns the first 100).
+        Follows GHL's startAfter/startAfterId cursor and waits on the shared rate limiter per page
+        (pass priority="bulk" from background sweeps so they yield to urgent work).
+        """
+        from api.services.ghl_rate_limiter import ghl_rate_limiter
+
+        contacts = []
+        params = {
+            "locationId": self.location_id,
+            "limit": min(page_size, 100)
+        }
+        if query:
+            params["query"] = query
+
+        try:
+            url = f"{self.base_url}/contacts/"
+            for page in range(max_pages):
+                ghl_rate_limiter.acquire(priority=priority)
+                response = self._make_request_with_fallback("GET", url, params=params)
+                if response.status_code != 200:
+                    logger.error(f"Failed to search contacts (page {page + 1}): {response.status_code} - {response.text}")
+                    break
+
+                data = response.json()
+                page_contacts = data.get('contacts', [])
+                contacts.extend(page_contacts)
+
+                meta = data.get('meta', {})
+                if len(page_contacts) < params["limit"] or not meta.get('startAfterId'):
+                    break
+                params["startAfterId"] = meta['startAfterId']
+                if meta.get('startAfter'):
+                    params["startAfter"] = meta['startAfter']
+            else:
+                logger.warning(f"Stopped contact search after {max_pages} pages ({len(contacts)} contacts)")
+
+            return contacts
+        except Exception as e:
+            logger.error(f"Error searching contacts (paged): {str(e)}")
+            return contacts
+
     def get_contact_by_id(self, contact_id: str) -> Optional[Dict]:
         """Get contact details by ID with fallback authentication"""
         try:
@@ -397,7 +452,9 @@ class GoHighLevelAPI:
             return None
     
     def get_pipelines(self) -> List[Dict]:
-        """Get all pipelines for the location"""
+        """Get all pipelines for the location (the configured location is served from ghl_metadata_cache)"""
+        if self.location_id == AppConfig.GHL_LOCATION_ID:
+            return ghl_metadata_cache.get("pipelines")
         try:
             url = f"{self.base_url}/opportunities/pipelines"
             params = {"locationId": self.location_id}
@@ -414,7 +471,9 @@ class GoHighLevelAPI:
             return []
     
     def get_custom_fields(self) -> List[Dict]:
-        """Get custom fields for the location"""
+        """Get custom fields for the location (the configured location is served from ghl_metadata_cache)"""
+        if self.location_id == AppConfig.GHL_LOCATION_ID:
+            return ghl_metadata_cache.get("custom_fields")
         try:
             url = f"{self.base_url}/locations/{self.location_id}/customFields"
             
@@ -603,7 +662,7 @@ class GoHighLevelAPI:
             
             # Make V2 API request
             logger.info("🚀 SENDING V2 API REQUEST...")
-            response = requests.post(url, headers=v2_headers, json=payload, timeout=30)
+            response = self.session.post(url, headers=v2_headers, json=payload, timeout=30)
             
             # 🔍 ULTRA-DETAILED V2 API RESPONSE DEBUGGING
             logger.error("=" * 80)
@@ -690,7 +749,7 @@ class GoHighLevelAPI:
                 return None
             
             # CORRECTED: Use V1 API endpoint for user creation
-            v1_base_url = "https://rest.gohighlevel.com"
+            v1_base_url = AppConfig.GHL_V1_API_BASE_URL
             url = f"{v1_base_url}/v1/users/"
             
             # CORRECTED: V1 API headers with Agency API key
@@ -769,7 +828,7 @@ class GoHighLevelAPI:
             logger.info(f"📋 Full V1 Payload: {payload}")
             
             # CORRECTED: Use V1 API endpoint and headers
-            response = requests.post(url, headers=v1_headers, json=payload)
+            response = self.session.post(url, headers=v1_headers, json=payload)
             
             logger.info(f"📈 V1 User Creation Response: Status={response.status_code}")
             logger.info(f"📄 V1 Response Headers: {dict(response.headers)}")
@@ -863,7 +922,7 @@ class GoHighLevelAPI:
         """Get user by email address using V1 API (matches create_user endpoint)"""
         try:
             # CORRECTED: Use V1 API base URL and endpoint for user lookup
-            v1_base_url = "https://rest.gohighlevel.com"
+            v1_base_url = AppConfig.GHL_V1_API_BASE_URL
             url = f"{v1_base_url}/v1/users"
             
             # Use Agency API key for V1 user operations
@@ -880,7 +939,7 @@ class GoHighLevelAPI:
             params = {"email": email}
             
             logger.info(f"🔍 V1 User lookup: {url} with email={email}")
-            response = requests.get(url, headers=v1_headers, params=params)
+            response = self.session.get(url, headers=v1_headers, params=params)
             
             logger.info(f"📈 V1 User lookup response: Status={response.status_code}")
             logger.debug(f"📄 V1 User lookup response: {response.text}")
@@ -32,8 +32,8 @@ class EnhancedGoHighLevelAPIV2:
         self.location_id = location_id or AppConfig.GHL_LOCATION_ID
         self.agency_api_key = agency_api_key or AppConfig.GHL_AGENCY_API_KEY
         
-        self.base_url = "https://services.leadconnectorhq.com"
-        self.v1_base_url = "https://rest.gohighlevel.com"
+        self.base_url = AppConfig.GHL_API_BASE_URL
+        self.v1_base_url = AppConfig.GHL_V1_API_BASE_URL
         
         # V2 AI enhancement settings
         self.ai_recovery_enabled = ai_error_recovery_v2.enabled
@@ -8,9 +8,14 @@ Only falls back to v1 for vendor user creation
 import requests
 import logging
 import json
+import threading
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 
+from config import AppConfig
+from api.services.ghl_metadata_cache import ghl_metadata_cache
+from api.services.ghl_http import create_ghl_session
+
 logger = logging.getLogger(__name__)
 
 class OptimizedGoHighLevelAPI:
@@ -30,9 +35,9 @@ class OptimizedGoHighLevelAPI:
         self.agency_api_key = agency_api_key
         self.location_api_key = location_api_key  # V1 API Key (only for vendor user creation)
         
-        # V2 API base URLs
-        self.v2_base_url = "https://services.leadconnectorhq.com"
-        self.v1_base_url = "https://rest.gohighlevel.com"
+        # V2 API base URLs (AppConfig can point them at the local emulator)
+        self.v2_base_url = AppConfig.GHL_API_BASE_URL
+        self.v1_base_url = AppConfig.GHL_V1_API_BASE_URL
         
         # V2 headers with PIT token
         self.v2_headers = {
@@ -56,6 +61,13 @@ class OptimizedGoHighLevelAPI:
         if not self.private_token:
             raise ValueError("PIT token is required for v2 API operations")
         
+        # Keep-alive session so repeated calls reuse TLS connections instead of reconnecting
+        self.session = create_ghl_session({
+            "pit": self.private_token,
+            "agency": agency_api_key,
+            "location": location_api_key,
+        })
+        
         logger.info("🚀 Optimized GHL API v2 initialized")
         logger.info(f"   📍 Using v2 endpoints with PIT token for all operations except vendor user creation")
     
@@ -84,7 +96,7 @@ class OptimizedGoHighLevelAPI:
             
             logger.debug(f"🔍 Searching contacts with v2 API: {params}")
             
-            response = requests.get(url, headers=self.v2_headers, params=params, timeout=10)
+            response = self.session.get(url, headers=self.v2_headers, params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -105,7 +117,7 @@ class OptimizedGoHighLevelAPI:
             # V2 endpoint
             url = f"{self.v2_base_url}/contacts/{contact_id}"
             
-            response = requests.get(url, headers=self.v2_headers, timeout=10)
+            response = self.session.get(url, headers=self.v2_headers, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -133,7 +145,7 @@ class OptimizedGoHighLevelAPI:
             
             logger.info(f"📞 Creating contact with v2 API: {contact_data.get('email', 'unknown')}")
             
-            response = requests.post(url, headers=self.v2_headers, json=payload, timeout=15)
+            response = self.session.post(url, headers=self.v2_headers, json=payload, timeout=15)
             
             if response.status_code in [200, 201]:
                 data = response.json()
@@ -172,7 +184,7 @@ class OptimizedGoHighLevelAPI:
             
             logger.info(f"📝 Updating contact {contact_id} with v2 API")
             
-            response = requests.put(url, headers=self.v2_headers, json=update_data, timeout=15)
+            response = self.session.put(url, headers=self.v2_headers, json=update_data, timeout=15)
             
             if response.status_code in [200, 201]:
                 logger.info(f"✅ Contact {contact_id} updated successfully with v2 API")
@@ -200,7 +212,7 @@ class OptimizedGoHighLevelAPI:
             
             logger.info(f"🎯 Creating opportunity with v2 API")
             
-            response = requests.post(url, headers=self.v2_headers, json=payload, timeout=15)
+            response = self.session.post(url, headers=self.v2_headers, json=payload, timeout=15)
             
             if response.status_code in [200, 201]:
                 data = response.json()
@@ -242,7 +254,7 @@ class OptimizedGoHighLevelAPI:
             logger.info(f"   Request URL: {url}")
             logger.info(f"   Request params: {json.dumps(params, indent=2)}")
             
-            response = requests.get(url, headers=self.v2_headers, params=params, timeout=10)
+            response = self.session.get(url, headers=self.v2_headers, params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -267,7 +279,7 @@ class OptimizedGoHighLevelAPI:
             logger.info(f"📝 Updating opportunity {opportunity_id} with v2 API")
             logger.info(f"   Update data: {json.dumps(update_data, indent=2)}")
             
-            response = requests.put(url, headers=self.v2_headers, json=update_data, timeout=15)
+            response = self.session.put(url, headers=self.v2_headers, json=update_data, timeout=15)
             
             if response.status_code in [200, 201]:
                 logger.info(f"✅ Opportunity {opportunity_id} updated successfully")
@@ -287,7 +299,7 @@ class OptimizedGoHighLevelAPI:
             # V2 endpoint
             url = f"{self.v2_base_url}/opportunities/{opportunity_id}"
             
-            response = requests.get(url, headers=self.v2_headers, timeout=10)
+            response = self.session.get(url, headers=self.v2_headers, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -325,7 +337,7 @@ class OptimizedGoHighLevelAPI:
             if status:
                 params["status"] = status
             
-            response = requests.get(url, headers=self.v2_headers, params=params, timeout=10)
+            response = self.session.get(url, headers=self.v2_headers, params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -339,14 +351,16 @@ class OptimizedGoHighLevelAPI:
             return []
     
     def get_pipelines(self) -> List[Dict]:
-        """Get pipelines using v2 API"""
+        """Get pipelines using v2 API (the configured location is served from ghl_metadata_cache)"""
+        if self.location_id == AppConfig.GHL_LOCATION_ID:
+            return ghl_metadata_cache.get("pipelines")
         try:
             # V2 endpoint
             url = f"{self.v2_base_url}/opportunities/pipelines"
             
             params = {"locationId": self.location_id}
             
-            response = requests.get(url, headers=self.v2_headers, params=params, timeout=10)
+            response = self.session.get(url, headers=self.v2_headers, params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -385,7 +399,7 @@ class OptimizedGoHighLevelAPI:
             logger.info(f"👤 Creating vendor user with v1 API: {user_data.get('email')}")
             logger.debug(f"Using v1 endpoint: {url}")
             
-            response = requests.post(url, headers=self.v1_agency_headers, json=payload, timeout=30)
+            response = self.session.post(url, headers=self.v1_agency_headers, json=payload, timeout=30)
             
             if response.status_code in [200, 201]:
                 data = response.json()
@@ -419,7 +433,7 @@ class OptimizedGoHighLevelAPI:
                 "email": email
             }
             
-            response = requests.get(url, headers=self.v1_agency_headers, params=params, timeout=10)
+            response = self.session.get(url, headers=self.v1_agency_headers, params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -456,7 +470,7 @@ class OptimizedGoHighLevelAPI:
                 "message": message
             }
             
-            response = requests.post(url, headers=self.v2_headers, json=payload, timeout=10)
+            response = self.session.post(url, headers=self.v2_headers, json=payload, timeout=10)
             
             if response.status_code in [200, 201]:
                 logger.info(f"✅ SMS sent successfully to {contact_id}")
@@ -479,7 +493,7 @@ class OptimizedGoHighLevelAPI:
                 "body": note
             }
             
-            response = requests.post(url, headers=self.v2_headers, json=payload, timeout=10)
+            response = self.session.post(url, headers=self.v2_headers, json=payload, timeout=10)
             
             if response.status_code in [200, 201]:
                 logger.info(f"✅ Note added successfully to contact {contact_id}")
@@ -511,7 +525,7 @@ class OptimizedGoHighLevelAPI:
             if assigned_to:
                 payload["assignedTo"] = assigned_to
             
-            response = requests.post(url, headers=self.v2_headers, json=payload, timeout=10)
+            response = self.session.post(url, headers=self.v2_headers, json=payload, timeout=10)
             
             if response.status_code in [200, 201]:
                 logger.info(f"✅ Task added successfully to contact {contact_id}")
@@ -525,12 +539,14 @@ class OptimizedGoHighLevelAPI:
             return False
     
     def get_custom_fields(self) -> List[Dict]:
-        """Get custom fields using v2 API"""
+        """Get custom fields using v2 API (the configured location is served from ghl_metadata_cache)"""
+        if self.location_id == AppConfig.GHL_LOCATION_ID:
+            return ghl_metadata_cache.get("custom_fields")
         try:
             # V2 endpoint for custom fields
             url = f"{self.v2_base_url}/locations/{self.location_id}/customFields"
             
-            response = requests.get(url, headers=self.v2_headers, timeout=10)
+            response = self.session.get(url, headers=self.v2_headers, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -544,14 +560,16 @@ class OptimizedGoHighLevelAPI:
             return []
     
     def get_calendars(self) -> List[Dict]:
-        """Get calendars using v2 API"""
+        """Get calendars using v2 API (the configured location is served from ghl_metadata_cache)"""
+        if self.location_id == AppConfig.GHL_LOCATION_ID:
+            return ghl_metadata_cache.get("calendars")
         try:
             # V2 endpoint for calendars
             url = f"{self.v2_base_url}/calendars/"
             
             params = {"locationId": self.location_id}
             
-            response = requests.get(url, headers=self.v2_headers, params=params, timeout=10)
+            response = self.session.get(url, headers=self.v2_headers, params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -576,7 +594,7 @@ class OptimizedGoHighLevelAPI:
             # Try to get location custom fields as a test
             url = f"{self.v2_base_url}/locations/{self.location_id}/customFields"
             
-            response = requests.get(url, headers=self.v2_headers, timeout=5)
+            response = self.session.get(url, headers=self.v2_headers, timeout=5)
             
             if response.status_code == 200:
                 logger.info("✅ v2 API connection successful!")
@@ -604,4 +622,27 @@ class OptimizedGoHighLevelAPI:
                 "GET /calendars/"
             ],
             "optimization": "Using v2 API with PIT token for all operations except vendor user creation"
-        }
\ No newline at end of file
+        }
+
+
+# ============================================
+# SHARED CLIENT
+# ============================================
+
+_shared_client: Optional[OptimizedGoHighLevelAPI] = None
+_shared_client_lock = threading.Lock()
+
+
+def get_shared_ghl_client() -> OptimizedGoHighLevelAPI:
+    """Process-wide client for the configured location (reuses its connection pool)"""
+    global _shared_client
+    if _shared_client is None:
+        with _shared_client_lock:
+            if _shared_client is None:
+                from config import AppConfig
+                _shared_client = OptimizedGoHighLevelAPI(
+                    private_token=AppConfig.GHL_PRIVATE_TOKEN,
+                    location_id=AppConfig.GHL_LOCATION_ID,
+                    agency_api_key=AppConfig.GHL_AGENCY_API_KEY
+                )
+    return _shared_client
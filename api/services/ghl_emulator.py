@@ -0,0 +1,559 @@
+# api/services/ghl_emulator.py
+"""
+GHL API Emulator
+Local stand-in for services.leadconnectorhq.com (plus the v1 user endpoints) for load
+tests and offline development: contacts (CRUD, search, pagination), opportunities,
+pipelines, custom fields, users, notes/tasks and messages, all in memory. Latency,
+rate limiting (429 with GHL's rate-limit headers) and 5xx errors are configurable.
+
+Point the clients at it with GHL_API_BASE_URL / GHL_V1_API_BASE_URL. It is mounted at
+/ghl-emulator when GHL_EMULATOR_ENABLED=true, or runs on its own port:
+
+    python -m api.services.ghl_emulator --port 8900 --latency lognormal:150:0.5 --error-rate 0.01
+
+Behaviour can be changed at runtime with PUT /_emulator/config; GET /_emulator/stats
+reports request counts, injected errors and rate-limit rejections.
+"""
+
+import os
+import json
+import time
+import math
+import random
+import string
+import asyncio
+import logging
+from threading import Lock
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from config import AppConfig
+
+logger = logging.getLogger(__name__)
+
+ID_ALPHABET = string.ascii_letters + string.digits
+MAX_PAGE_SIZE = 100
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Latency spec -> sampler returning seconds:
+    none | fixed:MS | uniform:MIN_MS:MAX_MS | lognormal:MEDIAN_MS:SIGMA
+    """
+    kind, _, rest = (spec or "none").strip().lower().partition(":")
+    params = [float(p) for p in rest.split(":") if p]
+    if kind in ("", "none", "0"):
+        return lambda rng: 0.0
+    if kind == "fixed" and len(params) == 1:
+        return lambda rng: params[0] / 1000
+    if kind == "uniform" and len(params) == 2:
+        return lambda rng: rng.uniform(params[0], params[1]) / 1000
+    if kind == "lognormal" and len(params) == 2:
+        mu = math.log(max(params[0], 0.001))
+        return lambda rng: rng.lognormvariate(mu, params[1]) / 1000
+    raise ValueError(f"Invalid latency spec: {spec!r}")
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _error(status_code: int, message: str, **extra) -> JSONResponse:
+    return JSONResponse(status_code=status_code, content={"statusCode": status_code, "message": message, **extra})
+
+
+class GHLEmulator:
+    """In-memory GHL location plus the latency/rate-limit/error behaviour applied to every call"""
+
+    def __init__(self, location_id: str = None, latency: str = "none", rate_limit_per_second: float = 0,
+                 rate_limit_burst: int = 100, rate_429: float = 0.0, error_rate: float = 0.0, seed: int = None):
+        self.location_id = location_id or AppConfig.GHL_LOCATION_ID or "emulatorLocation01"
+        self._rng = random.Random(seed)
+        self._lock = Lock()
+        self.configure(latency=latency, rate_limit_per_second=rate_limit_per_second,
+                       rate_limit_burst=rate_limit_burst, rate_429=rate_429, error_rate=error_rate)
+        self.reset()
+
+    # ---------- behaviour ----------
+
+    def configure(self, **settings) -> Dict[str, Any]:
+        with self._lock:
+            if "latency" in settings:
+                self._latency_sampler = parse_latency(settings["latency"])
+                self.latency = settings["latency"]
+            for key in ("rate_limit_per_second", "rate_429", "error_rate"):
+                if key in settings:
+                    setattr(self, key, float(settings[key]))
+            if "rate_limit_burst" in settings:
+                self.rate_limit_burst = int(settings["rate_limit_burst"])
+            self._buckets: Dict[str, Tuple[float, float]] = {}  # token -> (tokens, updated_at)
+        return self.get_config()
+
+    def get_config(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency,
+            "rate_limit_per_second": self.rate_limit_per_second,
+            "rate_limit_burst": self.rate_limit_burst,
+            "rate_429": self.rate_429,
+            "error_rate": self.error_rate,
+        }
+
+    def sample_latency(self) -> float:
+        with self._lock:
+            return self._latency_sampler(self._rng)
+
+    def take_token(self, token: str) -> Tuple[bool, int, float]:
+        """Token bucket per API token -> (allowed, remaining, retry_after_seconds)"""
+        if self.rate_limit_per_second <= 0:
+            return True, self.rate_limit_burst, 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(token, (float(self.rate_limit_burst), now))
+            tokens = min(float(self.rate_limit_burst), tokens + (now - updated_at) * self.rate_limit_per_second)
+            if tokens < 1:
+                self._buckets[token] = (tokens, now)
+                return False, 0, (1 - tokens) / self.rate_limit_per_second
+            self._buckets[token] = (tokens - 1, now)
+            return True, int(tokens - 1), 0.0
+
+    def roll(self, probability: float) -> bool:
+        if probability <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < probability
+
+    # ---------- state ----------
+
+    def reset(self) -> None:
+        with self._lock:
+            self.contacts: Dict[str, Dict[str, Any]] = {}  # insertion order = dateAdded order
+            self.opportunities: Dict[str, Dict[str, Any]] = {}
+            self.users: Dict[str, Dict[str, Any]] = {}
+            self.notes: List[Dict[str, Any]] = []
+            self.tasks: List[Dict[str, Any]] = []
+            self.messages: List[Dict[str, Any]] = []
+            self.pipelines = self._default_pipelines()
+            self.custom_fields = self._default_custom_fields()
+            self.stats = {"requests": 0, "rate_limited": 0, "injected_429": 0, "injected_errors": 0,
+                          "by_endpoint": {}}
+
+    def new_id(self) -> str:
+        with self._lock:
+            return "".join(self._rng.choice(ID_ALPHABET) for _ in range(20))
+
+    def _default_pipelines(self) -> List[Dict[str, Any]]:
+        pipeline_id = AppConfig.PIPELINE_ID or "emulatorPipeline0001"
+        new_stage_id = AppConfig.NEW_LEAD_STAGE_ID or "emulatorStageNew0001"
+        stages = [("New Lead", new_stage_id), ("Contacted", "emulatorStageCont001"),
+                  ("Quoted", "emulatorStageQuot001"), ("Won", "emulatorStageWon0001"),
+                  ("Lost", "emulatorStageLost001")]
+        return [{
+            "id": pipeline_id,
+            "name": "Lead Pipeline",
+            "locationId": self.location_id,
+            "stages": [{"id": stage_id, "name": name, "position": position}
+                       for position, (name, stage_id) in enumerate(stages)],
+        }]
+
+    def _default_custom_fields(self) -> List[Dict[str, Any]]:
+        """The location's real field definitions from field_reference.json, when present"""
+        project_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        try:
+            with open(os.path.join(project_dir, "field_reference.json")) as f:
+                fields = json.load(f).get("all_ghl_fields", {})
+        except (OSError, ValueError):
+            fields = {}
+        return [{
+            "id": field["id"], "name": name, "fieldKey": field["fieldKey"],
+            "dataType": field.get("dataType", "TEXT"), "model": field.get("model", "contact"),
+            "documentType": "field", "locationId": self.location_id,
+        } for name, field in fields.items() if field.get("id") and field.get("fieldKey")]
+
+    def seed_contacts(self, count: int) -> None:
+        """Synthetic contacts for pagination/sync tests"""
+        for index in range(count):
+            contact_id = self.new_id()
+            self.contacts[contact_id] = {
+                "id": contact_id, "locationId": self.location_id,
+                "firstName": "Seed", "lastName": f"Contact {index}",
+                "email": f"seed{index}@emulator.example", "phone": f"+1555{index:07d}",
+                "tags": [], "customFields": [], "dateAdded": _now_iso(), "dateUpdated": _now_iso(),
+            }
+
+    def find_duplicate(self, email: Optional[str], phone: Optional[str]) -> Optional[Dict[str, Any]]:
+        email = (email or "").strip().lower()
+        phone = "".join(ch for ch in (phone or "") if ch.isdigit())[-10:]
+        for contact in self.contacts.values():
+            if email and (contact.get("email") or "").lower() == email:
+                return contact
+            if phone and "".join(ch for ch in (contact.get("phone") or "") if ch.isdigit())[-10:] == phone:
+                return contact
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **{k: v for k, v in self.stats.items() if k != "by_endpoint"},
+            "by_endpoint": dict(self.stats["by_endpoint"]),
+            "contacts": len(self.contacts),
+            "opportunities": len(self.opportunities),
+            "users": len(self.users),
+            "config": self.get_config(),
+        }
+
+
+def _paginate(items: List[Dict[str, Any]], params, key: str, default_limit: int = 20) -> Dict[str, Any]:
+    """Slice by skip/startAfterId (GHL supports both) and build the meta block"""
+    try:
+        limit = max(1, min(int(params.get("limit") or default_limit), MAX_PAGE_SIZE))
+        skip = max(0, int(params.get("skip") or 0))
+    except ValueError:
+        limit, skip = default_limit, 0
+    start_after_id = params.get("startAfterId")
+    if start_after_id:
+        ids = [item["id"] for item in items]
+        skip = ids.index(start_after_id) + 1 if start_after_id in ids else len(items)
+    page = items[skip:skip + limit]
+    has_more = skip + limit < len(items)
+    return {
+        key: page,
+        "meta": {
+            "total": len(items),
+            "currentPage": skip // limit + 1,
+            "nextPage": skip // limit + 2 if has_more else None,
+            "startAfterId": page[-1]["id"] if page and has_more else None,
+            "startAfter": int(time.time() * 1000) if page and has_more else None,
+        },
+    }
+
+
+def create_ghl_emulator_app(emulator: GHLEmulator = None) -> FastAPI:
+    """ASGI app serving the GHL endpoints used by our clients from a GHLEmulator"""
+    if emulator is None:
+        emulator = GHLEmulator(
+            latency=AppConfig.GHL_EMULATOR_LATENCY,
+            rate_limit_per_second=AppConfig.GHL_EMULATOR_RATE_LIMIT_PER_SECOND,
+            rate_limit_burst=AppConfig.GHL_EMULATOR_RATE_LIMIT_BURST,
+            rate_429=AppConfig.GHL_EMULATOR_429_RATE,
+            error_rate=AppConfig.GHL_EMULATOR_ERROR_RATE,
+        )
+        emulator.seed_contacts(AppConfig.GHL_EMULATOR_SEED_CONTACTS)
+
+    app = FastAPI(title="GHL API Emulator", docs_url=None, redoc_url=None, openapi_url=None)
+    app.state.emulator = emulator
+
+    @app.middleware("http")
+    async def behaviour(request: Request, call_next):
+        path = request.url.path
+        if path.startswith("/_emulator"):
+            return await call_next(request)
+
+        emulator.stats["requests"] += 1
+        endpoint = f"{request.method} {'/'.join('{id}' if len(s) == 20 else s for s in path.split('/'))}"
+        emulator.stats["by_endpoint"][endpoint] = emulator.stats["by_endpoint"].get(endpoint, 0) + 1
+
+        authorization = request.headers.get("authorization", "")
+        if not authorization.startswith("Bearer ") or len(authorization) <= 7:
+            return _error(401, "Invalid JWT")
+
+        allowed, remaining, retry_after = emulator.take_token(authorization)
+        rate_headers = {
+            "X-RateLimit-Max": str(emulator.rate_limit_burst),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Interval-Milliseconds": "10000",
+        }
+        if not allowed or emulator.roll(emulator.rate_429):
+            emulator.stats["rate_limited" if not allowed else "injected_429"] += 1
+            response = _error(429, "Too many requests")
+            response.headers.update({**rate_headers, "Retry-After": str(max(1, math.ceil(retry_after)))})
+            return response
+
+        delay = emulator.sample_latency()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if emulator.roll(emulator.error_rate):
+            emulator.stats["injected_errors"] += 1
+            with emulator._lock:
+                status_code = emulator._rng.choice((500, 502, 503))
+            return _error(status_code, "Injected upstream error")
+
+        response = await call_next(request)
+        response.headers.update(rate_headers)
+        return response
+
+    # ---------- emulator control ----------
+
+    @app.get("/_emulator/stats")
+    async def emulator_stats():
+        return emulator.get_stats()
+
+    @app.put("/_emulator/config")
+    async def emulator_config(request: Request):
+        settings = await request.json()
+        try:
+            return emulator.configure(**{k: v for k, v in settings.items() if k in emulator.get_config()})
+        except ValueError as e:
+            return _error(400, str(e))
+
+    @app.post("/_emulator/reset")
+    async def emulator_reset(seed_contacts: int = 0):
+        emulator.reset()
+        emulator.seed_contacts(seed_contacts)
+        return emulator.get_stats()
+
+    # ---------- contacts ----------
+
+    @app.get("/contacts/")
+    async def list_contacts(request: Request):
+        params = request.query_params
+        contacts = list(emulator.contacts.values())
+        email = (params.get("email") or "").lower()
+        phone = "".join(ch for ch in params.get("phone") or "" if ch.isdigit())[-10:]
+        query = (params.get("query") or "").lower()
+        if email:
+            contacts = [c for c in contacts if (c.get("email") or "").lower() == email]
+        elif phone:
+            contacts = [c for c in contacts if "".join(ch for ch in c.get("phone") or "" if ch.isdigit())[-10:] == phone]
+        elif query:
+            contacts = [c for c in contacts if any(query in str(c.get(f) or "").lower()
+                                                   for f in ("email", "phone", "firstName", "lastName", "companyName"))]
+        return _paginate(contacts, params, "contacts")
+
+    @app.post("/contacts/")
+    async def create_contact(request: Request):
+        payload = await request.json()
+        duplicate = emulator.find_duplicate(payload.get("email"), payload.get("phone"))
+        if duplicate:
+            return _error(400, "This location does not allow duplicated contacts.",
+                          meta={"contactName": f"{duplicate.get('firstName', '')} {duplicate.get('lastName', '')}".strip(),
+                                "contactId": duplicate["id"]})
+        contact_id = emulator.new_id()
+        contact = {"tags": [], "customFields": [], **payload, "id": contact_id,
+                   "locationId": payload.get("locationId") or emulator.location_id,
+                   "dateAdded": _now_iso(), "dateUpdated": _now_iso()}
+        emulator.contacts[contact_id] = contact
+        return JSONResponse(status_code=201, content={"contact": contact})
+
+    @app.get("/contacts/{contact_id}")
+    async def get_contact(contact_id: str):
+        contact = emulator.contacts.get(contact_id)
+        if not contact:
+            return _error(400, "Contact not found")
+        return {"contact": contact}
+
+    @app.put("/contacts/{contact_id}")
+    async def update_contact(contact_id: str, request: Request):
+        contact = emulator.contacts.get(contact_id)
+        if not contact:
+            return _error(400, "Contact not found")
+        payload = await request.json()
+        if payload.get("customFields"):
+            merged = {f.get("id") or f.get("key"): f for f in contact.get("customFields", [])}
+            merged.update({f.get("id") or f.get("key"): f for f in payload["customFields"]})
+            payload["customFields"] = list(merged.values())
+        contact.update({**payload, "dateUpdated": _now_iso()})
+        return {"succeded": True, "contact": contact}
+
+    @app.delete("/contacts/{contact_id}")
+    async def delete_contact(contact_id: str):
+        if emulator.contacts.pop(contact_id, None) is None:
+            return _error(400, "Contact not found")
+        return {"succeded": True}
+
+    @app.post("/contacts/{contact_id}/notes")
+    async def add_note(contact_id: str, request: Request):
+        if contact_id not in emulator.contacts:
+            return _error(400, "Contact not found")
+        note = {**(await request.json()), "id": emulator.new_id(), "contactId": contact_id, "dateAdded": _now_iso()}
+        emulator.notes.append(note)
+        return JSONResponse(status_code=201, content={"note": note})
+
+    @app.post("/contacts/{contact_id}/tasks")
+    async def add_task(contact_id: str, request: Request):
+        if contact_id not in emulator.contacts:
+            return _error(400, "Contact not found")
+        task = {**(await request.json()), "id": emulator.new_id(), "contactId": contact_id}
+        emulator.tasks.append(task)
+        return JSONResponse(status_code=201, content={"task": task})
+
+    @app.post("/conversations/messages")
+    async def send_message(request: Request):
+        message = {**(await request.json()), "messageId": emulator.new_id(), "conversationId": emulator.new_id()}
+        emulator.messages.append(message)
+        return message
+
+    # ---------- opportunities (static paths before /{opportunity_id}) ----------
+
+    def matching_opportunities(params) -> List[Dict[str, Any]]:
+        contact_id = params.get("contact_id") or params.get("contactId")
+        pipeline_id = params.get("pipeline_id") or params.get("pipelineId")
+        stage_id = params.get("pipeline_stage_id") or params.get("stageId")
+        status = params.get("status")
+        query = (params.get("q") or "").lower()
+        return [
+            o for o in emulator.opportunities.values()
+            if (not contact_id or o.get("contactId") == contact_id)
+            and (not pipeline_id or o.get("pipelineId") == pipeline_id)
+            and (not stage_id or o.get("pipelineStageId") == stage_id)
+            and (not status or status == "all" or o.get("status") == status)
+            and (not query or query in str(o.get("name") or "").lower())
+        ]
+
+    @app.get("/opportunities")
+    async def list_opportunities(request: Request):
+        # Opportunities by contact (GoHighLevelAPI.get_opportunities_by_contact)
+        return _paginate(matching_opportunities(request.query_params), request.query_params, "opportunities")
+
+    @app.get("/opportunities/search")
+    async def search_opportunities(request: Request):
+        return _paginate(matching_opportunities(request.query_params), request.query_params, "opportunities")
+
+    @app.get("/opportunities/pipelines")
+    async def get_pipelines():
+        return {"pipelines": emulator.pipelines}
+
+    @app.post("/opportunities/")
+    async def create_opportunity(request: Request):
+        payload = await request.json()
+        if payload.get("contactId") not in emulator.contacts:
+            return _error(400, "Contact not found")
+        pipeline = next((p for p in emulator.pipelines if p["id"] == payload.get("pipelineId")), None)
+        if not pipeline:
+            return _error(400, "Pipeline not found")
+        if payload.get("pipelineStageId") and payload["pipelineStageId"] not in {s["id"] for s in pipeline["stages"]}:
+            return _error(400, "Pipeline stage not found")
+        opportunity_id = emulator.new_id()
+        opportunity = {"status": "open", "monetaryValue": 0, **payload, "id": opportunity_id,
+                       "locationId": payload.get("locationId") or emulator.location_id,
+                       "createdAt": _now_iso(), "updatedAt": _now_iso()}
+        emulator.opportunities[opportunity_id] = opportunity
+        return JSONResponse(status_code=201, content={"opportunity": opportunity})
+
+    @app.get("/opportunities/{opportunity_id}")
+    async def get_opportunity(opportunity_id: str):
+        opportunity = emulator.opportunities.get(opportunity_id)
+        if not opportunity:
+            return _error(404, "Opportunity not found")
+        return {"opportunity": opportunity}
+
+    @app.put("/opportunities/{opportunity_id}")
+    async def update_opportunity(opportunity_id: str, request: Request):
+        opportunity = emulator.opportunities.get(opportunity_id)
+        if not opportunity:
+            return _error(404, "Opportunity not found")
+        opportunity.update({**(await request.json()), "updatedAt": _now_iso()})
+        return {"opportunity": opportunity}
+
+    @app.delete("/opportunities/{opportunity_id}")
+    async def delete_opportunity(opportunity_id: str):
+        if emulator.opportunities.pop(opportunity_id, None) is None:
+            return _error(404, "Opportunity not found")
+        return {"succeded": True}
+
+    # ---------- location metadata ----------
+
+    @app.get("/locations/{location_id}/customFields")
+    async def get_custom_fields(location_id: str):
+        return {"customFields": emulator.custom_fields}
+
+    @app.post("/locations/{location_id}/customFields")
+    async def create_custom_field(location_id: str, request: Request):
+        payload = await request.json()
+        name = payload.get("name", "")
+        field = {"dataType": "TEXT", "model": "contact", **payload, "id": emulator.new_id(),
+                 "fieldKey": f"contact.{name.lower().replace(' ', '_')}", "documentType": "field",
+                 "locationId": location_id}
+        emulator.custom_fields.append(field)
+        return JSONResponse(status_code=201, content={"customField": field})
+
+    @app.get("/calendars/")
+    async def get_calendars():
+        return {"calendars": []}
+
+    # ---------- users (v2 and the v1 agency endpoints) ----------
+
+    def _create_user(payload: Dict[str, Any]) -> JSONResponse:
+        email = (payload.get("email") or "").lower()
+        if any((u.get("email") or "").lower() == email for u in emulator.users.values()):
+            return _error(400, "User with this email already exists")
+        user_id = emulator.new_id()
+        user = {key: value for key, value in payload.items() if key != "password"}
+        user.update({"id": user_id, "locationIds": payload.get("locationIds") or [emulator.location_id]})
+        emulator.users[user_id] = user
+        return JSONResponse(status_code=201, content=user)
+
+    def _list_users(request: Request) -> Dict[str, Any]:
+        email = (request.query_params.get("email") or "").lower()
+        users = [u for u in emulator.users.values() if not email or (u.get("email") or "").lower() == email]
+        return {"users": users}
+
+    @app.post("/users/")
+    async def create_user(request: Request):
+        return _create_user(await request.json())
+
+    @app.get("/users/")
+    async def list_users(request: Request):
+        return _list_users(request)
+
+    @app.post("/v1/users/")
+    async def create_user_v1(request: Request):
+        return _create_user(await request.json())
+
+    @app.get("/v1/users")
+    @app.get("/v1/users/")
+    async def list_users_v1(request: Request):
+        return _list_users(request)
+
+    @app.get("/users/{user_id}")
+    @app.get("/locations/{location_id}/users/{user_id}")
+    async def get_user(user_id: str):
+        user = emulator.users.get(user_id)
+        return user if user else _error(404, "User not found")
+
+    @app.put("/users/{user_id}")
+    @app.put("/locations/{location_id}/users/{user_id}")
+    async def update_user(user_id: str, request: Request):
+        user = emulator.users.get(user_id)
+        if not user:
+            return _error(404, "User not found")
+        user.update(await request.json())
+        return user
+
+    @app.delete("/users/{user_id}")
+    @app.delete("/locations/{location_id}/users/{user_id}")
+    async def delete_user(user_id: str):
+        if emulator.users.pop(user_id, None) is None:
+            return _error(404, "User not found")
+        return {"succeded": True}
+
+    return app
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the local GHL API emulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", default=AppConfig.GHL_EMULATOR_LATENCY)
+    parser.add_argument("--rate-limit", type=float, default=AppConfig.GHL_EMULATOR_RATE_LIMIT_PER_SECOND,
+                        help="Requests/second per token (0 = unlimited)")
+    parser.add_argument("--burst", type=int, default=AppConfig.GHL_EMULATOR_RATE_LIMIT_BURST)
+    parser.add_argument("--rate-429", type=float, default=AppConfig.GHL_EMULATOR_429_RATE)
+    parser.add_argument("--error-rate", type=float, default=AppConfig.GHL_EMULATOR_ERROR_RATE)
+    parser.add_argument("--seed-contacts", type=int, default=AppConfig.GHL_EMULATOR_SEED_CONTACTS)
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for ids, latency and injected errors")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    standalone = GHLEmulator(latency=args.latency, rate_limit_per_second=args.rate_limit,
+                             rate_limit_burst=args.burst, rate_429=args.rate_429,
+                             error_rate=args.error_rate, seed=args.seed)
+    standalone.seed_contacts(args.seed_contacts)
+    logger.info(f"🧪 GHL emulator on http://{args.host}:{args.port} - set GHL_API_BASE_URL and "
+                f"GHL_V1_API_BASE_URL to this address")
+    uvicorn.run(create_ghl_emulator_app(standalone), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,58 @@
+# api/services/ghl_http.py
+"""
+GHL HTTP Sessions
+Keep-alive requests sessions for every GHL client, with the metrics adapter mounted so each
+call records ghl_request_duration by endpoint, auth type and status.
+"""
+
+import re
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.metrics import ghl_request_duration
+
+# Path segments that are IDs (GHL IDs are long alphanumerics) collapse to {id} in metric labels
+_ID_SEGMENT = re.compile(r"^(?=.*\d)[A-Za-z0-9_-]{10,}$|^\d+$")
+
+
+def _endpoint_label(path: str) -> str:
+    return "/".join("{id}" if _ID_SEGMENT.match(segment) else segment for segment in path.split("/"))
+
+
+class MetricsHTTPAdapter(HTTPAdapter):
+    """Records latency/status of every request sent through the session, by endpoint and auth type"""
+
+    def __init__(self, auth_types: Dict[str, str], **kwargs):
+        self.auth_types = auth_types  # Authorization header -> label
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = super().send(request, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            ghl_request_duration.observe(
+                time.perf_counter() - start,
+                request.method,
+                _endpoint_label(request.path_url.split("?", 1)[0]),
+                self.auth_types.get(request.headers.get("Authorization", ""), "other"),
+                status
+            )
+
+
+def create_ghl_session(tokens: Dict[str, Optional[str]]) -> requests.Session:
+    """
+    Session with the metrics adapter mounted. `tokens` maps an auth type label
+    (pit, location, agency) to its token; unset tokens are ignored.
+    """
+    session = requests.Session()
+    adapter = MetricsHTTPAdapter({f"Bearer {token}": label for label, token in tokens.items() if token})
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
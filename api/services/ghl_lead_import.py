@@ -0,0 +1,210 @@
+# api/services/ghl_lead_import.py
+"""
+GHL Lead Import
+Turns an existing GHL contact into a database lead (field mapping, service classification,
+ZIP -> county) and links or creates its opportunity. Shared by the webhook handlers and
+the unassigned-lead batch router.
+"""
+
+import json
+import uuid
+import logging
+from typing import Dict, Any, Optional
+
+from config import AppConfig
+from database.simple_connection import db as simple_db_instance
+from api.services.ghl_api_v2_optimized import OptimizedGoHighLevelAPI
+from api.services.field_mapper import field_mapper
+from api.services.location_service import location_service
+from api.services.service_mapper import get_service_category as get_direct_service_category
+
+logger = logging.getLogger(__name__)
+
+
+async def create_lead_from_ghl_contact(
+    ghl_contact_data: Dict[str, Any],
+    account_id: str,
+    form_identifier: str = "bulk_assignment"
+) -> tuple[str, Optional[str]]:
+    """
+    SHARED PIPELINE: Convert GHL contact to database lead + opportunity
+    Used by both webhook and bulk assignment workflows for consistency
+    
+    Returns: (lead_id, opportunity_id)
+    """
+    try:
+        # Step 1: Extract customer data (reuse webhook logic)
+        customer_data = {
+            "name": f"{ghl_contact_data.get('firstName', '')} {ghl_contact_data.get('lastName', '')}".strip(),
+            "email": ghl_contact_data.get("email", ""),
+            "phone": ghl_contact_data.get("phone", "")
+        }
+        
+        # Step 2: Apply field mapping (same as webhook system)
+        mapped_payload = field_mapper.map_payload(ghl_contact_data, industry="marine")
+        logger.info(f"🔄 Shared pipeline field mapping. Original keys: {list(ghl_contact_data.keys())}, Mapped keys: {list(mapped_payload.keys())}")
+        
+        # Step 3: Service classification (reuse webhook logic)
+        service_category = get_direct_service_category(form_identifier)
+        
+        # Step 4: ZIP → County conversion (critical for routing)
+        zip_code = mapped_payload.get("zip_code_of_service", "")
+        service_county = ""
+        service_state = ""
+        
+        if zip_code and len(zip_code) == 5 and zip_code.isdigit():
+            logger.info(f"🗺️ Converting ZIP {zip_code} to county using shared pipeline")
+            location_data = location_service.zip_to_location(zip_code)
+            
+            if not location_data.get('error'):
+                county = location_data.get('county', '')
+                state = location_data.get('state', '')
+                if county and state:
+                    service_county = f"{county}, {state}"
+                    service_state = state
+                    logger.info(f"✅ Shared pipeline ZIP {zip_code} → {service_county}")
+                else:
+                    logger.warning(f"⚠️ Shared pipeline ZIP {zip_code} conversion incomplete: county={county}, state={state}")
+            else:
+                logger.warning(f"⚠️ Shared pipeline could not convert ZIP {zip_code}: {location_data['error']}")
+        else:
+            logger.warning(f"⚠️ Shared pipeline invalid ZIP code format: '{zip_code}'")
+
+        # Step 5: Create database lead using correct schema
+        lead_id_str = str(uuid.uuid4())
+        
+        # Build service_details from all mapped fields
+        service_details = {}
+        standard_lead_fields = {
+            "firstName", "lastName", "email", "phone", "primary_service_category",
+            "customer_zip_code", "specific_service_requested"
+        }
+        
+        for field_key, field_value in mapped_payload.items():
+            if field_value and field_value != "" and field_key not in standard_lead_fields:
+                service_details[field_key] = field_value
+                
+        service_details.update({
+            "form_source": form_identifier,
+            "processing_method": "shared_pipeline",
+            "created_via": "create_lead_from_ghl_contact"
+        })
+        
+        # Database INSERT using correct schema
+        conn = None
+        try:
+            conn = simple_db_instance._get_conn()
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT INTO leads (
+                    id, account_id, ghl_contact_id, ghl_opportunity_id, customer_name,
+                    customer_email, customer_phone, primary_service_category, specific_service_requested,
+                    service_zip_code, service_county, service_state, vendor_id, 
+                    status, priority, source, service_details, 
+                    created_at, updated_at, service_city, 
+                    service_complexity, estimated_duration, requires_emergency_response, 
+                    classification_confidence, classification_reasoning
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, ?, ?, ?, ?, ?, ?)
+            ''', (
+                lead_id_str,                                                # id
+                account_id,                                                 # account_id
+                ghl_contact_data.get('id'),                                 # ghl_contact_id
+                None,                                                       # ghl_opportunity_id (will be updated)
+                customer_data.get("name", ""),                              # customer_name
+                customer_data.get("email", "").lower().strip() if customer_data.get("email") else None,  # customer_email
+                customer_data.get("phone", ""),                             # customer_phone
+                service_category,                                           # primary_service_category (FIXED)
+                mapped_payload.get("specific_service_requested", ""),                # specific_service_requested (FIXED)
+                zip_code,                                                   # service_zip_code (FIXED)
+                service_county,                                             # service_county
+                service_state,                                              # service_state
+                None,                                                       # vendor_id (unassigned)
+                "unassigned",                                               # status
+                "normal",                                                   # priority
+                form_identifier,                                            # source
+                json.dumps(service_details),                                # service_details
+                "",                                                         # service_city
+                "simple",                                                   # service_complexity
+                "medium",                                                   # estimated_duration
+                False,                                                      # requires_emergency_response
+                1.0,                                                        # classification_confidence
+                f"Created via shared pipeline from {form_identifier}"       # classification_reasoning
+            ))
+            
+            conn.commit()
+            logger.info(f"✅ Shared pipeline created lead: {lead_id_str}")
+            
+        except Exception as e:
+            logger.error(f"❌ Shared pipeline lead creation error: {e}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+        
+        # Step 6: Create opportunity if needed (check for existing first)
+        opportunity_id = None
+        if AppConfig.PIPELINE_ID and AppConfig.NEW_LEAD_STAGE_ID:
+            # Use optimized v2 API for better performance
+            ghl_api_client = OptimizedGoHighLevelAPI(
+                private_token=AppConfig.GHL_PRIVATE_TOKEN,
+                location_id=AppConfig.GHL_LOCATION_ID,
+                agency_api_key=AppConfig.GHL_AGENCY_API_KEY
+            )
+            
+            # First check if an opportunity already exists for this contact
+            existing_opportunities = ghl_api_client.get_opportunities_by_contact(ghl_contact_data.get('id'))
+            
+            if existing_opportunities and len(existing_opportunities) > 0:
+                # Use existing opportunity
+                opportunity_id = existing_opportunities[0].get('id')
+                logger.info(f"📋 Shared pipeline using existing opportunity: {opportunity_id}")
+            else:
+                # Create new opportunity
+                logger.info(f"📈 Shared pipeline creating opportunity for {service_category} lead")
+                
+                customer_name = customer_data["name"]
+                
+                opportunity_data = {
+                    'contactId': ghl_contact_data.get('id'),
+                    'pipelineId': AppConfig.PIPELINE_ID,
+                    'pipelineStageId': AppConfig.NEW_LEAD_STAGE_ID,
+                    'name': f"{customer_name} - {service_category}",
+                    'monetaryValue': 0,
+                    'status': 'open',
+                    'source': f"{form_identifier} (DSP Shared Pipeline)",
+                    'locationId': AppConfig.GHL_LOCATION_ID,
+                }
+                
+                opportunity_response = ghl_api_client.create_opportunity(opportunity_data)
+                
+                # Handle both v1 and v2 API response formats
+                if opportunity_response:
+                    if opportunity_response.get('opportunity', {}).get('id'):
+                        # v2 API format - opportunity is nested
+                        opportunity_id = opportunity_response['opportunity']['id']
+                        logger.info(f"✅ Shared pipeline created opportunity (v2 format): {opportunity_id}")
+                    elif opportunity_response.get('id'):
+                        # v1 API format - id at root level
+                        opportunity_id = opportunity_response['id']
+                        logger.info(f"✅ Shared pipeline created opportunity (v1 format): {opportunity_id}")
+                    else:
+                        logger.error(f"❌ Shared pipeline unexpected opportunity response format: {opportunity_response}")
+                else:
+                    logger.error(f"❌ Shared pipeline failed to create opportunity: No response received")
+            
+            # Update lead with opportunity ID if we have one
+            if opportunity_id:
+                try:
+                    simple_db_instance.update_lead_opportunity_id(lead_id_str, opportunity_id)
+                    logger.info(f"✅ Shared pipeline linked opportunity {opportunity_id} to lead {lead_id_str}")
+                except Exception as e:
+                    logger.warning(f"⚠️ Shared pipeline could not link opportunity ID: {e}")
+        else:
+            logger.warning("⚠️ Shared pipeline: Pipeline not configured - skipping opportunity creation")
+        
+        return lead_id_str, opportunity_id
+        
+    except Exception as e:
+        logger.error(f"❌ Shared pipeline error for contact {ghl_contact_data.get('id', 'unknown')}: {e}")
+        raise
@@ -0,0 +1,381 @@
+# api/services/ghl_metadata_cache.py
+"""
+GHL Location Metadata Cache
+Persists custom fields, pipelines and calendars to disk, versioned by a content hash.
+Serves stale data while a background thread revalidates against GHL, and notifies
+subscribers (FieldMapper, FieldReferenceService) only when the content actually changed.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable
+
+from config import AppConfig
+from api.services.ghl_http import create_ghl_session
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Default time-to-live per metadata kind (seconds). Custom fields and pipelines change rarely.
+DEFAULT_TTLS = {
+    "custom_fields": 15 * 60,
+    "pipelines": 15 * 60,
+    "calendars": 30 * 60,
+}
+
+
+def compute_content_hash(data: Any) -> str:
+    """Stable SHA-256 of JSON-serializable data (key order independent)"""
+    serialized = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def build_field_reference(custom_fields: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Convert raw GHL custom field definitions into the field_reference.json structure
+    (client_fields / vendor_fields / all_ghl_fields) used by FieldMapper and FieldReferenceService
+    """
+    all_ghl_fields = {}
+    client_fields = {}
+    vendor_fields = {}
+
+    for field in custom_fields:
+        if field.get('documentType') != 'field':
+            continue
+
+        field_name = field.get('name')
+        field_key = field.get('fieldKey')
+        field_id = field.get('id')
+
+        if field_name and field_key and field_id:
+            field_data = {
+                "fieldKey": field_key,
+                "id": field_id,
+                "dataType": field.get('dataType', 'TEXT'),
+                "model": field.get('model', 'contact')
+            }
+
+            all_ghl_fields[field_name] = field_data
+
+            # Categorize as client or vendor field
+            if any(keyword in field_name.lower() for keyword in ['vendor', 'company', 'business', 'service']):
+                vendor_fields[field_name] = field_data
+            else:
+                client_fields[field_name] = field_data
+
+    return {
+        "client_fields": client_fields,
+        "vendor_fields": vendor_fields,
+        "all_ghl_fields": all_ghl_fields,
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+
+_session = None
+
+
+def _get_session():
+    """Metrics-instrumented session for metadata fetches (created on first refresh)"""
+    global _session
+    if _session is None:
+        _session = create_ghl_session({"pit": AppConfig.GHL_PRIVATE_TOKEN})
+    return _session
+
+
+def _fetch_location_resource(path: str, result_key: str, params: Optional[Dict[str, Any]] = None) -> List[Dict]:
+    """
+    Fetch a metadata collection from the GHL v2 API.
+    Raises on any failure so the cache never replaces good data with an empty result.
+    """
+    if not AppConfig.GHL_PRIVATE_TOKEN or not AppConfig.GHL_LOCATION_ID:
+        raise RuntimeError("GHL_PRIVATE_TOKEN and GHL_LOCATION_ID are required to refresh metadata")
+
+    headers = {
+        "Accept": "application/json",
+        "Authorization": f"Bearer {AppConfig.GHL_PRIVATE_TOKEN}",
+        "Content-Type": "application/json",
+        "Version": "2021-07-28"
+    }
+    response = _get_session().get(f"{AppConfig.GHL_API_BASE_URL}{path}", headers=headers, params=params, timeout=10)
+    if response.status_code != 200:
+        raise RuntimeError(f"GHL returned {response.status_code} for {path}: {response.text[:200]}")
+    return response.json().get(result_key, [])
+
+
+def fetch_custom_fields() -> List[Dict]:
+    return _fetch_location_resource(f"/locations/{AppConfig.GHL_LOCATION_ID}/customFields", "customFields")
+
+
+def fetch_pipelines() -> List[Dict]:
+    return _fetch_location_resource("/opportunities/pipelines", "pipelines", {"locationId": AppConfig.GHL_LOCATION_ID})
+
+
+def fetch_calendars() -> List[Dict]:
+    return _fetch_location_resource("/calendars/", "calendars", {"locationId": AppConfig.GHL_LOCATION_ID})
+
+
+class GHLMetadataCache:
+    """
+    Stale-while-revalidate cache for GHL location metadata.
+
+    - Entries are persisted to a JSON file so restarts start warm
+    - Each entry carries a content hash; subscribers are only called when it changes
+    - Reads never block on GHL once an entry exists; stale entries are refreshed in a background thread
+    """
+
+    def __init__(self, cache_file: str = None):
+        if cache_file is None:
+            project_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            cache_file = os.path.join(project_dir, "ghl_metadata_cache.json")
+        self.cache_file = cache_file
+
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._sources: Dict[str, Callable[[], List[Dict]]] = {}
+        self._ttls: Dict[str, int] = dict(DEFAULT_TTLS)
+        self._subscribers: Dict[str, List[Callable[[List[Dict], str], None]]] = {}
+        self._lock = threading.RLock()
+        self._refreshing: set = set()
+        self._last_errors: Dict[str, str] = {}
+
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+        self.stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "content_changes": 0
+        }
+
+        self._load_from_disk()
+
+    # ============================================
+    # CONFIGURATION
+    # ============================================
+
+    def register_source(self, kind: str, fetcher: Callable[[], List[Dict]], ttl_seconds: Optional[int] = None):
+        """Register the function used to fetch fresh data for a metadata kind"""
+        with self._lock:
+            self._sources[kind] = fetcher
+            if ttl_seconds is not None:
+                self._ttls[kind] = ttl_seconds
+
+    def subscribe(self, kind: str, callback: Callable[[List[Dict], str], None], replay: bool = True):
+        """
+        Call `callback(data, content_hash)` whenever the content of `kind` changes.
+        With replay=True the callback also runs immediately if an entry is already cached.
+        """
+        with self._lock:
+            self._subscribers.setdefault(kind, []).append(callback)
+            entry = self._entries.get(kind)
+
+        if replay and entry:
+            self._notify_one(kind, callback, entry["data"], entry["hash"])
+
+    # ============================================
+    # READ PATH
+    # ============================================
+
+    def get(self, kind: str, allow_fetch: bool = True) -> List[Dict]:
+        """
+        Return cached data for `kind`.
+        Stale entries are returned immediately and revalidated in the background.
+        Only a cold cache (no entry at all) fetches inline, and only when allow_fetch is True.
+        """
+        with self._lock:
+            entry = self._entries.get(kind)
+
+        if entry is None:
+            self.stats["misses"] += 1
+            if allow_fetch and self.refresh(kind):
+                entry = self._entries.get(kind)
+            return entry["data"] if entry else []
+
+        if self._is_stale(kind, entry):
+            self.stats["stale_hits"] += 1
+            self._refresh_in_background(kind)
+        else:
+            self.stats["hits"] += 1
+
+        return entry["data"]
+
+    def peek(self, kind: str) -> Optional[Dict[str, Any]]:
+        """Return cache entry metadata without fetching (safe for health checks)"""
+        with self._lock:
+            entry = self._entries.get(kind)
+        if not entry:
+            return None
+        return {
+            "hash": entry["hash"],
+            "count": len(entry["data"]),
+            "fetched_at": entry["fetched_at"],
+            "age_seconds": round(time.time() - entry["fetched_at"], 1),
+            "stale": self._is_stale(kind, entry),
+            "last_error": self._last_errors.get(kind)
+        }
+
+    def get_version(self, kind: str) -> Optional[str]:
+        """Content hash of the cached entry, or None if nothing is cached"""
+        entry = self._entries.get(kind)
+        return entry["hash"] if entry else None
+
+    def _is_stale(self, kind: str, entry: Dict[str, Any]) -> bool:
+        return (time.time() - entry["fetched_at"]) > self._ttls.get(kind, 900)
+
+    # ============================================
+    # REFRESH PATH
+    # ============================================
+
+    def refresh(self, kind: str) -> bool:
+        """
+        Fetch fresh data for `kind` and store it.
+        Returns True if the refresh succeeded (whether or not the content changed).
+        """
+        fetcher = self._sources.get(kind)
+        if not fetcher:
+            logger.warning(f"⚠️ No metadata source registered for '{kind}'")
+            return False
+
+        try:
+            data = fetcher()
+        except Exception as e:
+            self.stats["refresh_failures"] += 1
+            self._last_errors[kind] = str(e)
+            logger.warning(f"⚠️ Metadata refresh failed for '{kind}' - serving cached copy: {e}")
+            return False
+
+        self.stats["refreshes"] += 1
+        self._last_errors.pop(kind, None)
+        new_hash = compute_content_hash(data)
+
+        with self._lock:
+            previous = self._entries.get(kind)
+            changed = previous is None or previous["hash"] != new_hash
+            self._entries[kind] = {"data": data, "hash": new_hash, "fetched_at": time.time()}
+            self._save_to_disk()
+            subscribers = list(self._subscribers.get(kind, []))
+
+        if changed:
+            self.stats["content_changes"] += 1
+            logger.info(f"🔄 GHL metadata '{kind}' changed ({len(data)} items, version {new_hash[:12]})")
+            for callback in subscribers:
+                self._notify_one(kind, callback, data, new_hash)
+        else:
+            logger.debug(f"✅ GHL metadata '{kind}' unchanged (version {new_hash[:12]})")
+
+        return True
+
+    def refresh_all(self):
+        """Refresh every registered metadata kind"""
+        for kind in list(self._sources.keys()):
+            self.refresh(kind)
+
+    def _refresh_in_background(self, kind: str):
+        """Revalidate a stale entry without blocking the caller (one refresh per kind at a time)"""
+        with self._lock:
+            if kind in self._refreshing:
+                return
+            self._refreshing.add(kind)
+
+        def run():
+            try:
+                self.refresh(kind)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(kind)
+
+        threading.Thread(target=run, daemon=True, name=f"ghl-metadata-{kind}").start()
+
+    def start_background_refresh(self, interval_seconds: int = 300):
+        """Start a daemon thread that periodically refreshes all stale entries"""
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return
+
+        self._stop_event.clear()
+
+        def loop():
+            # Refresh anything that is missing or stale right away, then on the interval
+            while True:
+                for kind in list(self._sources.keys()):
+                    entry = self._entries.get(kind)
+                    if entry is None or self._is_stale(kind, entry):
+                        self.refresh(kind)
+                if self._stop_event.wait(interval_seconds):
+                    break
+
+        self._refresh_thread = threading.Thread(target=loop, daemon=True, name="ghl-metadata-refresh")
+        self._refresh_thread.start()
+        logger.info(f"🔁 GHL metadata background refresh started (every {interval_seconds}s)")
+
+    def stop_background_refresh(self):
+        self._stop_event.set()
+
+    def _notify_one(self, kind: str, callback: Callable, data: List[Dict], content_hash: str):
+        try:
+            callback(data, content_hash)
+        except Exception as e:
+            logger.error(f"❌ Metadata subscriber for '{kind}' failed: {e}")
+
+    # ============================================
+    # PERSISTENCE
+    # ============================================
+
+    def _load_from_disk(self):
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r') as f:
+                    stored = json.load(f)
+                for kind, entry in stored.get("entries", {}).items():
+                    if {"data", "hash", "fetched_at"} <= set(entry.keys()):
+                        self._entries[kind] = entry
+                logger.info(f"✅ Loaded GHL metadata cache from disk: {list(self._entries.keys())}")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load GHL metadata cache from {self.cache_file}: {e}")
+
+    def _save_to_disk(self):
+        """Atomically write all entries (caller holds the lock)"""
+        tmp_file = f"{self.cache_file}.tmp"
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump({"entries": self._entries, "saved_at": time.time()}, f)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not persist GHL metadata cache: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache statistics and per-kind entry info for admin/health endpoints"""
+        return {
+            **self.stats,
+            "cache_file": self.cache_file,
+            "entries": {kind: self.peek(kind) for kind in set(self._entries) | set(self._sources)}
+        }
+
+
+def register_field_index_listeners(cache: "GHLMetadataCache"):
+    """Rebuild FieldMapper / FieldReferenceService indexes whenever custom fields change"""
+    from api.services.field_mapper import field_mapper
+    from api.services.field_reference_service import field_reference_service
+
+    def on_custom_fields_changed(custom_fields: List[Dict], content_hash: str):
+        field_reference = build_field_reference(custom_fields)
+        field_mapper.reload_field_reference(field_reference, version=content_hash)
+        field_reference_service.reload_field_reference(field_reference, version=content_hash)
+
+    cache.subscribe("custom_fields", on_custom_fields_changed)
+
+
+# Global instance with the default GHL sources
+ghl_metadata_cache = GHLMetadataCache()
+ghl_metadata_cache.register_source("custom_fields", fetch_custom_fields)
+ghl_metadata_cache.register_source("pipelines", fetch_pipelines)
+ghl_metadata_cache.register_source("calendars", fetch_calendars)
+metrics.register_cache("ghl_metadata", lambda: (
+    ghl_metadata_cache.stats["hits"] + ghl_metadata_cache.stats["stale_hits"],
+    ghl_metadata_cache.stats["misses"]))
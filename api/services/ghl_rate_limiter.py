@@ -0,0 +1,142 @@
+# api/services/ghl_rate_limiter.py
+"""
+Shared GHL API Rate Limiter
+Process-wide token bucket so concurrent GHL callers (bulk jobs, background workers,
+request handlers) stay under the location's burst limit together instead of each
+assuming it has the whole budget.
+
+Callers acquire at "normal" or "bulk" priority. Bulk callers (reassignment jobs,
+unassigned-lead sweeps) leave a reserve of tokens untouched and stop taking tokens
+entirely while urgent (emergency) work is in flight.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+from config import AppConfig
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# How often deferred bulk callers re-check while urgent work is running
+URGENT_BACKOFF_SECONDS = 0.1
+
+
+class GHLRateLimiter:
+    """
+    Thread-safe token bucket. GHL allows ~100 requests per 10 seconds per location,
+    so the defaults refill at 8/s with a burst of 10 to leave headroom for webhooks.
+    """
+
+    def __init__(self, rate_per_second: float = None, burst: int = None, bulk_reserve: int = None):
+        self.rate_per_second = float(rate_per_second or AppConfig.GHL_RATE_LIMIT_PER_SECOND)
+        self.burst = int(burst or AppConfig.GHL_RATE_LIMIT_BURST)
+        self.bulk_reserve = int(bulk_reserve if bulk_reserve is not None else AppConfig.GHL_RATE_LIMIT_BULK_RESERVE)
+        self._urgent_active = 0
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+        self.stats = {
+            "acquired": 0,
+            "throttled": 0,
+            "total_wait_seconds": 0.0,
+            "timeouts": 0,
+            "bulk_deferred": 0,
+        }
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate_per_second)
+            self._last_refill = now
+
+    def _try_take(self, tokens: int, priority: str = "normal") -> float:
+        """Take tokens if available; otherwise return seconds until they will be"""
+        with self._lock:
+            self._refill()
+            needed = tokens
+            if priority == "bulk":
+                if self._urgent_active:
+                    self.stats["bulk_deferred"] += 1
+                    return URGENT_BACKOFF_SECONDS
+                needed = tokens + min(self.bulk_reserve, self.burst - tokens)
+
+            if self._tokens >= needed:
+                self._tokens -= tokens
+                self.stats["acquired"] += tokens
+                return 0.0
+            return (needed - self._tokens) / self.rate_per_second
+
+    def acquire(self, tokens: int = 1, timeout: Optional[float] = None, priority: str = "normal") -> bool:
+        """Block the calling thread until tokens are available (False on timeout)"""
+        tokens = min(tokens, self.burst)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        waited = 0.0
+
+        while True:
+            wait = self._try_take(tokens, priority)
+            if wait == 0.0:
+                if waited:
+                    self._record_wait(waited)
+                return True
+
+            if deadline is not None and time.monotonic() + wait > deadline:
+                with self._lock:
+                    self.stats["timeouts"] += 1
+                return False
+
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, tokens: int = 1, priority: str = "normal") -> None:
+        """Await until tokens are available without blocking the event loop"""
+        tokens = min(tokens, self.burst)
+        waited = 0.0
+
+        while True:
+            wait = self._try_take(tokens, priority)
+            if wait == 0.0:
+                if waited:
+                    self._record_wait(waited)
+                return
+            await asyncio.sleep(wait)
+            waited += wait
+
+    @contextmanager
+    def urgent(self):
+        """Mark urgent work in flight - bulk callers yield the GHL budget until it ends"""
+        with self._lock:
+            self._urgent_active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._urgent_active -= 1
+
+    def _record_wait(self, waited: float) -> None:
+        with self._lock:
+            self.stats["throttled"] += 1
+            self.stats["total_wait_seconds"] += waited
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill()
+            return {
+                **self.stats,
+                "total_wait_seconds": round(self.stats["total_wait_seconds"], 3),
+                "rate_per_second": self.rate_per_second,
+                "burst": self.burst,
+                "bulk_reserve": self.bulk_reserve,
+                "urgent_active": self._urgent_active,
+                "available_tokens": round(self._tokens, 2),
+            }
+
+
+# Global instance
+ghl_rate_limiter = GHLRateLimiter()
+metrics.register_stats("ghl_rate_limiter", ghl_rate_limiter.get_stats)
@@ -5,6 +5,7 @@ Core lead reassignment logic shared by both webhook and API endpoints.
 Follows the corrected flow: ensure opportunity → ensure lead → reassign vendor
 """
 
+import asyncio
 import logging
 import json
 import uuid
@@ -15,6 +16,7 @@ from config import AppConfig
 from database.simple_connection import db as simple_db_instance
 from api.services.ghl_api_v2_optimized import OptimizedGoHighLevelAPI
 from api.services.lead_routing_service import lead_routing_service
+from api.services.vendor_scoring import vendor_scoring
 from api.services.location_service import location_service
 from api.services.field_mapper import field_mapper
 
@@ -310,13 +312,16 @@ class LeadReassignmentCore:
                         "previous_vendor_id": previous_vendor_id
                     }
             
-            # Step 6: Select new vendor
-            selected_vendor = self.lead_routing.select_vendor_from_pool(available_vendors, account_id)
+            # Steps 6-7: Select new vendor and update the lead under the routing lock
+            # (the lock may wait - keep it off the event loop)
+            selected_vendor = await asyncio.to_thread(
+                self.lead_routing.select_vendor_from_pool, available_vendors, account_id, lead_id
+            )
             
             if not selected_vendor:
                 return {
                     "success": False,
-                    "error": "Vendor selection failed",
+                    "error": "Vendor selection failed or lead could not be updated in database",
                     "contact_id": contact_id,
                     "lead_id": lead_id
                 }
@@ -327,17 +332,6 @@ class LeadReassignmentCore:
             
             logger.info(f"🎯 Selected vendor: {vendor_name} (ID: {vendor_id})")
             
-            # Step 7: Update lead with new vendor (preserve original source)
-            db_update = simple_db_instance.assign_lead_to_vendor(lead_id, vendor_id)
-            
-            if not db_update:
-                return {
-                    "success": False,
-                    "error": "Failed to update lead in database",
-                    "contact_id": contact_id,
-                    "lead_id": lead_id
-                }
-            
             # IMPORTANT: If we need to preserve source, update it back
             if preserve_source and original_source:
                 conn = simple_db_instance._get_conn()
@@ -373,7 +367,13 @@ class LeadReassignmentCore:
                 except Exception as e:
                     logger.error(f"❌ Error updating GHL opportunity: {e}")
             
-            # Step 9: Log reassignment event
+            # Step 9: Log reassignment event (and score it against the previous vendor)
+            vendor_scoring.handle_lead_event({
+                "event_type": "lead_reassigned",
+                "lead_id": lead_id,
+                "previous_vendor_id": previous_vendor_id,
+                "new_vendor_id": vendor_id
+            })
             simple_db_instance.log_activity(
                 event_type="lead_reassigned_success",
                 event_data={
@@ -3,18 +3,31 @@
 import logging
 import random
 import json
+import time
+from contextlib import ExitStack
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 from api.services.location_service import location_service
+from api.services.vendor_spatial_index import vendor_spatial_index
 from api.services.service_categories import service_manager
+from api.services.shared_state import shared_state, SharedStateTimeout
+from api.services.vendor_scoring import vendor_scoring
+from api.services.vendor_capacity import vendor_capacity
 from database.simple_connection import db as simple_db_instance
+from utils.metrics import vendor_match_pool_size
+
+# The routing lock must outlive its body: a handful of SQLite writes (lead assignment,
+# last_lead_assigned, score counters, capacity buckets, shared round-robin hash), each of
+# which may wait on a busy database. Waiters give up after ROUTING_LOCK_WAIT_SECONDS.
+ROUTING_LOCK_TTL_SECONDS = 120.0
+ROUTING_LOCK_WAIT_SECONDS = 10.0
 
 logger = logging.getLogger(__name__)
 
 class LeadRoutingService:
     """
     Enhanced lead routing service that supports:
-    - Geographic coverage types (global, national, state, county, zip)
+    - Geographic coverage types (global, national, state, county, zip, radius)
     - Dual routing methods (round-robin vs performance-based)
     - Configurable routing distribution percentages
     - DIRECT STRING MATCHING for service matching (no keyword matching)
@@ -38,7 +51,8 @@ class LeadRoutingService:
             specific_service: Specific service needed (e.g., "AC Service") - NEW
             
         Returns:
-            List of matching vendors with coverage verification
+            List of matching vendors with coverage verification; radius vendors carry
+            distance_miles and are ranked nearest first
         """
         try:
             # Convert ZIP code to location information
@@ -57,37 +71,50 @@ class LeadRoutingService:
             # Get all active vendors for this account
             all_vendors = self._get_vendors_from_database(account_id)
             eligible_vendors = []
+
+            # Radius vendors whose service circle contains the lead's ZIP centroid
+            radius_hits: Dict[str, float] = {}
+            if location_data.get('lat') is not None and location_data.get('lng') is not None:
+                grid = vendor_spatial_index.ensure_built(all_vendors, key=account_id)
+                radius_hits = dict(grid.query(float(location_data['lat']), float(location_data['lng'])))
             
             for vendor in all_vendors:
                 vendor_name = vendor.get('company_name', vendor.get('name', 'Unknown'))
                 
                 # Check if vendor is active and taking new work
                 if vendor.get("status") != "active" or not vendor.get("taking_new_work", False):
-                    logger.debug(f"❌ Skipping vendor {vendor_name} - status={vendor.get('status')}, taking_work={vendor.get('taking_new_work')}")
+                    logger.debug("❌ Skipping vendor %s - status=%s, taking_work=%s", vendor_name, vendor.get('status'), vendor.get('taking_new_work'))
                     continue
                 
                 # DIRECT SERVICE MATCHING - match specific service if provided, otherwise category
                 service_to_match = specific_service if specific_service else service_category
-                logger.debug(f"🔍 Checking vendor {vendor_name} for service: '{service_to_match}'")
+                logger.debug("🔍 Checking vendor %s for service: '%s'", vendor_name, service_to_match)
                 
                 if not self._vendor_matches_service(vendor, service_to_match):
-                    logger.debug(f"❌ Skipping vendor {vendor_name} - no service match for '{service_to_match}'")
+                    logger.debug("❌ Skipping vendor %s - no service match for '%s'", vendor_name, service_to_match)
                     continue
                 
                 # Check if vendor can serve this location
-                if self._vendor_covers_location(vendor, zip_code, target_state, target_county):
+                if self._vendor_covers_location(vendor, zip_code, target_state, target_county, radius_hits):
                     # Add coverage info for debugging
                     vendor_copy = vendor.copy()
+                    if vendor_copy['id'] in radius_hits:
+                        vendor_copy['distance_miles'] = radius_hits[vendor_copy['id']]
                     vendor_copy['coverage_match_reason'] = self._get_coverage_match_reason(
-                        vendor, zip_code, target_state, target_county
+                        vendor_copy, zip_code, target_state, target_county
                     )
                     eligible_vendors.append(vendor_copy)
-                    logger.info(f"✅ MATCH: Vendor {vendor_name} matches - {vendor_copy['coverage_match_reason']}")
+                    logger.debug("✅ MATCH: Vendor %s matches - %s", vendor_name, vendor_copy['coverage_match_reason'])
                 else:
-                    logger.debug(f"❌ Skipping vendor {vendor_name} - location not covered")
+                    logger.debug("❌ Skipping vendor %s - location not covered", vendor_name)
+
+            # Nearest radius vendors first; the rest keep their order (stable sort)
+            if radius_hits:
+                eligible_vendors.sort(key=lambda v: (v.get('distance_miles') is None, v.get('distance_miles') or 0.0))
             
             service_desc = f"specific service '{specific_service}'" if specific_service else f"category '{service_category}'"
             logger.info(f"🎯 Found {len(eligible_vendors)} eligible vendors for {service_desc} in {zip_code}")
+            vendor_match_pool_size.observe(len(eligible_vendors))
             return eligible_vendors
             
         except Exception as e:
@@ -100,9 +127,7 @@ class LeadRoutingService:
         FIXED: Uses the field names that actually exist in the database.
         """
         try:
-            import sqlite3
-            
-            conn = sqlite3.connect('smart_lead_router.db')
+            conn = simple_db_instance._get_conn()
             cursor = conn.cursor()
             
             # Query vendors using ACTUAL database field names
@@ -110,7 +135,8 @@ class LeadRoutingService:
                 SELECT id, account_id, ghl_contact_id, ghl_user_id, name, email, phone,
                        company_name, service_categories, services_offered, coverage_type,
                        coverage_states, coverage_counties, last_lead_assigned,
-                       lead_close_percentage, status, taking_new_work
+                       lead_close_percentage, status, taking_new_work,
+                       home_zip_code, service_radius_miles
                 FROM vendors
                 WHERE account_id = ?
             """, (account_id,))
@@ -134,7 +160,9 @@ class LeadRoutingService:
                     'last_lead_assigned': row[13],
                     'lead_close_percentage': row[14] or 0.0,
                     'status': row[15] or 'active',
-                    'taking_new_work': bool(row[16]) if row[16] is not None else True
+                    'taking_new_work': bool(row[16]) if row[16] is not None else True,
+                    'home_zip_code': row[17],
+                    'service_radius_miles': row[18] or 0.0
                 }
                 vendors.append(vendor)
             
@@ -193,33 +221,33 @@ class LeadRoutingService:
                             vendor_level3_services.add(offered_service)
             
             if vendor_has_level3:
-                logger.debug(f"🔍 Vendor has Level 3 services: {vendor_level3_services}")
+                logger.debug("🔍 Vendor has Level 3 services: %s", vendor_level3_services)
                 
                 # For vendors with Level 3 services, ONLY match on exact Level 3 service
                 for offered_service in services_offered:
                     offered_lower = str(offered_service).strip().lower()
                     if offered_lower == service_lower:
-                        logger.info(f"✅ Level 3 EXACT match: '{service_requested}' == '{offered_service}'")
+                        logger.debug("✅ Level 3 EXACT match: '%s' == '%s'", service_requested, offered_service)
                         return True
                 
                 # Special case: If service_requested is a Level 1 category (like "Boat Maintenance")
                 # and vendor has specific Level 3 services for subcategories under it, do NOT match
                 # This prevents vendors who specified Level 3 services from getting generic category leads
                 if service_requested in SERVICE_CATEGORIES:
-                    logger.debug(f"❌ Lead requests Level 1 category '{service_requested}' but vendor has specific Level 3 services")
+                    logger.debug("❌ Lead requests Level 1 category '%s' but vendor has specific Level 3 services", service_requested)
                     return False
                 
                 # Check if requested service is a subcategory that has Level 3 services
                 for category, subcategories in LEVEL_3_SERVICES.items():
                     if service_requested in subcategories:
-                        logger.debug(f"❌ Lead requests subcategory '{service_requested}' but vendor specified Level 3 services")
+                        logger.debug("❌ Lead requests subcategory '%s' but vendor specified Level 3 services", service_requested)
                         return False
                 
-                logger.debug(f"❌ No Level 3 match: '{service_requested}' not in vendor's Level 3 services: {vendor_level3_services}")
+                logger.debug("❌ No Level 3 match: '%s' not in vendor's Level 3 services: %s", service_requested, vendor_level3_services)
                 return False
             
             # For vendors with only Level 2 services (backward compatibility)
-            logger.debug(f"🔍 Vendor uses Level 2 services: {services_offered}")
+            logger.debug("🔍 Vendor uses Level 2 services: %s", services_offered)
             
             # First try exact match
             for offered_service in services_offered:
@@ -227,12 +255,12 @@ class LeadRoutingService:
                 
                 # Exact match
                 if offered_lower == service_lower:
-                    logger.info(f"✅ Level 2 EXACT match: '{service_requested}' == '{offered_service}'")
+                    logger.debug("✅ Level 2 EXACT match: '%s' == '%s'", service_requested, offered_service)
                     return True
                 
                 # Handle common variations (e.g., "Boat Bottom Cleaning" matches "Bottom Cleaning")
                 if service_lower == "bottom cleaning" and "bottom cleaning" in offered_lower:
-                    logger.debug(f"✅ Service variant match: '{service_requested}' matched with '{offered_service}'")
+                    logger.debug("✅ Service variant match: '%s' matched with '%s'", service_requested, offered_service)
                     return True
             
             # Check if service_requested is a child of any vendor's offered categories
@@ -245,7 +273,7 @@ class LeadRoutingService:
                     
                     # Check if requested service is in this category
                     if service_lower in category_services_lower:
-                        logger.info(f"✅ Level 2 parent match: Vendor offers category '{offered_service}' which includes '{service_requested}'")
+                        logger.debug("✅ Level 2 parent match: Vendor offers category '%s' which includes '%s'", offered_service, service_requested)
                         return True
             
             # Check if this is a Level 2 category requested and vendor offers services under it
@@ -257,13 +285,13 @@ class LeadRoutingService:
                 for offered_service in services_offered:
                     offered_lower = str(offered_service).strip().lower()
                     if offered_lower in category_services_lower:
-                        logger.info(f"✅ Level 2 category match: Vendor offers '{offered_service}' under '{service_requested}'")
+                        logger.debug("✅ Level 2 category match: Vendor offers '%s' under '%s'", offered_service, service_requested)
                         return True
                 
-                logger.debug(f"❌ No Level 3 services found for category '{service_requested}' in vendor's services: {services_offered}")
+                logger.debug("❌ No Level 3 services found for category '%s' in vendor's services: %s", service_requested, services_offered)
             else:
                 # Not a category and no exact match found
-                logger.debug(f"❌ No match for '{service_requested}' in services offered: {services_offered}")
+                logger.debug("❌ No match for '%s' in services offered: %s", service_requested, services_offered)
             
             return False
             
@@ -272,28 +300,30 @@ class LeadRoutingService:
             return False
     
     def _vendor_covers_location(self, vendor: Dict[str, Any], zip_code: str, 
-                              target_state: Optional[str], target_county: Optional[str]) -> bool:
+                              target_state: Optional[str], target_county: Optional[str],
+                              radius_hits: Optional[Dict[str, float]] = None) -> bool:
         """
         Check if vendor covers the specified location, with improved data validation.
         FIXED: Uses actual database field names (coverage_type, coverage_states, coverage_counties)
+        radius_hits: vendor id -> distance for radius vendors covering the lead (vendor_spatial_index)
         """
         coverage_type = vendor.get('coverage_type', 'zip')  # FIXED: Use actual field name
         vendor_name = vendor.get('company_name', vendor.get('name', 'Unknown'))
         
-        logger.debug(f"🔍 Checking coverage for vendor {vendor_name}: type={coverage_type}, target_state={target_state}, target_county={target_county}")
+        logger.debug("🔍 Checking coverage for vendor %s: type=%s, target_state=%s, target_county=%s", vendor_name, coverage_type, target_state, target_county)
         
         if coverage_type == 'global':
-            logger.debug(f"✅ Vendor {vendor_name} has GLOBAL coverage - matches all locations")
+            logger.debug("✅ Vendor %s has GLOBAL coverage - matches all locations", vendor_name)
             return True
         
         if coverage_type == 'national':
             matches = target_state is not None
-            logger.debug(f"{'✅' if matches else '❌'} Vendor {vendor_name} has NATIONAL coverage - matches={matches} (target_state={target_state})")
+            logger.debug("%s Vendor %s has NATIONAL coverage - matches=%s (target_state=%s)", '✅' if matches else '❌', vendor_name, matches, target_state)
             return matches
         
         if coverage_type == 'state':
             if not target_state:
-                logger.debug(f"❌ Vendor {vendor_name} has STATE coverage but no target_state provided")
+                logger.debug("❌ Vendor %s has STATE coverage but no target_state provided", vendor_name)
                 return False
             coverage_states = vendor.get('coverage_states', [])  # FIXED: Use actual field name
             if not isinstance(coverage_states, list):
@@ -302,12 +332,12 @@ class LeadRoutingService:
             
             # Check if target state is in coverage states
             matches = target_state in coverage_states
-            logger.debug(f"{'✅' if matches else '❌'} Vendor {vendor_name} STATE coverage check: {target_state} in {coverage_states} = {matches}")
+            logger.debug("%s Vendor %s STATE coverage check: %s in %s = %s", '✅' if matches else '❌', vendor_name, target_state, coverage_states, matches)
             return matches
         
         if coverage_type == 'county':
             if not target_county or not target_state:
-                logger.debug(f"❌ Vendor {vendor_name} has COUNTY coverage but missing target location (county={target_county}, state={target_state})")
+                logger.debug("❌ Vendor %s has COUNTY coverage but missing target location (county=%s, state=%s)", vendor_name, target_county, target_state)
                 return False
             coverage_counties = vendor.get('coverage_counties', [])  # FIXED: Use actual field name
             if not isinstance(coverage_counties, list):
@@ -320,7 +350,7 @@ class LeadRoutingService:
             for coverage_area in coverage_counties:
                 # Direct string comparison for exact match
                 if coverage_area.strip() == full_county_string:
-                    logger.debug(f"✅ Vendor {vendor_name} COUNTY match: '{full_county_string}' in vendor's coverage")
+                    logger.debug("✅ Vendor %s COUNTY match: '%s' in vendor's coverage", vendor_name, full_county_string)
                     return True
                 
                 # Also try component matching for flexibility
@@ -328,10 +358,10 @@ class LeadRoutingService:
                     county_part, state_part = coverage_area.split(',', 1)
                     if (target_county.lower() == county_part.strip().lower() and
                         target_state.lower() == state_part.strip().lower()):
-                        logger.debug(f"✅ Vendor {vendor_name} COUNTY component match: {target_county}, {target_state}")
+                        logger.debug("✅ Vendor %s COUNTY component match: %s, %s", vendor_name, target_county, target_state)
                         return True
             
-            logger.debug(f"❌ Vendor {vendor_name} COUNTY coverage: no match for {full_county_string} in {coverage_counties}")
+            logger.debug("❌ Vendor %s COUNTY coverage: no match for %s in %s", vendor_name, full_county_string, coverage_counties)
             return False
         
         if coverage_type == 'zip':
@@ -344,6 +374,12 @@ class LeadRoutingService:
                 self.location_service.normalize_zip_code(z) for z in service_areas
             ]
             return normalized_zip in normalized_service_areas
+
+        if coverage_type == 'radius':
+            matches = vendor.get('id') in (radius_hits or {})
+            logger.debug("%s Vendor %s RADIUS coverage: %s mi from %s", '✅' if matches else '❌', vendor_name,
+                         vendor.get('service_radius_miles'), vendor.get('home_zip_code'))
+            return matches
         
         return False
     
@@ -365,25 +401,77 @@ class LeadRoutingService:
             return f"County coverage: {target_county}, {target_state}"
         elif coverage_type == 'zip':
             return f"ZIP code coverage: {zip_code}"
+        elif coverage_type == 'radius':
+            return (f"Radius coverage: {vendor.get('distance_miles')} mi from home port "
+                    f"{vendor.get('home_zip_code')} (radius {vendor.get('service_radius_miles')} mi)")
         else:
             return f"Coverage type: {coverage_type}"
     
     def select_vendor_from_pool(self, eligible_vendors: List[Dict[str, Any]], 
-                              account_id: str) -> Optional[Dict[str, Any]]:
+                              account_id: str, lead_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         Select a vendor from the eligible pool using the configured routing method
         
         Args:
             eligible_vendors: List of vendors that can serve the request
             account_id: Account ID for routing configuration
+            lead_id: Lead to assign to the selected vendor. Assigned under the routing lock,
+                so concurrent selections already count it against the vendor's open-lead limit
             
         Returns:
-            Selected vendor or None if no vendors available
+            Selected vendor or None if no vendors available (or the lead could not be assigned)
         """
         if not eligible_vendors:
             return None
         
-        # Get routing configuration for this account
+        use_performance = self._choose_routing_method(account_id)
+        
+        # Pick and stamp under one lock per account, against every worker's latest
+        # assignments - the pool's last_lead_assigned values may be stale by now
+        with ExitStack() as stack:
+            try:
+                stack.enter_context(shared_state.lock(f"routing:{account_id}", ttl=ROUTING_LOCK_TTL_SECONDS,
+                                                      wait=ROUTING_LOCK_WAIT_SECONDS))
+                locked = True
+            except SharedStateTimeout:
+                # Another worker is routing for this account - routing without the lock could
+                # overshoot quotas, so leave the lead unassigned for the unassigned-lead sweep
+                logger.warning(f"⚠️ Routing lock for account {account_id} busy - lead left unassigned")
+                return None
+            except Exception as e:
+                # The shared state backend itself is down - nothing to coordinate with
+                logger.warning(f"⚠️ Shared routing lock unavailable ({e}) - selecting without it")
+                locked = False
+            
+            started = time.monotonic()
+            selected_vendor = self._select_and_record(eligible_vendors, account_id, use_performance,
+                                                      lead_id, shared=locked)
+            if locked and time.monotonic() - started > ROUTING_LOCK_TTL_SECONDS:
+                logger.warning(f"⚠️ Routing for account {account_id} outlived its lock "
+                               f"({time.monotonic() - started:.1f}s > {ROUTING_LOCK_TTL_SECONDS}s)")
+            return selected_vendor
+    
+    def preview_vendor_from_pool(self, eligible_vendors: List[Dict[str, Any]],
+                                 account_id: str) -> Optional[Dict[str, Any]]:
+        """
+        The vendor select_vendor_from_pool would pick right now, without recording anything
+        (no assignment, last_lead_assigned, score or quota usage) - for testing routing
+        
+        Args:
+            eligible_vendors: List of vendors that can serve the request
+            account_id: Account ID for routing configuration
+            
+        Returns:
+            Vendor that would be selected or None if no vendors available
+        """
+        if not eligible_vendors:
+            return None
+        use_performance = self._choose_routing_method(account_id)
+        selected_vendor, _ = self._select(eligible_vendors, account_id, use_performance, dry_run=True)
+        return selected_vendor
+    
+    def _choose_routing_method(self, account_id: str) -> bool:
+        """Roll the account's performance percentage - True for performance-based routing"""
         routing_config = self._get_routing_configuration(account_id)
         performance_percentage = routing_config.get('performance_percentage', 0)
         
@@ -392,17 +480,63 @@ class LeadRoutingService:
         
         if use_performance:
             logger.info(f"🎯 Using performance-based routing ({performance_percentage}% configured)")
-            selected_vendor = self._select_by_performance(eligible_vendors)
         else:
             logger.info(f"🔄 Using round-robin routing ({100 - performance_percentage}% configured)")
-            selected_vendor = self._select_by_round_robin(eligible_vendors)
+        return use_performance
+    
+    def _select(self, eligible_vendors: List[Dict[str, Any]], account_id: str, use_performance: bool,
+                shared: bool = True, dry_run: bool = False) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Select from the pool against the shared round-robin state; returns (vendor, shared)"""
+        if shared:
+            try:
+                latest = shared_state.hgetall(f"routing:last_assigned:{account_id}")
+            except Exception as e:
+                logger.warning(f"⚠️ Shared round-robin state unavailable: {e}")
+                latest, shared = {}, False
+            eligible_vendors = [self._with_latest_assignment(v, latest.get(v['id'])) for v in eligible_vendors]
+        
+        # Vendors at their lead quotas drop out; the lead spills over to the rest of the pool
+        if dry_run:
+            eligible_vendors = vendor_capacity.available(eligible_vendors)
+        else:
+            eligible_vendors = vendor_capacity.filter_available(eligible_vendors)
+        if not eligible_vendors:
+            return None, shared
+        
+        if use_performance:
+            return self._select_by_performance(eligible_vendors), shared
+        return self._select_by_round_robin(eligible_vendors), shared
+    
+    def _select_and_record(self, eligible_vendors: List[Dict[str, Any]], account_id: str,
+                           use_performance: bool, lead_id: Optional[str] = None,
+                           shared: bool = True) -> Optional[Dict[str, Any]]:
+        """Select from the pool and record the assignment (lead, DB and shared round-robin state)"""
+        key = f"routing:last_assigned:{account_id}"
+        selected_vendor, shared = self._select(eligible_vendors, account_id, use_performance, shared)
+        
+        # Assign before releasing the lock - open leads are counted from leads.vendor_id
+        if selected_vendor and lead_id and not simple_db_instance.assign_lead_to_vendor(lead_id, selected_vendor['id']):
+            return None
         
         # Update vendor's last_lead_assigned timestamp
         if selected_vendor:
-            self._update_vendor_last_assigned(selected_vendor['id'])
+            assigned_at = self._update_vendor_last_assigned(selected_vendor['id'])
+            vendor_scoring.record_assignment(selected_vendor['id'])
+            vendor_capacity.consume([selected_vendor['id']])
+            if shared:
+                try:
+                    shared_state.hset(key, selected_vendor['id'], assigned_at)
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not share round-robin assignment: {e}")
         
         return selected_vendor
     
+    @staticmethod
+    def _with_latest_assignment(vendor: Dict[str, Any], assigned_at: Optional[str]) -> Dict[str, Any]:
+        if assigned_at and assigned_at > (vendor.get('last_lead_assigned') or ''):
+            return {**vendor, 'last_lead_assigned': assigned_at}
+        return vendor
+    
     def _get_routing_configuration(self, account_id: str) -> Dict[str, Any]:
         """
         Get routing configuration for the account
@@ -440,7 +574,8 @@ class LeadRoutingService:
     
     def _select_by_performance(self, vendors: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        Select vendor with highest lead_close_percentage
+        Select vendor with the highest close-rate score (vendor_scoring - decayed recent
+        outcomes, falling back to the synced lead_close_percentage)
         
         Args:
             vendors: List of eligible vendors
@@ -448,18 +583,24 @@ class LeadRoutingService:
         Returns:
             Vendor with best performance
         """
-        # Sort by close percentage (desc), then by last_lead_assigned (asc) for ties
+        scores = vendor_scoring.get_scores(vendors)
+        
+        def close_rate(vendor: Dict[str, Any]) -> float:
+            score = scores.get(vendor.get('id'))
+            return score['score'] if score else (vendor.get('lead_close_percentage') or 0)
+        
+        # Sort by close rate (desc), then by last_lead_assigned (asc) for ties
         sorted_vendors = sorted(
             vendors,
             key=lambda v: (
-                -v.get('lead_close_percentage', 0),  # Higher percentage first
+                -close_rate(v),  # Higher percentage first
                 v.get('last_lead_assigned') or '1900-01-01'  # Older assignment first for ties
             )
         )
         
         selected = sorted_vendors[0]
         logger.info(f"🏆 Performance-based selection: {selected.get('name')} "
-                   f"(close rate: {selected.get('lead_close_percentage', 0)}%)")
+                   f"(close rate: {close_rate(selected):.1f}%)")
         return selected
     
     def _select_by_round_robin(self, vendors: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -484,27 +625,141 @@ class LeadRoutingService:
                    f"(last assigned: {last_assigned})")
         return selected
     
-    def _update_vendor_last_assigned(self, vendor_id: str) -> None:
+    def _update_vendor_last_assigned(self, vendor_id: str) -> str:
         """
         Update vendor's last_lead_assigned timestamp
         
         Args:
             vendor_id: Vendor ID to update
+            
+        Returns:
+            The timestamp recorded
         """
+        # Microsecond resolution (same format as select_vendor_for_batch): with
+        # CURRENT_TIMESTAMP, vendors assigned within the same second tie in round-robin
+        assigned_at = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S.%f")
         try:
             conn = simple_db_instance._get_conn()
             cursor = conn.cursor()
             cursor.execute("""
                 UPDATE vendors 
-                SET last_lead_assigned = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP 
+                SET last_lead_assigned = ?, updated_at = CURRENT_TIMESTAMP 
                 WHERE id = ?
-            """, (vendor_id,))
+            """, (assigned_at, vendor_id))
             conn.commit()
             conn.close()
             logger.debug(f"✅ Updated last_lead_assigned for vendor {vendor_id}")
         except Exception as e:
             logger.error(f"❌ Error updating last_lead_assigned for vendor {vendor_id}: {e}")
+        return assigned_at
     
+    def resolve_location_key(self, zip_code: str, zip_locations: Dict[str, Dict[str, Any]]) -> str:
+        """
+        Key used to group leads that share a vendor pool: "County, ST" for the ZIP,
+        or the ZIP itself when it cannot be resolved. Lookups are memoized in zip_locations.
+
+        Matching depends only on the resolved state/county (vendors have no ZIP-level
+        coverage data), so leads with the same key always get the same eligible vendors.
+        """
+        if zip_code not in zip_locations:
+            zip_locations[zip_code] = self.location_service.zip_to_location(zip_code)
+        location = zip_locations[zip_code]
+
+        if not location.get('error') and location.get('county') and location.get('state'):
+            return f"{location['county']}, {location['state']}"
+        return zip_code
+
+    def select_vendor_for_batch(self, eligible_vendors: List[Dict[str, Any]], performance_percentage: int,
+                                batch_last_assigned: Dict[str, str],
+                                batch_reserved: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Same policy as select_vendor_from_pool for bulk operations. Round-robin state is
+        tracked in batch_last_assigned (vendor_id -> timestamp) so consecutive leads in a
+        batch rotate through the pool; persist those timestamps afterwards with
+        update_vendors_last_assigned.
+
+        Args:
+            eligible_vendors: Non-empty list of vendors that can serve the request
+            performance_percentage: Account's performance-routing percentage
+            batch_last_assigned: Assignments made so far in this batch (updated in place)
+            batch_reserved: Leads planned per vendor in this batch, counted against their
+                capacity until update_vendors_last_assigned consumes it (updated in place)
+
+        Returns:
+            Selected vendor, or None if every vendor in the pool is at capacity
+        """
+        candidates = [
+            {**v, 'last_lead_assigned': batch_last_assigned[v['id']]} if v['id'] in batch_last_assigned else v
+            for v in eligible_vendors
+        ]
+        candidates = vendor_capacity.filter_available(candidates, batch_reserved)
+        if not candidates:
+            return None
+
+        if random.randint(1, 100) <= performance_percentage:
+            selected = self._select_by_performance(candidates)
+        else:
+            selected = self._select_by_round_robin(candidates)
+
+        # Same format as SQLite CURRENT_TIMESTAMP (UTC) so it sorts after stored values
+        batch_last_assigned[selected['id']] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S.%f")
+        if batch_reserved is not None:
+            batch_reserved[selected['id']] = batch_reserved.get(selected['id'], 0) + 1
+        return selected
+
+    def get_performance_percentage(self, account_id: str) -> int:
+        """Account's configured performance-based routing percentage"""
+        return self._get_routing_configuration(account_id).get('performance_percentage', 0)
+
+    def update_vendors_last_assigned(self, account_id: str, vendor_ids: List[str],
+                                     last_assigned: Dict[str, str]) -> None:
+        """
+        Batched _update_vendor_last_assigned for bulk operations (one transaction), under the
+        account's routing lock and shared with other workers' round-robin state
+
+        Args:
+            account_id: Account the leads were routed for
+            vendor_ids: Vendor ID per assigned lead (scored and counted against quotas)
+            last_assigned: vendor_id -> timestamp recorded by select_vendor_for_batch. A vendor
+                whose stored assignment is already newer keeps it.
+        """
+        if not vendor_ids:
+            return
+        last_assigned = {vendor_id: last_assigned[vendor_id] for vendor_id in set(vendor_ids)
+                         if vendor_id in last_assigned}
+        with ExitStack() as stack:
+            try:
+                stack.enter_context(shared_state.lock(f"routing:{account_id}", ttl=ROUTING_LOCK_TTL_SECONDS,
+                                                      wait=ROUTING_LOCK_WAIT_SECONDS))
+            except Exception as e:
+                # The leads are already assigned - record them anyway; newer timestamps win below
+                logger.warning(f"⚠️ Routing lock for account {account_id} unavailable ({e}) - "
+                               f"recording batch assignments without it")
+            try:
+                conn = simple_db_instance._get_conn()
+                cursor = conn.cursor()
+                cursor.executemany("""
+                    UPDATE vendors
+                    SET last_lead_assigned = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND (last_lead_assigned IS NULL OR last_lead_assigned < ?)
+                """, [(assigned_at, vendor_id, assigned_at) for vendor_id, assigned_at in last_assigned.items()])
+                conn.commit()
+                conn.close()
+                logger.debug(f"✅ Updated last_lead_assigned for {len(last_assigned)} vendors")
+                vendor_scoring.record_assignments(vendor_ids)
+                vendor_capacity.consume(vendor_ids)
+            except Exception as e:
+                logger.error(f"❌ Error batch updating last_lead_assigned: {e}")
+            
+            key = f"routing:last_assigned:{account_id}"
+            try:
+                latest = shared_state.hgetall(key)
+                for vendor_id, assigned_at in last_assigned.items():
+                    if assigned_at > (latest.get(vendor_id) or ''):
+                        shared_state.hset(key, vendor_id, assigned_at)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not share batch round-robin assignments: {e}")
+
     def update_routing_configuration(self, account_id: str, performance_percentage: int) -> bool:
         """
         Update the routing configuration for an account
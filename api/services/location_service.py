@@ -1,12 +1,35 @@
 # File: Lead-Router-Pro/api/services/location_service.py
 
 import logging
-from typing import Dict, Optional, List
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Optional, List, Iterable, Any
 import re
 from utils.dependency_manager import get_module, is_available
 
 logger = logging.getLogger(__name__)
 
+# State / territory names accepted in coverage strings ("Florida" as well as "FL")
+US_STATE_NAMES = {
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR", "california": "CA",
+    "colorado": "CO", "connecticut": "CT", "delaware": "DE", "district of columbia": "DC",
+    "florida": "FL", "georgia": "GA", "hawaii": "HI", "idaho": "ID", "illinois": "IL",
+    "indiana": "IN", "iowa": "IA", "kansas": "KS", "kentucky": "KY", "louisiana": "LA",
+    "maine": "ME", "maryland": "MD", "massachusetts": "MA", "michigan": "MI", "minnesota": "MN",
+    "mississippi": "MS", "missouri": "MO", "montana": "MT", "nebraska": "NE", "nevada": "NV",
+    "new hampshire": "NH", "new jersey": "NJ", "new mexico": "NM", "new york": "NY",
+    "north carolina": "NC", "north dakota": "ND", "ohio": "OH", "oklahoma": "OK", "oregon": "OR",
+    "pennsylvania": "PA", "rhode island": "RI", "south carolina": "SC", "south dakota": "SD",
+    "tennessee": "TN", "texas": "TX", "utah": "UT", "vermont": "VT", "virginia": "VA",
+    "washington": "WA", "west virginia": "WV", "wisconsin": "WI", "wyoming": "WY",
+    "puerto rico": "PR", "guam": "GU", "u.s. virgin islands": "VI", "virgin islands": "VI",
+    "american samoa": "AS", "northern mariana islands": "MP",
+}
+US_STATE_CODES = set(US_STATE_NAMES.values())
+
+ZIP_PATTERN = re.compile(r'^(\d{5})(?:-\d{4})?$')
+COVERAGE_CACHE_SIZE = 2048
+
 class LocationService:
     """
     Service for converting ZIP codes to geographic information.
@@ -15,6 +38,12 @@ class LocationService:
     
     def __init__(self):  # ← Fixed: was **init** (markdown formatting issue)
         """Initialize the geocoding engine for the US."""
+        # ZIP -> location (the postal dataset is static, so entries never expire) and
+        # whole coverage string -> resolved coverage (LRU)
+        self._zip_cache: Dict[str, Dict[str, Any]] = {}
+        self._coverage_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = Lock()
+        
         if not is_available('pgeocode'):
             logger.warning("⚠️ LocationService initialized without pgeocode")
             self.geo_us = None
@@ -57,30 +86,180 @@ class LocationService:
         if not normalized_zip:
             return {'error': f'Invalid ZIP code format: {zip_code}'}
 
+        cached = self._zip_cache.get(normalized_zip)
+        if cached is not None:
+            return dict(cached)
+
         try:
             location_data = self.geo_us.query_postal_code(normalized_zip)
-            
-            # Handle pandas checking gracefully
-            pd = get_module('pandas')
-            if pd and pd.isna(location_data.county_name):
-                return {'error': f'ZIP code not found: {normalized_zip}'}
-            elif not pd and not location_data.county_name:
-                return {'error': f'ZIP code not found: {normalized_zip}'}
-
-            return {
-                'state': location_data.state_code,
-                'county': location_data.county_name,
-                'city': location_data.place_name,
-                'zipcode': location_data.postal_code,
-                'lat': location_data.latitude,
-                'lng': location_data.longitude,
-                'accuracy': location_data.accuracy,
-                'error': None
-            }
+            location = self._location_from_row(normalized_zip, location_data.postal_code,
+                                               location_data.state_code, location_data.county_name,
+                                               location_data.place_name, location_data.latitude,
+                                               location_data.longitude, location_data.accuracy)
         except Exception as e:
             logger.error(f"❌ Error looking up ZIP code {normalized_zip}: {e}")
             return {'error': f'Lookup error: {str(e)}'}
 
+        self._zip_cache[normalized_zip] = location
+        return dict(location)
+
+    def _location_from_row(self, zip_code, postal_code, state, county, city, lat, lng, accuracy) -> Dict[str, Any]:
+        # Handle pandas checking gracefully
+        pd = get_module('pandas')
+        if (pd and pd.isna(county)) or (not pd and not county):
+            return {'error': f'ZIP code not found: {zip_code}'}
+        return {
+            'state': state,
+            'county': county,
+            'city': city,
+            'zipcode': postal_code,
+            'lat': lat,
+            'lng': lng,
+            'accuracy': accuracy,
+            'error': None
+        }
+
+    def _load_zip_locations(self, zip_codes: List[str]) -> None:
+        """Fill the ZIP cache for every uncached 5-digit ZIP with one vectorized pgeocode query"""
+        missing = [z for z in dict.fromkeys(zip_codes) if z not in self._zip_cache]
+        if not missing or not self.geo_us:
+            return
+        try:
+            frame = self.geo_us.query_postal_code(missing)
+            rows = zip(missing, frame.postal_code, frame.state_code, frame.county_name,
+                       frame.place_name, frame.latitude, frame.longitude, frame.accuracy)
+            for zip_code, *columns in rows:
+                self._zip_cache[zip_code] = self._location_from_row(zip_code, *columns)
+        except Exception as e:
+            logger.error(f"❌ Error looking up {len(missing)} ZIP codes: {e}")
+
+    def zips_to_locations(self, zip_codes: Iterable[str]) -> Dict[str, Any]:
+        """
+        Resolve many ZIP codes at once. Returns ordered unique counties ("County, ST") and
+        states, plus one detail entry per input ZIP in input order.
+        """
+        candidates = [str(z).strip() for z in zip_codes if z is not None and str(z).strip()]
+        valid = [m.group(1) for m in (ZIP_PATTERN.match(z) for z in candidates) if m]
+        if self.pgeocode_available:
+            self._load_zip_locations(valid)
+
+        counties: Dict[str, None] = {}
+        states: Dict[str, None] = {}
+        details = []
+        successful = 0
+        for raw in candidates:
+            match = ZIP_PATTERN.match(raw)
+            if not match:
+                details.append({"zip_code": raw, "error": "Invalid ZIP code format", "success": False})
+                continue
+            zip_code = match.group(1)
+            location = self._zip_cache.get(zip_code) or self.zip_to_location(zip_code)
+            county, state = location.get('county'), location.get('state')
+            if location.get('error') or not county or not state:
+                details.append({"zip_code": zip_code, "error": location.get('error') or "No county/state data",
+                                "success": False})
+                continue
+            counties[f"{county}, {state}"] = None
+            states[state] = None
+            details.append({"zip_code": zip_code, "county": county, "state": state,
+                            "city": location.get('city'), "success": True})
+            successful += 1
+
+        return {
+            "counties": list(counties),
+            "states": list(states),
+            "details": details,
+            "successful_conversions": successful,
+            "total_zip_codes": len(candidates),
+        }
+
+    def resolve_coverage(self, coverage) -> Dict[str, Any]:
+        """
+        Resolve a vendor coverage value - ZIP codes, "County, ST" entries, state codes or
+        names, GLOBAL/NATIONAL - given as a string or list. Returns the coverage type
+        (global/national/state/county, None if nothing resolved) with ordered unique
+        states and counties. Results are memoized per coverage string.
+        """
+        if isinstance(coverage, str):
+            key = coverage.strip()
+        elif coverage:
+            key = "\n".join(str(item).strip() for item in coverage if item is not None)
+        else:
+            key = ""
+
+        with self._cache_lock:
+            cached = self._coverage_cache.get(key)
+            if cached is not None:
+                self._coverage_cache.move_to_end(key)
+        if cached is None:
+            cached = self._resolve_coverage(key)
+            with self._cache_lock:
+                self._coverage_cache[key] = cached
+                while len(self._coverage_cache) > COVERAGE_CACHE_SIZE:
+                    self._coverage_cache.popitem(last=False)
+        return {k: list(v) if isinstance(v, list) else v for k, v in cached.items()}
+
+    def _resolve_coverage(self, text: str) -> Dict[str, Any]:
+        result = {"type": None, "states": [], "counties": [], "zip_codes": [], "unresolved": [],
+                  "successful_conversions": 0, "total_zip_codes": 0}
+        upper = text.upper()
+        if not text:
+            return result
+        if 'GLOBAL' in upper:
+            return {**result, "type": "global"}
+        if 'NATIONAL' in upper or upper in ('USA', 'US', 'UNITED STATES'):
+            return {**result, "type": "national"}
+
+        counties: Dict[str, None] = {}
+        states: Dict[str, None] = {}
+        zip_codes = []
+        # Entries are separated by ';' or newlines; within an entry, commas separate ZIPs and
+        # states, and "Name, ST" pairs are counties
+        for entry in re.split(r'[;\n]', text):
+            tokens = [t.strip() for t in entry.split(',') if t.strip()]
+            i = 0
+            while i < len(tokens):
+                token = tokens[i]
+                next_token = tokens[i + 1].upper() if i + 1 < len(tokens) else ""
+                if ZIP_PATTERN.match(token):
+                    zip_codes.append(token)
+                elif len(next_token) == 2 and next_token in US_STATE_CODES and token.upper() not in US_STATE_CODES:
+                    # "Washington, PA" is a county even though Washington is also a state name
+                    counties[f"{token}, {next_token}"] = None
+                    i += 1
+                elif self._state_code(token):
+                    states[self._state_code(token)] = None
+                else:
+                    result["unresolved"].append(token)
+                i += 1
+
+        county_states = {county.rsplit(', ', 1)[1]: None for county in counties}
+        if zip_codes:
+            batch = self.zips_to_locations(zip_codes)
+            for county in batch["counties"]:
+                counties[county] = None
+            for state in batch["states"]:
+                county_states[state] = None
+            result["zip_codes"] = zip_codes
+            result["successful_conversions"] = batch["successful_conversions"]
+            result["total_zip_codes"] = batch["total_zip_codes"]
+
+        if counties:
+            result["type"] = "county"
+            result["counties"] = list(counties)
+            result["states"] = list({**county_states, **states})
+        elif states:
+            result["type"] = "state"
+            result["states"] = list(states)
+        return result
+
+    @staticmethod
+    def _state_code(token: str) -> Optional[str]:
+        upper = token.upper()
+        if len(upper) == 2 and upper in US_STATE_CODES:
+            return upper
+        return US_STATE_NAMES.get(token.lower())
+
     def get_state_counties(self, state_abbr: str) -> List[str]:
         """
         Get all unique counties for a given state abbreviation.
@@ -0,0 +1,249 @@
+# api/services/mail_outbox.py
+"""
+Outbound Mail Outbox
+Emails are persisted to the email_outbox table and delivered by a background worker
+over pooled, already-authenticated aiosmtplib connections (one per sender), so request
+handlers only pay for a local insert. Security emails (2FA, password reset) are sent
+ahead of notifications; failed sends retry with exponential backoff.
+"""
+
+import time
+import random
+import asyncio
+import logging
+import smtplib
+from email.message import Message
+from typing import Dict, Any, Optional
+
+from database.simple_connection import db as simple_db_instance
+from utils.dependency_manager import get_module, is_available
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Lower value sends first
+PRIORITY_SECURITY = 0       # 2FA codes, password resets
+PRIORITY_ACCOUNT = 5        # welcome / account alerts
+PRIORITY_NOTIFICATION = 10  # admin / bulk notifications
+
+MAX_ATTEMPTS = 6
+BASE_BACKOFF_SECONDS = 15
+MAX_BACKOFF_SECONDS = 1800
+IDLE_DISCONNECT_SECONDS = 240  # Gmail drops idle SMTP sessions after a few minutes
+SEND_LEASE_SECONDS = 300  # a 'sending' claim older than this was abandoned by a crashed worker
+
+
+class SMTPSender:
+    """A named SMTP account with one pooled, authenticated connection"""
+
+    def __init__(self, name: str, host: str, port: int, username: str, password: str):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self._smtp = None
+        self._last_used = 0.0
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.username and self.password)
+
+    async def _connect(self):
+        aiosmtplib = get_module('aiosmtplib')
+        use_tls = self.port == 465
+        smtp = aiosmtplib.SMTP(hostname=self.host, port=self.port, use_tls=use_tls,
+                               start_tls=False, timeout=20)
+        await smtp.connect()
+        if not use_tls:
+            await smtp.starttls()
+        await smtp.login(self.username, self.password)
+        self._smtp = smtp
+        logger.info(f"📧 SMTP connection opened for sender '{self.name}' ({self.host}:{self.port})")
+
+    async def send(self, from_addr: str, to_addr: str, message: str) -> None:
+        """Send over the pooled connection, reconnecting once if the server dropped it"""
+        if not is_available('aiosmtplib'):
+            # Blocking fallback kept off the event loop
+            await asyncio.to_thread(self._send_blocking, from_addr, to_addr, message)
+            return
+
+        if self._smtp is not None and time.monotonic() - self._last_used > IDLE_DISCONNECT_SECONDS:
+            await self.close()
+
+        for attempt in range(2):
+            if self._smtp is None or not self._smtp.is_connected:
+                await self._connect()
+            try:
+                await self._smtp.sendmail(from_addr, [to_addr], message)
+                self._last_used = time.monotonic()
+                return
+            except get_module('aiosmtplib').SMTPServerDisconnected:
+                self._smtp = None
+                if attempt:
+                    raise
+
+    def _send_blocking(self, from_addr: str, to_addr: str, message: str) -> None:
+        with smtplib.SMTP(self.host, self.port, timeout=20) as server:
+            server.starttls()
+            server.login(self.username, self.password)
+            server.sendmail(from_addr, [to_addr], message)
+
+    async def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                await self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+
+class MailOutbox:
+    """Persistent, priority-ordered email queue drained by a single background task"""
+
+    def __init__(self):
+        self.senders: Dict[str, SMTPSender] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_requeue = 0.0
+        self.stats = {"queued": 0, "sent": 0, "retried": 0, "failed": 0, "expired": 0}
+
+    def register_sender(self, name: str, host: str, port: int, username: str, password: str) -> None:
+        self.senders[name] = SMTPSender(name, host, port, username, password)
+
+    def enqueue(self, sender: str, msg: Message, priority: int = PRIORITY_NOTIFICATION,
+                expires_in_seconds: Optional[int] = None) -> bool:
+        """Queue a message for delivery. Returns False if it could not be queued."""
+        smtp_sender = self.senders.get(sender)
+        if smtp_sender is None or not smtp_sender.configured:
+            logger.warning(f"SMTP sender '{sender}' not configured - email to {msg['To']} not queued")
+            return False
+
+        expires_at = time.time() + expires_in_seconds if expires_in_seconds else None
+        email_id = simple_db_instance.enqueue_outbound_email(
+            sender, smtp_sender.username, msg["To"], msg.as_string(), priority, expires_at
+        )
+        if not email_id:
+            return False
+
+        self.stats["queued"] += 1
+        self._notify()
+        logger.info(f"📨 Queued email {email_id[:8]} to {msg['To']} (priority {priority})")
+        return True
+
+    def _notify(self) -> None:
+        if self._loop is None or self._wakeup is None:
+            return
+        try:
+            if asyncio.get_running_loop() is self._loop:
+                self._wakeup.set()
+                return
+        except RuntimeError:
+            pass
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    # ============================================
+    # Worker
+    # ============================================
+
+    def start(self) -> None:
+        """Start the delivery worker on the running event loop"""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._requeue_abandoned()
+        self._task = self._loop.create_task(self._run())
+        logger.info("📨 Mail outbox worker started")
+
+    def _requeue_abandoned(self) -> None:
+        """Requeue emails whose sending claim expired (their worker died mid-send)"""
+        self._last_requeue = time.time()
+        requeued = simple_db_instance.requeue_stuck_outbound_emails(SEND_LEASE_SECONDS)
+        if requeued:
+            logger.info(f"📨 Requeued {requeued} emails interrupted during sending")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for sender in self.senders.values():
+            await sender.close()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                email = await asyncio.to_thread(simple_db_instance.claim_next_outbound_email)
+                if email:
+                    await self._deliver(email)
+                    continue
+
+                if time.time() - self._last_requeue >= SEND_LEASE_SECONDS:
+                    await asyncio.to_thread(self._requeue_abandoned)
+                    continue
+
+                next_due = await asyncio.to_thread(simple_db_instance.next_outbound_email_due_at)
+                timeout = max(0.0, next_due - time.time()) if next_due else SEND_LEASE_SECONDS
+                timeout = min(timeout, SEND_LEASE_SECONDS)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Mail outbox worker error: {e}")
+                await asyncio.sleep(5)
+
+    async def _deliver(self, email: Dict[str, Any]) -> None:
+        email_id = email["id"]
+
+        if email["expires_at"] and time.time() > email["expires_at"]:
+            self.stats["expired"] += 1
+            logger.warning(f"⌛ Email {email_id[:8]} to {email['to_addr']} expired before delivery")
+            await asyncio.to_thread(simple_db_instance.complete_outbound_email, email_id, "expired")
+            return
+
+        sender = self.senders.get(email["sender"])
+        try:
+            if sender is None:
+                raise RuntimeError(f"Unknown sender '{email['sender']}'")
+            await sender.send(email["from_addr"], email["to_addr"], email["message"])
+        except Exception as e:
+            attempts = email["attempts"] + 1
+            if attempts >= MAX_ATTEMPTS:
+                self.stats["failed"] += 1
+                logger.error(f"❌ Giving up on email {email_id[:8]} to {email['to_addr']} after {attempts} attempts: {e}")
+                await asyncio.to_thread(simple_db_instance.complete_outbound_email, email_id, "failed", str(e))
+                return
+
+            backoff = min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** (attempts - 1))
+            backoff *= random.uniform(0.8, 1.2)
+            self.stats["retried"] += 1
+            logger.warning(f"⚠️ Email {email_id[:8]} to {email['to_addr']} failed ({e}) - retrying in {backoff:.0f}s")
+            await asyncio.to_thread(simple_db_instance.complete_outbound_email, email_id, "pending",
+                                    str(e), time.time() + backoff)
+            return
+
+        self.stats["sent"] += 1
+        logger.info(f"✅ Email {email_id[:8]} sent to {email['to_addr']}")
+        await asyncio.to_thread(simple_db_instance.complete_outbound_email, email_id, "sent")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "running": self._task is not None and not self._task.done(),
+            "outbox": simple_db_instance.get_outbound_email_stats(),
+            "async_smtp": is_available('aiosmtplib'),
+        }
+
+
+# Global instance
+mail_outbox = MailOutbox()
+metrics.register_stats("mail_outbox", lambda: mail_outbox.stats)
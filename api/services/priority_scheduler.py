@@ -0,0 +1,295 @@
+# api/services/priority_scheduler.py
+"""
+Priority Work Scheduler
+Runs webhook ingestion/routing work on a fixed pool of worker threads fed by per-lane
+queues, so an emergency tow request never waits behind a vendor-application backlog.
+
+- The emergency lane is always dequeued first and has a worker reserved for it.
+- Remaining lanes share the pool by smooth weighted round-robin (no lane starves).
+- Emergency work marks the shared GHL rate limiter as urgent while it runs, which makes
+  bulk sync/reassignment callers yield their GHL budget.
+- Per-lane queue wait / latency percentiles are tracked against an SLO target.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Callable, Awaitable, Optional
+
+from config import AppConfig
+from api.services.ghl_rate_limiter import ghl_rate_limiter
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+EMERGENCY_LANE = "emergency"
+
+# lane -> dequeue weight (emergency is strict priority, weight only used for reporting)
+LANE_WEIGHTS = {
+    EMERGENCY_LANE: 8,
+    "lead": 4,
+    "general": 2,
+    "vendor": 1,
+}
+
+# lane -> end-to-end latency target in seconds (queue wait + processing)
+LANE_SLO_SECONDS = {
+    EMERGENCY_LANE: 5.0,
+    "lead": 30.0,
+    "general": 120.0,
+    "vendor": 300.0,
+}
+
+FORM_TYPE_LANES = {
+    "emergency_service": EMERGENCY_LANE,
+    "client_lead": "lead",
+    "general_inquiry": "general",
+    "vendor_application": "vendor",
+}
+
+LATENCY_SAMPLE_SIZE = 500
+
+
+def lane_for_form_config(form_config: Dict[str, Any]) -> str:
+    """Map a get_form_configuration() result onto a scheduler lane"""
+    if form_config.get("priority") == "high":
+        return EMERGENCY_LANE
+    return FORM_TYPE_LANES.get(form_config.get("form_type"), "lead")
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class _WorkItem:
+    __slots__ = ("lane", "name", "coro_factory", "enqueued_at")
+
+    def __init__(self, lane: str, name: str, coro_factory: Callable[[], Awaitable[Any]]):
+        self.lane = lane
+        self.name = name
+        self.coro_factory = coro_factory
+        self.enqueued_at = time.monotonic()
+
+
+class PriorityWorkScheduler:
+    """
+    Thread-safe, lane-aware work queue. submit() can be called from any thread or event
+    loop; each worker owns a persistent event loop and runs one work item at a time.
+    """
+
+    def __init__(self, worker_count: int = None, weights: Dict[str, int] = None,
+                 slo_seconds: Dict[str, float] = None):
+        self.worker_count = max(1, int(worker_count or AppConfig.WEBHOOK_WORKER_THREADS))
+        self.weights = dict(weights or LANE_WEIGHTS)
+        self.slo_seconds = dict(slo_seconds or LANE_SLO_SECONDS)
+
+        self._queues: Dict[str, deque] = {lane: deque() for lane in self.weights}
+        self._wrr_current: Dict[str, int] = {lane: 0 for lane in self.weights}
+        self._cond = threading.Condition()
+        self._workers = []
+        self._running = False
+
+        self._metrics: Dict[str, Dict[str, Any]] = {
+            lane: {
+                "submitted": 0,
+                "completed": 0,
+                "failed": 0,
+                "in_flight": 0,
+                "slo_met": 0,
+                "queue_wait_ms": deque(maxlen=LATENCY_SAMPLE_SIZE),
+                "latency_ms": deque(maxlen=LATENCY_SAMPLE_SIZE),
+            }
+            for lane in self.weights
+        }
+
+    # ============================================
+    # Lifecycle
+    # ============================================
+
+    def start(self) -> None:
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            # One worker only ever serves the emergency lane so it is never fully occupied
+            # by lower-priority work; the rest serve every lane.
+            specs = [(f"priority-worker-{EMERGENCY_LANE}", True)]
+            specs += [(f"priority-worker-{i}", False) for i in range(self.worker_count)]
+            for name, emergency_only in specs:
+                worker = threading.Thread(target=self._worker_loop, args=(emergency_only,),
+                                          daemon=True, name=name)
+                worker.start()
+                self._workers.append(worker)
+        logger.info(f"🚦 Priority scheduler started with {self.worker_count} workers "
+                    f"+ 1 reserved emergency worker (weights: {self.weights})")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop workers after the items they are currently running (queued items are dropped)"""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            dropped = sum(len(queue) for queue in self._queues.values())
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+        if dropped:
+            logger.warning(f"⚠️ Priority scheduler stopped with {dropped} queued items dropped")
+        logger.info("🛑 Priority scheduler stopped")
+
+    # ============================================
+    # Submission / dequeue
+    # ============================================
+
+    def submit(self, lane: str, coro_factory: Callable[[], Awaitable[Any]], name: str = "") -> None:
+        """Queue coro_factory() to run on a worker loop in the given lane"""
+        if lane not in self._queues:
+            logger.warning(f"⚠️ Unknown scheduler lane '{lane}', using 'lead'")
+            lane = "lead"
+        if not self._running:
+            self.start()
+
+        with self._cond:
+            self._queues[lane].append(_WorkItem(lane, name or lane, coro_factory))
+            self._metrics[lane]["submitted"] += 1
+            depth = len(self._queues[lane])
+            self._cond.notify_all()
+        logger.debug(f"📥 Queued '{name}' in lane '{lane}' (depth {depth})")
+
+    def _next_item(self, emergency_only: bool) -> Optional[_WorkItem]:
+        """Pop the next item by lane priority. Caller must hold self._cond."""
+        if self._queues[EMERGENCY_LANE]:
+            return self._queues[EMERGENCY_LANE].popleft()
+        if emergency_only:
+            return None
+
+        # Smooth weighted round-robin over non-empty lanes
+        ready = [lane for lane, queue in self._queues.items() if queue and lane != EMERGENCY_LANE]
+        if not ready:
+            return None
+        total = 0
+        for lane in ready:
+            self._wrr_current[lane] += self.weights[lane]
+            total += self.weights[lane]
+        chosen = max(ready, key=lambda lane: self._wrr_current[lane])
+        self._wrr_current[chosen] -= total
+        return self._queues[chosen].popleft()
+
+    def _worker_loop(self, emergency_only: bool) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            while True:
+                with self._cond:
+                    item = self._next_item(emergency_only)
+                    while item is None and self._running:
+                        self._cond.wait()
+                        item = self._next_item(emergency_only)
+                    if not self._running:
+                        return
+                    self._metrics[item.lane]["in_flight"] += 1
+                self._run_item(loop, item)
+        finally:
+            loop.close()
+
+    def _run_item(self, loop: asyncio.AbstractEventLoop, item: _WorkItem) -> None:
+        started_at = time.monotonic()
+        success = False
+        try:
+            if item.lane == EMERGENCY_LANE:
+                with ghl_rate_limiter.urgent():
+                    loop.run_until_complete(item.coro_factory())
+            else:
+                loop.run_until_complete(item.coro_factory())
+            success = True
+        except Exception as e:
+            logger.error(f"❌ Scheduled work '{item.name}' failed in lane '{item.lane}': {e}", exc_info=True)
+        finally:
+            self._record(item, started_at, time.monotonic(), success)
+
+    def _record(self, item: _WorkItem, started_at: float, finished_at: float, success: bool) -> None:
+        queue_wait_ms = (started_at - item.enqueued_at) * 1000
+        latency_ms = (finished_at - item.enqueued_at) * 1000
+        with self._cond:
+            metrics = self._metrics[item.lane]
+            metrics["in_flight"] -= 1
+            metrics["completed" if success else "failed"] += 1
+            metrics["queue_wait_ms"].append(queue_wait_ms)
+            metrics["latency_ms"].append(latency_ms)
+            if latency_ms <= self.slo_seconds.get(item.lane, float("inf")) * 1000:
+                metrics["slo_met"] += 1
+
+        if latency_ms > self.slo_seconds.get(item.lane, float("inf")) * 1000:
+            logger.warning(f"🐢 '{item.name}' missed the {item.lane} SLO: {latency_ms:.0f}ms "
+                           f"(queued {queue_wait_ms:.0f}ms)")
+
+    # ============================================
+    # Metrics
+    # ============================================
+
+    def get_lane_stats(self) -> Dict[str, Any]:
+        """Per-lane depth, counters and latency percentiles (over the last samples)"""
+        with self._cond:
+            snapshot = {
+                lane: {
+                    **{k: v for k, v in metrics.items() if not isinstance(v, deque)},
+                    "queue_wait_ms": sorted(metrics["queue_wait_ms"]),
+                    "latency_ms": sorted(metrics["latency_ms"]),
+                    "queued": len(self._queues[lane]),
+                }
+                for lane, metrics in self._metrics.items()
+            }
+            running = self._running
+
+        lanes = {}
+        for lane, data in snapshot.items():
+            finished = data["completed"] + data["failed"]
+            lanes[lane] = {
+                "weight": self.weights[lane],
+                "queued": data["queued"],
+                "in_flight": data["in_flight"],
+                "submitted": data["submitted"],
+                "completed": data["completed"],
+                "failed": data["failed"],
+                "queue_wait_ms": {
+                    "p50": round(_percentile(data["queue_wait_ms"], 0.50), 1),
+                    "p95": round(_percentile(data["queue_wait_ms"], 0.95), 1),
+                    "max": round(data["queue_wait_ms"][-1], 1) if data["queue_wait_ms"] else 0.0,
+                },
+                "latency_ms": {
+                    "p50": round(_percentile(data["latency_ms"], 0.50), 1),
+                    "p95": round(_percentile(data["latency_ms"], 0.95), 1),
+                    "max": round(data["latency_ms"][-1], 1) if data["latency_ms"] else 0.0,
+                },
+                "slo_target_ms": self.slo_seconds.get(lane, 0) * 1000,
+                "slo_attainment_pct": round(data["slo_met"] / finished * 100, 1) if finished else 100.0,
+            }
+
+        return {
+            "running": running,
+            "workers": self.worker_count,
+            "reserved_emergency_workers": 1,
+            "lanes": lanes,
+            "ghl_rate_limiter": ghl_rate_limiter.get_stats(),
+        }
+
+
+    def queue_depths(self) -> Dict[tuple, float]:
+        """(lane, state) -> count of queued / in-flight items, for /metrics"""
+        with self._cond:
+            depths = {(lane, "queued"): len(queue) for lane, queue in self._queues.items()}
+            depths.update({(lane, "in_flight"): m["in_flight"] for lane, m in self._metrics.items()})
+        return depths
+
+
+# Global instance
+priority_scheduler = PriorityWorkScheduler()
+
+metrics.gauge_callback("webhook_backlog", "Webhook work items per scheduler lane",
+                       ("lane", "state"), priority_scheduler.queue_depths)
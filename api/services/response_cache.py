@@ -0,0 +1,254 @@
+# api/services/response_cache.py
+"""
+Pre-serialized Response Cache
+Serializes rarely-changing payloads once to bytes, keeps precomputed gzip/brotli variants
+and a strong ETag, and answers conditional GETs (If-None-Match / If-Modified-Since) with 304.
+Used for the service dictionary JSON endpoints and the HTML dashboard/widget pages.
+"""
+
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Any, Callable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from utils.dependency_manager import get_module, is_available
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 512
+
+
+@dataclass
+class CachedPayload:
+    body: bytes
+    media_type: str
+    etag: str
+    last_modified: str
+    last_modified_ts: float
+    gzip_body: Optional[bytes] = None
+    brotli_body: Optional[bytes] = None
+
+
+def build_payload(body: bytes, media_type: str, last_modified_ts: float = None) -> CachedPayload:
+    """Hash and precompress a response body"""
+    last_modified_ts = int(last_modified_ts or time.time())
+    payload = CachedPayload(
+        body=body,
+        media_type=media_type,
+        etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        last_modified=formatdate(last_modified_ts, usegmt=True),
+        last_modified_ts=last_modified_ts,
+    )
+
+    if len(body) >= MIN_COMPRESS_BYTES:
+        payload.gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        if is_available('brotli'):
+            payload.brotli_body = get_module('brotli').compress(body)
+
+    return payload
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison per RFC 9110 - proxies may add W/ after compressing
+    return any(tag == etag or tag == f"W/{etag}" for tag in candidates)
+
+
+def _not_modified_since(if_modified_since: str, last_modified_ts: float) -> bool:
+    try:
+        return parsedate_to_datetime(if_modified_since).timestamp() >= last_modified_ts
+    except (TypeError, ValueError):
+        return False
+
+
+def serve_payload(request: Request, payload: CachedPayload, cache_control: str) -> Response:
+    """Return 304 for a fresh conditional GET, otherwise the best encoding the client accepts"""
+    headers = {
+        "ETag": payload.etag,
+        "Last-Modified": payload.last_modified,
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, payload.etag):
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since"):
+        if _not_modified_since(request.headers["if-modified-since"], payload.last_modified_ts):
+            return Response(status_code=304, headers=headers)
+
+    accept_encoding = request.headers.get("accept-encoding", "").lower()
+    body = payload.body
+    if payload.brotli_body is not None and "br" in accept_encoding:
+        body = payload.brotli_body
+        headers["Content-Encoding"] = "br"
+    elif payload.gzip_body is not None and "gzip" in accept_encoding:
+        body = payload.gzip_body
+        headers["Content-Encoding"] = "gzip"
+
+    return Response(content=body, media_type=payload.media_type, headers=headers)
+
+
+class JSONResponseCache:
+    """
+    Named JSON payloads built from registered builder functions. Each payload is
+    serialized once (at warm-up or on first request) and rebuilt only after invalidate().
+    """
+
+    def __init__(self):
+        self._builders: Dict[str, Callable[[], Any]] = {}
+        self._payloads: Dict[str, CachedPayload] = {}
+        self._lock = threading.Lock()
+
+    def register(self, key: str, builder: Callable[[], Any]) -> None:
+        self._builders[key] = builder
+        self._payloads.pop(key, None)
+
+    def get(self, key: str) -> CachedPayload:
+        payload = self._payloads.get(key)
+        if payload is not None:
+            return payload
+
+        with self._lock:
+            payload = self._payloads.get(key)
+            if payload is None:
+                data = self._builders[key]()
+                body = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+                payload = build_payload(body, "application/json")
+                self._payloads[key] = payload
+                logger.info(f"📦 Cached response '{key}': {len(body)} bytes "
+                            f"(gzip {len(payload.gzip_body or b'')}, br {len(payload.brotli_body or b'')})")
+        return payload
+
+    def invalidate(self, key: str = None) -> None:
+        """Drop one (or every) cached payload so it is rebuilt on next access"""
+        with self._lock:
+            if key is None:
+                self._payloads.clear()
+            else:
+                self._payloads.pop(key, None)
+
+    def warm(self) -> None:
+        """Build every registered payload up front (called at startup)"""
+        for key in list(self._builders):
+            try:
+                self.get(key)
+            except Exception as e:
+                logger.error(f"❌ Failed to warm cached response '{key}': {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            key: {
+                "etag": payload.etag,
+                "bytes": len(payload.body),
+                "gzip_bytes": len(payload.gzip_body) if payload.gzip_body else None,
+                "brotli_bytes": len(payload.brotli_body) if payload.brotli_body else None,
+            }
+            for key, payload in self._payloads.items()
+        }
+
+
+class HTMLTemplateCache:
+    """
+    HTML files held in memory keyed by path and mtime. A file is re-stat'ed at most every
+    stat_interval seconds; with watching enabled (dev mode) a background thread reloads
+    edited files as soon as they change instead.
+    """
+
+    def __init__(self, stat_interval: float = 2.0):
+        self.stat_interval = stat_interval
+        self._entries: Dict[str, Tuple[float, CachedPayload]] = {}  # path -> (mtime, payload)
+        self._last_stat: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._watch_stop: Optional[threading.Event] = None
+
+    def get(self, file_path: Path) -> Optional[CachedPayload]:
+        """Cached payload for file_path, reloaded if the file changed (None if missing)"""
+        key = str(file_path)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry is not None and (self._watch_stop is not None
+                                  or now - self._last_stat.get(key, 0) < self.stat_interval):
+            return entry[1]
+
+        try:
+            mtime = os.stat(key).st_mtime
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+        self._last_stat[key] = now
+
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+        return self._load(key, mtime)
+
+    def _load(self, key: str, mtime: float) -> CachedPayload:
+        with open(key, "rb") as f:
+            body = f.read()
+        payload = build_payload(body, "text/html; charset=utf-8", mtime)
+        with self._lock:
+            self._entries[key] = (mtime, payload)
+        logger.debug(f"📄 Cached template {key} ({len(body)} bytes)")
+        return payload
+
+    def invalidate(self, file_path: Path = None) -> None:
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(file_path), None)
+
+    def start_watching(self, interval: float = 1.0) -> None:
+        """Poll cached files for changes and reload them immediately (dev mode)"""
+        if self._watch_stop is not None:
+            return
+        self._watch_stop = threading.Event()
+        stop = self._watch_stop
+
+        def watch():
+            while not stop.wait(interval):
+                for key, (mtime, _) in list(self._entries.items()):
+                    try:
+                        current = os.stat(key).st_mtime
+                    except FileNotFoundError:
+                        self.invalidate(Path(key))
+                        continue
+                    if current != mtime:
+                        logger.info(f"🔄 Template changed, reloading: {key}")
+                        self._load(key, current)
+
+        threading.Thread(target=watch, daemon=True, name="template-cache-watch").start()
+        logger.info("👀 Watching cached HTML templates for changes")
+
+    def stop_watching(self) -> None:
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self._watch_stop = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "templates": len(self._entries),
+            "bytes": sum(len(payload.body) for _, payload in self._entries.values()),
+            "watching": self._watch_stop is not None,
+        }
+
+
+# Global instances
+json_response_cache = JSONResponseCache()
+html_template_cache = HTMLTemplateCache()
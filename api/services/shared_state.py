@@ -0,0 +1,469 @@
+# api/services/shared_state.py
+"""
+Shared State Backend
+Counters, sliding windows, hashes, cached values and locks that every worker process sees,
+so rate limiting, IP blocking, round-robin routing and caches behave the same under
+`uvicorn --workers N` (or several nodes) as they do in a single process.
+
+Backends (SHARED_STATE_BACKEND):
+    redis   SHARED_STATE_REDIS_URL - works across nodes
+    sqlite  a local WAL-mode SQLite file - all workers on one node
+    memory  process-local (the old single-process behaviour; tests)
+    auto    redis when a URL is configured and reachable, otherwise sqlite
+
+All values are JSON-encoded. Keys are namespaced with SHARED_STATE_PREFIX.
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple
+
+from config import AppConfig
+from utils.dependency_manager import get_module, is_available
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+LOCK_POLL_SECONDS = 0.01
+
+
+class SharedStateTimeout(Exception):
+    """A shared lock could not be acquired in time"""
+
+
+class SharedStateBackend:
+    """Interface shared by all backends"""
+
+    name = "base"
+
+    def __init__(self):
+        self.stats = {"operations": 0, "lock_acquired": 0, "lock_timeouts": 0, "lock_wait_seconds": 0.0}
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        raise NotImplementedError
+
+    def get(self, key: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def hget(self, key: str, field: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def hgetall(self, key: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def hset(self, key: str, field: str, value: Any) -> None:
+        raise NotImplementedError
+
+    def hdel(self, key: str, field: str) -> bool:
+        raise NotImplementedError
+
+    def hit_window(self, key: str, window_seconds: float, limit: Optional[int] = None) -> Tuple[bool, int, float]:
+        """
+        Sliding-window log. Records a hit unless `limit` hits are already inside the window.
+        Returns (recorded, hits in window, timestamp of the oldest hit).
+        """
+        raise NotImplementedError
+
+    def clear_window(self, key: str) -> None:
+        raise NotImplementedError
+
+    def _acquire(self, name: str, owner: str, ttl: float) -> bool:
+        raise NotImplementedError
+
+    def _release(self, name: str, owner: str) -> None:
+        raise NotImplementedError
+
+    @contextmanager
+    def lock(self, name: str, ttl: float = 10.0, wait: float = 10.0):
+        """Mutual exclusion across workers; the lock expires after `ttl` if its holder dies"""
+        owner = uuid.uuid4().hex
+        started = time.monotonic()
+        while not self._acquire(name, owner, ttl):
+            if time.monotonic() - started >= wait:
+                self.stats["lock_timeouts"] += 1
+                raise SharedStateTimeout(f"Timed out waiting for shared lock '{name}'")
+            time.sleep(LOCK_POLL_SECONDS * (1 + random.random()))
+        self.stats["lock_acquired"] += 1
+        self.stats["lock_wait_seconds"] += time.monotonic() - started
+        try:
+            yield
+        finally:
+            try:
+                self._release(name, owner)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not release shared lock '{name}' (expires in {ttl}s): {e}")
+
+    def cleanup(self) -> None:
+        """Drop expired entries (backends with native expiry do nothing)"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, **self.stats}
+
+
+class MemorySharedState(SharedStateBackend):
+    """Process-local state - correct for a single worker only"""
+
+    name = "memory"
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.RLock()
+        self._values: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._hashes: Dict[str, Dict[str, Any]] = {}
+        self._windows: Dict[str, list] = {}
+        self._locks: Dict[str, Tuple[str, float]] = {}
+
+    def _live(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        entry = self._values.get(key)
+        if entry and entry[1] is not None and entry[1] <= time.time():
+            del self._values[key]
+            return None
+        return entry
+
+    def incr(self, key, amount=1, ttl=None):
+        with self._lock:
+            self.stats["operations"] += 1
+            entry = self._live(key)
+            value = (json.loads(entry[0]) if entry else 0) + amount
+            expires = entry[1] if entry else (time.time() + ttl if ttl else None)
+            self._values[key] = (json.dumps(value), expires)
+            return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            self.stats["operations"] += 1
+            entry = self._live(key)
+            return json.loads(entry[0]) if entry else default
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self.stats["operations"] += 1
+            self._values[key] = (json.dumps(value), time.time() + ttl if ttl else None)
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+            self._hashes.pop(key, None)
+            self._windows.pop(key, None)
+
+    def hget(self, key, field, default=None):
+        with self._lock:
+            self.stats["operations"] += 1
+            value = self._hashes.get(key, {}).get(field)
+            return json.loads(value) if value is not None else default
+
+    def hgetall(self, key):
+        with self._lock:
+            self.stats["operations"] += 1
+            return {field: json.loads(value) for field, value in self._hashes.get(key, {}).items()}
+
+    def hset(self, key, field, value):
+        with self._lock:
+            self.stats["operations"] += 1
+            self._hashes.setdefault(key, {})[field] = json.dumps(value)
+
+    def hdel(self, key, field):
+        with self._lock:
+            self.stats["operations"] += 1
+            return self._hashes.get(key, {}).pop(field, None) is not None
+
+    def hit_window(self, key, window_seconds, limit=None):
+        now = time.time()
+        with self._lock:
+            self.stats["operations"] += 1
+            hits = [t for t in self._windows.get(key, []) if t >= now - window_seconds]
+            oldest = hits[0] if hits else now
+            if limit is not None and len(hits) >= limit:
+                self._windows[key] = hits
+                return False, len(hits), oldest
+            hits.append(now)
+            self._windows[key] = hits
+            return True, len(hits), oldest
+
+    def clear_window(self, key):
+        with self._lock:
+            self._windows.pop(key, None)
+
+    def _acquire(self, name, owner, ttl):
+        now = time.time()
+        with self._lock:
+            holder = self._locks.get(name)
+            if holder and holder[1] > now:
+                return False
+            self._locks[name] = (owner, now + ttl)
+            return True
+
+    def _release(self, name, owner):
+        with self._lock:
+            if self._locks.get(name, (None,))[0] == owner:
+                del self._locks[name]
+
+
+class SQLiteSharedState(SharedStateBackend):
+    """
+    One WAL-mode SQLite file shared by every worker on the node. Each read-modify-write
+    runs in a BEGIN IMMEDIATE transaction, so it is atomic across processes.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+        with self._transaction() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS hashes (key TEXT, field TEXT, value TEXT, "
+                         "PRIMARY KEY (key, field))")
+            conn.execute("CREATE TABLE IF NOT EXISTS windows (key TEXT, ts REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_windows_key_ts ON windows (key, ts)")
+            conn.execute("CREATE TABLE IF NOT EXISTS locks (name TEXT PRIMARY KEY, owner TEXT, expires_at REAL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        self.stats["operations"] += 1
+
+    def _read(self, sql: str, params: tuple):
+        self.stats["operations"] += 1
+        return self._conn().execute(sql, params)
+
+    def incr(self, key, amount=1, ttl=None):
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+            if row and (row[1] is None or row[1] > now):
+                value, expires = json.loads(row[0]) + amount, row[1]
+            else:
+                value, expires = amount, now + ttl if ttl else None
+            conn.execute("INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, json.dumps(value), expires))
+        return value
+
+    def get(self, key, default=None):
+        row = self._read("SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                         (key, time.time())).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key, value, ttl=None):
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, json.dumps(value), time.time() + ttl if ttl else None))
+
+    def delete(self, key):
+        with self._transaction() as conn:
+            for table in ("kv", "hashes", "windows"):
+                conn.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+
+    def hget(self, key, field, default=None):
+        row = self._read("SELECT value FROM hashes WHERE key = ? AND field = ?", (key, field)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def hgetall(self, key):
+        rows = self._read("SELECT field, value FROM hashes WHERE key = ?", (key,)).fetchall()
+        return {field: json.loads(value) for field, value in rows}
+
+    def hset(self, key, field, value):
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO hashes (key, field, value) VALUES (?, ?, ?)",
+                         (key, field, json.dumps(value)))
+
+    def hdel(self, key, field):
+        with self._transaction() as conn:
+            return conn.execute("DELETE FROM hashes WHERE key = ? AND field = ?", (key, field)).rowcount > 0
+
+    def hit_window(self, key, window_seconds, limit=None):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM windows WHERE key = ? AND ts < ?", (key, now - window_seconds))
+            count, oldest = conn.execute("SELECT COUNT(*), MIN(ts) FROM windows WHERE key = ?", (key,)).fetchone()
+            if limit is not None and count >= limit:
+                return False, count, oldest
+            conn.execute("INSERT INTO windows (key, ts) VALUES (?, ?)", (key, now))
+        return True, count + 1, oldest or now
+
+    def clear_window(self, key):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM windows WHERE key = ?", (key,))
+
+    def _acquire(self, name, owner, ttl):
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT expires_at FROM locks WHERE name = ?", (name,)).fetchone()
+            if row and row[0] > now:
+                return False
+            conn.execute("INSERT OR REPLACE INTO locks (name, owner, expires_at) VALUES (?, ?, ?)",
+                         (name, owner, now + ttl))
+        return True
+
+    def _release(self, name, owner):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM locks WHERE name = ? AND owner = ?", (name, owner))
+
+    def cleanup(self):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+            conn.execute("DELETE FROM locks WHERE expires_at <= ?", (now,))
+            # Windows are trimmed per key on every hit; this catches keys that went quiet
+            conn.execute("DELETE FROM windows WHERE ts < ?", (now - 86400,))
+
+
+class RedisSharedState(SharedStateBackend):
+    """Redis-backed state shared across nodes"""
+
+    name = "redis"
+
+    # Atomic check-and-record for the sliding window (ZSET of hit timestamps)
+    HIT_WINDOW_SCRIPT = """
+        redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+        local count = redis.call('ZCARD', KEYS[1])
+        local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')[2] or ARGV[2]
+        if tonumber(ARGV[3]) >= 0 and count >= tonumber(ARGV[3]) then
+            return {0, count, oldest}
+        end
+        redis.call('ZADD', KEYS[1], ARGV[2], ARGV[4])
+        redis.call('EXPIRE', KEYS[1], ARGV[5])
+        return {1, count + 1, oldest}
+    """
+
+    RELEASE_SCRIPT = """
+        if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+        return 0
+    """
+
+    def __init__(self, url: str):
+        super().__init__()
+        redis = get_module("redis")
+        self.client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self.client.ping()
+        self._hit_window = self.client.register_script(self.HIT_WINDOW_SCRIPT)
+        self._release_lock = self.client.register_script(self.RELEASE_SCRIPT)
+
+    def _op(self):
+        self.stats["operations"] += 1
+        return self.client
+
+    def incr(self, key, amount=1, ttl=None):
+        value = self._op().incrby(key, amount)
+        if ttl and value == amount:
+            self.client.expire(key, int(ttl))
+        return value
+
+    def get(self, key, default=None):
+        value = self._op().get(key)
+        return json.loads(value) if value is not None else default
+
+    def set(self, key, value, ttl=None):
+        self._op().set(key, json.dumps(value), ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self._op().delete(key)
+
+    def hget(self, key, field, default=None):
+        value = self._op().hget(key, field)
+        return json.loads(value) if value is not None else default
+
+    def hgetall(self, key):
+        return {field.decode(): json.loads(value) for field, value in self._op().hgetall(key).items()}
+
+    def hset(self, key, field, value):
+        self._op().hset(key, field, json.dumps(value))
+
+    def hdel(self, key, field):
+        return bool(self._op().hdel(key, field))
+
+    def hit_window(self, key, window_seconds, limit=None):
+        now = time.time()
+        self.stats["operations"] += 1
+        recorded, count, oldest = self._hit_window(
+            keys=[key],
+            args=[now - window_seconds, now, -1 if limit is None else limit,
+                  f"{now}-{uuid.uuid4().hex[:8]}", int(window_seconds) + 1])
+        return bool(recorded), int(count), float(oldest)
+
+    def clear_window(self, key):
+        self._op().delete(key)
+
+    def _acquire(self, name, owner, ttl):
+        return bool(self._op().set(f"lock:{name}", owner, nx=True, px=int(ttl * 1000)))
+
+    def _release(self, name, owner):
+        self._release_lock(keys=[f"lock:{name}"], args=[owner])
+
+
+class _Namespaced:
+    """Prefixes every key so several apps can share one Redis/SQLite store"""
+
+    def __init__(self, backend: SharedStateBackend, prefix: str):
+        self.backend = backend
+        self.prefix = prefix
+        self.name = backend.name
+
+    def __getattr__(self, attr):
+        method = getattr(self.backend, attr)
+        if attr in ("incr", "get", "set", "delete", "hget", "hgetall", "hset", "hdel",
+                    "hit_window", "clear_window", "lock"):
+            return lambda key, *args, **kwargs: method(self.prefix + key, *args, **kwargs)
+        return method
+
+
+def create_shared_state(backend: str = None):
+    backend = (backend or AppConfig.SHARED_STATE_BACKEND).lower()
+    redis_url = AppConfig.SHARED_STATE_REDIS_URL
+
+    if backend in ("auto", "redis") and redis_url:
+        if is_available("redis"):
+            try:
+                state = RedisSharedState(redis_url)
+                logger.info("🔗 Shared state: redis")
+                return _Namespaced(state, AppConfig.SHARED_STATE_PREFIX)
+            except Exception as e:
+                logger.warning(f"⚠️ Redis shared state unavailable ({e}) - falling back to SQLite")
+        else:
+            logger.warning("⚠️ redis package not installed - shared state falls back to SQLite")
+    elif backend == "redis":
+        logger.warning("⚠️ SHARED_STATE_BACKEND=redis but SHARED_STATE_REDIS_URL is empty - using SQLite")
+
+    if backend == "memory":
+        logger.info("🔗 Shared state: memory (process-local, single worker only)")
+        return _Namespaced(MemorySharedState(), AppConfig.SHARED_STATE_PREFIX)
+
+    path = AppConfig.SHARED_STATE_SQLITE_PATH or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "shared_state.db")
+    logger.info(f"🔗 Shared state: sqlite ({path})")
+    return _Namespaced(SQLiteSharedState(path), AppConfig.SHARED_STATE_PREFIX)
+
+
+# Global instance
+shared_state = create_shared_state()
+metrics.register_stats("shared_state", shared_state.get_stats)
@@ -0,0 +1,107 @@
+# api/services/stage_pipeline.py
+"""
+Dependency-aware stage pipeline
+Runs async stages as soon as the stages they depend on have finished, so independent
+work (e.g. a GHL call and local vendor matching) overlaps instead of running in sequence.
+Every stage records its own timing and, inside a trace, its own span.
+"""
+
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Callable, Awaitable, Optional
+
+from api.services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+StageFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class PipelineStage:
+    """
+    A unit of work. func receives the shared context dict and its return value is stored
+    in context[name]. A stage runs only if all of its dependencies succeeded.
+    """
+    name: str
+    func: StageFunc
+    depends_on: List[str] = field(default_factory=list)
+    timeout: Optional[float] = None
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str  # "success", "failed", "skipped"
+    duration_ms: float = 0.0
+    error: Optional[str] = None
+
+
+class StagePipeline:
+    """Executes PipelineStages as a DAG over a shared context dict"""
+
+    def __init__(self, name: str, stages: List[PipelineStage]):
+        self.name = name
+        self.stages = {stage.name: stage for stage in stages}
+
+        for stage in stages:
+            for dependency in stage.depends_on:
+                if dependency not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dependency}'")
+
+    async def run(self, context: Dict[str, Any]) -> Dict[str, StageResult]:
+        """
+        Run all stages. Returns per-stage results; stage outputs are written to context.
+        Failures never raise - dependents of a failed stage are marked skipped.
+        """
+        results: Dict[str, StageResult] = {}
+        done_events = {name: asyncio.Event() for name in self.stages}
+        pipeline_start = time.perf_counter()
+
+        async def run_stage(stage: PipelineStage) -> None:
+            try:
+                for dependency in stage.depends_on:
+                    await done_events[dependency].wait()
+
+                failed_deps = [d for d in stage.depends_on if results[d].status != "success"]
+                if failed_deps:
+                    results[stage.name] = StageResult(stage.name, "skipped",
+                                                      error=f"dependency not satisfied: {', '.join(failed_deps)}")
+                    return
+
+                start = time.perf_counter()
+                try:
+                    with tracer.span(f"{self.name}.{stage.name}"):
+                        if stage.timeout:
+                            context[stage.name] = await asyncio.wait_for(stage.func(context), stage.timeout)
+                        else:
+                            context[stage.name] = await stage.func(context)
+                    results[stage.name] = StageResult(stage.name, "success",
+                                                      (time.perf_counter() - start) * 1000)
+                except Exception as e:
+                    error = "timeout" if isinstance(e, asyncio.TimeoutError) else str(e)
+                    logger.error(f"❌ {self.name}: stage '{stage.name}' failed: {error}")
+                    results[stage.name] = StageResult(stage.name, "failed",
+                                                      (time.perf_counter() - start) * 1000, error)
+            finally:
+                done_events[stage.name].set()
+
+        await asyncio.gather(*(run_stage(stage) for stage in self.stages.values()))
+
+        total_ms = (time.perf_counter() - pipeline_start) * 1000
+        timings = ", ".join(
+            f"{name}={result.duration_ms:.0f}ms" if result.status == "success" else f"{name}={result.status}"
+            for name, result in results.items()
+        )
+        logger.info(f"⏱️ {self.name} finished in {total_ms:.0f}ms ({timings})")
+        return results
+
+    @staticmethod
+    def timings_ms(results: Dict[str, StageResult]) -> Dict[str, Any]:
+        """Compact {stage: duration_ms | status} mapping for activity logs"""
+        return {
+            name: round(result.duration_ms, 1) if result.status == "success" else result.status
+            for name, result in results.items()
+        }
@@ -0,0 +1,342 @@
+# api/services/tracing.py
+"""
+Lead Lifecycle Tracing
+Lightweight spans for the webhook -> routing -> vendor assignment path. The current span
+lives in a contextvar, so children created in awaited code, asyncio.gather() tasks and
+asyncio.to_thread() calls are parented automatically.
+
+Finished traces go to an in-memory ring buffer (for the admin latency endpoints) and,
+if OTEL_EXPORTER_OTLP_ENDPOINT is set, are batched to an OTLP/HTTP JSON collector.
+"""
+
+import os
+import time
+import queue
+import logging
+import secrets
+import threading
+from collections import deque, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional
+
+import requests
+
+from config import AppConfig
+
+logger = logging.getLogger(__name__)
+
+STAGE_SAMPLE_SIZE = 1000
+# form_identifier comes from the (unauthenticated) webhook URL; forms past this many share one bucket
+MAX_TRACKED_FORMS = 200
+OTHER_FORMS = "_other"
+EXPORT_BATCH_SIZE = 50
+EXPORT_INTERVAL_SECONDS = 5.0
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_span_id", "name", "attributes",
+                 "start_ns", "end_ns", "status", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_span_id: Optional[str],
+                 attributes: Dict[str, Any], start_ns: int = None):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, error: str) -> None:
+        self.status = "error"
+        self.error = error
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "start_offset_ms": round((self.start_ns - self.trace.root.start_ns) / 1e6, 1),
+            "duration_ms": round(self.duration_ms, 1),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error or ""} if self.status == "error" else {"code": 1},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Trace:
+    """All spans for one webhook/lead, finished when its root span ends"""
+
+    def __init__(self, root_name: str, attributes: Dict[str, Any], start_ns: int = None):
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self.root = self.add_span(root_name, None, attributes, start_ns)
+
+    def add_span(self, name: str, parent_span_id: Optional[str], attributes: Dict[str, Any],
+                 start_ns: int = None) -> Span:
+        span = Span(self, name, parent_span_id, attributes, start_ns)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    @property
+    def form_identifier(self) -> str:
+        return self.root.attributes.get("form_identifier", "unknown")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "form_identifier": self.form_identifier,
+            "started_at": self.root.start_ns / 1e9,
+            "duration_ms": round(self.root.duration_ms, 1),
+            "status": "error" if any(s.status == "error" for s in self.spans) else "ok",
+            "spans": [span.to_dict() for span in sorted(self.spans, key=lambda s: s.start_ns)],
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class OTLPExporter:
+    """Batches finished traces to an OTLP/HTTP JSON endpoint on a background thread"""
+
+    def __init__(self, endpoint: str, service_name: str):
+        self.endpoint = endpoint.rstrip("/")
+        if not self.endpoint.endswith("/v1/traces"):
+            self.endpoint += "/v1/traces"
+        self.service_name = service_name
+        self._queue: "queue.Queue[Trace]" = queue.Queue(maxsize=1000)
+        self.stats = {"exported_spans": 0, "dropped_traces": 0, "export_errors": 0}
+        threading.Thread(target=self._run, daemon=True, name="otlp-exporter").start()
+
+    def submit(self, trace: Trace) -> None:
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.stats["dropped_traces"] += 1
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + EXPORT_INTERVAL_SECONDS
+            while len(batch) < EXPORT_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._export(batch)
+
+    def _export(self, traces: List[Trace]) -> None:
+        spans = [span.to_otlp() for trace in traces for span in trace.spans]
+        body = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{"scope": {"name": "lead_router.tracing"}, "spans": spans}],
+            }]
+        }
+        try:
+            response = requests.post(self.endpoint, json=body, timeout=10)
+            response.raise_for_status()
+            self.stats["exported_spans"] += len(spans)
+        except Exception as e:
+            self.stats["export_errors"] += 1
+            logger.warning(f"⚠️ OTLP trace export failed ({len(spans)} spans): {e}")
+
+
+class Tracer:
+    """Creates spans, keeps recent traces, and aggregates per-stage latency"""
+
+    def __init__(self, buffer_size: int = None, exporter: OTLPExporter = None):
+        self.enabled = AppConfig.TRACING_ENABLED
+        self._traces = deque(maxlen=buffer_size or AppConfig.TRACE_BUFFER_SIZE)
+        self._stage_ms: Dict[str, deque] = defaultdict(lambda: deque(maxlen=STAGE_SAMPLE_SIZE))
+        self._form_stage_ms: Dict[str, Dict[str, deque]] = defaultdict(
+            lambda: defaultdict(lambda: deque(maxlen=STAGE_SAMPLE_SIZE)))
+        self._lock = threading.Lock()
+        self.exporter = exporter
+
+    @contextmanager
+    def trace(self, name: str, start_ns: int = None, **attributes):
+        """Start a trace around a whole unit of work (nests as a plain span if one is active)"""
+        if not self.enabled:
+            yield None
+            return
+        parent = _current_span.get()
+        if parent is None:
+            current = Trace(name, attributes, start_ns).root
+        else:
+            current = parent.trace.add_span(name, parent.span_id, attributes, start_ns)
+        with self._activate(current, finish_trace=parent is None):
+            yield current
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time a block as a child of the current span (no-op outside a trace)"""
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+        current = parent.trace.add_span(name, parent.span_id, attributes)
+        with self._activate(current, finish_trace=False):
+            yield current
+
+    @contextmanager
+    def _activate(self, current: Span, finish_trace: bool):
+        token = _current_span.set(current)
+        try:
+            yield
+        except BaseException as e:
+            current.set_error(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            current.end_ns = time.time_ns()
+            if finish_trace:
+                self._finish(current.trace)
+
+    def record(self, name: str, start_ns: int, end_ns: int, **attributes) -> None:
+        """Add an already-measured interval (e.g. queue wait) as a child of the current span"""
+        parent = _current_span.get()
+        if parent is None:
+            return
+        span = parent.trace.add_span(name, parent.span_id, attributes, start_ns)
+        span.end_ns = end_ns
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def annotate(self, **attributes) -> None:
+        """Attach attributes (lead_id, vendor_id, ...) to the current trace's root span"""
+        span = _current_span.get()
+        if span is not None:
+            span.trace.root.attributes.update(attributes)
+
+    def _finish(self, trace: Trace) -> None:
+        form_identifier = trace.form_identifier
+        with self._lock:
+            self._traces.append(trace)
+            form_key = form_identifier
+            if form_key not in self._form_stage_ms and len(self._form_stage_ms) >= MAX_TRACKED_FORMS:
+                form_key = OTHER_FORMS
+            for span in trace.spans:
+                duration_ms = span.duration_ms
+                self._stage_ms[span.name].append(duration_ms)
+                self._form_stage_ms[form_key][span.name].append(duration_ms)
+        if self.exporter:
+            self.exporter.submit(trace)
+
+        if trace.root.duration_ms > AppConfig.TRACE_SLOW_THRESHOLD_MS:
+            slowest = max((s for s in trace.spans if s is not trace.root),
+                          key=lambda s: s.duration_ms, default=None)
+            logger.warning(f"🐢 Slow trace {trace.trace_id[:8]} '{trace.root.name}' for {form_identifier}: "
+                           f"{trace.root.duration_ms:.0f}ms"
+                           + (f" (slowest: {slowest.name} {slowest.duration_ms:.0f}ms)" if slowest else ""))
+
+    # ============================================
+    # Reporting
+    # ============================================
+
+    @staticmethod
+    def _summarize(samples: deque) -> Dict[str, Any]:
+        values = sorted(samples)
+        return {
+            "count": len(values),
+            "p50_ms": round(_percentile(values, 0.50), 1),
+            "p95_ms": round(_percentile(values, 0.95), 1),
+            "p99_ms": round(_percentile(values, 0.99), 1),
+            "max_ms": round(values[-1], 1) if values else 0.0,
+        }
+
+    def get_stage_stats(self) -> Dict[str, Any]:
+        """Latency percentiles per stage, overall and per form identifier"""
+        with self._lock:
+            stages = {name: list(samples) for name, samples in self._stage_ms.items()}
+            forms = {form: {name: list(samples) for name, samples in form_stages.items()}
+                     for form, form_stages in self._form_stage_ms.items()}
+        return {
+            "stages": {name: self._summarize(samples) for name, samples in sorted(stages.items())},
+            "forms": {
+                form: {name: self._summarize(samples) for name, samples in sorted(form_stages.items())}
+                for form, form_stages in sorted(forms.items())
+            },
+            "buffered_traces": len(self._traces),
+            "exporter": self.exporter.stats if self.exporter else None,
+        }
+
+    def get_recent_traces(self, limit: int = 20, form_identifier: str = None,
+                          min_duration_ms: float = 0) -> List[Dict[str, Any]]:
+        with self._lock:
+            traces = list(self._traces)
+        selected = [
+            trace for trace in reversed(traces)
+            if (form_identifier is None or trace.form_identifier == form_identifier)
+            and trace.root.duration_ms >= min_duration_ms
+        ]
+        return [trace.to_dict() for trace in selected[:limit]]
+
+    def get_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            traces = list(self._traces)
+        for trace in traces:
+            if trace.trace_id == trace_id:
+                return trace.to_dict()
+        return None
+
+
+def _build_exporter() -> Optional[OTLPExporter]:
+    endpoint = os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT") or os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    if not endpoint:
+        return None
+    logger.info(f"📡 Exporting lead traces to {endpoint}")
+    return OTLPExporter(endpoint, os.getenv("OTEL_SERVICE_NAME", "lead-router-pro"))
+
+
+# Global instance
+tracer = Tracer(exporter=_build_exporter())
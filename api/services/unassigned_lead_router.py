@@ -0,0 +1,469 @@
+# api/services/unassigned_lead_router.py
+"""
+Batch router for unassigned leads.
+Collects every unassigned lead (local DB via the idx_leads_unassigned partial index, plus a
+paged GHL contact search), groups them by (service, county) so each vendor pool is looked
+up once, distributes leads with the fair batch selection, and commits assignments in batches.
+Safe to run from the dashboard and on a schedule: runs never overlap in-process, and
+assignments only apply to leads that are still unassigned at commit time.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from config import AppConfig
+from database.simple_connection import db
+from api.services.lead_routing_service import lead_routing_service
+from api.services.ghl_api import GoHighLevelAPI
+from api.services.ghl_rate_limiter import ghl_rate_limiter
+from api.services.ghl_lead_import import create_lead_from_ghl_contact
+
+logger = logging.getLogger(__name__)
+
+# GHL custom field holding the specific service requested
+SPECIFIC_SERVICE_FIELD_ID = "FT85QGi0tBq1AfVGNJ9v"
+
+DEFAULT_CATEGORY = "Boater Resources"
+
+LEAD_TAGS = ['lead', 'new lead', 'unassigned']
+
+
+def find_category_from_specific_service(specific_service: str) -> str:
+    """
+    Smart category lookup: derive primary category from specific service
+    Uses DockSide Pros service dictionary to avoid defaulting to "Boater Resources"
+    
+    Example: "Outboard Engine Repair" → "Engines and Generators"
+    """
+    if not specific_service:
+        return "Boater Resources"
+    
+    # DockSide Pros Service Dictionary
+    SERVICE_CATEGORY_MAPPINGS = {
+        "Engines and Generators": [
+            "Engines and Generators Sales/Service", "Generator Sales or Service",
+            "Engine Service or Sales", "Outboard Engine Service", "Inboard Engine Service", 
+            "Outboard Engine Repair", "Inboard Engine Repair", "Generator Repair",
+            "Motor Repair", "Engine Installation", "Generator Installation",
+            "Diesel Engine Service", "Gas Engine Service", "Marine Engine Repair",
+            "Outboard Engine Service", "Inboard Engine Service"
+        ],
+        
+        "Boat Maintenance": [
+            "Ceramic Coating", "Boat Detailing", "Bottom Cleaning",
+            "Boat and Yacht Maintenance", "Boat Oil Change", "Bilge Cleaning",
+            "Jet Ski Maintenance", "Barnacle Cleaning", "Yacht Fire Detection Systems",
+            "Boat Wrapping and Marine Protection Film", "Boat Cleaning", "Boat Washing"
+        ],
+        
+        "Marine Systems": [
+            "Marine Systems Install and Sales", "Yacht Stabilizers and Seakeepers",
+            "Instrument Panel and Dashboard", "Yacht AC Sales", "Yacht AC Service",
+            "Boat Electrical Service", "Boat Sound Systems", "Yacht Plumbing",
+            "Boat Lighting", "Yacht Refrigeration and Watermakers", "Marine Electronics"
+        ],
+        
+        "Boat and Yacht Repair": [
+            "Boat and Yacht Repair", "Fiberglass Repair", "Welding & Metal Fabrication",
+            "Carpentry & Woodwork", "Riggers & Masts", "Jet Ski Repair",
+            "Boat Canvas and Upholstery", "Boat Decking and Yacht Flooring"
+        ]
+    }
+    
+    # Keyword mappings for partial matches
+    KEYWORD_MAPPINGS = {
+        "engine": "Engines and Generators",
+        "motor": "Engines and Generators", 
+        "generator": "Engines and Generators",
+        "outboard": "Engines and Generators",
+        "inboard": "Engines and Generators",
+        "diesel": "Engines and Generators",
+        "detailing": "Boat Maintenance",
+        "cleaning": "Boat Maintenance",
+        "maintenance": "Boat Maintenance",
+        "ceramic": "Boat Maintenance",
+        "repair": "Boat and Yacht Repair",
+        "fiberglass": "Boat and Yacht Repair",
+        "electrical": "Marine Systems",
+        "plumbing": "Marine Systems",
+        "ac service": "Marine Systems"
+    }
+    
+    specific_lower = specific_service.lower().strip()
+    
+    # Method 1: Exact match
+    for category, services in SERVICE_CATEGORY_MAPPINGS.items():
+        for service in services:
+            if specific_lower == service.lower():
+                logger.info(f"🎯 Exact service match: '{specific_service}' → {category}")
+                return category
+    
+    # Method 2: Partial match
+    for category, services in SERVICE_CATEGORY_MAPPINGS.items():
+        for service in services:
+            if specific_lower in service.lower() or service.lower() in specific_lower:
+                logger.info(f"🎯 Partial service match: '{specific_service}' → {category} (matched: {service})")
+                return category
+    
+    # Method 3: Keyword match
+    for keyword, category in KEYWORD_MAPPINGS.items():
+        if keyword in specific_lower:
+            logger.info(f"🎯 Keyword match: '{specific_service}' → {category} (keyword: {keyword})")
+            return category
+    
+    # Default fallback
+    logger.warning(f"⚠️ No category match found for '{specific_service}' - defaulting to Boater Resources")
+    return "Boater Resources"
+
+
+
+def extract_specific_service(custom_fields: Any) -> str:
+    """Read the specific service custom field from a GHL contact (dict or list format)"""
+    if isinstance(custom_fields, dict):
+        return custom_fields.get(SPECIFIC_SERVICE_FIELD_ID, '') or ''
+    if isinstance(custom_fields, list):
+        for field in custom_fields:
+            if isinstance(field, dict) and field.get('id') == SPECIFIC_SERVICE_FIELD_ID:
+                return field.get('value', '') or ''
+    return ''
+
+
+def is_unassigned_ghl_lead(contact: Dict[str, Any]) -> bool:
+    """A GHL contact counts as an unassigned lead if it has a lead tag and no assignedTo"""
+    tags = contact.get('tags', []) or []
+    is_lead = any(tag.lower() in LEAD_TAGS for tag in tags)
+    return is_lead and not contact.get('assignedTo')
+
+
+class UnassignedLeadBatchRouter:
+    """Routes all unassigned leads in one pass with one vendor-pool lookup per (service, county)"""
+
+    def __init__(self, commit_batch_size: int = 50, max_concurrency: int = None):
+        self.commit_batch_size = commit_batch_size
+        self.max_concurrency = max_concurrency or AppConfig.BULK_REASSIGNMENT_CONCURRENCY
+        self.rate_limiter = ghl_rate_limiter
+        self._run_lock = asyncio.Lock()
+        self._schedule_task: Optional[asyncio.Task] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._run_lock.locked()
+
+    def _get_ghl_api(self) -> GoHighLevelAPI:
+        return GoHighLevelAPI(
+            location_api_key=AppConfig.GHL_LOCATION_API,
+            private_token=AppConfig.GHL_PRIVATE_TOKEN,
+            location_id=AppConfig.GHL_LOCATION_ID,
+            agency_api_key=AppConfig.GHL_AGENCY_API_KEY,
+            company_id=AppConfig.GHL_COMPANY_ID
+        )
+
+    # ============================================
+    # ENTRY POINTS
+    # ============================================
+
+    async def run(self, include_ghl: bool = True, trigger: str = "dashboard") -> Dict[str, Any]:
+        """
+        Process every unassigned lead. Returns the processing summary, or a "skipped"
+        status if a run is already in progress.
+        """
+        if self.is_running:
+            logger.info(f"⏭️ Unassigned lead sweep already running - skipping {trigger} run")
+            return {
+                "status": "skipped",
+                "message": "Unassigned lead processing is already running",
+                "data": None
+            }
+
+        async with self._run_lock:
+            started = datetime.utcnow()
+            summary = await self._run(include_ghl)
+            data = summary["data"]
+            self.last_run = {
+                "trigger": trigger,
+                "processed_leads": data["processed_leads"],
+                "successful_assignments": data["successful_assignments"],
+                "failed_assignments": data["failed_assignments"],
+                "duration_seconds": round((datetime.utcnow() - started).total_seconds(), 2),
+                "finished_at": datetime.utcnow().isoformat()
+            }
+
+            db.log_activity(
+                event_type="unassigned_leads_processed",
+                event_data=self.last_run,
+                success=data["failed_assignments"] == 0
+            )
+            return summary
+
+    def start_schedule(self, interval_minutes: int) -> None:
+        """Run the sweep every interval_minutes in the background"""
+        if self._schedule_task and not self._schedule_task.done():
+            return
+
+        async def _loop():
+            while True:
+                await asyncio.sleep(interval_minutes * 60)
+                try:
+                    await self.run(trigger="schedule")
+                except Exception as e:
+                    logger.error(f"❌ Scheduled unassigned lead sweep failed: {e}")
+
+        self._schedule_task = asyncio.create_task(_loop())
+        logger.info(f"⏰ Unassigned lead sweep scheduled every {interval_minutes} minutes")
+
+    def stop_schedule(self) -> None:
+        if self._schedule_task:
+            self._schedule_task.cancel()
+            self._schedule_task = None
+
+    # ============================================
+    # PIPELINE
+    # ============================================
+
+    async def _run(self, include_ghl: bool) -> Dict[str, Any]:
+        account = db.get_account_by_ghl_location_id(AppConfig.GHL_LOCATION_ID)
+        if not account:
+            raise ValueError("No account found - cannot process leads")
+        account_id = account["id"]
+
+        # Step 1: Collect unassigned leads from the DB and GHL
+        leads = await asyncio.to_thread(db.get_unassigned_leads, account_id)
+        ghl_contacts: Dict[str, Dict[str, Any]] = {}
+        results: List[Dict[str, Any]] = []
+
+        if include_ghl:
+            contacts = await asyncio.to_thread(self._get_ghl_api().search_contacts_paged, "lead", priority="bulk")
+            ghl_contacts = {c['id']: c for c in contacts if c.get('id') and is_unassigned_ghl_lead(c)}
+            leads, created_results = await self._merge_ghl_leads(leads, ghl_contacts, account_id)
+            results.extend(created_results)
+
+        logger.info(f"📋 Unassigned lead sweep: {len(leads)} leads to route "
+                    f"({len(ghl_contacts)} unassigned in GHL)")
+
+        # Step 2: Plan assignments (one pool lookup per group, fair distribution)
+        planned, unroutable = await asyncio.to_thread(self._plan, leads, ghl_contacts, account_id)
+        results.extend(unroutable)
+
+        # Step 3: Commit in batches, then update GHL opportunities concurrently
+        results.extend(await self._commit_and_sync(planned, account_id))
+
+        successful = sum(1 for r in results if r["assignment_successful"])
+        return {
+            "status": "success",
+            "data": {
+                "processed_leads": len(results),
+                "successful_assignments": successful,
+                "failed_assignments": len(results) - successful,
+                "leads": results
+            },
+            "message": f"Processed {len(results)} unassigned leads: {successful} assigned, {len(results) - successful} failed"
+        }
+
+    def _new_result(self, contact_id: Optional[str], name: Optional[str]) -> Dict[str, Any]:
+        return {
+            "ghl_contact_id": contact_id,
+            "customer_name": name,
+            "assignment_successful": False,
+            "assigned_vendor": None,
+            "matching_vendors_count": 0,
+            "error_message": None,
+            "service_category": None,
+            "zip_code": None,
+            "database_lead_created": False,
+            "opportunity_created": False,
+            "processing_method": "batch_assignment_pipeline"
+        }
+
+    async def _merge_ghl_leads(self, leads: List[Dict[str, Any]], ghl_contacts: Dict[str, Dict[str, Any]],
+                               account_id: str):
+        """Add GHL-only unassigned contacts to the lead list, creating DB leads where missing"""
+        known_contact_ids = {lead.get('ghl_contact_id') for lead in leads}
+        missing_ids = [cid for cid in ghl_contacts if cid not in known_contact_ids]
+        if not missing_ids:
+            return leads, []
+
+        existing = await asyncio.to_thread(db.get_leads_by_ghl_contact_ids, missing_ids)
+        created_results = []
+        created_contact_ids = []
+
+        for contact_id in missing_ids:
+            if contact_id in existing:
+                # Already assigned in our DB - GHL is just behind; nothing to route
+                continue
+
+            contact = ghl_contacts[contact_id]
+            name = f"{contact.get('firstName', '')} {contact.get('lastName', '')}".strip()
+            try:
+                lead_id, opportunity_id = await create_lead_from_ghl_contact(
+                    ghl_contact_data=contact,
+                    account_id=account_id,
+                    form_identifier="bulk_assignment"
+                )
+                created_contact_ids.append(contact_id)
+                logger.info(f"✅ Created database lead {lead_id} for GHL contact {contact_id}")
+            except Exception as e:
+                logger.error(f"❌ Failed to create database lead for {contact_id}: {e}")
+                result = self._new_result(contact_id, name)
+                result["error_message"] = f"Lead creation failed: {e}"
+                created_results.append(result)
+
+        if created_contact_ids:
+            created = await asyncio.to_thread(db.get_leads_by_ghl_contact_ids, created_contact_ids)
+            for contact_id, lead in created.items():
+                if lead.get('vendor_id'):
+                    continue
+                leads.append({**lead, "database_lead_created": True,
+                              "opportunity_created": bool(lead.get('ghl_opportunity_id'))})
+
+        return leads, created_results
+
+    def _routing_data(self, lead: Dict[str, Any], ghl_contacts: Dict[str, Dict[str, Any]]):
+        """Service category and ZIP for a lead, filling gaps from the GHL contact already fetched"""
+        service_category = lead.get('primary_service_category') or lead.get('service_category') or ''
+        zip_code = lead.get('service_zip_code') or lead.get('customer_zip_code') or ''
+
+        contact = ghl_contacts.get(lead.get('ghl_contact_id'))
+        if contact and (not service_category or service_category == DEFAULT_CATEGORY or not zip_code):
+            specific_service = extract_specific_service(contact.get('customFields', {}))
+            if specific_service and (not service_category or service_category == DEFAULT_CATEGORY):
+                service_category = find_category_from_specific_service(specific_service)
+            if not zip_code:
+                zip_code = contact.get('postalCode', '') or ''
+
+        return service_category or DEFAULT_CATEGORY, zip_code
+
+    def _plan(self, leads: List[Dict[str, Any]], ghl_contacts: Dict[str, Dict[str, Any]], account_id: str):
+        """Group leads by (service, county), look up each pool once and select vendors"""
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        unroutable = []
+        zip_locations: Dict[str, Dict] = {}
+
+        for lead in leads:
+            result = self._new_result(lead.get('ghl_contact_id'), lead.get('customer_name'))
+            result["database_lead_created"] = lead.get("database_lead_created", False)
+            result["opportunity_created"] = lead.get("opportunity_created", False)
+
+            service_category, zip_code = self._routing_data(lead, ghl_contacts)
+            result["service_category"] = service_category
+            result["zip_code"] = zip_code
+
+            if not zip_code:
+                result["error_message"] = f"Missing routing data: category={service_category}, zip={zip_code}"
+                unroutable.append(result)
+                continue
+
+            location_key = lead_routing_service.resolve_location_key(zip_code, zip_locations)
+            groups.setdefault((service_category, location_key), []).append(
+                {"lead": lead, "result": result, "zip_code": zip_code}
+            )
+
+        performance_percentage = lead_routing_service.get_performance_percentage(account_id)
+        batch_last_assigned: Dict[str, str] = {}
+        batch_reserved: Dict[str, int] = {}
+        planned = []
+
+        for (service_category, location_key), members in groups.items():
+            pool = lead_routing_service.find_matching_vendors(
+                account_id=account_id,
+                service_category=service_category,
+                zip_code=members[0]["zip_code"],
+                priority="normal"
+            )
+            logger.info(f"🎯 {service_category} in {location_key}: {len(pool)} vendors for {len(members)} leads")
+
+            for member in members:
+                result = member["result"]
+                result["matching_vendors_count"] = len(pool)
+                if not pool:
+                    result["error_message"] = "No matching vendors found"
+                    unroutable.append(result)
+                    continue
+
+                vendor = lead_routing_service.select_vendor_for_batch(pool, performance_percentage,
+                                                                      batch_last_assigned, batch_reserved)
+                if not vendor:
+                    result["error_message"] = "All matching vendors are at capacity"
+                    unroutable.append(result)
+                    continue
+                planned.append({"lead": member["lead"], "vendor": vendor, "result": result,
+                                "assigned_at": batch_last_assigned[vendor["id"]]})
+
+        return planned, unroutable
+
+    async def _commit_and_sync(self, planned: List[Dict[str, Any]], account_id: str) -> List[Dict[str, Any]]:
+        """Commit DB assignments in batches and push each batch's GHL updates concurrently"""
+        results = []
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        ghl_api = self._get_ghl_api() if planned else None
+
+        for start in range(0, len(planned), self.commit_batch_size):
+            batch = planned[start:start + self.commit_batch_size]
+            assigned_ids = set(await asyncio.to_thread(
+                db.bulk_assign_leads_to_vendors,
+                [(item["lead"]["id"], item["vendor"]["id"]) for item in batch],
+                True
+            ))
+            committed = [item for item in batch if item["lead"]["id"] in assigned_ids]
+            last_assigned: Dict[str, str] = {}
+            for item in committed:
+                vendor_id = item["vendor"]["id"]
+                last_assigned[vendor_id] = max(last_assigned.get(vendor_id, ""), item["assigned_at"])
+            await asyncio.to_thread(
+                lead_routing_service.update_vendors_last_assigned,
+                account_id,
+                [item["vendor"]["id"] for item in committed],
+                last_assigned
+            )
+
+            sync_tasks = []
+            for item in batch:
+                if item["lead"]["id"] not in assigned_ids:
+                    item["result"]["error_message"] = "Lead was assigned by another process"
+                    results.append(item["result"])
+                    continue
+                sync_tasks.append(self._sync_assignment(ghl_api, item, semaphore))
+
+            results.extend(await asyncio.gather(*sync_tasks))
+
+        return results
+
+    async def _sync_assignment(self, ghl_api: GoHighLevelAPI, item: Dict[str, Any],
+                               semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        """Mirror a committed DB assignment onto the GHL opportunity"""
+        lead, vendor, result = item["lead"], item["vendor"], item["result"]
+        vendor_ghl_user_id = vendor.get("ghl_user_id")
+        opportunity_id = lead.get("ghl_opportunity_id")
+
+        if not vendor_ghl_user_id or not opportunity_id:
+            logger.warning(f"⚠️ Vendor {vendor.get('name')} missing GHL user ID or no opportunity")
+            result["assignment_successful"] = True  # Database assignment worked
+            result["assigned_vendor"] = vendor
+            result["error_message"] = "Assigned but vendor missing GHL user ID"
+            return result
+
+        async with semaphore:
+            await self.rate_limiter.acquire_async(priority="bulk")
+            try:
+                updated = await asyncio.to_thread(ghl_api.update_opportunity, opportunity_id, {
+                    'assignedTo': vendor_ghl_user_id,
+                    'pipelineId': AppConfig.PIPELINE_ID,
+                    'pipelineStageId': AppConfig.NEW_LEAD_STAGE_ID
+                })
+            except Exception as e:
+                logger.error(f"❌ Error updating opportunity {opportunity_id}: {e}")
+                result["error_message"] = f"Opportunity update error: {e}"
+                return result
+
+        if updated:
+            result["assignment_successful"] = True
+            result["assigned_vendor"] = vendor
+        else:
+            result["error_message"] = "Failed to update GHL opportunity"
+        return result
+
+
+# Global instance
+unassigned_lead_router = UnassignedLeadBatchRouter()
@@ -0,0 +1,246 @@
+# api/services/vendor_capacity.py
+"""
+Vendor Capacity
+Per-vendor lead quotas checked when a vendor is picked from an eligible pool, so a busy vendor
+spills leads over to the next eligible vendor instead of being hot-spotted until someone flips
+their taking_new_work toggle.
+
+Limits (vendors.max_open_leads / max_leads_per_day / max_leads_per_hour; NULL = the
+VENDOR_DEFAULT_* setting, 0 = unlimited):
+    per hour / per day  token buckets in vendor_capacity_buckets - a bucket holds up to the
+                        limit and refills continuously (limit per period), so capacity returns
+                        as assignments age out rather than at a fixed reset time
+    open leads          the vendor's leads that are not closed (VENDOR_CAPACITY_CLOSED_STATUSES)
+                        and younger than VENDOR_OPEN_LEAD_EXPIRY_DAYS; closing, reassigning or
+                        expiry frees a slot. Counted with an index scan capped at the limit.
+
+Single-lead routing checks, assigns the lead and consumes under the per-account routing lock
+(so the next check already counts the new open lead); batch routing tracks its own usage and
+consumes when the batch is persisted.
+"""
+
+import time
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Iterable
+
+from config import AppConfig
+from database.simple_connection import db as simple_db_instance
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"hour": 3600.0, "day": 86400.0}
+
+
+class VendorCapacity:
+    """Lead quotas per vendor: token buckets for leads/hour and leads/day, capped open leads"""
+
+    def __init__(self):
+        self.defaults = {
+            "open": AppConfig.VENDOR_DEFAULT_MAX_OPEN_LEADS,
+            "day": AppConfig.VENDOR_DEFAULT_MAX_LEADS_PER_DAY,
+            "hour": AppConfig.VENDOR_DEFAULT_MAX_LEADS_PER_HOUR,
+        }
+        self.closed_statuses = [status.strip().lower()
+                                for status in AppConfig.VENDOR_CAPACITY_CLOSED_STATUSES.split(",") if status.strip()]
+        self.open_lead_expiry_days = AppConfig.VENDOR_OPEN_LEAD_EXPIRY_DAYS
+        self.stats = {
+            "checks": 0,
+            "spillovers": 0,
+            "pools_exhausted": 0,
+            "consumed": 0,
+            "errors": 0,
+        }
+
+    def remaining(self, vendor_ids: Iterable[str], now: Optional[float] = None) -> Dict[str, Optional[float]]:
+        """
+        Leads each vendor can take right now: vendor_id -> min over its limits (None = unlimited).
+        One query for limits and buckets, plus one bounded count per vendor with an open-lead cap.
+        Fails open (everyone unlimited) if the database can't be read.
+        """
+        vendor_ids = list(dict.fromkeys(vendor_id for vendor_id in vendor_ids if vendor_id))
+        result: Dict[str, Optional[float]] = {vendor_id: None for vendor_id in vendor_ids}
+        if not vendor_ids:
+            return result
+        now = now or time.time()
+        try:
+            conn = simple_db_instance._get_conn()
+            try:
+                limits = self._load_limits(conn, vendor_ids)
+                if not any(any(values.values()) for values in limits.values()):
+                    return result
+                buckets = self._load_buckets(conn, [v for v, values in limits.items() if values["hour"] or values["day"]])
+                for vendor_id, values in limits.items():
+                    left = []
+                    for period in PERIODS:
+                        if values[period]:
+                            left.append(self._tokens(values[period], period, buckets.get((vendor_id, period)), now))
+                    if values["open"]:
+                        left.append(values["open"] - self._count_open_leads(conn, vendor_id, values["open"]))
+                    result[vendor_id] = min(left) if left else None
+            finally:
+                conn.close()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"⚠️ Vendor capacity unavailable - not enforcing quotas: {e}")
+        return result
+
+    def filter_available(self, vendors: List[Dict[str, Any]],
+                         reserved: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        """
+        The vendors that can take another lead (pool order kept). `reserved` counts leads
+        already planned for vendors but not yet consumed (batch routing).
+        """
+        if not vendors:
+            return vendors
+        self.stats["checks"] += 1
+        available = self.available(vendors, reserved)
+        if len(available) < len(vendors):
+            available_ids = {v["id"] for v in available}
+            full = [v.get("name") or v["id"] for v in vendors if v["id"] not in available_ids]
+            if available:
+                self.stats["spillovers"] += 1
+                logger.info(f"🚦 {len(full)} vendor(s) at capacity, spilling over: {', '.join(full)}")
+            else:
+                self.stats["pools_exhausted"] += 1
+                logger.warning(f"🚦 All {len(vendors)} eligible vendors are at capacity - lead left unassigned")
+        return available
+
+    def available(self, vendors: List[Dict[str, Any]],
+                  reserved: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        """filter_available without stats or logging (previews)"""
+        if not vendors:
+            return vendors
+        remaining = self.remaining(v["id"] for v in vendors)
+        reserved = reserved or {}
+        return [
+            v for v in vendors
+            if remaining.get(v["id"]) is None or remaining[v["id"]] - reserved.get(v["id"], 0) >= 1
+        ]
+
+    def consume(self, vendor_ids: Iterable[str], now: Optional[float] = None) -> None:
+        """Take one token per assignment from each limited bucket (one transaction)"""
+        vendor_ids = [vendor_id for vendor_id in vendor_ids if vendor_id]
+        if not vendor_ids:
+            return
+        now = now or time.time()
+        conn = None
+        try:
+            conn = simple_db_instance._get_conn()
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            used = Counter(vendor_ids)
+            limits = self._load_limits(conn, list(used))
+            limited = [v for v, values in limits.items() if values["hour"] or values["day"]]
+            buckets = self._load_buckets(conn, limited)
+            updates = []
+            for vendor_id in limited:
+                for period in PERIODS:
+                    if limits[vendor_id][period]:
+                        tokens = self._tokens(limits[vendor_id][period], period, buckets.get((vendor_id, period)), now)
+                        updates.append((vendor_id, period, tokens - used[vendor_id], now))
+            conn.executemany('''
+                INSERT OR REPLACE INTO vendor_capacity_buckets (vendor_id, period, tokens, updated_at)
+                VALUES (?, ?, ?, ?)
+            ''', updates)
+            conn.execute("COMMIT")
+            self.stats["consumed"] += len(vendor_ids)
+        except Exception as e:
+            self.stats["errors"] += 1
+            if conn is not None and conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logger.warning(f"⚠️ Could not record vendor capacity usage: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def get_status(self, vendors: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Limits and remaining capacity per vendor (dashboard)"""
+        vendor_ids = [v["id"] for v in vendors if v.get("id")]
+        now = time.time()
+        status = {}
+        conn = simple_db_instance._get_conn()
+        try:
+            limits = self._load_limits(conn, vendor_ids)
+            buckets = self._load_buckets(conn, vendor_ids)
+            for vendor_id, values in limits.items():
+                entry = {"limits": values}
+                for period in PERIODS:
+                    if values[period]:
+                        entry[f"remaining_{period}"] = round(
+                            self._tokens(values[period], period, buckets.get((vendor_id, period)), now), 2)
+                if values["open"]:
+                    entry["open_leads"] = self._count_open_leads(conn, vendor_id, values["open"])
+                status[vendor_id] = entry
+        finally:
+            conn.close()
+        return status
+
+    def reset(self, vendor_id: str) -> None:
+        """Refill a vendor's buckets (e.g. after raising their limits)"""
+        conn = simple_db_instance._get_conn()
+        try:
+            conn.execute("DELETE FROM vendor_capacity_buckets WHERE vendor_id = ?", (vendor_id,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ---- Storage ----
+
+    def _load_limits(self, conn, vendor_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        if not vendor_ids:
+            return {}
+        placeholders = ",".join("?" * len(vendor_ids))
+        rows = conn.execute(f'''
+            SELECT id, max_open_leads, max_leads_per_day, max_leads_per_hour
+            FROM vendors WHERE id IN ({placeholders})
+        ''', vendor_ids).fetchall()
+        limits = {}
+        for vendor_id, max_open, max_day, max_hour in rows:
+            configured = {"open": max_open, "day": max_day, "hour": max_hour}
+            limits[vendor_id] = {
+                kind: int(value if value is not None else self.defaults[kind]) or 0
+                for kind, value in configured.items()
+            }
+        return limits
+
+    @staticmethod
+    def _load_buckets(conn, vendor_ids: List[str]) -> Dict[tuple, tuple]:
+        if not vendor_ids:
+            return {}
+        placeholders = ",".join("?" * len(vendor_ids))
+        rows = conn.execute(f'''
+            SELECT vendor_id, period, tokens, updated_at
+            FROM vendor_capacity_buckets WHERE vendor_id IN ({placeholders})
+        ''', vendor_ids).fetchall()
+        return {(vendor_id, period): (tokens, updated_at) for vendor_id, period, tokens, updated_at in rows}
+
+    @staticmethod
+    def _tokens(limit: int, period: str, bucket: Optional[tuple], now: float) -> float:
+        """Tokens in a bucket now: refilled at limit/period since its last update, capped at the limit"""
+        if bucket is None:
+            return float(limit)
+        tokens, updated_at = bucket
+        return min(float(limit), tokens + max(now - updated_at, 0.0) * limit / PERIODS[period])
+
+    def _count_open_leads(self, conn, vendor_id: str, limit: int) -> int:
+        cutoff = (datetime.utcnow() - timedelta(days=self.open_lead_expiry_days)).strftime("%Y-%m-%d %H:%M:%S")
+        placeholders = ",".join("?" * len(self.closed_statuses)) or "''"
+        return conn.execute(f'''
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM leads
+                WHERE vendor_id = ? AND created_at >= ?
+                  AND LOWER(COALESCE(status, '')) NOT IN ({placeholders})
+                LIMIT ?
+            )
+        ''', (vendor_id, cutoff, *self.closed_statuses, limit)).fetchone()[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "defaults": self.defaults}
+
+
+# Global instance
+vendor_capacity = VendorCapacity()
+metrics.register_stats("vendor_capacity", vendor_capacity.get_stats)
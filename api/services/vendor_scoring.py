@@ -0,0 +1,341 @@
+# api/services/vendor_scoring.py
+"""
+Vendor Performance Scoring
+Close-rate scores for performance-based routing, kept current incrementally. Every assignment
+and lead outcome (opportunity status/stage updates, lead events) updates one row of
+exponentially decayed assigned/won/lost counters per vendor and window
+(VENDOR_SCORE_WINDOWS_DAYS, default 30 and 90 days) - O(1) per event, no recompute over leads.
+
+A counter stored as c at time t0 is worth c * exp(-(now - t0) / window) now. A vendor's close
+rate in a window is won / (won + lost), smoothed with VENDOR_SCORE_PRIOR_WEIGHT pseudo-leads
+toward the next-longer window's rate and, for the longest window, toward the synced
+lead_close_percentage - so a vendor without outcomes scores exactly its synced value.
+"""
+
+import math
+import time
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Iterable
+
+from config import AppConfig
+from database.simple_connection import db as simple_db_instance
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+OUTCOMES = ("won", "lost")
+DAY_SECONDS = 86400.0
+
+
+def _parse_list(value: str) -> List[str]:
+    return [item.strip().lower() for item in (value or "").split(",") if item.strip()]
+
+
+def to_epoch(value: Any) -> Optional[float]:
+    """Epoch seconds from an epoch number, ISO string or SQLite CURRENT_TIMESTAMP (UTC)"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) / 1000.0 if value > 1e11 else float(value)  # GHL sends milliseconds
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class VendorScoring:
+    """Incremental, exponentially decayed close-rate counters per vendor"""
+
+    def __init__(self):
+        self.windows = sorted({int(days) for days in _parse_list(AppConfig.VENDOR_SCORE_WINDOWS_DAYS)}) or [30, 90]
+        self.prior_weight = max(AppConfig.VENDOR_SCORE_PRIOR_WEIGHT, 0.0)
+        self.won_stages = set(_parse_list(AppConfig.VENDOR_SCORE_WON_STAGES))
+        self.lost_stages = set(_parse_list(AppConfig.VENDOR_SCORE_LOST_STAGES))
+        self.reassignment_as_lost = AppConfig.VENDOR_SCORE_REASSIGNMENT_AS_LOST
+        self.stats = {
+            "assignments": 0,
+            "outcomes": 0,
+            "reversals": 0,
+            "duplicates": 0,
+            "ignored_events": 0,
+            "errors": 0,
+        }
+
+    def classify(self, status: Optional[str] = None, stage: Optional[str] = None) -> Optional[str]:
+        """
+        Map an opportunity status/stage to won, lost, open (reopened - any outcome is withdrawn)
+        or None (no change). A configured won/lost stage name wins over the status, since many
+        pipelines move leads to "Closed Won" without flipping the opportunity status.
+        """
+        stage = (stage or "").strip().lower()
+        status = (status or "").strip().lower()
+        if stage in self.won_stages:
+            return "won"
+        if stage in self.lost_stages:
+            return "lost"
+        if status == "won":
+            return "won"
+        if status in ("lost", "abandoned"):
+            return "lost"
+        if status == "open":
+            return "open"
+        return None
+
+    # ---- Event intake ----
+
+    def record_assignments(self, vendor_ids: Iterable[str], at: Optional[float] = None) -> None:
+        """Count leads assigned to vendors (one transaction for the batch)"""
+        vendor_ids = [vendor_id for vendor_id in vendor_ids if vendor_id]
+        if not vendor_ids:
+            return
+        at = at or time.time()
+        try:
+            with self._transaction() as conn:
+                for vendor_id in vendor_ids:
+                    self._apply(conn, vendor_id, {"assigned": 1.0}, at)
+            self.stats["assignments"] += len(vendor_ids)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"⚠️ Could not record vendor assignments for scoring: {e}")
+
+    def record_assignment(self, vendor_id: str, at: Optional[float] = None) -> None:
+        self.record_assignments([vendor_id], at)
+
+    def record_outcome(self, lead_id: str, vendor_id: str, outcome: str, at: Optional[float] = None) -> bool:
+        """
+        Set the outcome counted for a lead/vendor pair: won, lost, or open to withdraw it.
+        Repeated deliveries are no-ops; a changed outcome (won -> lost, reopened) reverses
+        the earlier contribution exactly, at its original time. Returns True if counters changed.
+        """
+        if not lead_id or not vendor_id or outcome not in OUTCOMES + ("open",):
+            return False
+        at = at or time.time()
+        try:
+            with self._transaction() as conn:
+                previous = conn.execute(
+                    "SELECT outcome, outcome_at FROM lead_outcomes WHERE lead_id = ? AND vendor_id = ?",
+                    (lead_id, vendor_id)
+                ).fetchone()
+                if previous and previous[0] == outcome:
+                    self.stats["duplicates"] += 1
+                    return False
+                if previous is None and outcome == "open":
+                    return False
+
+                if previous:
+                    self._apply(conn, vendor_id, {previous[0]: -1.0}, previous[1])
+                    self.stats["reversals"] += 1
+                if outcome == "open":
+                    conn.execute("DELETE FROM lead_outcomes WHERE lead_id = ? AND vendor_id = ?",
+                                 (lead_id, vendor_id))
+                else:
+                    self._apply(conn, vendor_id, {outcome: 1.0}, at)
+                    conn.execute('''
+                        INSERT OR REPLACE INTO lead_outcomes (lead_id, vendor_id, outcome, outcome_at)
+                        VALUES (?, ?, ?, ?)
+                    ''', (lead_id, vendor_id, outcome, at))
+                    self.stats["outcomes"] += 1
+            logger.info(f"📈 Vendor {vendor_id} lead {lead_id} outcome: {outcome}")
+            return True
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"⚠️ Could not record outcome {outcome} for lead {lead_id}: {e}")
+            return False
+
+    def handle_lead_event(self, event: Dict[str, Any]) -> Optional[str]:
+        """
+        Consume a lead event (the dicts written to lead_events). Understood types:
+            opportunity_status_changed  status/stage of the lead's opportunity (vendor_id = owner)
+            lead_reassigned             counts a loss for previous_vendor_id (VENDOR_SCORE_REASSIGNMENT_AS_LOST)
+        Returns the outcome applied, or None.
+        """
+        event_type = event.get("event_type")
+        lead_id = event.get("lead_id")
+        at = to_epoch(event.get("timestamp"))
+
+        if event_type == "opportunity_status_changed":
+            outcome = self.classify(event.get("status"), event.get("stage"))
+            if outcome and self.record_outcome(lead_id, event.get("vendor_id"), outcome, at):
+                return outcome
+        elif event_type == "lead_reassigned" and self.reassignment_as_lost:
+            previous_vendor_id = event.get("previous_vendor_id")
+            if previous_vendor_id and previous_vendor_id != event.get("new_vendor_id"):
+                if self.record_outcome(lead_id, previous_vendor_id, "lost", at):
+                    return "lost"
+        else:
+            self.stats["ignored_events"] += 1
+        return None
+
+    # ---- Scores ----
+
+    def get_scores(self, vendors: List[Dict[str, Any]], now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Current scores for the given vendors (one query): vendor_id -> {"score": close rate %,
+        "windows": {"30d": {assigned, won, lost, close_rate}, ...}}. Vendors without counters
+        (or if the query fails) score their lead_close_percentage.
+        """
+        now = now or time.time()
+        vendor_ids = [v["id"] for v in vendors if v.get("id")]
+        counters: Dict[str, Dict[int, Dict[str, float]]] = {}
+        if vendor_ids:
+            try:
+                conn = simple_db_instance._get_conn()
+                try:
+                    placeholders = ",".join("?" * len(vendor_ids))
+                    rows = conn.execute(f'''
+                        SELECT vendor_id, window_days, assigned, won, lost, updated_at
+                        FROM vendor_score_counters WHERE vendor_id IN ({placeholders})
+                    ''', vendor_ids).fetchall()
+                finally:
+                    conn.close()
+                for vendor_id, window_days, assigned, won, lost, updated_at in rows:
+                    factor = self._decay(window_days, now - updated_at)
+                    counters.setdefault(vendor_id, {})[window_days] = {
+                        "assigned": assigned * factor, "won": won * factor, "lost": lost * factor
+                    }
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"⚠️ Vendor scores unavailable, using synced close rates: {e}")
+
+        return {v["id"]: self._score(v, counters.get(v["id"], {})) for v in vendors if v.get("id")}
+
+    def _score(self, vendor: Dict[str, Any], counters: Dict[int, Dict[str, float]]) -> Dict[str, Any]:
+        rate = float(vendor.get("lead_close_percentage") or 0.0)
+        windows = {}
+        for window_days in reversed(self.windows):  # Longest first; each smooths the next
+            values = counters.get(window_days, {"assigned": 0.0, "won": 0.0, "lost": 0.0})
+            decided = max(values["won"], 0.0) + max(values["lost"], 0.0)
+            if decided > 1e-9:
+                rate = (max(values["won"], 0.0) * 100.0 + self.prior_weight * rate) / (decided + self.prior_weight)
+            windows[f"{window_days}d"] = {
+                "assigned": round(max(values["assigned"], 0.0), 2),
+                "won": round(max(values["won"], 0.0), 2),
+                "lost": round(max(values["lost"], 0.0), 2),
+                "close_rate": round(rate, 2),
+            }
+        return {"score": rate, "windows": dict(reversed(list(windows.items())))}
+
+    # ---- Backfill ----
+
+    def rebuild(self) -> Dict[str, int]:
+        """
+        Recompute all counters from lead history (leads.vendor_id/status and lead_reassigned
+        events). For the initial backfill or after changing windows - normal operation is incremental.
+        """
+        now = time.time()
+        totals: Dict[tuple, Dict[str, float]] = {}
+        outcomes: Dict[tuple, tuple] = {}
+
+        def add(vendor_id, field, at):
+            for window_days in self.windows:
+                values = totals.setdefault((vendor_id, window_days), {"assigned": 0.0, "won": 0.0, "lost": 0.0})
+                values[field] += self._decay(window_days, now - at)
+
+        conn = simple_db_instance._get_conn()
+        try:
+            leads = conn.execute('''
+                SELECT id, vendor_id, status, created_at, updated_at FROM leads WHERE vendor_id IS NOT NULL
+            ''').fetchall()
+            for lead_id, vendor_id, status, created_at, updated_at in leads:
+                add(vendor_id, "assigned", to_epoch(created_at) or now)
+                outcome = self.classify(status)
+                if outcome in OUTCOMES:
+                    outcomes[(lead_id, vendor_id)] = (outcome, to_epoch(updated_at) or now)
+
+            if self.reassignment_as_lost:
+                try:
+                    events = simple_db_instance.get_lead_events(event_type="lead_reassigned")
+                except Exception:
+                    events = []
+                for event in events:
+                    previous_vendor_id = event.get("previous_vendor_id")
+                    if event.get("lead_id") and previous_vendor_id and previous_vendor_id != event.get("new_vendor_id"):
+                        outcomes.setdefault((event["lead_id"], previous_vendor_id),
+                                            ("lost", to_epoch(event.get("timestamp")) or now))
+
+            for (lead_id, vendor_id), (outcome, at) in outcomes.items():
+                add(vendor_id, outcome, at)
+
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM vendor_score_counters")
+            conn.execute("DELETE FROM lead_outcomes")
+            conn.executemany('''
+                INSERT INTO vendor_score_counters (vendor_id, window_days, assigned, won, lost, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(vendor_id, window_days, v["assigned"], v["won"], v["lost"], now)
+                  for (vendor_id, window_days), v in totals.items()])
+            conn.executemany('''
+                INSERT INTO lead_outcomes (lead_id, vendor_id, outcome, outcome_at) VALUES (?, ?, ?, ?)
+            ''', [(lead_id, vendor_id, outcome, at) for (lead_id, vendor_id), (outcome, at) in outcomes.items()])
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        result = {"leads": len(leads), "outcomes": len(outcomes),
+                  "vendors": len({vendor_id for vendor_id, _ in totals})}
+        logger.info(f"📊 Vendor scores rebuilt: {result}")
+        return result
+
+    # ---- Storage ----
+
+    @staticmethod
+    def _decay(window_days: float, elapsed_seconds: float) -> float:
+        return math.exp(-elapsed_seconds / (window_days * DAY_SECONDS))
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE on the main database; commits on success, rolls back on error"""
+        conn = simple_db_instance._get_conn()
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _apply(self, conn, vendor_id: str, deltas: Dict[str, float], at: float) -> None:
+        """Decay each window's row to now and add the event's contribution (decayed from its time)"""
+        now = time.time()
+        for window_days in self.windows:
+            row = conn.execute('''
+                SELECT assigned, won, lost, updated_at FROM vendor_score_counters
+                WHERE vendor_id = ? AND window_days = ?
+            ''', (vendor_id, window_days)).fetchone()
+            values = {"assigned": 0.0, "won": 0.0, "lost": 0.0}
+            reference = now
+            if row:
+                reference = max(now, row[3])  # Another worker's clock may be slightly ahead
+                factor = self._decay(window_days, reference - row[3])
+                values = {"assigned": row[0] * factor, "won": row[1] * factor, "lost": row[2] * factor}
+            for field, delta in deltas.items():
+                values[field] += delta * self._decay(window_days, max(reference - at, 0.0))
+            conn.execute('''
+                INSERT OR REPLACE INTO vendor_score_counters (vendor_id, window_days, assigned, won, lost, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (vendor_id, window_days, values["assigned"], values["won"], values["lost"], reference))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "windows_days": self.windows}
+
+
+# Global instance
+vendor_scoring = VendorScoring()
+metrics.register_stats("vendor_scoring", vendor_scoring.get_stats)
@@ -0,0 +1,151 @@
+# api/services/vendor_spatial_index.py
+"""
+Vendor Spatial Index
+Grid index over the service circles of radius-coverage vendors (home port ZIP centroid +
+service radius), one immutable grid per account. Each vendor is registered in every 1°x1°
+cell its circle overlaps, so a lookup is one cell fetch followed by a vectorized haversine
+over the few candidates.
+"""
+
+import math
+import logging
+from threading import Lock
+from typing import Dict, Any, List, Tuple, Optional
+
+from api.services.location_service import location_service
+from utils.dependency_manager import get_module, is_available
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = 69.0
+GRID_CELL_DEGREES = 1.0
+
+
+def haversine_miles(lat: float, lng: float, lats, lngs) -> List[float]:
+    """Great-circle distances from one point to many (numpy when available)"""
+    if is_available('numpy'):
+        np = get_module('numpy')
+        lat1, lng1 = np.radians(lat), np.radians(lng)
+        lat2, lng2 = np.radians(np.asarray(lats, dtype=float)), np.radians(np.asarray(lngs, dtype=float))
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+        return (2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(a))).tolist()
+
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    distances = []
+    for other_lat, other_lng in zip(lats, lngs):
+        lat2, lng2 = math.radians(other_lat), math.radians(other_lng)
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+        distances.append(2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a)))
+    return distances
+
+
+class SpatialGrid:
+    """
+    Immutable cell -> radius vendor grid for one vendor set. Routing queries the grid it was
+    handed, so a concurrent rebuild (another account, changed ports) never swaps it mid-lookup.
+    """
+
+    def __init__(self, signature: tuple, cells: Dict[Tuple[int, int], Tuple[int, ...]],
+                 entries: Tuple[Dict[str, Any], ...], cell_degrees: float, stats: Dict[str, int]):
+        self.signature = signature
+        self.cells = cells
+        self.entries = entries
+        self.cell_degrees = cell_degrees
+        self._stats = stats
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees))
+
+    def query(self, lat: float, lng: float) -> List[Tuple[str, float]]:
+        """(vendor_id, distance_miles) for every vendor whose radius covers the point, nearest first"""
+        candidates = [self.entries[i] for i in self.cells.get(self._cell(lat, lng), ())]
+        self._stats["queries"] += 1
+        self._stats["candidates_checked"] += len(candidates)
+        if not candidates:
+            return []
+        distances = haversine_miles(lat, lng, [c["lat"] for c in candidates], [c["lng"] for c in candidates])
+        hits = [(c["vendor_id"], round(d, 1)) for c, d in zip(candidates, distances) if d <= c["radius"]]
+        hits.sort(key=lambda hit: hit[1])
+        return hits
+
+
+class VendorSpatialIndex:
+    """One SpatialGrid per account, rebuilt when that account's radius vendors change"""
+
+    def __init__(self, cell_degrees: float = GRID_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._lock = Lock()
+        self._grids: Dict[str, SpatialGrid] = {}
+        self.stats = {"builds": 0, "queries": 0, "candidates_checked": 0, "unlocated_vendors": 0}
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees))
+
+    def ensure_built(self, vendors: List[Dict[str, Any]], key: Optional[str] = None) -> SpatialGrid:
+        """
+        The grid for the radius vendors in this list (key: account id), rebuilt when their
+        ports or radii changed. Query the returned grid.
+        """
+        key = key or "default"
+        radius_vendors = [v for v in vendors if v.get('coverage_type') == 'radius']
+        signature = tuple(sorted((str(v.get('id')), v.get('home_zip_code') or '', float(v.get('service_radius_miles') or 0))
+                                 for v in radius_vendors))
+        grid = self._grids.get(key)
+        if grid is not None and grid.signature == signature:
+            return grid
+        with self._lock:
+            grid = self._grids.get(key)
+            if grid is None or grid.signature != signature:
+                grid = self._build(radius_vendors, signature)
+                self._grids[key] = grid
+        return grid
+
+    def _build(self, radius_vendors: List[Dict[str, Any]], signature: tuple) -> SpatialGrid:
+        # One batched lookup warms the ZIP cache for every home port
+        location_service.zips_to_locations(v.get('home_zip_code') for v in radius_vendors)
+
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        entries = []
+        unlocated = 0
+        for vendor in radius_vendors:
+            home_zip = vendor.get('home_zip_code') or ''
+            radius = float(vendor.get('service_radius_miles') or 0)
+            location = location_service.zip_to_location(home_zip) if home_zip else {'error': 'No home port'}
+            lat, lng = location.get('lat'), location.get('lng')
+            if location.get('error') or lat is None or lng is None or radius <= 0 \
+                    or math.isnan(float(lat)) or math.isnan(float(lng)):
+                unlocated += 1
+                continue
+            lat, lng = float(lat), float(lng)
+            index = len(entries)
+            entries.append({"vendor_id": str(vendor.get('id')), "lat": lat, "lng": lng, "radius": radius})
+
+            # Register the circle's bounding box, widened in longitude for latitude
+            dlat = radius / MILES_PER_DEGREE_LAT
+            dlng = radius / (MILES_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+            lat_lo, lng_lo = self._cell(lat - dlat, lng - dlng)
+            lat_hi, lng_hi = self._cell(lat + dlat, lng + dlng)
+            for cell_lat in range(lat_lo, lat_hi + 1):
+                for cell_lng in range(lng_lo, lng_hi + 1):
+                    cells.setdefault((cell_lat, cell_lng), []).append(index)
+
+        self.stats["builds"] += 1
+        self.stats["unlocated_vendors"] = unlocated
+        if unlocated:
+            logger.warning(f"⚠️ {unlocated} radius-coverage vendors have no resolvable home port ZIP or radius")
+        logger.debug("🧭 Vendor spatial index built: %d vendors in %d cells", len(entries), len(cells))
+        return SpatialGrid(signature, {cell: tuple(indexes) for cell, indexes in cells.items()},
+                           tuple(entries), self.cell_degrees, self.stats)
+
+    def get_stats(self) -> Dict[str, Any]:
+        grids = list(self._grids.values())
+        return {**self.stats, "grids": len(grids),
+                "indexed_vendors": sum(len(grid.entries) for grid in grids),
+                "cells": sum(len(grid.cells) for grid in grids)}
+
+
+# Global instance
+vendor_spatial_index = VendorSpatialIndex()
+metrics.register_stats("vendor_spatial_index", vendor_spatial_index.get_stats)
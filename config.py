@@ -18,7 +18,91 @@ class AppConfig:
     GHL_LOCATION_ID: str = os.getenv("GHL_LOCATION_ID", "")
     GHL_AGENCY_API_KEY: str = os.getenv("GHL_AGENCY_API_KEY", "")
     GHL_COMPANY_ID: str = os.getenv("GHL_COMPANY_ID", "")  # For V2 user creation API
-    
+
+    # GHL API base URLs (point both at the emulator, e.g. http://localhost:8000/ghl-emulator, for load tests)
+    GHL_API_BASE_URL: str = os.getenv("GHL_API_BASE_URL", "https://services.leadconnectorhq.com").rstrip("/")
+    GHL_V1_API_BASE_URL: str = os.getenv("GHL_V1_API_BASE_URL", "https://rest.gohighlevel.com").rstrip("/")
+
+    # Local GHL API emulator (api/services/ghl_emulator.py), mounted at /ghl-emulator when enabled.
+    # Latency: none | fixed:MS | uniform:MIN_MS:MAX_MS | lognormal:MEDIAN_MS:SIGMA
+    GHL_EMULATOR_ENABLED: bool = os.getenv("GHL_EMULATOR_ENABLED", "false").lower() == "true"
+    GHL_EMULATOR_LATENCY: str = os.getenv("GHL_EMULATOR_LATENCY", "lognormal:150:0.5")
+    GHL_EMULATOR_RATE_LIMIT_PER_SECOND: float = float(os.getenv("GHL_EMULATOR_RATE_LIMIT_PER_SECOND", "10"))  # 0 = unlimited
+    GHL_EMULATOR_RATE_LIMIT_BURST: int = int(os.getenv("GHL_EMULATOR_RATE_LIMIT_BURST", "100"))
+    GHL_EMULATOR_429_RATE: float = float(os.getenv("GHL_EMULATOR_429_RATE", "0"))  # Extra random 429s
+    GHL_EMULATOR_ERROR_RATE: float = float(os.getenv("GHL_EMULATOR_ERROR_RATE", "0"))  # Random 500/502/503s
+    GHL_EMULATOR_SEED_CONTACTS: int = int(os.getenv("GHL_EMULATOR_SEED_CONTACTS", "0"))
+
+    # GHL Rate Limiting (shared across all GHL callers in the process)
+    GHL_RATE_LIMIT_PER_SECOND: float = float(os.getenv("GHL_RATE_LIMIT_PER_SECOND", "8"))
+    GHL_RATE_LIMIT_BURST: int = int(os.getenv("GHL_RATE_LIMIT_BURST", "10"))
+    GHL_RATE_LIMIT_BULK_RESERVE: int = int(os.getenv("GHL_RATE_LIMIT_BULK_RESERVE", "3"))  # Tokens bulk jobs never take
+
+    # Shared state for multi-worker deployments (rate limits, IP blocks, round-robin, caches)
+    # auto = redis when SHARED_STATE_REDIS_URL is set and reachable, otherwise a local SQLite file
+    SHARED_STATE_BACKEND: str = os.getenv("SHARED_STATE_BACKEND", "auto").lower()  # auto | redis | sqlite | memory
+    SHARED_STATE_REDIS_URL: str = os.getenv("SHARED_STATE_REDIS_URL", os.getenv("REDIS_URL", ""))
+    SHARED_STATE_SQLITE_PATH: str = os.getenv("SHARED_STATE_SQLITE_PATH", "")  # default: shared_state.db in the project dir
+    SHARED_STATE_PREFIX: str = os.getenv("SHARED_STATE_PREFIX", "leadrouter:")
+
+    # Vendor performance scoring (api/services/vendor_scoring.py) - decayed close rates for performance routing
+    VENDOR_SCORE_WINDOWS_DAYS: str = os.getenv("VENDOR_SCORE_WINDOWS_DAYS", "30,90")
+    VENDOR_SCORE_PRIOR_WEIGHT: float = float(os.getenv("VENDOR_SCORE_PRIOR_WEIGHT", "5"))  # Pseudo-leads at the fallback rate
+    VENDOR_SCORE_WON_STAGES: str = os.getenv("VENDOR_SCORE_WON_STAGES", "won,closed won,job won,job completed")
+    VENDOR_SCORE_LOST_STAGES: str = os.getenv("VENDOR_SCORE_LOST_STAGES", "lost,closed lost,job lost,abandoned")
+    VENDOR_SCORE_REASSIGNMENT_AS_LOST: bool = os.getenv("VENDOR_SCORE_REASSIGNMENT_AS_LOST", "true").lower() == "true"
+
+    # Vendor capacity (api/services/vendor_capacity.py) - defaults for vendors without their own limits, 0 = unlimited
+    VENDOR_DEFAULT_MAX_OPEN_LEADS: int = int(os.getenv("VENDOR_DEFAULT_MAX_OPEN_LEADS", "0"))
+    VENDOR_DEFAULT_MAX_LEADS_PER_DAY: int = int(os.getenv("VENDOR_DEFAULT_MAX_LEADS_PER_DAY", "0"))
+    VENDOR_DEFAULT_MAX_LEADS_PER_HOUR: int = int(os.getenv("VENDOR_DEFAULT_MAX_LEADS_PER_HOUR", "0"))
+    VENDOR_OPEN_LEAD_EXPIRY_DAYS: float = float(os.getenv("VENDOR_OPEN_LEAD_EXPIRY_DAYS", "14"))  # Older leads stop counting as open
+    VENDOR_CAPACITY_CLOSED_STATUSES: str = os.getenv("VENDOR_CAPACITY_CLOSED_STATUSES", "won,lost,closed,completed,cancelled")
+
+    # Bulk Reassignment Configuration
+    BULK_REASSIGNMENT_CONCURRENCY: int = int(os.getenv("BULK_REASSIGNMENT_CONCURRENCY", "8"))
+
+    # Webhook Processing (worker threads shared by all priority lanes, plus one reserved for emergencies)
+    WEBHOOK_WORKER_THREADS: int = int(os.getenv("WEBHOOK_WORKER_THREADS", "4"))
+
+    # GHL new-contact trigger: acknowledge first and process on the worker pool; repeat deliveries
+    # of the same contact/webhook id within the window coalesce into one job
+    GHL_CONTACT_TRIGGER_ASYNC: bool = os.getenv("GHL_CONTACT_TRIGGER_ASYNC", "true").lower() == "true"
+    GHL_CONTACT_TRIGGER_DEDUP_HOURS: float = float(os.getenv("GHL_CONTACT_TRIGGER_DEDUP_HOURS", "24"))
+    # A worker holds a lease on the jobs it runs and renews it while alive; other workers only
+    # resume queued/processing jobs whose lease has expired
+    GHL_CONTACT_JOB_LEASE_SECONDS: float = float(os.getenv("GHL_CONTACT_JOB_LEASE_SECONDS", "120"))
+
+    # Unassigned Lead Sweep (minutes between scheduled runs, 0 = dashboard only)
+    UNASSIGNED_LEAD_SWEEP_INTERVAL_MINUTES: int = int(os.getenv("UNASSIGNED_LEAD_SWEEP_INTERVAL_MINUTES", "0"))
+
+    # Service dictionary responses (static per deploy; clients revalidate via ETag after max-age)
+    SERVICE_DICTIONARY_CACHE_MAX_AGE: int = int(os.getenv("SERVICE_DICTIONARY_CACHE_MAX_AGE", "86400"))
+
+    # AI Error Recovery (model calls are optional; learned rules work without them)
+    AI_RECOVERY_TIMEOUT_SECONDS: float = float(os.getenv("AI_RECOVERY_TIMEOUT_SECONDS", "20"))
+    AI_RECOVERY_MAX_CONCURRENCY: int = int(os.getenv("AI_RECOVERY_MAX_CONCURRENCY", "2"))
+    AI_RECOVERY_BREAKER_THRESHOLD: int = int(os.getenv("AI_RECOVERY_BREAKER_THRESHOLD", "5"))
+    AI_RECOVERY_BREAKER_COOLDOWN_SECONDS: float = float(os.getenv("AI_RECOVERY_BREAKER_COOLDOWN_SECONDS", "120"))
+
+    # Lead lifecycle tracing (OTLP export is enabled by the standard OTEL_EXPORTER_OTLP_ENDPOINT variable)
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    TRACE_BUFFER_SIZE: int = int(os.getenv("TRACE_BUFFER_SIZE", "500"))
+    TRACE_SLOW_THRESHOLD_MS: float = float(os.getenv("TRACE_SLOW_THRESHOLD_MS", "15000"))
+
+    # Logging (LOG_SAMPLE_RATES thins INFO/DEBUG per module, e.g. "api.services.lead_routing_service=0.1")
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text").lower()  # text | json
+    LOG_FILE: str = os.getenv("LOG_FILE", "")
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_SAMPLE_RATES: str = os.getenv("LOG_SAMPLE_RATES", "")
+    # Captured payloads (/api/v1/routing/debug/payloads) need METRICS_AUTH_TOKEN or an admin token
+    LOG_CAPTURE_PAYLOADS: bool = os.getenv("LOG_CAPTURE_PAYLOADS", "false").lower() == "true"
+    LOG_PAYLOAD_BUFFER_SIZE: int = int(os.getenv("LOG_PAYLOAD_BUFFER_SIZE", "200"))
+
+    # Metrics (/metrics requires "Authorization: Bearer <token>" when set)
+    METRICS_AUTH_TOKEN: str = os.getenv("METRICS_AUTH_TOKEN", "")
+
     # Pipeline Configuration
     PIPELINE_ID: Optional[str] = os.getenv("PIPELINE_ID")
     NEW_LEAD_STAGE_ID: Optional[str] = os.getenv("NEW_LEAD_STAGE_ID")
@@ -43,6 +127,10 @@ class AppConfig:
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
     JWT_REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("JWT_REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+    TOKEN_FINGERPRINT_KEY: str = os.getenv("TOKEN_FINGERPRINT_KEY", "")  # defaults to the JWT secret
+    AUTH_HASH_WORKERS: int = int(os.getenv("AUTH_HASH_WORKERS", "4"))
+    PRINCIPAL_CACHE_TTL_SECONDS: int = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
     
     # Email Configuration
     SMTP_HOST: str = os.getenv("SMTP_HOST", "")
@@ -74,7 +74,7 @@ class AuthToken(Base):
     id = Column(get_uuid_column(), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(get_uuid_column(), ForeignKey("users.id"), nullable=False)
     token_type = Column(String(50), nullable=False)  # access, refresh, reset_password
-    token_hash = Column(String(255), nullable=False)
+    token_hash = Column(String(255), nullable=False, index=True)  # HMAC-SHA256 fingerprint
     expires_at = Column(DateTime, nullable=False)
     is_revoked = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
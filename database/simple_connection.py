@@ -6,13 +6,20 @@ import logging
 from typing import Dict, List, Any, Optional
 import json 
 import uuid 
+import time
 from datetime import datetime
 import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 
+from utils.metrics import instrument_methods, sqlite_query_duration
+
 logger = logging.getLogger(__name__)
 
+# Lead statuses that end a lead's life - such leads are never picked up for (re)assignment
+TERMINAL_LEAD_STATUSES = ("closed", "lost", "won", "completed", "cancelled", "canceled",
+                          "duplicate", "spam", "archived")
+
 class SimpleDatabase:
     def __init__(self, db_path: str = None):
         # Use absolute path to ensure consistent database location
@@ -122,7 +129,139 @@ class SimpleDatabase:
                 if column_name not in columns:
                     cursor.execute(f"ALTER TABLE leads ADD COLUMN {column_name} {column_def}")
                     logger.info(f"✅ Added enhanced column: {column_name}")
+
+            # Radius coverage (coverage_type='radius'): home port ZIP + service radius;
+            # capacity limits (NULL = configured default, 0 = unlimited)
+            cursor.execute("PRAGMA table_info(vendors)")
+            vendor_columns = [column[1] for column in cursor.fetchall()]
+            for column_name, column_def in [("home_zip_code", "TEXT"), ("service_radius_miles", "REAL"),
+                                            ("max_open_leads", "INTEGER"), ("max_leads_per_day", "INTEGER"),
+                                            ("max_leads_per_hour", "INTEGER")]:
+                if column_name not in vendor_columns:
+                    cursor.execute(f"ALTER TABLE vendors ADD COLUMN {column_name} {column_def}")
+                    logger.info(f"✅ Added vendor column: {column_name}")
+
+            # Open-lead counts per vendor (vendor capacity)
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_leads_vendor_created
+                ON leads (vendor_id, created_at)
+            ''')
+
+            # Partial index for unassigned-lead sweeps (only rows without a vendor are indexed)
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_leads_unassigned
+                ON leads (account_id, created_at) WHERE vendor_id IS NULL
+            ''')
+            
+            # auth_tokens is created by SQLAlchemy; index fingerprints on databases created before it was indexed
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='auth_tokens'")
+            if cursor.fetchone():
+                cursor.execute("CREATE INDEX IF NOT EXISTS ix_auth_tokens_token_hash ON auth_tokens (token_hash)")
+
+            # Outbound email queue (api/services/mail_outbox.py); lower priority value sends first
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS email_outbox (
+                    id TEXT PRIMARY KEY,
+                    sender TEXT NOT NULL,
+                    from_addr TEXT NOT NULL,
+                    to_addr TEXT NOT NULL,
+                    message TEXT,
+                    priority INTEGER DEFAULT 5,
+                    status TEXT DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    expires_at REAL,
+                    claimed_at REAL,
+                    last_error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    sent_at TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_email_outbox_due
+                ON email_outbox (priority, next_attempt_at) WHERE status = 'pending'
+            ''')
+            cursor.execute("PRAGMA table_info(email_outbox)")
+            if "claimed_at" not in [column[1] for column in cursor.fetchall()]:
+                cursor.execute("ALTER TABLE email_outbox ADD COLUMN claimed_at REAL")
             
+            # Normalized email / E.164 phone -> GHL contact id (api/services/contact_identity_index.py)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS contact_identities (
+                    identity_key TEXT PRIMARY KEY,
+                    ghl_contact_id TEXT NOT NULL,
+                    source TEXT,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_contact_identities_contact
+                ON contact_identities (ghl_contact_id)
+            ''')
+            
+            # GHL new-contact trigger jobs; one row per (contact, webhook delivery id), retries coalesce
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ghl_contact_jobs (
+                    id TEXT PRIMARY KEY,
+                    dedup_key TEXT NOT NULL UNIQUE,
+                    ghl_contact_id TEXT NOT NULL,
+                    webhook_id TEXT,
+                    status TEXT DEFAULT 'queued',
+                    deliveries INTEGER DEFAULT 1,
+                    payload TEXT,
+                    result TEXT,
+                    error TEXT,
+                    claimed_by TEXT,
+                    lease_expires_at REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_ghl_contact_jobs_contact
+                ON ghl_contact_jobs (ghl_contact_id)
+            ''')
+            # Worker lease (claimed_by / lease_expires_at): only expired claims are resumed
+            cursor.execute("PRAGMA table_info(ghl_contact_jobs)")
+            job_columns = [column[1] for column in cursor.fetchall()]
+            for column_name, column_def in [("claimed_by", "TEXT"), ("lease_expires_at", "REAL")]:
+                if column_name not in job_columns:
+                    cursor.execute(f"ALTER TABLE ghl_contact_jobs ADD COLUMN {column_name} {column_def}")
+
+            # Vendor performance scoring (api/services/vendor_scoring.py): exponentially decayed
+            # assigned/won/lost counters per vendor and window, valued as of updated_at
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS vendor_score_counters (
+                    vendor_id TEXT NOT NULL,
+                    window_days INTEGER NOT NULL,
+                    assigned REAL DEFAULT 0,
+                    won REAL DEFAULT 0,
+                    lost REAL DEFAULT 0,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (vendor_id, window_days)
+                )
+            ''')
+            # Vendor capacity token buckets (leads/hour, leads/day), valued as of updated_at
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS vendor_capacity_buckets (
+                    vendor_id TEXT NOT NULL,
+                    period TEXT NOT NULL,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (vendor_id, period)
+                )
+            ''')
+            # Outcome currently counted for each lead/vendor pair, so repeated or reversed stage updates stay exact
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS lead_outcomes (
+                    lead_id TEXT NOT NULL,
+                    vendor_id TEXT NOT NULL,
+                    outcome TEXT NOT NULL,
+                    outcome_at REAL NOT NULL,
+                    PRIMARY KEY (lead_id, vendor_id)
+                )
+            ''')
+
             # Create activity log table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS activity_log (
@@ -1196,6 +1335,572 @@ class SimpleDatabase:
             if conn:
                 conn.close()
 
+    def get_lead_by_ghl_opportunity_id(self, ghl_opportunity_id: str) -> Optional[Dict[str, Any]]:
+        """Get a specific lead by GHL opportunity ID (opportunity status/stage webhooks)"""
+        conn = None
+        try:
+            conn = self._get_conn()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, account_id, vendor_id, ghl_contact_id, ghl_opportunity_id, status,
+                       created_at, updated_at
+                FROM leads WHERE ghl_opportunity_id = ?
+                ORDER BY created_at DESC LIMIT 1
+            ''', (ghl_opportunity_id,))
+
+            row = cursor.fetchone()
+            if row:
+                return {
+                    "id": row[0], "account_id": row[1], "vendor_id": row[2],
+                    "ghl_contact_id": row[3], "ghl_opportunity_id": row[4],
+                    "status": row[5], "created_at": row[6], "updated_at": row[7]
+                }
+            return None
+
+        except Exception as e:
+            logger.error(f"❌ Error getting lead by GHL opportunity ID {ghl_opportunity_id}: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def get_leads_by_ghl_contact_ids(self, ghl_contact_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Batched version of get_lead_by_ghl_contact_id for bulk operations.
+        Returns {ghl_contact_id: lead} using the most recent lead per contact.
+        """
+        leads = {}
+        if not ghl_contact_ids:
+            return leads
+
+        conn = None
+        try:
+            conn = self._get_conn()
+            cursor = conn.cursor()
+            unique_ids = list(dict.fromkeys(ghl_contact_ids))
+
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(unique_ids), 500):
+                chunk = unique_ids[start:start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                cursor.execute(f'''
+                    SELECT id, account_id, vendor_id, ghl_contact_id, ghl_opportunity_id,
+                           primary_service_category, customer_name, customer_email, customer_phone,
+                           service_details, priority, status,
+                           service_county, service_state, customer_zip_code,
+                           specific_service_requested, source, created_at, updated_at
+                    FROM leads WHERE ghl_contact_id IN ({placeholders})
+                    ORDER BY created_at ASC
+                ''', chunk)
+
+                for row in cursor.fetchall():
+                    # Later rows overwrite earlier ones, leaving the most recent lead
+                    leads[row[3]] = {
+                        "id": row[0], "account_id": row[1], "vendor_id": row[2],
+                        "ghl_contact_id": row[3], "ghl_opportunity_id": row[4],
+                        "primary_service_category": row[5],
+                        "service_category": row[5],
+                        "customer_name": row[6],
+                        "customer_email": row[7], "customer_phone": row[8],
+                        "service_details": json.loads(row[9]) if row[9] else {},
+                        "priority": row[10], "status": row[11],
+                        "service_county": row[12], "service_state": row[13],
+                        "customer_zip_code": row[14],
+                        "service_zip_code": row[14],
+                        "specific_service_requested": row[15],
+                        "source": row[16],
+                        "created_at": row[17], "updated_at": row[18]
+                    }
+
+            return leads
+
+        except Exception as e:
+            logger.error(f"❌ Error batch loading leads for {len(ghl_contact_ids)} contacts: {e}")
+            return leads
+        finally:
+            if conn:
+                conn.close()
+
+    def get_lead_reassignment_counts(self, lead_ids: List[str]) -> Dict[str, int]:
+        """
+        {lead_id: reassignment_count} for bulk operations. The column is added on first
+        reassignment (update_lead), so a missing column means nothing was reassigned yet.
+        """
+        counts = {lead_id: 0 for lead_id in lead_ids}
+        if not lead_ids:
+            return counts
+
+        conn = None
+        try:
+            conn = self._get_conn()
+            cursor = conn.cursor()
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(leads)").fetchall()}
+            if "reassignment_count" not in columns:
+                return counts
+
+            unique_ids = list(dict.fromkeys(lead_ids))
+            for start in range(0, len(unique_ids), 500):
+                chunk = unique_ids[start:start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                cursor.execute(f'''
+                    SELECT id, reassignment_count FROM leads WHERE id IN ({placeholders})
+                ''', chunk)
+                for lead_id, count in cursor.fetchall():
+                    try:
+                        counts[lead_id] = int(count or 0)
+                    except (TypeError, ValueError):
+                        counts[lead_id] = 0
+            return counts
+
+        except Exception as e:
+            logger.error(f"❌ Error loading reassignment counts for {len(lead_ids)} leads: {e}")
+            return counts
+        finally:
+            if conn:
+                conn.close()
+
+    def bulk_assign_leads_to_vendors(self, assignments: List[tuple], only_unassigned: bool = False) -> List[str]:
+        """
+        Assign many leads in a single transaction.
+        assignments: list of (lead_id, vendor_id). With only_unassigned, leads that were
+        assigned by someone else in the meantime are left alone.
+        Returns the IDs of the leads that were actually updated.
+        """
+        if not assignments:
+            return []
+
+        conn = None
+        try:
+            conn = self._get_conn()
+            cursor = conn.cursor()
+            guard = " AND vendor_id IS NULL" if only_unassigned else ""
+            updated = []
+            for lead_id, vendor_id in assignments:
+                cursor.execute(f'''
+                    UPDATE leads
+                    SET vendor_id = ?, status = 'assigned', updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?{guard}
+                ''', (vendor_id, lead_id))
+                if cursor.rowcount > 0:
+                    updated.append(lead_id)
+            conn.commit()
+            logger.info(f"✅ Bulk assigned {len(updated)}/{len(assignments)} leads to vendors")
+            return updated
+
+        except Exception as e:
+            logger.error(f"❌ Error bulk assigning {len(assignments)} leads: {e}")
+            if conn:
+                conn.rollback()
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    def get_unassigned_leads(self, account_id: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Open leads with no vendor, oldest first (served by the idx_leads_unassigned partial index)"""
+        conn = None
+        try:
+            conn = self._get_conn()
+            cursor = conn.cursor()
+            query = '''
+                SELECT id, account_id, ghl_contact_id, ghl_opportunity_id, customer_name,
+                       primary_service_category, specific_service_requested,
+                       service_zip_code, customer_zip_code, service_county, service_state,
+                       status, created_at
+                FROM leads WHERE vendor_id IS NULL
+                  AND LOWER(COALESCE(status, '')) NOT IN ({})
+            '''.format(",".join("?" * len(TERMINAL_LEAD_STATUSES)))
+            params: List[Any] = list(TERMINAL_LEAD_STATUSES)
+            if account_id:
+                query += " AND account_id = ?"
+                params.append(account_id)
+            query += " ORDER BY created_at ASC"
+            if limit:
+                query += " LIMIT ?"
+                params.append(limit)
+
+            cursor.execute(query, params)
+            return [{
+                "id": row[0], "account_id": row[1], "ghl_contact_id": row[2],
+                "ghl_opportunity_id": row[3], "customer_name": row[4],
+                "primary_service_category": row[5], "specific_service_requested": row[6],
+                "service_zip_code": row[7], "customer_zip_code": row[8],
+                "service_county": row[9], "service_state": row[10],
+                "status": row[11], "created_at": row[12], "vendor_id": None
+            } for row in cursor.fetchall()]
+
+        except Exception as e:
+            logger.error(f"❌ Error getting unassigned leads: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    # ============================================
+    # Outbound email queue
+    # ============================================
+
+    def enqueue_outbound_email(self, sender: str, from_addr: str, to_addr: str, message: str,
+                               priority: int, expires_at: Optional[float] = None) -> Optional[str]:
+        """Persist an outbound email; returns its outbox id"""
+        conn = None
+        try:
+            conn = self._get_conn()
+            email_id = str(uuid.uuid4())
+            conn.execute('''
+                INSERT INTO email_outbox (id, sender, from_addr, to_addr, message, priority,
+                                          next_attempt_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (email_id, sender, from_addr, to_addr, message, priority, time.time(), expires_at))
+            conn.commit()
+            return email_id
+        except Exception as e:
+            logger.error(f"❌ Error queueing email to {to_addr}: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def claim_next_outbound_email(self) -> Optional[Dict[str, Any]]:
+        """Mark the highest-priority due email as sending (claimed now) and return it"""
+        conn = None
+        try:
+            conn = self._get_conn()
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute('''
+                SELECT id, sender, from_addr, to_addr, message, priority, attempts, expires_at
+                FROM email_outbox
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY priority ASC, next_attempt_at ASC
+                LIMIT 1
+            ''', (now,)).fetchone()
+            if not row:
+                conn.execute("COMMIT")
+                return None
+            conn.execute("UPDATE email_outbox SET status = 'sending', claimed_at = ? WHERE id = ?", (now, row[0]))
+            conn.execute("COMMIT")
+            return {
+                "id": row[0], "sender": row[1], "from_addr": row[2], "to_addr": row[3],
+                "message": row[4], "priority": row[5], "attempts": row[6], "expires_at": row[7]
+            }
+        except Exception as e:
+            logger.error(f"❌ Error claiming outbound email: {e}")
+            if conn and conn.in_transaction:
+                conn.execute("ROLLBACK")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def next_outbound_email_due_at(self) -> Optional[float]:
+        """Earliest next_attempt_at among pending emails (None if the outbox is empty)"""
+        conn = None
+        try:
+            conn = self._get_conn()
+            row = conn.execute(
+                "SELECT MIN(next_attempt_at) FROM email_outbox WHERE status = 'pending'"
+            ).fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            logger.error(f"❌ Error reading outbox schedule: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def complete_outbound_email(self, email_id: str, status: str, error: Optional[str] = None,
+                                next_attempt_at: Optional[float] = None) -> bool:
+        """
+        Record a delivery outcome. status 'pending' reschedules a retry; 'sent', 'failed' and
+        'expired' are final and drop the message body (it may contain security codes).
+        """
+        conn = None
+        try:
+            conn = self._get_conn()
+            if status == "pending":
+                conn.execute('''
+                    UPDATE email_outbox
+                    SET status = 'pending', attempts = attempts + 1, last_error = ?, next_attempt_at = ?
+                    WHERE id = ?
+                ''', (error, next_attempt_at, email_id))
+            else:
+                conn.execute('''
+                    UPDATE email_outbox
+                    SET status = ?, attempts = attempts + 1, last_error = ?, message = NULL,
+                        sent_at = CASE WHEN ? = 'sent' THEN CURRENT_TIMESTAMP ELSE sent_at END
+                    WHERE id = ?
+                ''', (status, error, status, email_id))
+            conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error updating outbound email {email_id}: {e}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+
+    def requeue_stuck_outbound_emails(self, lease_seconds: float) -> int:
+        """
+        Return emails left in 'sending' by a crashed process to the queue. Only claims older
+        than lease_seconds are requeued - younger ones may still be in flight on another worker.
+        """
+        conn = None
+        try:
+            conn = self._get_conn()
+            cursor = conn.execute('''
+                UPDATE email_outbox SET status = 'pending', claimed_at = NULL
+                WHERE status = 'sending' AND (claimed_at IS NULL OR claimed_at < ?)
+            ''', (time.time() - lease_seconds,))
+            conn.commit()
+            return cursor.rowcount
+        except Exception as e:
+            logger.error(f"❌ Error requeueing outbound emails: {e}")
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    def get_outbound_email_stats(self) -> Dict[str, int]:
+        conn = None
+        try:
+            conn = self._get_conn()
+            rows = conn.execute("SELECT status, COUNT(*) FROM email_outbox GROUP BY status").fetchall()
+            return {status: count for status, count in rows}
+        except Exception as e:
+            logger.error(f"❌ Error reading outbox stats: {e}")
+            return {}
+        finally:
+            if conn:
+                conn.close()
+
+    def lookup_contact_identities(self, identity_keys: List[str]) -> Dict[str, str]:
+        """Map each known identity key to its GHL contact id"""
+        if not identity_keys:
+            return {}
+        conn = None
+        try:
+            conn = self._get_conn()
+            placeholders = ",".join("?" for _ in identity_keys)
+            rows = conn.execute(
+                f"SELECT identity_key, ghl_contact_id FROM contact_identities WHERE identity_key IN ({placeholders})",
+                identity_keys
+            ).fetchall()
+            return {key: contact_id for key, contact_id in rows}
+        except Exception as e:
+            logger.error(f"❌ Error looking up contact identities: {e}")
+            return {}
+        finally:
+            if conn:
+                conn.close()
+
+    def upsert_contact_identities(self, rows: List[tuple]) -> int:
+        """Insert or repoint (identity_key, ghl_contact_id, source) rows in one transaction"""
+        if not rows:
+            return 0
+        conn = None
+        try:
+            conn = self._get_conn()
+            now = time.time()
+            conn.executemany('''
+                INSERT INTO contact_identities (identity_key, ghl_contact_id, source, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(identity_key) DO UPDATE SET
+                    ghl_contact_id = excluded.ghl_contact_id,
+                    source = excluded.source,
+                    updated_at = excluded.updated_at
+            ''', [(key, contact_id, source, now) for key, contact_id, source in rows])
+            conn.commit()
+            return len(rows)
+        except Exception as e:
+            logger.error(f"❌ Error storing contact identities: {e}")
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    def delete_contact_identities(self, ghl_contact_id: str) -> int:
+        """Forget every identity pointing at a GHL contact"""
+        conn = None
+        try:
+            conn = self._get_conn()
+            cursor = conn.execute("DELETE FROM contact_identities WHERE ghl_contact_id = ?", (ghl_contact_id,))
+            conn.commit()
+            return cursor.rowcount
+        except Exception as e:
+            logger.error(f"❌ Error deleting contact identities for {ghl_contact_id}: {e}")
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    def _ghl_contact_job_row(self, row) -> Dict[str, Any]:
+        return {
+            "id": row[0], "ghl_contact_id": row[1], "webhook_id": row[2], "status": row[3],
+            "deliveries": row[4], "payload": json.loads(row[5]) if row[5] else {},
+            "result": json.loads(row[6]) if row[6] else None, "error": row[7],
+            "created_at": row[8], "updated_at": row[9]
+        }
+
+    def claim_ghl_contact_job(self, ghl_contact_id: str, webhook_id: str, payload: Dict[str, Any],
+                              dedup_window_seconds: float, worker_id: str, lease_seconds: float) -> tuple:
+        """
+        Record a webhook delivery. Returns (job, is_new): is_new is False when the same
+        contact/webhook id was already received (a GHL retry) and the job is queued, running
+        or completed within the dedup window. Failed or expired jobs are reset to 'queued'.
+        New and reset jobs are leased to worker_id for lease_seconds.
+        """
+        conn = None
+        try:
+            conn = self._get_conn()
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            dedup_key = f"{ghl_contact_id}:{webhook_id}"
+            row = conn.execute('''
+                SELECT id, status, updated_at FROM ghl_contact_jobs WHERE dedup_key = ?
+            ''', (dedup_key,)).fetchone()
+
+            if row is None:
+                job_id = str(uuid.uuid4())
+                conn.execute('''
+                    INSERT INTO ghl_contact_jobs (id, dedup_key, ghl_contact_id, webhook_id, payload,
+                                                  claimed_by, lease_expires_at, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (job_id, dedup_key, ghl_contact_id, webhook_id, json.dumps(payload),
+                      worker_id, now + lease_seconds, now, now))
+                is_new = True
+            else:
+                job_id, status, updated_at = row
+                is_new = status == "failed" or (status == "completed" and updated_at < now - dedup_window_seconds)
+                if is_new:
+                    conn.execute('''
+                        UPDATE ghl_contact_jobs
+                        SET status = 'queued', deliveries = deliveries + 1, payload = ?, error = NULL,
+                            claimed_by = ?, lease_expires_at = ?, updated_at = ?
+                        WHERE id = ?
+                    ''', (json.dumps(payload), worker_id, now + lease_seconds, now, job_id))
+                else:
+                    conn.execute("UPDATE ghl_contact_jobs SET deliveries = deliveries + 1 WHERE id = ?",
+                                 (job_id,))
+
+            job = conn.execute('''
+                SELECT id, ghl_contact_id, webhook_id, status, deliveries, payload, result, error,
+                       created_at, updated_at
+                FROM ghl_contact_jobs WHERE id = ?
+            ''', (job_id,)).fetchone()
+            conn.execute("COMMIT")
+            return self._ghl_contact_job_row(job), is_new
+        except Exception as e:
+            logger.error(f"❌ Error recording GHL contact job for {ghl_contact_id}: {e}")
+            if conn and conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def update_ghl_contact_job(self, job_id: str, status: str, result: Dict[str, Any] = None,
+                               error: Optional[str] = None) -> bool:
+        conn = None
+        try:
+            conn = self._get_conn()
+            conn.execute('''
+                UPDATE ghl_contact_jobs SET status = ?, result = ?, error = ?, updated_at = ?
+                WHERE id = ?
+            ''', (status, json.dumps(result, default=str) if result is not None else None, error,
+                  time.time(), job_id))
+            conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error updating GHL contact job {job_id}: {e}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+
+    def renew_ghl_contact_job_leases(self, worker_id: str, lease_seconds: float) -> int:
+        """Heartbeat: extend the lease on every unfinished job worker_id holds"""
+        conn = None
+        try:
+            conn = self._get_conn()
+            cursor = conn.execute('''
+                UPDATE ghl_contact_jobs SET lease_expires_at = ?
+                WHERE claimed_by = ? AND status IN ('queued', 'processing')
+            ''', (time.time() + lease_seconds, worker_id))
+            conn.commit()
+            return cursor.rowcount
+        except Exception as e:
+            logger.error(f"❌ Error renewing GHL contact job leases: {e}")
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    def claim_expired_ghl_contact_jobs(self, worker_id: str, lease_seconds: float,
+                                       limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Take over unfinished jobs whose lease expired (their worker stopped or crashed) and
+        return them. Jobs still leased by a live worker are left alone.
+        """
+        conn = None
+        try:
+            conn = self._get_conn()
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            rows = conn.execute('''
+                SELECT id, ghl_contact_id, webhook_id, status, deliveries, payload, result, error,
+                       created_at, updated_at
+                FROM ghl_contact_jobs
+                WHERE status IN ('queued', 'processing')
+                  AND (lease_expires_at IS NULL OR lease_expires_at < ?)
+                ORDER BY created_at ASC LIMIT ?
+            ''', (now, limit)).fetchall()
+            conn.executemany(
+                "UPDATE ghl_contact_jobs SET claimed_by = ?, lease_expires_at = ? WHERE id = ?",
+                [(worker_id, now + lease_seconds, row[0]) for row in rows]
+            )
+            conn.execute("COMMIT")
+            return [self._ghl_contact_job_row(row) for row in rows]
+        except Exception as e:
+            logger.error(f"❌ Error claiming expired GHL contact jobs: {e}")
+            if conn and conn.in_transaction:
+                conn.execute("ROLLBACK")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    def get_ghl_contact_jobs(self, ghl_contact_id: str = None, statuses: List[str] = None,
+                             limit: int = 20) -> List[Dict[str, Any]]:
+        """Jobs for a contact (or in the given statuses), newest first"""
+        conn = None
+        try:
+            conn = self._get_conn()
+            clauses, params = [], []
+            if ghl_contact_id:
+                clauses.append("ghl_contact_id = ?")
+                params.append(ghl_contact_id)
+            if statuses:
+                clauses.append(f"status IN ({','.join('?' for _ in statuses)})")
+                params.extend(statuses)
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            rows = conn.execute(f'''
+                SELECT id, ghl_contact_id, webhook_id, status, deliveries, payload, result, error,
+                       created_at, updated_at
+                FROM ghl_contact_jobs {where}
+                ORDER BY created_at DESC LIMIT ?
+            ''', params + [limit]).fetchall()
+            return [self._ghl_contact_job_row(row) for row in rows]
+        except Exception as e:
+            logger.error(f"❌ Error reading GHL contact jobs: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
     def unassign_lead_from_vendor(self, lead_id: str) -> bool:
         """Remove vendor assignment from lead (for reassignment workflow)"""
         conn = None
@@ -1517,6 +2222,9 @@ class SimpleDatabase:
             if conn:
                 conn.close()
 
+# Per-method query timing for /metrics
+instrument_methods(SimpleDatabase, sqlite_query_duration, exclude=("init_database",))
+
 # Global database instance
 db = SimpleDatabase()
 
@@ -13,12 +13,14 @@ load_dotenv()  # This loads the .env file
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import logging
 from pathlib import Path # os was not used, Path is already imported
 
+from config import AppConfig
+
 # Define the base directory for the application (directory of this main.py file)
 BASE_DIR = Path(__file__).resolve().parent
 
@@ -37,16 +39,16 @@ from api.routes.admin_functions import router as admin_functions_router
 from api.routes.vendor_matching_enhanced import router as vendor_matching_router
 from api.routes.service_dictionary_routes import router as service_dictionary_router
 from api.routes.services_api import router as services_api_router
+from api.services.response_cache import html_template_cache, serve_payload
+from utils.metrics import metrics, MetricsMiddleware
+from utils.structured_logging import configure_logging
 
 # Import security middleware
 from api.security.middleware import IPSecurityMiddleware, SecurityCleanupMiddleware
 from api.security.auth_middleware import auth_middleware
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging (queue-backed; level, format and sampling come from AppConfig)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Lifespan event handler
@@ -56,8 +58,7 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 DocksidePros Lead Router Pro starting up...")
     
-    # Import and validate configuration
-    from config import AppConfig
+    # Validate configuration
     
     # Log environment variable loading status
     logger.info("🔧 Configuration Status:")
@@ -74,6 +75,32 @@ async def lifespan(app: FastAPI):
     else:
         logger.error("❌ Configuration validation failed - check environment variables")
     
+    # Warm GHL metadata (custom fields, pipelines, calendars) from disk and keep it fresh in the background
+    from api.services.ghl_metadata_cache import ghl_metadata_cache, register_field_index_listeners
+    register_field_index_listeners(ghl_metadata_cache)
+    ghl_metadata_cache.start_background_refresh()
+    
+    # Serialize/compress the service dictionary responses once (routers registered them at import)
+    from api.services.response_cache import json_response_cache
+    json_response_cache.warm()
+    
+    # Reload edited dashboard/widget templates immediately while developing
+    if AppConfig.DEBUG:
+        html_template_cache.start_watching()
+    
+    # Deliver queued 2FA / notification emails in the background
+    from api.services.mail_outbox import mail_outbox
+    mail_outbox.start()
+    
+    # Lease this worker's GHL new-contact jobs; pick up jobs whose worker stopped (lease expired)
+    from api.routes.webhook_routes import start_ghl_contact_job_leases, stop_ghl_contact_job_leases
+    start_ghl_contact_job_leases()
+    
+    # Periodic batch routing of unassigned leads (disabled unless an interval is configured)
+    from api.services.unassigned_lead_router import unassigned_lead_router
+    if AppConfig.UNASSIGNED_LEAD_SWEEP_INTERVAL_MINUTES > 0:
+        unassigned_lead_router.start_schedule(AppConfig.UNASSIGNED_LEAD_SWEEP_INTERVAL_MINUTES)
+    
     logger.info("✅ Enhanced webhook system loaded")
     logger.info("✅ Admin dashboard available at /admin")
     logger.info("✅ System health page available at /system-health")
@@ -84,6 +111,13 @@ async def lifespan(app: FastAPI):
     yield
     
     # Shutdown (if needed)
+    ghl_metadata_cache.stop_background_refresh()
+    unassigned_lead_router.stop_schedule()
+    stop_ghl_contact_job_leases()
+    html_template_cache.stop_watching()
+    await mail_outbox.stop()
+    from api.services.priority_scheduler import priority_scheduler
+    priority_scheduler.stop()
     logger.info("🛑 DocksidePros Lead Router Pro shutting down...")
 
 # Create FastAPI app with lifespan
@@ -109,6 +143,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency metrics (added last so it wraps every other middleware)
+app.add_middleware(MetricsMiddleware)
+
 # Include API routes
 app.include_router(webhook_router)
 app.include_router(location_router)
@@ -135,6 +172,12 @@ templates_dir.mkdir(exist_ok=True)
 # Serve static files (for admin dashboard assets) from BASE_DIR / "static"
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
+# Local GHL API emulator for load tests (never enable in production)
+if AppConfig.GHL_EMULATOR_ENABLED:
+    from api.services.ghl_emulator import create_ghl_emulator_app
+    app.mount("/ghl-emulator", create_ghl_emulator_app(), name="ghl-emulator")
+    logger.warning("🧪 GHL API emulator mounted at /ghl-emulator")
+
 def read_html_file(file_path: Path) -> str: # Changed type hint to Path
     """Read HTML file with error handling"""
     try:
@@ -147,12 +190,23 @@ def read_html_file(file_path: Path) -> str: # Changed type hint to Path
         logger.error(f"Error reading HTML file {file_path}: {e}")
         return f"<html><body><h1>Error loading template: {e}</h1></body></html>"
 
+def serve_html_file(request: Request, file_path: Path) -> Response:
+    """Serve an HTML file from the in-memory template cache with ETag/Last-Modified support"""
+    try:
+        payload = html_template_cache.get(file_path)
+    except Exception as e:
+        logger.error(f"Error caching HTML file {file_path}: {e}")
+        payload = None
+    if payload is None:
+        return HTMLResponse(content=read_html_file(file_path))
+    return serve_payload(request, payload, "no-cache")
+
 # Login page route
 @app.get("/login", response_class=HTMLResponse)
 @app.get("/auth", response_class=HTMLResponse)
-async def login_page():
+async def login_page(request: Request):
     """Serve the login page"""
-    return HTMLResponse(content=read_html_file(BASE_DIR / "templates" / "login.html"))
+    return serve_html_file(request, BASE_DIR / "templates" / "login.html")
 
 # Main admin dashboard route - now protected
 @app.get("/admin", response_class=HTMLResponse)
@@ -190,14 +244,14 @@ async def admin_dashboard(request: Request):
         </script>
         """)
     
-    return HTMLResponse(content=read_html_file(BASE_DIR / "lead_router_pro_dashboard.html"))
+    return serve_html_file(request, BASE_DIR / "lead_router_pro_dashboard.html")
 
 # Protected admin content route
 @app.get("/admin-content", response_class=HTMLResponse)
 async def admin_content(request: Request):
     """Serve admin dashboard content - protected route"""
     # This will be called with authentication
-    return HTMLResponse(content=read_html_file(BASE_DIR / "lead_router_pro_dashboard.html"))
+    return serve_html_file(request, BASE_DIR / "lead_router_pro_dashboard.html")
 
 # Protected Service Categories page
 @app.get("/service-categories", response_class=HTMLResponse)
@@ -226,7 +280,7 @@ async def service_categories_page(request: Request):
         }
         </script>
         """)
-    return HTMLResponse(content=read_html_file(BASE_DIR / "templates" / "service_categories.html"))
+    return serve_html_file(request, BASE_DIR / "templates" / "service_categories.html")
 
 # Protected System Health page
 @app.get("/system-health", response_class=HTMLResponse)
@@ -255,7 +309,7 @@ async def system_health_page(request: Request):
         }
         </script>
         """)
-    return HTMLResponse(content=read_html_file(BASE_DIR / "templates" / "system_health.html"))
+    return serve_html_file(request, BASE_DIR / "templates" / "system_health.html")
 
 # Protected Enhanced Form Tester page
 @app.get("/form-tester", response_class=HTMLResponse)
@@ -284,20 +338,20 @@ async def enhanced_form_tester_page(request: Request):
         }
         </script>
         """)
-    return HTMLResponse(content=read_html_file(BASE_DIR / "templates" / "enhanced_form_tester.html"))
+    return serve_html_file(request, BASE_DIR / "templates" / "enhanced_form_tester.html")
 
 # Protected content routes
 @app.get("/service-categories-content", response_class=HTMLResponse)
-async def service_categories_content():
-    return HTMLResponse(content=read_html_file(BASE_DIR / "templates" / "service_categories.html"))
+async def service_categories_content(request: Request):
+    return serve_html_file(request, BASE_DIR / "templates" / "service_categories.html")
 
 @app.get("/system-health-content", response_class=HTMLResponse)
-async def system_health_content():
-    return HTMLResponse(content=read_html_file(BASE_DIR / "templates" / "system_health.html"))
+async def system_health_content(request: Request):
+    return serve_html_file(request, BASE_DIR / "templates" / "system_health.html")
 
 @app.get("/form-tester-content", response_class=HTMLResponse)
-async def form_tester_content():
-    return HTMLResponse(content=read_html_file(BASE_DIR / "templates" / "enhanced_form_tester.html"))
+async def form_tester_content(request: Request):
+    return serve_html_file(request, BASE_DIR / "templates" / "enhanced_form_tester.html")
 
 # Protected main dashboard route - now the root
 @app.get("/", response_class=HTMLResponse)
@@ -342,59 +396,59 @@ async def root(request: Request):
         </html>
         """)
     
-    return HTMLResponse(content=read_html_file(BASE_DIR / "lead_router_pro_dashboard.html"))
+    return serve_html_file(request, BASE_DIR / "lead_router_pro_dashboard.html")
 
 # Protected dashboard content route
 @app.get("/dashboard-content", response_class=HTMLResponse)
 async def dashboard_content(request: Request):
     """Serve main dashboard content - protected route"""
-    return HTMLResponse(content=read_html_file(BASE_DIR / "lead_router_pro_dashboard.html"))
+    return serve_html_file(request, BASE_DIR / "lead_router_pro_dashboard.html")
 
 # Admin User Guide Route - Public Access (read-only documentation)
 @app.get("/admin_user_guide.html", response_class=HTMLResponse)
 @app.get("/user-guide", response_class=HTMLResponse)
-async def admin_user_guide():
+async def admin_user_guide(request: Request):
     """Serve the admin user guide - no authentication required for documentation"""
     user_guide_path = BASE_DIR / "admin_user_guide.html"
-    return HTMLResponse(content=read_html_file(user_guide_path))
+    return serve_html_file(request, user_guide_path)
 
 # Vendor Widget Route - Public Access
 @app.get("/vendor-widget", response_class=HTMLResponse)
 @app.get("/vendor-application", response_class=HTMLResponse)
-async def vendor_widget_page():
+async def vendor_widget_page(request: Request):
     """Serve the vendor application widget - no authentication required"""
     vendor_widget_path = BASE_DIR / "vendor_application_final.html"
-    return HTMLResponse(content=read_html_file(vendor_widget_path))
+    return serve_html_file(request, vendor_widget_path)
 
 @app.get("/vendor-application-new", response_class=HTMLResponse)
-async def vendor_application_new():
+async def vendor_application_new(request: Request):
     """Serve the NEW enhanced vendor application with Level 3 services - for GUI approval"""
     vendor_app_new_path = BASE_DIR / "vendor_application_new.html"
-    return HTMLResponse(content=read_html_file(vendor_app_new_path))
+    return serve_html_file(request, vendor_app_new_path)
 
 @app.get("/vendor-application-api", response_class=HTMLResponse)
-async def vendor_application_api():
+async def vendor_application_api(request: Request):
     """Serve the API-driven vendor application - fetches data from services API"""
     vendor_app_api_path = BASE_DIR / "vendor_application_api.html"
-    return HTMLResponse(content=read_html_file(vendor_app_api_path))
+    return serve_html_file(request, vendor_app_api_path)
 
 @app.get("/vendor-application-api-fixed", response_class=HTMLResponse)
-async def vendor_application_api_fixed():
+async def vendor_application_api_fixed(request: Request):
     """Serve the FIXED API-driven vendor application"""
     vendor_app_fixed_path = BASE_DIR / "vendor_application_api_fixed.html"
-    return HTMLResponse(content=read_html_file(vendor_app_fixed_path))
+    return serve_html_file(request, vendor_app_fixed_path)
 
 @app.get("/vendor-application-api-v2", response_class=HTMLResponse)
-async def vendor_application_api_v2():
+async def vendor_application_api_v2(request: Request):
     """Serve the V2 API-driven vendor application - complete working version"""
     vendor_app_v2_path = BASE_DIR / "vendor_application_api_v2.html"
-    return HTMLResponse(content=read_html_file(vendor_app_v2_path))
+    return serve_html_file(request, vendor_app_v2_path)
 
 @app.get("/vendor-application-working", response_class=HTMLResponse)
-async def vendor_application_working():
+async def vendor_application_working(request: Request):
     """Serve the WORKING vendor application with all fixes"""
     vendor_app_working_path = BASE_DIR / "vendor_application_working.html"
-    return HTMLResponse(content=read_html_file(vendor_app_working_path))
+    return serve_html_file(request, vendor_app_working_path)
 
 # Health check endpoint
 @app.get("/health")
@@ -414,6 +468,15 @@ async def health_check():
         ]
     }
 
+# Prometheus scrape endpoint
+@app.get("/metrics")
+async def prometheus_metrics(request: Request):
+    """Metrics in the Prometheus text exposition format"""
+    if AppConfig.METRICS_AUTH_TOKEN and \
+            request.headers.get("authorization") != f"Bearer {AppConfig.METRICS_AUTH_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Error handlers
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
@@ -143,35 +143,15 @@ class VendorMigrator:
         Returns:
             Tuple of (county_list, successful_conversion_count)
         """
-        counties = []
-        successful_conversions = 0
-        
-        for zip_code in zip_codes:
-            zip_str = str(zip_code).strip()
-            
-            # Validate ZIP code format
-            if not zip_str or len(zip_str) != 5 or not zip_str.isdigit():
-                logger.warning(f"⚠️ Invalid ZIP code format: '{zip_str}', skipping")
-                continue
-            
-            # Convert using LocationService
-            location_data = location_service.zip_to_location(zip_str)
-            
-            if location_data.get('error'):
-                logger.warning(f"⚠️ Could not convert ZIP {zip_str}: {location_data['error']}")
-                continue
-            
-            county = location_data.get('county')
-            state = location_data.get('state')
-            
-            if county and state:
-                county_entry = f"{county}, {state}"
-                if county_entry not in counties:
-                    counties.append(county_entry)
-                    logger.debug(f"   ✅ ZIP {zip_str} → {county_entry}")
-                successful_conversions += 1
+        batch = location_service.zips_to_locations(zip_codes)
+        for detail in batch["details"]:
+            if detail["success"]:
+                logger.debug(f"   ✅ ZIP {detail['zip_code']} → {detail['county']}, {detail['state']}")
             else:
-                logger.warning(f"⚠️ ZIP {zip_str} did not resolve to valid county/state")
+                logger.warning(f"⚠️ Could not convert ZIP {detail['zip_code']}: {detail['error']}")
+        
+        counties = batch["counties"]
+        successful_conversions = batch["successful_conversions"]
         
         return counties, successful_conversions
     
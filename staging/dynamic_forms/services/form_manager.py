@@ -3,9 +3,15 @@ Dynamic Form Configuration Manager
 Handles form registration, auto-discovery, and webhook processing
 """
 
+import copy
 import json
+import atexit
 import logging
-from typing import Dict, List, Optional, Any
+import threading
+from types import MappingProxyType
+from typing import Dict, List, Optional, Any, Mapping
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 from datetime import datetime
 
@@ -19,6 +25,113 @@ from staging.dynamic_forms.models.form_models import (
 
 logger = logging.getLogger(__name__)
 
+# Seconds between batched submission-count flushes
+SUBMISSION_FLUSH_INTERVAL = 10.0
+
+# Cache sentinel: identifier never looked up (None means "looked up, not registered")
+_MISSING = object()
+
+
+# ============================================
+# SHARED CACHES (FormManager is created per request)
+# ============================================
+
+class FormConfigCache:
+    """
+    Read-only form configurations keyed by form identifier. Entries are frozen
+    (MappingProxyType) and dropped by register/update/delete so the next read reloads.
+    Unregistered identifiers are cached as None until a form is registered.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Optional[Mapping[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, form_identifier: str):
+        return self._entries.get(form_identifier, _MISSING)
+
+    def put(self, form_identifier: str, config: Optional[Dict]) -> Optional[Mapping[str, Any]]:
+        frozen = MappingProxyType(copy.deepcopy(config)) if config is not None else None
+        with self._lock:
+            self._entries[form_identifier] = frozen
+        return frozen
+
+    def invalidate(self, form_identifier: str = None) -> None:
+        with self._lock:
+            if form_identifier is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(form_identifier, None)
+
+
+class FormSubmissionCounter:
+    """
+    Accumulates per-form submission counts in memory and writes them in one batched
+    UPDATE every SUBMISSION_FLUSH_INTERVAL seconds instead of a commit per submission.
+    """
+
+    def __init__(self, flush_interval: float = SUBMISSION_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, List] = {}  # form_id -> [count, last_submission]
+        self._engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def record(self, form_id: str, engine: Engine) -> None:
+        now = datetime.utcnow()
+        with self._lock:
+            self._engine = engine
+            entry = self._pending.setdefault(form_id, [0, now])
+            entry[0] += 1
+            entry[1] = now
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> int:
+        """Write pending counts in a single transaction; returns the number of forms updated"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            engine = self._engine
+            self._timer = None
+
+        if not pending or engine is None:
+            return 0
+
+        params = [
+            {"form_id": form_id, "count": count, "last_submission": last_submission}
+            for form_id, (count, last_submission) in pending.items()
+        ]
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    text(
+                        "UPDATE form_configurations "
+                        "SET submission_count = COALESCE(submission_count, 0) + :count, "
+                        "last_submission = :last_submission "
+                        "WHERE id = :form_id"
+                    ),
+                    params
+                )
+            logger.debug(f"Flushed submission counts for {len(params)} forms")
+            return len(params)
+        except Exception as e:
+            logger.error(f"Error flushing form submission counts: {e}")
+            # Put the counts back so they are retried on the next flush
+            with self._lock:
+                for form_id, (count, last_submission) in pending.items():
+                    entry = self._pending.setdefault(form_id, [0, last_submission])
+                    entry[0] += count
+                    entry[1] = max(entry[1], last_submission)
+            return 0
+
+
+# Global instances
+form_config_cache = FormConfigCache()
+form_submission_counter = FormSubmissionCounter()
+atexit.register(form_submission_counter.flush)
+
 
 class FormManager:
     """Manages dynamic form configurations and processing"""
@@ -92,6 +205,7 @@ class FormManager:
                     self.add_field_configuration(form, field_config)
             
             self.db.commit()
+            form_config_cache.invalidate(form_config["form_identifier"])
             
             logger.info(f"Registered form: {form_config['form_identifier']}")
             return form
@@ -302,6 +416,7 @@ class FormManager:
             unregistered.reviewed_at = datetime.utcnow()
             
             self.db.commit()
+            form_config_cache.invalidate(unregistered.form_identifier)
             
             logger.info(f"Auto-registered form: {unregistered.form_identifier}")
             return form
@@ -315,44 +430,57 @@ class FormManager:
     # FORM RETRIEVAL AND LOOKUP
     # ============================================
     
-    def get_form_configuration(self, form_identifier: str) -> Optional[Dict]:
+    def get_form_configuration(self, form_identifier: str, record_submission: bool = True) -> Optional[Dict]:
         """
         Get form configuration for webhook processing
-        This is the main method called by the webhook handler
+        This is the main method called by the webhook handler.
+        Served from the shared config cache; the submission is only counted in memory
+        (flushed in batches by form_submission_counter), so reads never write.
         """
-        # Check for registered form
+        cached = form_config_cache.get(form_identifier)
+        if cached is _MISSING:
+            cached = form_config_cache.put(form_identifier, self._load_form_configuration(form_identifier))
+        
+        if cached is None:
+            return None
+        
+        if record_submission:
+            form_submission_counter.record(cached["form_id"], self.db.get_bind())
+        
+        # Hand out a copy so callers can never mutate the shared cached entry
+        return copy.deepcopy(dict(cached))
+    
+    def _load_form_configuration(self, form_identifier: str) -> Optional[Dict]:
+        """Build the webhook-facing configuration dict for an active form"""
         form = self.db.query(FormConfiguration).filter_by(
             form_identifier=form_identifier,
             is_active=True
         ).first()
         
-        if form:
-            config = {
-                "form_type": form.form_type,
-                "service_category": form.category.category_name if form.category else None,
-                "default_subcategory": form.default_subcategory,
-                "required_fields": form.required_fields,
-                "optional_fields": form.optional_fields,
-                "field_mappings": form.field_mappings,
-                "validation_rules": form.validation_rules,
-                "priority": form.priority,
-                "auto_route_to_vendor": form.auto_route_to_vendor,
-                "requires_approval": form.requires_approval,
-                "default_tags": form.default_tags,
-                "metadata": form.meta_data  # Use meta_data field
-            }
-            
-            # Update submission tracking
-            form.submission_count += 1
-            form.last_submission = datetime.utcnow()
-            self.db.commit()
-            
-            return config
+        if not form:
+            return None
         
-        return None
+        return {
+            "form_id": form.id,
+            "form_type": form.form_type,
+            "service_category": form.category.category_name if form.category else None,
+            "default_subcategory": form.default_subcategory,
+            "required_fields": form.required_fields,
+            "optional_fields": form.optional_fields,
+            "field_mappings": form.field_mappings,
+            "validation_rules": form.validation_rules,
+            "priority": form.priority,
+            "auto_route_to_vendor": form.auto_route_to_vendor,
+            "requires_approval": form.requires_approval,
+            "default_tags": form.default_tags,
+            "metadata": form.meta_data  # Use meta_data field
+        }
     
     def get_all_forms(self, active_only: bool = True, form_type: Optional[str] = None) -> List[Dict]:
         """Get all registered forms"""
+        # Make pending submission counts visible before listing
+        form_submission_counter.flush()
+        
         query = self.db.query(FormConfiguration)
         
         if active_only:
@@ -391,7 +519,7 @@ class FormManager:
     
     def test_form(self, form_identifier: str, test_payload: Dict) -> Dict[str, Any]:
         """Test a form configuration with sample data"""
-        config = self.get_form_configuration(form_identifier)
+        config = self.get_form_configuration(form_identifier, record_submission=False)
         
         if not config:
             return {
@@ -465,6 +593,7 @@ class FormManager:
             
             form.updated_at = datetime.utcnow()
             self.db.commit()
+            form_config_cache.invalidate(form_identifier)
             
             logger.info(f"Updated form: {form_identifier}")
             return form
@@ -487,6 +616,7 @@ class FormManager:
             form.is_active = False
             form.updated_at = datetime.utcnow()
             self.db.commit()
+            form_config_cache.invalidate(form_identifier)
             
             logger.info(f"Deactivated form: {form_identifier}")
             return True
@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""
+Routing replay and benchmark harness
+
+Builds a reproducible synthetic marketplace from a seed (vendors with county, state,
+radius and national coverage; leads with a ZIP and a service) and runs it through the
+routing engine, reporting throughput, latency percentiles and allocations per stage:
+
+    match     lead_routing_service.find_matching_vendors
+    select    find_matching_vendors + select_vendor_from_pool (writes last_lead_assigned)
+    pipeline  Elementor webhook body -> GHL contact -> opportunity -> lead -> vendor
+              assignment, against a local in-memory GHL stub (no network)
+
+Everything runs on a throwaway SQLite database and a synthetic ZIP gazetteer, so results
+do not depend on pgeocode, the live database or GHL. Routing decisions (eligible pools and
+selected vendors) are compared with a golden file, so an optimization that changes who
+gets a lead fails the run, and so does any error logged while a stage runs.
+
+Usage:
+    python test_scripts/benchmark_routing_replay.py [--vendors 200] [--leads 1000] [--seed 7]
+        [--stages match,select,pipeline] [--pipeline-leads 100] [--performance-pct 30]
+        [--golden test_scripts/golden/routing_replay.json] [--update-golden] [--trace-alloc]
+
+    find_matching_vendors is linear in vendors per lead: at 100k vendors keep --leads to a
+    few thousand; 1M leads is practical at the low end of the vendor range. Stages share
+    round-robin state, so golden decisions are only compared for the recorded stage list.
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import argparse
+import tempfile
+import tracemalloc
+from array import array
+from collections import Counter
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+# Offline settings - must be in place before config is imported
+os.environ.update({
+    "GHL_LOCATION_ID": "bench-location",
+    "GHL_PRIVATE_TOKEN": "bench-token",
+    "PIPELINE_ID": "bench-pipeline",
+    "NEW_LEAD_STAGE_ID": "bench-stage-new",
+    "GHL_RATE_LIMIT_PER_SECOND": "1000000",
+    "GHL_RATE_LIMIT_BURST": "1000000",
+    "SHARED_STATE_BACKEND": "memory",
+})
+
+from config import AppConfig
+from database.simple_connection import db as simple_db_instance
+from api.services.location_service import location_service
+from api.services.lead_routing_service import lead_routing_service
+from api.services.service_categories import SERVICE_CATEGORIES, FORM_TO_CATEGORY_MAPPINGS
+
+DEFAULT_GOLDEN = os.path.join(PROJECT_DIR, "test_scripts", "golden", "routing_replay.json")
+
+# (state, center lat, center lng) - coastal states the marketplace actually serves
+STATES = [
+    ("FL", 27.8, -81.7), ("GA", 32.7, -83.4), ("SC", 33.9, -80.9), ("NC", 35.6, -79.4),
+    ("AL", 32.8, -86.8), ("MS", 32.7, -89.7), ("LA", 31.0, -92.0), ("TX", 31.0, -99.0),
+    ("VA", 37.5, -78.8), ("MD", 39.0, -76.7), ("NJ", 40.1, -74.5), ("NY", 42.9, -75.5),
+]
+# Lead columns test_scripts/restructure_database_tables.py adds to production databases;
+# init_database does not create them, but the webhook pipeline writes them
+RESTRUCTURED_LEAD_COLUMNS = [("primary_service_category", "TEXT"), ("specific_service_requested", "TEXT"),
+                             ("customer_zip_code", "TEXT"), ("assigned_at", "TIMESTAMP")]
+COVERAGE_MIX = [("county", 0.55), ("state", 0.2), ("radius", 0.2), ("national", 0.05)]
+SERVICE_RADII = (15, 25, 50, 100)
+
+
+class SyntheticGazetteer:
+    """Deterministic ZIP -> state/county/centroid table standing in for pgeocode"""
+
+    def __init__(self, rng: random.Random, counties_per_state: int = 20, zips_per_county: int = 10):
+        self.locations: Dict[str, Dict[str, Any]] = {}
+        self.counties: List[Tuple[str, str]] = []
+        next_zip = 10000
+        for state, lat, lng in STATES:
+            for index in range(counties_per_state):
+                county = f"{state} County {index:02d}"
+                county_lat, county_lng = lat + rng.uniform(-1.5, 1.5), lng + rng.uniform(-1.5, 1.5)
+                self.counties.append((county, state))
+                for _ in range(zips_per_county):
+                    zip_code = f"{next_zip:05d}"
+                    next_zip += 1
+                    self.locations[zip_code] = {
+                        'state': state, 'county': county, 'city': county, 'zipcode': zip_code,
+                        'lat': round(county_lat + rng.uniform(-0.2, 0.2), 4),
+                        'lng': round(county_lng + rng.uniform(-0.2, 0.2), 4),
+                        'accuracy': 4, 'error': None,
+                    }
+        self.zip_codes = list(self.locations)
+
+    def zip_to_location(self, zip_code: str) -> Dict[str, Any]:
+        location = self.locations.get(location_service.normalize_zip_code(zip_code))
+        return dict(location) if location else {'error': f'ZIP code not found: {zip_code}'}
+
+    def install(self) -> None:
+        """Serve location_service lookups from this table (its ZIP cache is the batch path)"""
+        location_service._zip_cache.update(self.locations)
+        location_service.zip_to_location = self.zip_to_location
+
+
+def _weighted(rng: random.Random, choices: List[Tuple[str, float]]) -> str:
+    point, total = rng.random(), 0.0
+    for value, weight in choices:
+        total += weight
+        if point < total:
+            return value
+    return choices[-1][0]
+
+
+def generate_vendors(rng: random.Random, count: int, gazetteer: SyntheticGazetteer) -> List[tuple]:
+    """Vendor rows (without account id) in insert order; ids are stable across runs"""
+    categories = list(SERVICE_CATEGORIES)
+    state_counties: Dict[str, List[str]] = {}
+    for county, state in gazetteer.counties:
+        state_counties.setdefault(state, []).append(f"{county}, {state}")
+
+    rows = []
+    for index in range(count):
+        category = rng.choice(categories)
+        services = rng.sample(SERVICE_CATEGORIES[category], k=min(len(SERVICE_CATEGORIES[category]), rng.randint(1, 6)))
+        coverage_type = _weighted(rng, COVERAGE_MIX)
+        states, counties, home_zip, radius = [], [], None, None
+        if coverage_type == "county":
+            state = rng.choice(STATES)[0]
+            counties = rng.sample(state_counties[state], k=rng.randint(1, 5))
+        elif coverage_type == "state":
+            states = [s for s, _, _ in rng.sample(STATES, k=rng.randint(1, 2))]
+        elif coverage_type == "radius":
+            home_zip = rng.choice(gazetteer.zip_codes)
+            radius = float(rng.choice(SERVICE_RADII))
+
+        vendor_id = f"bench-vendor-{index:06d}"
+        rows.append((
+            vendor_id, f"Bench Vendor {index}", f"Bench Marine {index} LLC",
+            f"vendor{index}@bench.example", f"+1555{index:07d}", f"bench-vcontact-{index:06d}",
+            f"bench-user-{index:06d}", json.dumps([category]), json.dumps(services), coverage_type,
+            json.dumps(states), json.dumps(counties), round(rng.uniform(5, 60), 1),
+            "active" if rng.random() < 0.95 else "inactive", 1 if rng.random() < 0.9 else 0,
+            home_zip, radius,
+        ))
+    return rows
+
+
+def generate_leads(seed: int, count: int, gazetteer: SyntheticGazetteer) -> Iterator[Dict[str, Any]]:
+    """Leads are streamed (1M leads never sit in memory); same seed, same sequence"""
+    rng = random.Random(seed * 7919 + 1)
+    categories = list(SERVICE_CATEGORIES)
+    for index in range(count):
+        category = rng.choice(categories)
+        service = rng.choice(SERVICE_CATEGORIES[category]) if rng.random() < 0.8 else category
+        yield {"key": f"lead-{index:07d}", "zip": rng.choice(gazetteer.zip_codes),
+               "category": category, "service": service}
+
+
+def setup_database(workdir: str, vendor_rows: List[tuple]) -> str:
+    """Point the shared SimpleDatabase at a fresh file and load the synthetic vendors"""
+    simple_db_instance.db_path = os.path.join(workdir, "routing_benchmark.db")
+    simple_db_instance.init_database()
+    account_id = simple_db_instance.create_account(
+        company_name="Benchmark Marine", industry="marine", ghl_location_id=AppConfig.GHL_LOCATION_ID
+    )
+    conn = simple_db_instance._get_conn()
+    try:
+        lead_columns = {row[1] for row in conn.execute("PRAGMA table_info(leads)")}
+        for column_name, column_def in RESTRUCTURED_LEAD_COLUMNS:
+            if column_name not in lead_columns:
+                conn.execute(f"ALTER TABLE leads ADD COLUMN {column_name} {column_def}")
+        conn.executemany("""
+            INSERT INTO vendors (id, account_id, name, company_name, email, phone, ghl_contact_id,
+                                 ghl_user_id, service_categories, services_offered, coverage_type,
+                                 coverage_states, coverage_counties, lead_close_percentage, status,
+                                 taking_new_work, home_zip_code, service_radius_miles)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(row[0], account_id) + row[1:] for row in vendor_rows])
+        conn.commit()
+    finally:
+        conn.close()
+    return account_id
+
+
+class ErrorLogCollector(logging.Handler):
+    """Collects ERROR records logged while a stage runs - any of them fails the run"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.messages: List[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(f"{record.name}: {record.getMessage()}")
+
+
+class StageMeter:
+    """Wall time, per-item latency percentiles, GC activity and (optionally) traced memory"""
+
+    def __init__(self, name: str, trace_alloc: bool = False):
+        self.name = name
+        self.trace_alloc = trace_alloc
+        self.latencies = array('d')
+
+    def __enter__(self):
+        gc.collect()
+        self._gc_before = sum(s["collections"] for s in gc.get_stats())
+        self._blocks_before = sys.getallocatedblocks()
+        if self.trace_alloc:
+            tracemalloc.start()
+        self._started = time.perf_counter()
+        return self
+
+    def record(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self._started
+        self.peak_kib = None
+        if self.trace_alloc:
+            self.peak_kib = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+        self.gc_collections = sum(s["collections"] for s in gc.get_stats()) - self._gc_before
+        self.net_blocks = sys.getallocatedblocks() - self._blocks_before
+        return False
+
+    def report(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        count = len(ordered)
+
+        def percentile(p: float) -> float:
+            return ordered[min(count - 1, int(p / 100 * count))] * 1000 if count else 0.0
+
+        return {
+            "items": count,
+            "elapsed_s": round(self.elapsed, 3),
+            "per_sec": round(count / self.elapsed, 1) if self.elapsed else 0.0,
+            "p50_ms": round(percentile(50), 3),
+            "p95_ms": round(percentile(95), 3),
+            "p99_ms": round(percentile(99), 3),
+            "max_ms": round(ordered[-1] * 1000, 3) if count else 0.0,
+            "gc_collections": self.gc_collections,
+            "net_alloc_blocks": self.net_blocks,
+            "peak_traced_kib": round(self.peak_kib, 1) if self.peak_kib is not None else None,
+        }
+
+
+def _pool_digest(vendors: List[Dict[str, Any]]) -> str:
+    ids = ",".join(v["id"] for v in vendors)
+    return f"{len(vendors)}:{hashlib.sha1(ids.encode()).hexdigest()[:12]}"
+
+
+def run_match(leads: Iterator[Dict[str, Any]], account_id: str, trace_alloc: bool):
+    decisions = {}
+    with StageMeter("match", trace_alloc) as meter:
+        for lead in leads:
+            started = time.perf_counter()
+            vendors = lead_routing_service.find_matching_vendors(
+                account_id, lead["category"], lead["zip"], specific_service=lead["service"]
+            )
+            meter.record(time.perf_counter() - started)
+            decisions[lead["key"]] = _pool_digest(vendors)
+    return meter, decisions
+
+
+def run_select(leads: Iterator[Dict[str, Any]], account_id: str, seed: int, trace_alloc: bool):
+    decisions = {}
+    random.seed(seed)  # performance-vs-round-robin draws
+    with StageMeter("select", trace_alloc) as meter:
+        for lead in leads:
+            started = time.perf_counter()
+            vendors = lead_routing_service.find_matching_vendors(
+                account_id, lead["category"], lead["zip"], specific_service=lead["service"]
+            )
+            selected = lead_routing_service.select_vendor_from_pool(vendors, account_id)
+            meter.record(time.perf_counter() - started)
+            decisions[lead["key"]] = selected["id"] if selected else None
+    return meter, decisions
+
+
+class LocalGHLStub:
+    """In-memory stand-in for the GHL client calls made by the webhook pipeline"""
+
+    def __init__(self):
+        self.contacts: Dict[str, Dict[str, Any]] = {}
+        self.opportunities: Dict[str, Dict[str, Any]] = {}
+        self.calls = Counter()
+
+    def search_contacts(self, query: str = None, email: str = None, phone: str = None, limit: int = 20) -> List[Dict]:
+        self.calls["search_contacts"] += 1
+        needle = (query or email or phone or "").lower()
+        return [c for c in self.contacts.values()
+                if needle and needle in (str(c.get("email", "")).lower(), str(c.get("phone", "")))][:limit]
+
+    def get_contact_by_id(self, contact_id: str) -> Optional[Dict]:
+        self.calls["get_contact_by_id"] += 1
+        return self.contacts.get(contact_id)
+
+    def create_contact(self, contact_data: Dict) -> Optional[Dict]:
+        self.calls["create_contact"] += 1
+        contact_id = f"bench-contact-{len(self.contacts):07d}"
+        self.contacts[contact_id] = {**contact_data, "id": contact_id}
+        return {"contact": self.contacts[contact_id]}
+
+    def update_contact(self, contact_id: str, update_data: Dict) -> bool:
+        self.calls["update_contact"] += 1
+        if contact_id not in self.contacts:
+            return False
+        self.contacts[contact_id].update(update_data)
+        return True
+
+    def create_opportunity(self, opportunity_data: Dict) -> Optional[Dict]:
+        self.calls["create_opportunity"] += 1
+        opportunity_id = f"bench-opp-{len(self.opportunities):07d}"
+        self.opportunities[opportunity_id] = {**opportunity_data, "id": opportunity_id}
+        return {"opportunity": self.opportunities[opportunity_id]}
+
+    def get_opportunities_by_contact(self, contact_id: str) -> List[Dict]:
+        self.calls["get_opportunities_by_contact"] += 1
+        return [o for o in self.opportunities.values() if o.get("contactId") == contact_id]
+
+    def update_opportunity(self, opportunity_id: str, update_data: Dict) -> bool:
+        self.calls["update_opportunity"] += 1
+        if opportunity_id not in self.opportunities:
+            return False
+        self.opportunities[opportunity_id].update(update_data)
+        return True
+
+
+def _client_lead_forms() -> Dict[str, str]:
+    """Category -> one Elementor form identifier that routes as a client lead"""
+    excluded = ("vendor", "network", "join", "application", "emergency", "tow", "breakdown",
+                "urgent", "subscribe", "email", "contact", "inquiry")
+    forms: Dict[str, str] = {}
+    for form_identifier, category in sorted(FORM_TO_CATEGORY_MAPPINGS.items()):
+        if category not in forms and not any(word in form_identifier for word in excluded):
+            forms[category] = form_identifier
+    return forms
+
+
+async def run_pipeline(leads: Iterator[Dict[str, Any]], seed: int, trace_alloc: bool):
+    from api.routes import webhook_routes
+
+    stub = LocalGHLStub()
+    webhook_routes.OptimizedGoHighLevelAPI = lambda *args, **kwargs: stub
+    webhook_routes.get_shared_ghl_client = lambda: stub
+    forms = _client_lead_forms()
+
+    decisions = {}
+    random.seed(seed)
+    with StageMeter("pipeline", trace_alloc) as meter:
+        for index, lead in enumerate(leads):
+            form_identifier = forms.get(lead["category"], lead["category"].lower().replace(" ", "_"))
+            body = json.dumps({
+                "firstName": "Bench", "lastName": f"Lead {index}",
+                "email": f"{lead['key']}@bench.example", "phone": f"555{index:07d}",
+                "zip_code_of_service": lead["zip"], "specific_service_needed": lead["service"],
+                "desired_timeline": "Within a week", "special_requests__notes": "benchmark",
+            }).encode()
+            started = time.perf_counter()
+            await webhook_routes.process_elementor_webhook_with_body(form_identifier, body, "application/json")
+            meter.record(time.perf_counter() - started)
+            decisions[lead["key"]] = _routed_vendor(f"{lead['key']}@bench.example")
+
+    print(f"  GHL stub calls: {dict(stub.calls)}")
+    return meter, decisions
+
+
+def _routed_vendor(email: str) -> Optional[str]:
+    conn = simple_db_instance._get_conn()
+    try:
+        row = conn.execute("SELECT vendor_id FROM leads WHERE customer_email = ?", (email,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        logging.getLogger(__name__).error(f"No lead record created for {email}")
+        return None
+    return row[0]
+
+
+def compare_with_golden(path: str, config: Dict[str, Any], results: Dict[str, Dict[str, Any]]) -> bool:
+    if not os.path.exists(path):
+        print(f"\nNo golden file at {path} - record one with --update-golden")
+        return True
+    with open(path) as f:
+        golden = json.load(f)
+    if golden.get("config") != config:
+        print(f"\nGolden comparison skipped: recorded for {golden.get('config')}")
+        return True
+
+    ok = True
+    print("\n=== Golden comparison ===")
+    for stage, decisions in results.items():
+        expected = golden.get("stages", {}).get(stage)
+        if expected is None:
+            print(f"{stage:>9}: no golden decisions recorded")
+            continue
+        changed = [key for key in expected if decisions.get(key) != expected[key]]
+        if not changed and len(decisions) == len(expected):
+            print(f"{stage:>9}: {len(decisions)} decisions match")
+            continue
+        ok = False
+        print(f"{stage:>9}: {len(changed)} of {len(expected)} decisions CHANGED")
+        for key in changed[:10]:
+            print(f"           {key}: {expected[key]} -> {decisions.get(key)}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Routing replay and benchmark harness")
+    parser.add_argument("--vendors", type=int, default=200)
+    parser.add_argument("--leads", type=int, default=1000)
+    parser.add_argument("--pipeline-leads", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--performance-pct", type=int, default=30,
+                        help="Account's performance-routing percentage (rest is round-robin)")
+    parser.add_argument("--stages", default="match,select,pipeline",
+                        help="Comma-separated: match, select, pipeline")
+    parser.add_argument("--golden", default=DEFAULT_GOLDEN)
+    parser.add_argument("--update-golden", action="store_true")
+    parser.add_argument("--trace-alloc", action="store_true", help="Track peak memory with tracemalloc (slower)")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.WARNING))
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    config = {"vendors": args.vendors, "leads": args.leads, "pipeline_leads": args.pipeline_leads,
+              "seed": args.seed, "performance_pct": args.performance_pct, "stages": stages}
+
+    rng = random.Random(args.seed)
+    gazetteer = SyntheticGazetteer(rng)
+    gazetteer.install()
+    vendor_rows = generate_vendors(rng, args.vendors, gazetteer)
+
+    print("=== Routing Replay Benchmark ===")
+    print(f"Vendors: {args.vendors}, leads: {args.leads}, pipeline leads: {args.pipeline_leads}, "
+          f"seed: {args.seed}, performance routing: {args.performance_pct}%, "
+          f"ZIPs: {len(gazetteer.zip_codes)}\n")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    stage_errors: Dict[str, List[str]] = {}
+    with tempfile.TemporaryDirectory(prefix="routing_bench_") as workdir:
+        account_id = setup_database(workdir, vendor_rows)
+        lead_routing_service.update_routing_configuration(account_id, args.performance_pct)
+
+        for stage in stages:
+            if stage not in ("match", "select", "pipeline"):
+                parser.error(f"unknown stage: {stage}")
+            collector = ErrorLogCollector()
+            logging.getLogger().addHandler(collector)
+            if stage == "match":
+                meter, decisions = run_match(generate_leads(args.seed, args.leads, gazetteer), account_id, args.trace_alloc)
+            elif stage == "select":
+                meter, decisions = run_select(generate_leads(args.seed, args.leads, gazetteer), account_id,
+                                              args.seed, args.trace_alloc)
+            else:
+                meter, decisions = asyncio.run(run_pipeline(
+                    generate_leads(args.seed + 1, args.pipeline_leads, gazetteer), args.seed, args.trace_alloc
+                ))
+            logging.getLogger().removeHandler(collector)
+
+            results[stage] = decisions
+            r = meter.report()
+            print(f"{stage:>9}: {r['per_sec']:9.1f}/s  p50 {r['p50_ms']:.2f}ms  p95 {r['p95_ms']:.2f}ms  "
+                  f"p99 {r['p99_ms']:.2f}ms  max {r['max_ms']:.2f}ms  ({r['items']} in {r['elapsed_s']}s)")
+            alloc = f"gc collections {r['gc_collections']}, net alloc blocks {r['net_alloc_blocks']:+d}"
+            if r["peak_traced_kib"] is not None:
+                alloc += f", peak traced {r['peak_traced_kib']:.0f} KiB"
+            print(f"{'':>11}{alloc}")
+            routed = sum(1 for d in decisions.values() if d and not str(d).startswith("0:"))
+            print(f"{'':>11}leads with a vendor: {routed}/{len(decisions)}")
+            if collector.messages:
+                stage_errors[stage] = collector.messages
+                print(f"{'':>11}❌ {len(collector.messages)} errors logged - stage FAILED")
+
+    if stage_errors:
+        print("\n=== Stage errors ===")
+        for stage, messages in stage_errors.items():
+            for message in messages[:10]:
+                print(f"{stage:>9}: {message}")
+        print("\nRun failed - results are not valid (golden file left unchanged)")
+        sys.exit(1)
+
+    if args.update_golden:
+        os.makedirs(os.path.dirname(args.golden), exist_ok=True)
+        with open(args.golden, "w") as f:
+            json.dump({"config": config, "stages": results}, f, indent=1, sort_keys=True)
+            f.write("\n")
+        print(f"\nGolden decisions written to {args.golden}")
+        return
+
+    if not compare_with_golden(args.golden, config, results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
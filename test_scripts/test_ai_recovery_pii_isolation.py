@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+AI error recovery - lead data isolation test
+
+Two leads with different emails, phones and names hit the same GHL validation error, so
+they share an error signature. Lead A is analyzed by a stub model whose corrected payload
+carries A's values; lead B must then be served from the signature cache (and later from
+the learned rule) with its own values only - nothing of lead A may reach B's retry
+payload, the cache or the persisted rule file.
+
+Usage:
+    python test_scripts/test_ai_recovery_pii_isolation.py
+"""
+
+import os
+import sys
+import json
+import asyncio
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+WORKDIR = tempfile.mkdtemp(prefix="ai_recovery_pii_")
+os.environ.setdefault("SHARED_STATE_BACKEND", "sqlite")
+os.environ["SHARED_STATE_SQLITE_PATH"] = os.path.join(WORKDIR, "shared_state.db")
+
+from api.services.ai_error_recovery_v2 import AIErrorRecoveryServiceV2, CorrectionRuleStore  # noqa: E402
+
+LEAD_A = {"firstName": "Alice", "lastName": "Archer", "email": " Alice.Archer@Example.com ",
+          "phone": "(305) 555-0101", "source": "Web Form"}
+LEAD_B = {"firstName": "Bob", "lastName": "Baker", "email": " Bob.Baker@Example.org ",
+          "phone": "(954) 555-0202", "source": "Web Form"}
+
+
+def ghl_error(lead):
+    return {"status_code": 422,
+            "response_text": f'email "{lead["email"].strip()}" is invalid; phone {lead["phone"]} must be E.164'}
+
+
+class StubModel:
+    """Answers like the model would for lead A: a full corrected payload with A's values"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def analyze(self, prompt):
+        self.calls += 1
+        return {
+            "error_type": "format_error",
+            "root_cause": "email alice.archer@example.com and phone 3055550101 are not normalized",
+            "problematic_fields": ["email", "phone"],
+            "suggested_corrections": {"email": "alice.archer@example.com", "phone": "+13055550101"},
+            "corrected_payload": {**LEAD_A, "email": "alice.archer@example.com", "phone": "+13055550101",
+                                  "country": "US", "tags": ["alice"]},
+            "confidence": "high",
+            "reasoning": "Normalize Alice's email and phone",
+            "retry_recommended": True,
+            "additional_checks": [],
+        }, {"input": 0, "output": 0}
+
+
+def lead_a_values():
+    return {"alice", "archer", "3055550101", "+13055550101", "example.com"}
+
+
+def leaks(payload) -> set:
+    text = json.dumps(payload).lower()
+    return {value for value in lead_a_values() if value in text}
+
+
+async def accept(payload):
+    return {"id": "contact-1"}
+
+
+async def main():
+    model = StubModel()
+    rules_file = os.path.join(WORKDIR, "ai_correction_rules.json")
+    service = AIErrorRecoveryServiceV2(model=model, rule_store=CorrectionRuleStore(rules_file))
+    failures = []
+
+    # Lead A: fresh model analysis; its own corrected values are fine for its own retry
+    analysis_a = await service.analyze_ghl_api_error(ghl_error(LEAD_A), LEAD_A, "/contacts/", "create_contact")
+    payload_a = await service._apply_corrections_smart(dict(LEAD_A), analysis_a)
+    print(f"Lead A retry payload: {payload_a}")
+
+    # Lead B: same signature, served from the cache without a model call
+    analysis_b = await service.analyze_ghl_api_error(ghl_error(LEAD_B), LEAD_B, "/contacts/", "create_contact")
+    payload_b = await service._apply_corrections_smart(dict(LEAD_B), analysis_b)
+    print(f"Lead B retry payload (cache): {payload_b}")
+    if model.calls != 1:
+        failures.append(f"expected one model call, got {model.calls}")
+    if leaks(payload_b) or leaks(analysis_b.to_dict()):
+        failures.append(f"lead A data in lead B cache analysis: {leaks(payload_b) | leaks(analysis_b.to_dict())}")
+    if payload_b.get("email") != "bob.baker@example.org" or payload_b.get("phone") != "+19545550202":
+        failures.append(f"structural corrections not applied to lead B: {payload_b}")
+
+    # Lead A's retry succeeds -> a rule is learned; lead B then goes through the rule
+    await service.smart_retry_with_state_machine(accept, LEAD_A, ghl_error(LEAD_A), "/contacts/", "create_contact")
+    result_b = await service.smart_retry_with_state_machine(accept, LEAD_B, ghl_error(LEAD_B),
+                                                            "/contacts/", "create_contact")
+    print(f"Lead B retry payload (rule): {result_b['final_payload']}")
+    if leaks(result_b["final_payload"]):
+        failures.append(f"lead A data in lead B rule rewrite: {leaks(result_b['final_payload'])}")
+
+    with open(rules_file) as f:
+        stored = json.load(f)
+    if leaks(stored) or any(op["op"] not in ("rename", "drop", "transform")
+                            for rule in stored.values() for op in rule["operations"]):
+        failures.append(f"persisted rules carry payload values: {stored}")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("\n✅ Cached analyses and learned rules carry no lead data across leads")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Multi-process round-robin consistency test
+
+Starts N worker processes that route leads at the same time against one vendor pool, the
+way `uvicorn --workers N` does: each worker reads the pool from the database (its
+last_lead_assigned values go stale while the others assign) and calls
+select_vendor_from_pool. With shared state, assignments in global order must rotate
+strictly - every run of <vendors> consecutive assignments hits each vendor once - and
+per-vendor totals differ by at most one.
+
+Usage:
+    python test_scripts/test_multiprocess_round_robin.py [--workers 4] [--vendors 5] [--leads 100]
+        [--backend sqlite|redis|memory] [--redis-url redis://localhost:6379/15]
+
+    --backend memory is the old process-local behaviour and is expected to fail.
+"""
+
+import os
+import sys
+import uuid
+import argparse
+import tempfile
+import multiprocessing
+from collections import Counter
+from typing import List, Tuple
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+
+def configure_environment(args, workdir: str) -> None:
+    """Shared-state settings - must be in place before config is imported (workers inherit them)"""
+    os.environ.update({
+        "SHARED_STATE_BACKEND": args.backend,
+        "SHARED_STATE_SQLITE_PATH": os.path.join(workdir, "shared_state.db"),
+        "SHARED_STATE_REDIS_URL": args.redis_url or "",
+        "SHARED_STATE_PREFIX": f"rr-test-{uuid.uuid4().hex[:8]}:",
+    })
+
+
+def setup_database(db_path: str, vendor_count: int) -> str:
+    from database.simple_connection import db
+
+    db.db_path = db_path
+    db.init_database()
+    account_id = db.create_account(company_name="Round Robin Test", industry="marine")
+    conn = db._get_conn()
+    try:
+        conn.executemany("""
+            INSERT INTO vendors (id, account_id, name, email, service_categories, services_offered,
+                                 coverage_type, status, taking_new_work)
+            VALUES (?, ?, ?, ?, '[]', '[]', 'national', 'active', 1)
+        """, [(f"rr-vendor-{i}", account_id, f"Vendor {i}", f"vendor{i}@rr.example") for i in range(vendor_count)])
+        conn.commit()
+    finally:
+        conn.close()
+    return account_id
+
+
+def worker(db_path: str, account_id: str, leads: int, barrier, results) -> None:
+    from database.simple_connection import db
+    from api.services.lead_routing_service import lead_routing_service
+
+    db.db_path = db_path
+    assignments: List[Tuple[str, str]] = []
+    record_assignment = lead_routing_service._update_vendor_last_assigned
+
+    def recording(vendor_id: str) -> str:
+        assigned_at = record_assignment(vendor_id)
+        assignments.append((assigned_at, vendor_id))
+        return assigned_at
+
+    lead_routing_service._update_vendor_last_assigned = recording
+
+    barrier.wait()
+    for _ in range(leads):
+        pool = lead_routing_service._get_vendors_from_database(account_id)
+        lead_routing_service.select_vendor_from_pool(pool, account_id)
+    results.put((os.getpid(), assignments))
+
+
+def check_rotation(sequence: List[str], vendor_count: int) -> Tuple[int, Counter]:
+    """Count assignments that repeat a vendor within the last <vendor_count> assignments"""
+    violations = 0
+    for index, vendor_id in enumerate(sequence):
+        if vendor_id in sequence[max(0, index - vendor_count + 1):index]:
+            violations += 1
+    return violations, Counter(sequence)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process round-robin consistency test")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--vendors", type=int, default=5)
+    parser.add_argument("--leads", type=int, default=100, help="Leads routed by each worker")
+    parser.add_argument("--backend", choices=("sqlite", "redis", "memory"), default="sqlite")
+    parser.add_argument("--redis-url", default=os.getenv("SHARED_STATE_REDIS_URL"))
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="round_robin_")
+    configure_environment(args, workdir)
+    db_path = os.path.join(workdir, "round_robin.db")
+    account_id = setup_database(db_path, args.vendors)
+
+    print("=== Multi-process Round-Robin Test ===")
+    print(f"Workers: {args.workers}, vendors: {args.vendors}, leads per worker: {args.leads}, "
+          f"backend: {args.backend}\n")
+
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(args.workers)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(db_path, account_id, args.leads, barrier, results))
+                 for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    assignments = []
+    for _ in processes:
+        pid, worker_assignments = results.get()
+        print(f"  worker {pid}: {len(worker_assignments)} assignments")
+        assignments.extend(worker_assignments)
+    for process in processes:
+        process.join()
+
+    sequence = [vendor_id for _, vendor_id in sorted(assignments)]
+    violations, counts = check_rotation(sequence, args.vendors)
+    spread = max(counts.values()) - min(counts.values())
+
+    print(f"\nAssignments per vendor: {dict(sorted(counts.items()))}")
+    print(f"Spread (max - min): {spread}")
+    print(f"Rotation violations (vendor repeated within {args.vendors} consecutive leads): {violations}")
+
+    expected = args.workers * args.leads
+    if len(sequence) != expected or spread > 1 or violations:
+        print(f"\n❌ Round-robin is not consistent across workers ({len(sequence)}/{expected} assigned)")
+        sys.exit(1)
+    print("\n✅ Round-robin is consistent across workers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Vendor capacity test
+
+Routes leads through select_vendor_from_pool against vendors with lead quotas, on a
+throwaway database:
+    hourly quota   vendors with max_leads_per_hour 1 and 3: once the first is full, leads spill
+                   over to the second although round-robin would pick the first; the fifth lead
+                   gets None, and the buckets refill at limit/hour - checked with explicit `now`
+    open leads     vendors with max_open_leads 1 and 2: the same spillover, then None (the lead
+                   stays unassigned); closing a lead frees its vendor's slot
+
+Usage:
+    python test_scripts/test_vendor_capacity.py
+"""
+
+import os
+import sys
+import uuid
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+WORKDIR = tempfile.mkdtemp(prefix="vendor_capacity_")
+os.environ["SHARED_STATE_BACKEND"] = "sqlite"
+os.environ["SHARED_STATE_SQLITE_PATH"] = os.path.join(WORKDIR, "shared_state.db")
+
+from database.simple_connection import db  # noqa: E402
+
+db.db_path = os.path.join(WORKDIR, "capacity.db")
+db.init_database()
+
+from api.services.lead_routing_service import lead_routing_service  # noqa: E402
+from api.services.vendor_capacity import vendor_capacity  # noqa: E402
+
+failures = []
+
+
+def check(condition: bool, message: str) -> None:
+    print(f"{'✅' if condition else '❌'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def add_vendors(account_id: str, prefix: str, limit: str, values: list) -> list:
+    """One vendor per value of `limit` (other limits unset), oldest assignment first"""
+    vendors = [{"id": f"{prefix}-{i}", "name": f"{prefix} {i}", "last_lead_assigned": f"2020-01-0{i + 1}"}
+               for i in range(len(values))]
+    conn = db._get_conn()
+    try:
+        conn.executemany(f'''
+            INSERT INTO vendors (id, account_id, name, status, taking_new_work, last_lead_assigned, {limit})
+            VALUES (?, ?, ?, 'active', 1, ?, ?)
+        ''', [(v["id"], account_id, v["name"], v["last_lead_assigned"], value) for v, value in zip(vendors, values)])
+        conn.commit()
+    finally:
+        conn.close()
+    return vendors
+
+
+def add_lead(account_id: str) -> str:
+    lead_id = str(uuid.uuid4())
+    conn = db._get_conn()
+    try:
+        conn.execute("INSERT INTO leads (id, account_id, status, created_at) VALUES (?, ?, 'new', CURRENT_TIMESTAMP)",
+                      (lead_id, account_id))
+        conn.commit()
+    finally:
+        conn.close()
+    return lead_id
+
+
+def route(vendors: list, account_id: str, lead_id: str = None):
+    selected = lead_routing_service.select_vendor_from_pool(vendors, account_id, lead_id)
+    return selected["id"] if selected else None
+
+
+def test_hourly_quota(account_id: str) -> None:
+    print("\n--- max_leads_per_hour 1 and 3 ---")
+    vendors = add_vendors(account_id, "hourly", "max_leads_per_hour", [1, 3])
+    ids = [v["id"] for v in vendors]
+    routed = [route(vendors, account_id) for _ in range(5)]
+    print(f"Routed: {routed}")
+    check(routed[:2] == ids, "round-robin while both vendors have capacity")
+    check(routed[2:4] == [ids[1], ids[1]], "full vendor is skipped - leads spill over to the next vendor")
+    check(routed[4] is None, "fifth lead gets no vendor while every vendor is full")
+
+    conn = db._get_conn()
+    try:
+        consumed_at = conn.execute("SELECT MAX(updated_at) FROM vendor_capacity_buckets WHERE vendor_id IN (?, ?)",
+                                   ids).fetchone()[0]
+    finally:
+        conn.close()
+    for label, elapsed, expected in (("right away", 0, [0.0, 0.0]), ("after 20 minutes", 1200, [1 / 3, 1.0]),
+                                     ("after 3 hours", 3 * 3600, [1.0, 3.0])):
+        remaining = vendor_capacity.remaining(ids, now=consumed_at + elapsed)
+        check(all(abs(remaining[vendor_id] - value) < 0.01 for vendor_id, value in zip(ids, expected)),
+              f"buckets hold {expected} tokens {label} (refill limit/hour, capped at the limit)")
+    available = [v["id"] for v in vendor_capacity.filter_available(vendors)]
+    check(available == [], "no vendor available until a whole token has refilled")
+
+
+def test_open_lead_cap(account_id: str) -> None:
+    print("\n--- max_open_leads 1 and 2 ---")
+    vendors = add_vendors(account_id, "open", "max_open_leads", [1, 2])
+    ids = [v["id"] for v in vendors]
+    leads = [add_lead(account_id) for _ in range(4)]
+    routed = [route(vendors, account_id, lead_id) for lead_id in leads]
+    print(f"Routed: {routed}")
+    check(routed[:3] == [ids[0], ids[1], ids[1]], "vendor holding its maximum open leads is skipped")
+    check(routed[3] is None, "fourth lead gets no vendor while every vendor is at its open-lead cap")
+    check(db.get_lead_by_id(leads[3]).get("vendor_id") is None, "unrouted lead stays unassigned")
+
+    conn = db._get_conn()
+    try:
+        conn.execute("UPDATE leads SET status = 'won' WHERE id = ?", (leads[0],))
+        conn.commit()
+    finally:
+        conn.close()
+    check(route(vendors, account_id, leads[3]) == ids[0], "closing a lead frees its vendor's slot")
+
+
+def main():
+    account_id = db.create_account(company_name="Capacity Test", industry="marine")
+    test_hourly_quota(account_id)
+    test_open_lead_cap(account_id)
+
+    if failures:
+        print(f"\n❌ {len(failures)} check(s) failed")
+        sys.exit(1)
+    print("\n✅ Vendor quotas spill over, exhaust and refill as expected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Vendor scoring test
+
+Feeds assignments and outcomes to vendor_scoring with explicit event times (`at`) and reads
+scores at explicit times (`now`), on a throwaway database:
+    decay         a counter is worth exp(-elapsed / window) in every window
+    duplicates    re-delivered outcomes and status events change nothing
+    reversal      won -> lost moves the lead between counters; reopening withdraws it and the
+                  vendor scores its synced close rate again
+    rebuild       rebuild() from lead history reproduces the won/lost counters and scores
+                  that the incremental (O(1) per event) updates produced
+
+Usage:
+    python test_scripts/test_vendor_scoring.py
+"""
+
+import os
+import sys
+import math
+import uuid
+import tempfile
+from datetime import datetime, timezone
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+WORKDIR = tempfile.mkdtemp(prefix="vendor_scoring_")
+os.environ["SHARED_STATE_BACKEND"] = "sqlite"
+os.environ["SHARED_STATE_SQLITE_PATH"] = os.path.join(WORKDIR, "shared_state.db")
+os.environ["VENDOR_SCORE_WINDOWS_DAYS"] = "30,90"
+os.environ["VENDOR_SCORE_REASSIGNMENT_AS_LOST"] = "true"
+
+from database.simple_connection import db  # noqa: E402
+
+db.db_path = os.path.join(WORKDIR, "scoring.db")
+db.init_database()
+
+from api.services.vendor_scoring import vendor_scoring  # noqa: E402
+
+DAY = 86400.0
+T0 = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc).timestamp()
+
+failures = []
+
+
+def check(condition: bool, message: str) -> None:
+    print(f"{'✅' if condition else '❌'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def scores(vendor_ids, now: float, synced_rate: float = 0.0):
+    vendors = [{"id": vendor_id, "lead_close_percentage": synced_rate} for vendor_id in vendor_ids]
+    return vendor_scoring.get_scores(vendors, now=now)
+
+
+def status_event(lead_id: str, vendor_id: str, status: str, at: float):
+    return vendor_scoring.handle_lead_event({"event_type": "opportunity_status_changed", "lead_id": lead_id,
+                                             "vendor_id": vendor_id, "status": status, "timestamp": at})
+
+
+def sql_time(at: float) -> str:
+    return datetime.fromtimestamp(at, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def add_lead(vendor_id: str, created_at: float, status: str, updated_at: float) -> str:
+    lead_id = str(uuid.uuid4())
+    conn = db._get_conn()
+    try:
+        conn.execute("INSERT INTO leads (id, vendor_id, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                     (lead_id, vendor_id, status, sql_time(created_at), sql_time(updated_at)))
+        conn.commit()
+    finally:
+        conn.close()
+    return lead_id
+
+
+def test_decay() -> None:
+    print("\n--- decay ---")
+    vendor_scoring.record_assignment("decay-v", at=T0)
+    vendor_scoring.record_outcome("decay-lead", "decay-v", "won", at=T0)
+    for elapsed_days in (0, 30, 60):
+        windows = scores(["decay-v"], now=T0 + elapsed_days * DAY)["decay-v"]["windows"]
+        expected = {f"{days}d": math.exp(-elapsed_days / days) for days in (30, 90)}
+        check(all(abs(windows[window]["won"] - value) < 0.006 and abs(windows[window]["assigned"] - value) < 0.006
+                  for window, value in expected.items()),
+              f"after {elapsed_days} days counters are worth exp(-elapsed/window): "
+              f"{ {window: round(value, 2) for window, value in expected.items()} }")
+
+
+def test_duplicates() -> None:
+    print("\n--- duplicate deliveries ---")
+    check(vendor_scoring.record_outcome("dup-lead", "dup-v", "won", at=T0), "first outcome is counted")
+    before = scores(["dup-v"], now=T0 + DAY)
+    check(not vendor_scoring.record_outcome("dup-lead", "dup-v", "won", at=T0 + 3600), "repeated outcome is a no-op")
+    check(status_event("dup-lead", "dup-v", "won", T0 + 7200) is None, "repeated status event is a no-op")
+    check(scores(["dup-v"], now=T0 + DAY) == before, "counters unchanged by duplicates")
+
+
+def test_reversal() -> None:
+    print("\n--- outcome reversal ---")
+    synced = 40.0
+    check(status_event("rev-lead", "rev-v", "won", T0) == "won", "won counted")
+    check(status_event("rev-lead", "rev-v", "lost", T0 + DAY) == "lost", "won -> lost counted")
+    windows = scores(["rev-v"], now=T0 + DAY, synced_rate=synced)["rev-v"]["windows"]
+    check(all(w["won"] == 0.0 and w["lost"] == 1.0 for w in windows.values()),
+          f"the win is withdrawn exactly and the loss counted: {windows}")
+    check(status_event("rev-lead", "rev-v", "open", T0 + 2 * DAY) == "open", "reopen withdraws the outcome")
+    result = scores(["rev-v"], now=T0 + 2 * DAY, synced_rate=synced)["rev-v"]
+    check(all(w["won"] == 0.0 and w["lost"] == 0.0 for w in result["windows"].values())
+          and abs(result["score"] - synced) < 1e-9,
+          f"after reopening the vendor scores its synced close rate ({result['score']:.4f})")
+
+
+def test_rebuild_matches_incremental() -> None:
+    print("\n--- rebuild vs incremental ---")
+    vendors = ["rb-a", "rb-b"]
+    # Incremental: the events as they would arrive, each with its own time
+    won = add_lead("rb-a", T0, "won", T0 + 5 * DAY)
+    vendor_scoring.record_assignment("rb-a", at=T0)
+    status_event(won, "rb-a", "won", T0 + 5 * DAY)
+
+    flipped = add_lead("rb-a", T0 + DAY, "lost", T0 + 20 * DAY)
+    vendor_scoring.record_assignment("rb-a", at=T0 + DAY)
+    status_event(flipped, "rb-a", "won", T0 + 10 * DAY)
+    status_event(flipped, "rb-a", "lost", T0 + 20 * DAY)
+    status_event(flipped, "rb-a", "lost", T0 + 21 * DAY)  # Duplicate delivery
+
+    rewon = add_lead("rb-b", T0 + 2 * DAY, "won", T0 + 40 * DAY)
+    vendor_scoring.record_assignment("rb-b", at=T0 + 2 * DAY)
+    status_event(rewon, "rb-b", "won", T0 + 15 * DAY)
+    status_event(rewon, "rb-b", "open", T0 + 30 * DAY)
+    status_event(rewon, "rb-b", "won", T0 + 40 * DAY)
+
+    add_lead("rb-b", T0 + 3 * DAY, "new", T0 + 3 * DAY)
+    vendor_scoring.record_assignment("rb-b", at=T0 + 3 * DAY)
+
+    # Reassigned rb-a -> rb-b: rebuild only sees the current vendor, so rb-b's assignment is
+    # recorded at the lead's creation time, as rebuild() counts it
+    reassigned = add_lead("rb-b", T0 + 4 * DAY, "new", T0 + 8 * DAY)
+    vendor_scoring.record_assignment("rb-b", at=T0 + 4 * DAY)
+    event = {"event_type": "lead_reassigned", "lead_id": reassigned, "previous_vendor_id": "rb-a",
+             "new_vendor_id": "rb-b", "timestamp": sql_time(T0 + 8 * DAY)}
+    db.create_lead_event(event)
+    vendor_scoring.handle_lead_event(event)
+
+    now = T0 + 60 * DAY
+    incremental = scores(vendors, now=now, synced_rate=25.0)
+    vendor_scoring.rebuild()
+    rebuilt = scores(vendors, now=now, synced_rate=25.0)
+
+    for vendor_id in vendors:
+        same_outcomes = all(
+            incremental[vendor_id]["windows"][window][field] == rebuilt[vendor_id]["windows"][window][field]
+            for window in incremental[vendor_id]["windows"] for field in ("won", "lost", "close_rate")
+        )
+        check(same_outcomes and abs(incremental[vendor_id]["score"] - rebuilt[vendor_id]["score"]) < 1e-9,
+              f"{vendor_id}: rebuilt won/lost/score match incremental "
+              f"(score {incremental[vendor_id]['score']:.4f} vs {rebuilt[vendor_id]['score']:.4f})")
+    # The previous vendor of a reassigned lead keeps its assignment incrementally, but rebuild()
+    # has no record of it - so assignments match for rb-b only
+    check(all(incremental["rb-b"]["windows"][w]["assigned"] == rebuilt["rb-b"]["windows"][w]["assigned"]
+              for w in incremental["rb-b"]["windows"]),
+          "rb-b: rebuilt assignments match incremental")
+
+
+def main():
+    test_decay()
+    test_duplicates()
+    test_reversal()
+    test_rebuild_matches_incremental()
+
+    if failures:
+        print(f"\n❌ {len(failures)} check(s) failed")
+        sys.exit(1)
+    print("\n✅ Incremental vendor scores decay, deduplicate, reverse and rebuild exactly")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,714 @@
+#!/usr/bin/env python3
+"""
+Webhook load generator and soak test
+
+Replays Elementor submissions and GHL new-contact webhooks against a running server at a
+target rate (open loop - arrivals don't wait for responses) and reports, per interval and
+at the end:
+
+    acceptance   POST latency percentiles and status codes/errors per form
+    routing      time from POST to the lead row and to vendor assignment (needs --db)
+    server       threads, RSS, open fds, scheduler backlog and mean SQLite call time,
+                 scraped from /metrics
+    lock waits   time a writer waits for the SQLite write lock (BEGIN IMMEDIATE probe
+                 against --db every --probe-interval seconds)
+
+Sources (combine freely; the form mix follows the source unless --mix is given):
+    --capture FILE       JSON/JSONL: a GET /api/v1/routing/debug/payloads dump (kinds
+                         elementor_normalized and ghl_new_contact_webhook), or records of
+                         {"form_identifier", "payload"} / {"form_identifier", "body", "content_type"}
+    --activity-db FILE   rebuild submissions from activity_log + leads, as listed by
+                         view_recent_form_submissions.py (field names and values of real
+                         submissions, last --hours)
+    (none)               synthetic client-lead submissions for every service category
+
+Elementor payloads are sent as JSON, flat form-encoded or Elementor's nested
+fields[name][value] encoding (--encoding). Every submission gets a unique email/phone so
+routing can be tracked and dedup doesn't coalesce the run. GHL contact webhooks need the
+contact to exist: with --ghl-emulator the contact is created there first (the server
+must point GHL_API_BASE_URL at the same emulator).
+
+Usage:
+    python test_scripts/webhook_load_generator.py --url http://localhost:8000 --rate 5 --duration 600 \\
+        [--capture payloads.json] [--activity-db smart_lead_router.db --hours 168] \\
+        [--mix boat_maintenance=5,emergency_tow=1] [--encoding mixed] [--poisson] \\
+        [--db smart_lead_router.db] [--metrics-token TOKEN] \\
+        [--ghl-emulator http://localhost:8000/ghl-emulator] [--json-out soak.json]
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import random
+import sqlite3
+import asyncio
+import argparse
+import threading
+import urllib.request
+from array import array
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.services.service_categories import SERVICE_CATEGORIES, FORM_TO_CATEGORY_MAPPINGS
+
+ELEMENTOR_PATH = "/api/v1/webhooks/elementor/{form_identifier}"
+GHL_CONTACT_PATH = "/api/v1/webhooks/ghl/process-new-contact"
+SYNTHETIC_ZIPS = ("33101", "33139", "33004", "33301", "33401", "32801", "33602", "33901", "34102", "33040")
+CLIENT_LEAD_EXCLUDED = ("vendor", "network", "join", "application", "emergency", "tow", "breakdown",
+                        "urgent", "subscribe", "email", "contact", "inquiry")
+
+
+def percentile(values, pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def ms(seconds: Optional[float]) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.0f}ms"
+
+
+# ============================================
+# Submission sources
+# ============================================
+
+def _submission(kind: str, form: str, fields: Dict[str, Any], raw: Tuple[bytes, str] = None) -> Dict[str, Any]:
+    return {"kind": kind, "form": form, "fields": fields, "raw": raw}
+
+
+def load_capture_file(path: str) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        text = f.read().strip()
+    try:
+        data = json.loads(text)
+        records = data.get("data", {}).get("payloads", []) if isinstance(data, dict) else data
+    except ValueError:
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    submissions = []
+    for record in records:
+        kind = record.get("kind")
+        if kind == "elementor_normalized":
+            submissions.append(_submission("elementor", record.get("context", {}).get("form", "unknown"),
+                                           record["payload"]))
+        elif kind == "ghl_new_contact_webhook":
+            submissions.append(_submission("ghl_contact", "ghl_new_contact", record["payload"]))
+        elif "body" in record:
+            body = record["body"].encode() if isinstance(record["body"], str) else json.dumps(record["body"]).encode()
+            submissions.append(_submission("elementor", record["form_identifier"], {},
+                                           (body, record.get("content_type", "application/json"))))
+        elif "payload" in record and "form_identifier" in record:
+            submissions.append(_submission("elementor", record["form_identifier"], record["payload"]))
+    return submissions
+
+
+def _value_for(key: str, lead: Dict[str, Any], rng: random.Random) -> str:
+    """Best guess at a field's value from the lead row it produced"""
+    name = key.lower()
+    first, _, last = (lead.get("customer_name") or "Soak Test").partition(" ")
+    if "email" in name:
+        return lead.get("customer_email") or "soak@loadtest.example"
+    if "phone" in name:
+        return lead.get("customer_phone") or "5550000000"
+    if "first" in name:
+        return first
+    if "last" in name:
+        return last or "Customer"
+    if "zip" in name:
+        return lead.get("customer_zip_code") or rng.choice(SYNTHETIC_ZIPS)
+    if "specific" in name or "service_requested" in name or "service_needed" in name:
+        return lead.get("specific_service_requested") or ""
+    if "category" in name:
+        return lead.get("primary_service_category") or ""
+    return "Load test"
+
+
+def load_activity_log(db_path: str, hours: float, rng: random.Random) -> List[Dict[str, Any]]:
+    """Submissions rebuilt from the activity log entries view_recent_form_submissions.py lists"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        threshold = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
+        rows = conn.execute("""
+            SELECT a.event_data, l.customer_name, l.customer_email, l.customer_phone,
+                   l.customer_zip_code, l.primary_service_category, l.specific_service_requested
+            FROM activity_log a
+            LEFT JOIN leads l ON l.ghl_contact_id = a.lead_id
+            WHERE (a.event_type LIKE 'clean_webhook_created'
+                   OR a.event_type LIKE 'clean_webhook_updated'
+                   OR a.event_type LIKE 'elementor_webhook_%')
+            AND a.timestamp > ?
+        """, (threshold,)).fetchall()
+    finally:
+        conn.close()
+
+    submissions = []
+    for row in rows:
+        try:
+            event = json.loads(row["event_data"] or "{}")
+        except ValueError:
+            continue
+        form = event.get("form")
+        if not form:
+            continue
+        lead = dict(row)
+        keys = event.get("elementor_payload_keys") or list(synthetic_fields(form, rng))
+        submissions.append(_submission("elementor", form, {key: _value_for(key, lead, rng) for key in keys}))
+    return submissions
+
+
+def synthetic_fields(form: str, rng: random.Random) -> Dict[str, Any]:
+    category = FORM_TO_CATEGORY_MAPPINGS.get(form) or rng.choice(list(SERVICE_CATEGORIES))
+    services = SERVICE_CATEGORIES.get(category) or [category]
+    return {
+        "firstName": "Soak", "lastName": "Customer",
+        "email": "soak@loadtest.example", "phone": "5550000000",
+        "zip_code_of_service": rng.choice(SYNTHETIC_ZIPS),
+        "specific_service_needed": rng.choice(services),
+        "desired_timeline": "Within a week",
+        "special_requests__notes": "Load test submission",
+    }
+
+
+def synthetic_forms() -> List[str]:
+    """One client-lead form per service category"""
+    forms: Dict[str, str] = {}
+    for form_identifier, category in sorted(FORM_TO_CATEGORY_MAPPINGS.items()):
+        if category not in forms and not any(word in form_identifier for word in CLIENT_LEAD_EXCLUDED):
+            forms[category] = form_identifier
+    return sorted(forms.values())
+
+
+class SubmissionMix:
+    """Picks a form by weight, then one of that form's submissions"""
+
+    def __init__(self, submissions: List[Dict[str, Any]], mix: Dict[str, float], rng: random.Random):
+        self.rng = rng
+        self.by_form: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for submission in submissions:
+            self.by_form[submission["form"]].append(submission)
+        if not self.by_form and not mix:
+            mix = {form: 1.0 for form in synthetic_forms()}
+        for form in mix:
+            if form not in self.by_form:
+                self.by_form[form].append(_submission("elementor", form, synthetic_fields(form, rng)))
+        weights = mix or {form: len(items) for form, items in self.by_form.items()}
+        self.forms = list(weights)
+        self.weights = [weights[form] for form in self.forms]
+
+    def pick(self) -> Dict[str, Any]:
+        form = self.rng.choices(self.forms, self.weights)[0]
+        return self.rng.choice(self.by_form[form])
+
+    def describe(self) -> str:
+        total = sum(self.weights)
+        return ", ".join(f"{form}={weight / total:.0%}" for form, weight in
+                         sorted(zip(self.forms, self.weights), key=lambda item: -item[1])[:8])
+
+
+# ============================================
+# Encoding
+# ============================================
+
+def personalize(fields: Dict[str, Any], run_id: str, seq: int) -> Tuple[Dict[str, Any], str]:
+    """Unique email/phone per submission -> (fields, tracking email)"""
+    fields = copy.deepcopy(fields)
+    email = f"soak+{run_id}-{seq}@loadtest.example"
+    phone = f"555{seq % 10_000_000:07d}"
+    targets = [fields] + [fields[k] for k in ("contact", "customData") if isinstance(fields.get(k), dict)]
+    for target in targets:
+        for key, value in list(target.items()):
+            if "email" in key.lower() and isinstance(value, str):
+                target[key] = email
+            elif "phone" in key.lower() and isinstance(value, str):
+                target[key] = phone
+    if not any("email" in key.lower() for key in fields):
+        fields["email"] = email
+    return fields, email
+
+
+def encode_elementor(fields: Dict[str, Any], form: str, encoding: str) -> Tuple[bytes, str]:
+    if encoding == "json":
+        return json.dumps(fields).encode(), "application/json"
+    flat = {key: value if isinstance(value, str) else json.dumps(value) for key, value in fields.items()}
+    if encoding == "form":
+        return urlencode(flat).encode(), "application/x-www-form-urlencoded"
+    # Elementor's own webhook format
+    nested = {"form[id]": form, "form[name]": form.replace("_", " ").title()}
+    for key, value in flat.items():
+        nested.update({f"fields[{key}][id]": key, f"fields[{key}][type]": "text",
+                       f"fields[{key}][title]": key.replace("_", " ").title(),
+                       f"fields[{key}][value]": value, f"fields[{key}][raw_value]": value,
+                       f"fields[{key}][required]": "0"})
+    nested.update({"meta[date][title]": "Date", "meta[date][value]": datetime.now().strftime("%B %d, %Y"),
+                   "meta[remote_ip][title]": "Remote IP", "meta[remote_ip][value]": "127.0.0.1"})
+    return urlencode(nested).encode(), "application/x-www-form-urlencoded"
+
+
+# ============================================
+# Measurement
+# ============================================
+
+class Recorder:
+    """Acceptance results, kept whole and per reporting interval"""
+
+    def __init__(self):
+        self.latencies = array('d')
+        self.window = array('d')
+        self.statuses: Counter = Counter()
+        self.window_statuses: Counter = Counter()
+        self.by_form: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Counter = Counter()
+        self.sent = 0
+        self.saturated = 0
+
+    def record(self, form: str, status: str, seconds: Optional[float]) -> None:
+        self.statuses[status] += 1
+        self.window_statuses[status] += 1
+        self.by_form[form][status] += 1
+        if seconds is not None:
+            self.latencies.append(seconds)
+            self.window.append(seconds)
+
+    def take_window(self) -> Tuple[array, Counter]:
+        window, statuses = self.window, self.window_statuses
+        self.window, self.window_statuses = array('d'), Counter()
+        return window, statuses
+
+    @property
+    def failed(self) -> int:
+        return sum(count for status, count in self.statuses.items() if not status.startswith("2"))
+
+
+class RoutingTracker(threading.Thread):
+    """Polls the leads table for submitted emails: time to lead row and to vendor assignment"""
+
+    def __init__(self, db_path: str, interval: float, timeout: float):
+        super().__init__(daemon=True, name="routing-tracker")
+        self.db_path, self.interval, self.timeout = db_path, interval, timeout
+        self.pending: Dict[str, float] = {}
+        self.created: Dict[str, float] = {}
+        self.to_lead = array('d')
+        self.to_routed = array('d')
+        self.unrouted = 0
+        self.tracked = 0
+        self._lock = threading.Lock()
+        self._halt = threading.Event()
+
+    def track(self, email: str, sent_at: float) -> None:
+        with self._lock:
+            self.pending[email] = sent_at
+            self.tracked += 1
+
+    def run(self) -> None:
+        while not self._halt.wait(self.interval):
+            self.poll()
+
+    def poll(self) -> None:
+        with self._lock:
+            emails = list(self.pending)
+        if not emails:
+            return
+        now = time.time()
+        rows = []
+        try:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=5)
+            try:
+                for start in range(0, len(emails), 500):
+                    chunk = emails[start:start + 500]
+                    rows.extend(conn.execute(
+                        f"SELECT customer_email, vendor_id FROM leads WHERE customer_email IN "
+                        f"({','.join('?' * len(chunk))})", chunk).fetchall())
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"⚠️ Routing poll failed: {e}")
+            return
+        with self._lock:
+            for email, vendor_id in rows:
+                sent_at = self.pending.get(email)
+                if sent_at is None:
+                    continue
+                if email not in self.created:
+                    self.created[email] = now
+                    self.to_lead.append(now - sent_at)
+                if vendor_id:
+                    self.to_routed.append(now - sent_at)
+                    del self.pending[email]
+                    self.created.pop(email, None)
+            for email, sent_at in list(self.pending.items()):
+                if now - sent_at > self.timeout:
+                    del self.pending[email]
+                    self.created.pop(email, None)
+                    self.unrouted += 1
+
+    def finish(self, grace: float) -> None:
+        deadline = time.time() + grace
+        while self.pending and time.time() < deadline:
+            time.sleep(self.interval)
+        self._halt.set()
+        self.poll()
+
+
+class LockProbe(threading.Thread):
+    """Measures how long a writer waits for the SQLite write lock"""
+
+    def __init__(self, db_path: str, interval: float):
+        super().__init__(daemon=True, name="sqlite-lock-probe")
+        self.db_path, self.interval = db_path, interval
+        self.waits = array('d')
+        self.window = array('d')
+        self.timeouts = 0
+        self._halt = threading.Event()
+
+    def run(self) -> None:
+        while not self._halt.wait(self.interval):
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            started = time.perf_counter()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                waited = time.perf_counter() - started
+                conn.execute("ROLLBACK")
+                self.waits.append(waited)
+                self.window.append(waited)
+            except sqlite3.OperationalError:
+                self.timeouts += 1
+            finally:
+                conn.close()
+
+    def take_window(self) -> array:
+        window, self.window = self.window, array('d')
+        return window
+
+    def stop(self) -> None:
+        self._halt.set()
+
+
+class ServerSampler(threading.Thread):
+    """Scrapes /metrics: process threads/RSS/fds, webhook backlog, SQLite call time"""
+
+    def __init__(self, base_url: str, token: Optional[str], interval: float):
+        super().__init__(daemon=True, name="metrics-sampler")
+        self.url = base_url.rstrip("/") + "/metrics"
+        self.token, self.interval = token, interval
+        self.samples: List[Dict[str, float]] = []
+        self.failures = 0
+        self._halt = threading.Event()
+
+    def run(self) -> None:
+        self.sample()
+        while not self._halt.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        request = urllib.request.Request(self.url)
+        if self.token:
+            request.add_header("Authorization", f"Bearer {self.token}")
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                text = response.read().decode()
+        except Exception as e:
+            self.failures += 1
+            if self.failures == 1:
+                print(f"⚠️ /metrics unavailable ({e}) - server stats disabled")
+            return
+        sample = {"t": time.time(), "backlog": 0.0, "sqlite_sum": 0.0, "sqlite_count": 0.0}
+        for line in text.splitlines():
+            if line.startswith("#") or " " not in line:
+                continue
+            name, value = line.rsplit(" ", 1)
+            if name.startswith('leadrouter_component_stat{component="process"'):
+                sample[name.split('stat="')[1].rstrip('"}')] = float(value)
+            elif name.startswith("leadrouter_webhook_backlog"):
+                sample["backlog"] += float(value)
+            elif name.startswith("leadrouter_sqlite_query_duration_seconds_sum"):
+                sample["sqlite_sum"] += float(value)
+            elif name.startswith("leadrouter_sqlite_query_duration_seconds_count"):
+                sample["sqlite_count"] += float(value)
+        self.samples.append(sample)
+
+    def latest(self) -> Dict[str, float]:
+        return self.samples[-1] if self.samples else {}
+
+    def stop(self) -> None:
+        self._halt.set()
+
+
+# ============================================
+# Load loop
+# ============================================
+
+async def create_emulator_contact(client: httpx.AsyncClient, emulator_url: str, fields: Dict[str, Any]) -> Optional[str]:
+    contact = fields.get("contact") if isinstance(fields.get("contact"), dict) else fields
+    body = {key: contact[key] for key in ("firstName", "lastName", "email", "phone", "tags") if key in contact}
+    response = await client.post(f"{emulator_url.rstrip('/')}/contacts/", json=body,
+                                 headers={"Authorization": "Bearer load-generator"})
+    if response.status_code == 400:
+        return response.json().get("meta", {}).get("contactId")
+    return response.json().get("contact", {}).get("id") if response.status_code < 300 else None
+
+
+async def send_one(client: httpx.AsyncClient, args, submission: Dict[str, Any], seq: int, run_id: str,
+                   rng: random.Random, recorder: Recorder, tracker: Optional[RoutingTracker]) -> None:
+    headers = {"User-Agent": "lead-router-load-generator"}
+    email = None
+    if submission["raw"]:
+        body, content_type = submission["raw"]
+        path = ELEMENTOR_PATH.format(form_identifier=submission["form"])
+    else:
+        fields, email = personalize(submission["fields"], run_id, seq)
+        if submission["kind"] == "ghl_contact":
+            if args.ghl_emulator:
+                contact_id = await create_emulator_contact(client, args.ghl_emulator, fields)
+                if not contact_id:
+                    recorder.record(submission["form"], "emulator_error", None)
+                    return
+                fields.update({"contactId": contact_id, "id": contact_id})
+            body, content_type = json.dumps(fields).encode(), "application/json"
+            headers["X-Webhook-Id"] = f"{run_id}-{seq}"
+            path = GHL_CONTACT_PATH
+        else:
+            encoding = args.encoding if args.encoding != "mixed" else rng.choice(("json", "form", "nested"))
+            body, content_type = encode_elementor(fields, submission["form"], encoding)
+            path = ELEMENTOR_PATH.format(form_identifier=submission["form"])
+    headers["Content-Type"] = content_type
+
+    sent_at = time.time()
+    started = time.perf_counter()
+    try:
+        response = await client.post(path, content=body, headers=headers)
+        status = str(response.status_code)
+    except httpx.HTTPError as e:
+        recorder.errors[type(e).__name__] += 1
+        recorder.record(submission["form"], type(e).__name__, None)
+        return
+    recorder.record(submission["form"], status, time.perf_counter() - started)
+    if tracker and email and status.startswith("2"):
+        tracker.track(email, sent_at)
+
+
+def report_line(elapsed: float, recorder: Recorder, tracker, probe, sampler) -> str:
+    window, statuses = recorder.take_window()
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    parts = [f"[{elapsed:6.0f}s] sent {recorder.sent:6d}",
+             f"ok {ok:4d} err {sum(statuses.values()) - ok:3d}",
+             f"accept p50 {ms(percentile(window, 50))} p99 {ms(percentile(window, 99))}"]
+    if recorder.saturated:
+        parts.append(f"saturated {recorder.saturated}")
+    if tracker:
+        parts.append(f"routed {len(tracker.to_routed)}/{tracker.tracked} "
+                     f"p95 {ms(percentile(tracker.to_routed, 95))}")
+    if probe:
+        parts.append(f"lock p95 {ms(percentile(probe.take_window(), 95))}")
+    if sampler and sampler.latest():
+        server = sampler.latest()
+        parts.append(f"threads {server.get('threads', 0):.0f} rss {server.get('rss_bytes', 0) / 2**20:.0f}MB "
+                     f"backlog {server.get('backlog', 0):.0f}")
+    return " | ".join(parts)
+
+
+async def run_load(args, mix: SubmissionMix, recorder: Recorder, tracker, probe, sampler) -> float:
+    rng = random.Random(args.seed)
+    run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        loop = asyncio.get_running_loop()
+        in_flight = set()
+        started = loop.time()
+        next_send = started
+        next_report = started + args.report_every
+        while loop.time() - started < args.duration and (not args.count or recorder.sent < args.count):
+            delay = next_send - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if len(in_flight) >= args.max_in_flight:
+                recorder.saturated += 1  # Server can't keep up with the offered rate
+            else:
+                recorder.sent += 1
+                task = asyncio.create_task(send_one(client, args, mix.pick(), recorder.sent, run_id,
+                                                    rng, recorder, tracker))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+            next_send += rng.expovariate(args.rate) if args.poisson else 1 / args.rate
+            if loop.time() >= next_report:
+                print(report_line(loop.time() - started, recorder, tracker, probe, sampler))
+                next_report += args.report_every
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        return loop.time() - started
+
+
+def growth(samples: List[Dict[str, float]], key: str) -> Optional[Tuple[float, float, float, float]]:
+    """(first, last, max, change per hour)"""
+    values = [(s["t"], s[key]) for s in samples if key in s]
+    if len(values) < 2:
+        return None
+    hours = max((values[-1][0] - values[0][0]) / 3600, 1e-9)
+    return values[0][1], values[-1][1], max(v for _, v in values), (values[-1][1] - values[0][1]) / hours
+
+
+def summarize(args, elapsed: float, recorder: Recorder, tracker, probe, sampler) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {
+        "elapsed_s": elapsed,
+        "sent": recorder.sent,
+        "offered_rate": args.rate,
+        "achieved_rate": recorder.sent / elapsed if elapsed else 0,
+        "client_saturated": recorder.saturated,
+        "statuses": dict(recorder.statuses),
+        "error_rate": recorder.failed / max(1, sum(recorder.statuses.values())),
+        "acceptance_ms": {f"p{p}": (percentile(recorder.latencies, p) or 0) * 1000 for p in (50, 95, 99)},
+        "by_form": {form: dict(statuses) for form, statuses in recorder.by_form.items()},
+    }
+    if tracker:
+        summary["routing"] = {
+            "tracked": tracker.tracked, "lead_created": len(tracker.to_lead), "routed": len(tracker.to_routed),
+            "unrouted_after_timeout": tracker.unrouted, "still_pending": len(tracker.pending),
+            "time_to_lead_ms": {f"p{p}": (percentile(tracker.to_lead, p) or 0) * 1000 for p in (50, 95, 99)},
+            "time_to_routed_ms": {f"p{p}": (percentile(tracker.to_routed, p) or 0) * 1000 for p in (50, 95, 99)},
+        }
+    if probe:
+        summary["sqlite_lock_wait_ms"] = {
+            "probes": len(probe.waits), "timeouts": probe.timeouts,
+            **{f"p{p}": (percentile(probe.waits, p) or 0) * 1000 for p in (50, 95, 99)},
+            "max": max(probe.waits, default=0) * 1000,
+        }
+    if sampler and len(sampler.samples) >= 2:
+        server = {}
+        for key in ("threads", "rss_bytes", "open_fds", "backlog"):
+            trend = growth(sampler.samples, key)
+            if trend:
+                server[key] = dict(zip(("first", "last", "max", "per_hour"), trend))
+        first, last = sampler.samples[0], sampler.samples[-1]
+        calls = last["sqlite_count"] - first["sqlite_count"]
+        server["sqlite_calls"] = calls
+        server["sqlite_mean_ms"] = (last["sqlite_sum"] - first["sqlite_sum"]) / calls * 1000 if calls else 0
+        summary["server"] = server
+    return summary
+
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    print("\n=== Soak Summary ===")
+    print(f"Sent {summary['sent']} in {summary['elapsed_s']:.0f}s "
+          f"({summary['achieved_rate']:.1f}/s of {summary['offered_rate']}/s offered, "
+          f"{summary['client_saturated']} skipped at max in-flight)")
+    print(f"Statuses: {summary['statuses']}  error rate {summary['error_rate']:.2%}")
+    acceptance = summary["acceptance_ms"]
+    print(f"Acceptance: p50 {acceptance['p50']:.0f}ms  p95 {acceptance['p95']:.0f}ms  p99 {acceptance['p99']:.0f}ms")
+    for form, statuses in sorted(summary["by_form"].items(), key=lambda item: -sum(item[1].values())):
+        print(f"  {form}: {statuses}")
+    routing = summary.get("routing")
+    if routing:
+        print(f"Routing: {routing['routed']}/{routing['tracked']} routed, {routing['lead_created']} lead rows, "
+              f"{routing['unrouted_after_timeout']} unrouted after timeout, {routing['still_pending']} pending")
+        print(f"  time to lead   p50 {routing['time_to_lead_ms']['p50']:.0f}ms  p95 {routing['time_to_lead_ms']['p95']:.0f}ms")
+        print(f"  time to routed p50 {routing['time_to_routed_ms']['p50']:.0f}ms  "
+              f"p95 {routing['time_to_routed_ms']['p95']:.0f}ms  p99 {routing['time_to_routed_ms']['p99']:.0f}ms")
+    locks = summary.get("sqlite_lock_wait_ms")
+    if locks:
+        print(f"SQLite write-lock wait: p50 {locks['p50']:.1f}ms  p95 {locks['p95']:.1f}ms  "
+              f"max {locks['max']:.1f}ms  ({locks['probes']} probes, {locks['timeouts']} timeouts)")
+    server = summary.get("server")
+    if server:
+        for key, trend in server.items():
+            if isinstance(trend, dict):
+                scale = 2**20 if key == "rss_bytes" else 1
+                print(f"Server {key}: {trend['first'] / scale:.0f} -> {trend['last'] / scale:.0f} "
+                      f"(max {trend['max'] / scale:.0f}, {trend['per_hour'] / scale:+.1f}/h)")
+        print(f"Server SQLite calls: {server['sqlite_calls']:.0f}, mean {server['sqlite_mean_ms']:.2f}ms")
+
+
+def parse_mix(spec: Optional[str]) -> Dict[str, float]:
+    mix = {}
+    for item in filter(None, (spec or "").split(",")):
+        form, _, weight = item.partition("=")
+        mix[form.strip()] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Webhook load generator and soak test")
+    parser.add_argument("--url", default="http://localhost:8000", help="Server base URL")
+    parser.add_argument("--rate", type=float, default=5.0, help="Submissions per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to run")
+    parser.add_argument("--count", type=int, default=0, help="Stop after this many submissions (0 = duration only)")
+    parser.add_argument("--poisson", action="store_true", help="Poisson arrivals instead of a fixed interval")
+    parser.add_argument("--max-in-flight", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30.0, help="HTTP timeout in seconds")
+    parser.add_argument("--capture", action="append", default=[], help="Captured payload file (repeatable)")
+    parser.add_argument("--activity-db", help="Rebuild submissions from this database's activity log")
+    parser.add_argument("--hours", type=float, default=168, help="Activity log window")
+    parser.add_argument("--mix", help="Form weights, e.g. boat_maintenance=5,emergency_tow=1")
+    parser.add_argument("--encoding", choices=("json", "form", "nested", "mixed"), default="mixed")
+    parser.add_argument("--ghl-emulator", help="GHL emulator base URL for creating contacts of GHL webhooks")
+    parser.add_argument("--db", help="Server database file (enables routing tracking and the lock probe)")
+    parser.add_argument("--routing-timeout", type=float, default=120.0)
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--probe-interval", type=float, default=1.0, help="SQLite lock probe interval (0 = off)")
+    parser.add_argument("--metrics-token", default=os.getenv("METRICS_AUTH_TOKEN"))
+    parser.add_argument("--no-metrics", action="store_true", help="Don't scrape /metrics")
+    parser.add_argument("--sample-every", type=float, default=10.0, help="Seconds between /metrics scrapes")
+    parser.add_argument("--report-every", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json-out", help="Write the summary and server samples here")
+    parser.add_argument("--max-error-rate", type=float, default=None, help="Exit 1 above this error rate")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    submissions = []
+    for path in args.capture:
+        submissions.extend(load_capture_file(path))
+    if args.activity_db:
+        submissions.extend(load_activity_log(args.activity_db, args.hours, rng))
+    mix = SubmissionMix(submissions, parse_mix(args.mix), rng)
+
+    print("=== Webhook Load Generator ===")
+    print(f"Target: {args.url}  rate {args.rate}/s ({'poisson' if args.poisson else 'fixed'}) "
+          f"for {args.duration:.0f}s, encoding {args.encoding}")
+    print(f"Submissions: {len(submissions) or 'synthetic'}  mix: {mix.describe()}\n")
+
+    recorder = Recorder()
+    tracker = probe = sampler = None
+    if args.db:
+        tracker = RoutingTracker(args.db, args.poll_interval, args.routing_timeout)
+        tracker.start()
+        if args.probe_interval > 0:
+            probe = LockProbe(args.db, args.probe_interval)
+            probe.start()
+    if not args.no_metrics:
+        sampler = ServerSampler(args.url, args.metrics_token, args.sample_every)
+        sampler.start()
+
+    elapsed = asyncio.run(run_load(args, mix, recorder, tracker, probe, sampler))
+
+    if tracker:
+        print(f"\nWaiting up to {args.routing_timeout:.0f}s for {len(tracker.pending)} leads to route...")
+        tracker.finish(args.routing_timeout)
+    if probe:
+        probe.stop()
+    if sampler:
+        sampler.stop()
+        sampler.sample()
+
+    summary = summarize(args, elapsed, recorder, tracker, probe, sampler)
+    print_summary(summary)
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump({"summary": summary, "server_samples": sampler.samples if sampler else []}, f, indent=2)
+        print(f"\n📄 Wrote {args.json_out}")
+
+    if args.max_error_rate is not None and summary["error_rate"] > args.max_error_rate:
+        print(f"❌ Error rate {summary['error_rate']:.2%} above {args.max_error_rate:.2%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
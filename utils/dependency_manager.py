@@ -118,9 +118,16 @@ class DependencyManager:
             "redis": DependencyInfo(
                 name="redis",
                 level=DependencyLevel.OPTIONAL,
-                purpose="Caching and session storage",
+                purpose="Shared state across workers and nodes (rate limits, IP blocks, round-robin, caches)",
                 install_command="pip install redis==5.0.1",
-                fallback_message="Caching disabled - performance may be slower"
+                fallback_message="Shared state uses a local SQLite file (workers on one node only)"
+            ),
+            "numpy": DependencyInfo(
+                name="numpy",
+                level=DependencyLevel.OPTIONAL,
+                purpose="Vectorized distance math for radius vendor matching",
+                install_command="pip install numpy",
+                fallback_message="Radius matching computes distances in pure Python"
             ),
             "celery": DependencyInfo(
                 name="celery",
@@ -171,6 +178,13 @@ class DependencyManager:
                 install_command="pip install aiosmtplib>=2.0,<3.0",
                 fallback_message="Email features limited"
             ),
+            "brotli": DependencyInfo(
+                name="brotli",
+                level=DependencyLevel.OPTIONAL,
+                purpose="Brotli-compressed cached API responses",
+                install_command="pip install brotli==1.1.0",
+                fallback_message="Cached responses served with gzip only"
+            ),
             "jinja2": DependencyInfo(
                 name="jinja2",
                 level=DependencyLevel.OPTIONAL,
@@ -0,0 +1,349 @@
+# utils/metrics.py
+"""
+Metrics Registry
+Prometheus-style counters and histograms rendered in the text exposition format at /metrics.
+
+Hot-path updates never take a lock: every thread writes to its own shard (a plain dict)
+and shards are only summed when /metrics is scraped. Existing ad-hoc stats dicts
+(security, rate limiter, caches, AI recovery...) are exposed through callbacks that are
+read at scrape time, so they cost nothing between scrapes.
+"""
+
+import os
+import time
+import inspect
+import logging
+import threading
+from bisect import bisect_left
+from functools import wraps
+from typing import Dict, Any, Callable, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "leadrouter_"
+
+# Seconds - spans fast SQLite lookups through slow GHL calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+LabelValues = Tuple[str, ...]
+
+
+class _ThreadShards:
+    """One dict per thread; readers copy every shard at scrape time"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._lock = threading.Lock()
+
+    def get(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def copies(self) -> List[dict]:
+        with self._lock:
+            shards = list(self._shards)
+        return [shard.copy() for shard in shards]
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._shards = _ThreadShards()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        shard = self._shards.get()
+        shard[label_values] = shard.get(label_values, 0) + amount
+
+    def collect(self) -> Dict[LabelValues, float]:
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._shards.copies():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._shards = _ThreadShards()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        shard = self._shards.get()
+        entry = shard.get(label_values)
+        if entry is None:
+            entry = shard[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def time(self, *label_values: str):
+        """Context manager observing the elapsed seconds of a block"""
+        return _Timer(self, label_values)
+
+    def collect(self) -> Dict[LabelValues, Tuple[List[int], float]]:
+        totals: Dict[LabelValues, Tuple[List[int], float]] = {}
+        for shard in self._shards.copies():
+            for key, (counts, total) in shard.items():
+                counts = list(counts)
+                if key in totals:
+                    merged_counts, merged_sum = totals[key]
+                    totals[key] = ([a + b for a, b in zip(merged_counts, counts)], merged_sum + total)
+                else:
+                    totals[key] = (counts, total)
+        return totals
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "start")
+
+    def __init__(self, histogram: Histogram, label_values: LabelValues):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+        return False
+
+
+class CallbackMetric:
+    """A gauge/counter whose samples are produced by a function at scrape time"""
+
+    def __init__(self, name: str, help: str, metric_type: str, labelnames: Tuple[str, ...],
+                 callback: Callable[[], Dict[LabelValues, float]]):
+        self.name = name
+        self.help = help
+        self.metric_type = metric_type
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        try:
+            samples = self.callback()
+        except Exception as e:
+            logger.warning(f"⚠️ Metrics callback for {self.name} failed: {e}")
+            return []
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.metric_type}"]
+        for key, value in sorted(samples.items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._caches: Dict[str, Callable[[], Tuple[float, float]]] = {}
+        self._stats_sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+        self.register(CallbackMetric(
+            f"{METRIC_PREFIX}cache_requests_total", "Cache lookups by cache and result",
+            "counter", ("cache", "result"), self._collect_cache_requests))
+        self.register(CallbackMetric(
+            f"{METRIC_PREFIX}cache_hit_ratio", "Cache hit ratio since process start",
+            "gauge", ("cache",), self._collect_cache_ratios))
+        self.register(CallbackMetric(
+            f"{METRIC_PREFIX}component_stat", "Numeric counters kept by individual components",
+            "gauge", ("component", "stat"), self._collect_component_stats))
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                return self._metrics[metric.name]
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(METRIC_PREFIX + name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(METRIC_PREFIX + name, help, labelnames, buckets))
+
+    def gauge_callback(self, name: str, help: str, labelnames: Tuple[str, ...],
+                       callback: Callable[[], Dict[LabelValues, float]]) -> CallbackMetric:
+        return self.register(CallbackMetric(METRIC_PREFIX + name, help, "gauge", labelnames, callback))
+
+    def register_cache(self, cache: str, hits_and_misses: Callable[[], Tuple[float, float]]) -> None:
+        """Expose a cache's (hits, misses) as request counters and a hit ratio"""
+        self._caches[cache] = hits_and_misses
+
+    def register_stats(self, component: str, stats: Callable[[], Dict[str, Any]]) -> None:
+        """Expose every numeric value of a component's stats dict"""
+        self._stats_sources[component] = stats
+
+    def _collect_cache_requests(self) -> Dict[LabelValues, float]:
+        samples = {}
+        for cache, getter in list(self._caches.items()):
+            hits, misses = getter()
+            samples[(cache, "hit")] = hits
+            samples[(cache, "miss")] = misses
+        return samples
+
+    def _collect_cache_ratios(self) -> Dict[LabelValues, float]:
+        samples = {}
+        for cache, getter in list(self._caches.items()):
+            hits, misses = getter()
+            samples[(cache,)] = hits / (hits + misses) if hits + misses else 0.0
+        return samples
+
+    def _collect_component_stats(self) -> Dict[LabelValues, float]:
+        samples = {}
+        for component, getter in list(self._stats_sources.items()):
+            try:
+                stats = getter()
+            except Exception as e:
+                logger.warning(f"⚠️ Stats for {component} unavailable: {e}")
+                continue
+            for key, value in stats.items():
+                if isinstance(value, (int, float)):
+                    samples[(component, key)] = float(value)
+        return samples
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global instance
+metrics = MetricsRegistry()
+
+# ============================================
+# Shared metric families
+# ============================================
+
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status"))
+ghl_request_duration = metrics.histogram(
+    "ghl_request_duration_seconds", "GoHighLevel API call latency",
+    ("method", "endpoint", "auth_type", "status"))
+sqlite_query_duration = metrics.histogram(
+    "sqlite_query_duration_seconds", "Time spent in each SimpleDatabase method", ("method",))
+vendor_match_pool_size = metrics.histogram(
+    "vendor_match_pool_size", "Eligible vendors found per lead match", (), SIZE_BUCKETS)
+rate_limit_rejections = metrics.counter(
+    "rate_limit_rejections_total", "Requests rejected by a rate limit or block", ("limiter",))
+
+
+def _process_stats() -> Dict[str, Any]:
+    """Threads, resident memory and open descriptors - what soak tests watch for leaks"""
+    stats = {"threads": threading.active_count()}
+    try:
+        with open("/proc/self/statm") as f:
+            stats["rss_bytes"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        stats["open_fds"] = len(os.listdir("/proc/self/fd"))
+    except (OSError, ValueError, IndexError):
+        pass  # Not Linux - threads only
+    return stats
+
+
+metrics.register_stats("process", _process_stats)
+
+
+def instrument_methods(cls, histogram: Histogram, exclude: Iterable[str] = ()) -> None:
+    """Time every public, plain method of cls into histogram (labelled by method name)"""
+    for name, func in list(vars(cls).items()):
+        if name.startswith("_") or name in exclude or not inspect.isfunction(func):
+            continue
+        setattr(cls, name, _timed_method(func, histogram, name))
+
+
+def _timed_method(func: Callable, histogram: Histogram, name: str) -> Callable:
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start, name)
+    return wrapper
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request latency by route template (not raw path, so
+    IDs and scanner noise don't create new series). Add it last so it wraps everything.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            http_request_duration.observe(time.perf_counter() - start,
+                                          scope.get("method", ""), route_path, str(status[0]))
@@ -0,0 +1,232 @@
+# utils/structured_logging.py
+"""
+Structured Logging
+Queue-backed, level-gated logging for the webhook hot path. A logging call only
+enqueues the record - message formatting and stream/file I/O happen on a listener
+thread. Chatty INFO/DEBUG output can be sampled per module, and full request
+payloads go to a bounded in-memory ring buffer (payload_capture) instead of the log.
+"""
+
+import copy
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, List, Optional
+
+from utils.metrics import metrics
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Dropped/sampled record counts (exported on /metrics)
+logging_stats = {"enqueued": 0, "dropped_queue_full": 0, "sampled_out": 0}
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stock handler formats every record in the caller's thread. Here the message
+    is only rendered up front when an argument is a mutable container that the caller
+    might change after the logging call returns.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args:
+            values = args.values() if isinstance(args, dict) else args
+            if isinstance(args, dict) or any(isinstance(v, (dict, list, set)) for v in values):
+                record.msg = record.getMessage()
+                record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            logging_stats["enqueued"] += 1
+        except queue.Full:
+            # Never block a request on log I/O
+            logging_stats["dropped_queue_full"] += 1
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of DEBUG/INFO records per module. WARNING and above always pass.
+    Rates are matched on the longest logger-name prefix, e.g. {"api.services.lead_routing_service": 0.1}.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = dict(rates)
+        self._resolved: Dict[str, float] = {}
+
+    def _rate_for(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            best = -1
+            for prefix, prefix_rate in self.rates.items():
+                if (name == prefix or name.startswith(prefix + ".")) and len(prefix) > best:
+                    rate, best = prefix_rate, len(prefix)
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate_for(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        logging_stats["sampled_out"] += 1
+        return False
+
+
+class StructuredFormatter(logging.Formatter):
+    """Text (the existing format plus key=value fields) or one JSON object per line"""
+
+    def __init__(self, json_output: bool = False):
+        super().__init__(TEXT_FORMAT)
+        self.json_output = json_output
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None)
+        if not self.json_output:
+            line = super().format(record)
+            if fields:
+                line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+            return line
+
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def log_event(logger: logging.Logger, level: int, event: str, **fields) -> None:
+    """Log an event with structured fields; nothing is built when the level is disabled"""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+
+class PayloadCapture:
+    """Bounded ring buffer of raw request/GHL payloads for debugging, off unless enabled"""
+
+    def __init__(self, max_entries: int = 200, enabled: bool = False):
+        self.enabled = enabled
+        self._entries: deque = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+        self.captured = 0
+
+    def configure(self, enabled: bool, max_entries: int) -> None:
+        with self._lock:
+            self.enabled = enabled
+            if max_entries != self._entries.maxlen:
+                self._entries = deque(self._entries, maxlen=max_entries)
+
+    def capture(self, kind: str, payload: Any, **context) -> None:
+        if not self.enabled:
+            return
+        entry = {
+            "captured_at": time.time(),
+            "kind": kind,
+            "context": context,
+            "payload": copy.deepcopy(payload),
+        }
+        with self._lock:
+            self._entries.append(entry)
+            self.captured += 1
+
+    def recent(self, limit: int = 20, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = list(self._entries)
+        if kind:
+            entries = [e for e in entries if e["kind"] == kind]
+        return list(reversed(entries[-limit:])) if limit > 0 else []
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "buffered": len(self._entries),
+            "max_entries": self._entries.maxlen,
+            "captured": self.captured,
+        }
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """'api.routes.webhook_routes=0.5,api.services.lead_routing_service=0.1' -> dict"""
+    rates = {}
+    for item in (spec or "").split(","):
+        name, _, rate = item.strip().partition("=")
+        if name and rate:
+            try:
+                rates[name.strip()] = max(0.0, min(1.0, float(rate)))
+            except ValueError:
+                pass
+    return rates
+
+
+_listener: Optional[QueueListener] = None
+
+
+def configure_logging() -> QueueListener:
+    """Route the root logger through a bounded queue drained by a background listener"""
+    global _listener
+    from config import AppConfig
+
+    if _listener is not None:
+        return _listener
+
+    formatter = StructuredFormatter(json_output=AppConfig.LOG_FORMAT == "json")
+    handlers: List[logging.Handler] = [logging.StreamHandler()]
+    if AppConfig.LOG_FILE:
+        handlers.append(logging.FileHandler(AppConfig.LOG_FILE))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = DeferredQueueHandler(queue.Queue(maxsize=AppConfig.LOG_QUEUE_SIZE))
+    rates = parse_sample_rates(AppConfig.LOG_SAMPLE_RATES)
+    if rates:
+        queue_handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, AppConfig.LOG_LEVEL.upper(), logging.INFO))
+
+    payload_capture.configure(AppConfig.LOG_CAPTURE_PAYLOADS, AppConfig.LOG_PAYLOAD_BUFFER_SIZE)
+
+    _listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+# Global instance
+payload_capture = PayloadCapture()
+metrics.register_stats("logging", lambda: {**logging_stats, "payloads_captured": payload_capture.captured})